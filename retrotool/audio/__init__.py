@@ -1,4 +1,20 @@
-"""retrotool.audio — SNES audio (BRR) codec wrappers."""
-from retrotool.audio.brr import BrrError, decode_brr, encode_brr
+"""retrotool.audio — SNES audio (BRR) codec and BRRtools wrappers."""
+from retrotool.audio.brr import (
+    BRR_BLOCK,
+    BRR_END,
+    BRR_LOOP,
+    BRR_SAMPLES,
+    BrrError,
+    BrrSample,
+    decode_brr,
+    decode_brr_samples,
+    encode_brr,
+    encode_brr_batch,
+    encode_brr_samples,
+)
 
-__all__ = ["encode_brr", "decode_brr", "BrrError"]
+__all__ = [
+    "encode_brr", "decode_brr", "BrrError",
+    "encode_brr_samples", "decode_brr_samples", "encode_brr_batch", "BrrSample",
+    "BRR_BLOCK", "BRR_SAMPLES", "BRR_END", "BRR_LOOP",
+]
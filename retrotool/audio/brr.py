@@ -1,11 +1,46 @@
-"""BRR encoder/decoder wrappers (BRRtools 3.15)."""
+"""BRR encoder/decoder: BRRtools 3.15 wrappers and an in-process codec.
+
+`encode_brr` / `decode_brr` shell out to BRRtools for WAV ↔ BRR files.
+`encode_brr_samples` / `decode_brr_samples` do the same on 16-bit sample
+sequences (`array('h')`, lists, int16 NumPy arrays) without a subprocess or
+temp files, and `encode_brr_batch` encodes a whole soundbank in a process
+pool.
+
+The decoder follows the S-DSP (and BRRtools' decoder) bit for bit: a signed
+nibble is scaled by `(n << range) >> 1` (ranges 13-15 give 0 / -2048), the
+block filter adds its fixed-point prediction from the previous two samples,
+and the sum is clamped to 16 bits then wrapped to 15. Output samples are
+that 15-bit value doubled. The encoder picks each block's filter and range
+by simulating exactly that decode, so the error it minimises is the error
+the hardware plays back.
+"""
 from __future__ import annotations
 
+import os
 import subprocess
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Optional, Sequence
 
 from retrotool import _toolchain
 
+BRR_BLOCK = 9          # bytes per block: header + 8 nibble pairs
+BRR_SAMPLES = 16       # samples per block
+
+BRR_END = 0x01
+BRR_LOOP = 0x02
+
+BRR_SEARCHES = ("exhaustive", "heuristic")
+
+_MAX_RANGE = 12
+
+# BRRtools' treble-boost FIR (tepples' gaussian inverse, scaled by 0.6).
+_BOOST = (0.912962, -0.16199, -0.0153283, 0.0426783,
+          -0.0372004, 0.023436, -0.0105816, 0.00250474)
+
 
 class BrrError(RuntimeError):
     """Raised when brr_encoder/brr_decoder exits non-zero."""
@@ -108,3 +143,294 @@ def decode_brr(
             f"--- stdout ---\n{proc.stdout}\n--- stderr ---\n{proc.stderr}"
         )
     return out_wav
+
+
+# --- in-process codec -------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class BrrSample:
+    """An encoded sample: whole BRR blocks plus the block the loop restarts
+    at (`None` = one-shot). `loop_offset` is what a sample directory stores."""
+    data: bytes
+    loop_block: Optional[int] = None
+
+    @property
+    def blocks(self) -> int:
+        return len(self.data) // BRR_BLOCK
+
+    @property
+    def loop_offset(self) -> Optional[int]:
+        return None if self.loop_block is None else self.loop_block * BRR_BLOCK
+
+
+def _predict(filt: int, p1: int, p2: int) -> int:
+    """Filter `filt`'s prediction from the previous two 15-bit samples."""
+    if filt == 0:
+        return 0
+    if filt == 1:
+        return p1 + ((-p1) >> 4)
+    if filt == 2:
+        return (p1 << 1) + ((-3 * p1) >> 5) - p2 + (p2 >> 4)
+    return (p1 << 1) + ((-13 * p1) >> 6) - p2 + ((3 * p2) >> 4)
+
+
+def _decode_block(data: bytes, pos: int, p1: int, p2: int, out: array) -> tuple[int, int]:
+    """Append the 16 samples of the block at `pos` → new (p1, p2)."""
+    header = data[pos]
+    shift = header >> 4
+    filt = (header >> 2) & 3
+    for byte in data[pos + 1:pos + BRR_BLOCK]:
+        for n in (byte >> 4, byte & 0x0F):
+            if n >= 8:
+                n -= 16
+            if shift <= _MAX_RANGE:
+                s = (n << shift) >> 1
+            else:
+                s = -2048 if n < 0 else 0
+            s += _predict(filt, p1, p2)
+            if s > 32767:
+                s = 32767
+            elif s < -32768:
+                s = -32768
+            s = ((s + 0x4000) & 0x7FFF) - 0x4000
+            out.append(s << 1)
+            p2, p1 = p1, s
+    return p1, p2
+
+
+def _gauss_filter(pcm: array) -> None:
+    """BRRtools' decoder `-g`: the S-DSP gaussian at pitch $1000, in place."""
+    n = len(pcm)
+    if n < 2:
+        return
+    prev = (372 + 1304) * pcm[0] + 372 * pcm[1]
+    for i in range(1, n - 1):
+        k = 372 * (pcm[i - 1] + pcm[i + 1]) + 1304 * pcm[i]
+        pcm[i - 1] = int(prev / 2048)
+        prev = k
+    last = 372 * pcm[n - 2] + (1304 + 372) * pcm[n - 1]
+    pcm[n - 2] = int(prev / 2048)
+    pcm[n - 1] = int(last / 2048)
+
+
+def decode_brr_samples(
+    data: bytes,
+    *,
+    loop_start_block: int = 0,
+    loops: int = 0,
+    gauss_filter: bool = False,
+) -> array:
+    """Decode BRR blocks → 16-bit samples (`array('h')`).
+
+    Decoding stops after the first block with the end flag (or at the end of
+    `data`). If that block also has the loop flag, playback jumps back to
+    `loop_start_block` `loops` more times, carrying the filter history over
+    as the DSP does. `gauss_filter` applies the hardware gaussian lowpass.
+    """
+    if len(data) % BRR_BLOCK:
+        raise ValueError(f"BRR data length {len(data)} is not a multiple of {BRR_BLOCK}")
+    count = len(data) // BRR_BLOCK
+    if count and not 0 <= loop_start_block < count:
+        raise ValueError(f"loop_start_block {loop_start_block} outside 0..{count - 1}")
+    out = array("h")
+    p1 = p2 = 0
+    block = 0
+    while block < count:
+        pos = block * BRR_BLOCK
+        p1, p2 = _decode_block(data, pos, p1, p2, out)
+        block += 1
+        header = data[pos]
+        if header & BRR_END or block == count:
+            if header & BRR_LOOP and loops > 0:
+                loops -= 1
+                block = loop_start_block
+                continue
+            break
+    if gauss_filter:
+        _gauss_filter(out)
+    return out
+
+
+def _pcm(samples: Iterable[int], amplitude: Optional[float]) -> list[int]:
+    if amplitude is None:
+        return [max(-32768, min(32767, int(v))) for v in samples]
+    return [max(-32768, min(32767, int(v * amplitude))) for v in samples]
+
+
+def _treble_boost(pcm: Sequence[int]) -> list[int]:
+    """BRRtools' encoder `-g`: pre-emphasis against the S-DSP gaussian."""
+    n = len(pcm)
+    out = []
+    for i in range(n):
+        acc = pcm[i] * _BOOST[0]
+        for k in range(7, 0, -1):
+            acc += _BOOST[k] * (pcm[i + k] if i + k < n else pcm[n - 1])
+            acc += _BOOST[k] * (pcm[i - k] if i >= k else pcm[0])
+        out.append(max(-32768, min(32767, int(acc))))
+    return out
+
+
+def _trial(block: Sequence[int], p1: int, p2: int, filt: int, shift: int,
+           wrap: bool, limit: float):
+    """Encode one block with (filt, shift) → (error, nibbles, p1, p2), or
+    `None` once the squared error reaches `limit` (or, without `wrap`, the
+    decode would overflow 15 bits)."""
+    step = 1 << shift
+    half = step >> 1
+    bias = (step << 2) + (step >> 2)
+    err = 0
+    codes = []
+    for x in block:
+        if filt == 0:
+            pred = 0
+        elif filt == 1:
+            pred = p1 + ((-p1) >> 4)
+        elif filt == 2:
+            pred = (p1 << 1) + ((-3 * p1) >> 5) - p2 + (p2 >> 4)
+        else:
+            pred = (p1 << 1) + ((-13 * p1) >> 6) - p2 + ((3 * p2) >> 4)
+        d = (x >> 1) - pred
+        if wrap:
+            if d > 16384:
+                d -= 32768
+            elif d < -16384:
+                d += 32768
+        c = (d + bias) // half if half else (d + bias) << 1
+        n = (0 if c < 0 else 15 if c > 15 else c) - 8
+        v = pred + ((n << shift) >> 1)
+        if v > 32767:
+            v = 32767
+        elif v < -32768:
+            v = -32768
+        if not -16384 <= v <= 16383:
+            if not wrap:
+                return None
+            v = ((v + 0x4000) & 0x7FFF) - 0x4000
+        e = x - (v << 1)
+        err += e * e
+        if err >= limit:
+            return None
+        codes.append(n & 0x0F)
+        p2, p1 = p1, v
+    return err, codes, p1, p2
+
+
+def _guess_shift(block: Sequence[int], p1: int, p2: int, filt: int) -> int:
+    """Smallest range whose nibbles span the block's ideal residuals."""
+    peak = 0
+    for x in block:
+        t = x >> 1
+        r = abs(t - _predict(filt, p1, p2))
+        if r > peak:
+            peak = r
+        p2, p1 = p1, t
+    shift = 0
+    while shift < _MAX_RANGE and (7 << shift) >> 1 < peak:
+        shift += 1
+    return shift
+
+
+def _candidates(block, p1, p2, filters, search):
+    guesses = []
+    for filt in filters:
+        g = _guess_shift(block, p1, p2, filt)
+        guesses += [(filt, s) for s in (g, g - 1, g + 1) if 0 <= s <= _MAX_RANGE]
+    if search == "heuristic":
+        return guesses
+    seen = set(guesses)
+    return guesses + [(f, s) for f in filters for s in range(_MAX_RANGE + 1)
+                      if (f, s) not in seen]
+
+
+def encode_brr_samples(
+    samples: Iterable[int],
+    *,
+    loop_point: Optional[int] = None,
+    search: str = "exhaustive",
+    gauss_boost: bool = False,
+    amplitude: Optional[float] = None,
+    no_wrap: bool = False,
+) -> BrrSample:
+    """Encode 16-bit samples → `BrrSample`, in-process.
+
+    - `loop_point`: sample index where the loop starts (None = one-shot).
+      The loop length must be a multiple of 16 samples; the sample is
+      zero-padded at the front to whole blocks so the loop lands on one.
+    - `search`: `"exhaustive"` tries every filter and range per block (the
+      minimum-error choice, with early cut-off); `"heuristic"` only tries
+      the ranges next to each filter's estimated one — several times faster.
+    - `gauss_boost`: pre-emphasis for the hardware gaussian filter.
+    - `amplitude`: multiply input by this factor (results are clamped).
+    - `no_wrap`: never rely on 15-bit wrap-around (old SPC player compat).
+
+    The first block and the loop block always use filter 0, so neither
+    depends on history the DSP may not have. Every block carries the loop
+    flag when looping; the last carries the end flag.
+    """
+    if search not in BRR_SEARCHES:
+        raise ValueError(f"unknown BRR search {search!r} (expected one of {BRR_SEARCHES})")
+    pcm = _pcm(samples, amplitude)
+    if gauss_boost and pcm:
+        pcm = _treble_boost(pcm)
+    n = len(pcm)
+    loop_block = None
+    if loop_point is not None:
+        if not 0 <= loop_point < n:
+            raise ValueError(f"loop_point {loop_point} outside 0..{n - 1}")
+        if (n - loop_point) % BRR_SAMPLES:
+            raise ValueError(
+                f"loop length {n - loop_point} is not a multiple of {BRR_SAMPLES} samples; "
+                "resample so it is"
+            )
+    pad = (-n) % BRR_SAMPLES if n else BRR_SAMPLES
+    pcm = [0] * pad + pcm
+    if loop_point is not None:
+        loop_block = (loop_point + pad) // BRR_SAMPLES
+    count = len(pcm) // BRR_SAMPLES
+    flags = BRR_LOOP if loop_block is not None else 0
+    wrap = not no_wrap
+    out = bytearray()
+    p1 = p2 = 0
+    for b in range(count):
+        block = pcm[b * BRR_SAMPLES:(b + 1) * BRR_SAMPLES]
+        filters = (0,) if b == 0 or b == loop_block else (0, 1, 2, 3)
+        best = None
+        limit = float("inf")
+        for filt, shift in _candidates(block, p1, p2, filters, search):
+            result = _trial(block, p1, p2, filt, shift, wrap, limit)
+            if result is not None:
+                best = (filt, shift, result)
+                limit = result[0]
+                if not limit:
+                    break
+        filt, shift, (_, codes, p1, p2) = best
+        header = (shift << 4) | (filt << 2) | flags
+        if b == count - 1:
+            header |= BRR_END
+        out.append(header)
+        out += bytes((codes[i] << 4) | codes[i + 1] for i in range(0, BRR_SAMPLES, 2))
+    return BrrSample(bytes(out), loop_block)
+
+
+def encode_brr_batch(
+    samples: Sequence[Iterable[int]],
+    *,
+    jobs: Optional[int] = 0,
+    chunksize: int = 1,
+    **options,
+) -> list[BrrSample]:
+    """`encode_brr_samples` over a soundbank, in order. `jobs` > 1 (`0` = cpu
+    count) encodes in a process pool; `None` / `1` encodes in-process.
+    `options` are passed to every `encode_brr_samples` call."""
+    samples = list(samples)
+    encode = partial(encode_brr_samples, **options)
+    if jobs is None:
+        workers = 1
+    else:
+        workers = (os.cpu_count() or 1) if jobs == 0 else max(1, jobs)
+    workers = min(workers, len(samples))
+    if workers <= 1:
+        return [encode(s) for s in samples]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(encode, samples, chunksize=max(1, chunksize)))
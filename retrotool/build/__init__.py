@@ -41,6 +41,7 @@ from retrotool.build.project import (
     scaffold_libsfx_project,
     workers_for_print,
 )
+from retrotool.build.steps import StepBuilder
 from retrotool.build.front_ends.mbxml import (
     MBXMLDeprecationWarning,
     migrate_mbxml,
@@ -113,4 +114,5 @@ __all__ = [
     "resolve_spec_path",
     "scaffold_libsfx_project",
     "workers_for_print",
+    "StepBuilder",
 ]
@@ -16,6 +16,7 @@ IPS_MAX_SIZE = 0x1000000          # 16 MB — IPS 24-bit offset limit
 IPS_HEADER = b"PATCH"
 IPS_EOF = b"EOF"
 IPS_EOF_OFFSET = 0x454F46         # b"EOF" as BE int — forbidden as a record offset
+_IPS_SCAN_BLOCK = 256             # equal-block skip granularity in `_encode_ips_runs`
 
 
 class DiffError(RuntimeError):
@@ -43,13 +44,20 @@ def _encode_ips_runs(original: bytes, modified: bytes) -> list[tuple[int, bytes]
     n = min(len(original), len(modified))
     i = 0
     while i < n:
-        if original[i] == modified[i]:
-            i += 1
+        # Patched ROMs differ in a few places; skip equal blocks with one
+        # slice compare (memcmp) and only walk blocks that changed.
+        end = min(i + _IPS_SCAN_BLOCK, n)
+        if original[i:end] == modified[i:end]:
+            i = end
             continue
-        start = i
-        while i < n and original[i] != modified[i]:
-            i += 1
-        runs.append((start, modified[start:i]))
+        while i < end:
+            if original[i] == modified[i]:
+                i += 1
+                continue
+            start = i
+            while i < n and original[i] != modified[i]:
+                i += 1
+            runs.append((start, modified[start:i]))
     if len(modified) > len(original):
         runs.append((len(original), modified[len(original):]))
     return runs
@@ -29,9 +29,11 @@ from typing import Callable, Optional
 
 from retrotool.core.cache import BuildCache, sha256_file, sha256_many
 from retrotool.core.rom import _strip_smc_header, detect_header
-from retrotool.build.diff import DiffResult, write_diff
-from retrotool.build.handlers import BuildContext, HandlerError, WriteRange, get_handler
-from retrotool.build.overflow import FreespaceAllocator
+from retrotool.build.diff import DiffResult, write_diff, write_ips
+from retrotool.build.handlers import (
+    BuildContext, HandlerError, WriteRange, _is_png_graphics, get_handler,
+)
+from retrotool.build.overflow import FreespaceAllocator, FreespaceStats
 from retrotool.build.interpolate import evaluate_condition
 from retrotool.build.reporter import Reporter, SectionStatus
 from retrotool.build.script_filter import ScriptFilter
@@ -226,6 +228,13 @@ def _section_cache_key(section: Section, files_root: Path) -> Optional[str]:
     )
     for name in typed_fields:
         parts.append(f"__{name}__={repr(getattr(section, name, None))}".encode())
+    # PNG graphics: the encode engine is pinned explicitly (default included),
+    # so entries cached before `auto` went in-process — or under another
+    # engine — are never replayed for this one. Raw graphics never reach the
+    # encoder, so their keys stay as they were.
+    if section.kind == SectionKind.GRAPHICS and _is_png_graphics(section):
+        engine = (section.attrs.get("engine") or "auto").lower()
+        parts.append(f"__engine__={engine}".encode())
     for f in section.files:
         path = (files_root / Path(str(f))).resolve()
         if not path.exists():
@@ -368,6 +377,8 @@ class BuildResult:
     duration_ms: int = 0
     diffs: list["DiffResult"] = field(default_factory=list)
     cache_hits: int = 0
+    # Freespace pool usage after the build; None when the spec declares none.
+    freespace: Optional["FreespaceStats"] = None
 
 
 # Valid SNES ROM sizes (post-header-strip). Pad rounds up to the next entry.
@@ -584,430 +595,616 @@ def build(
     started, terminal). Pass `retrotool.build.reporter.make_reporter()` for
     a TTY-aware default; pass `None` for a silent build."""
     t0 = perf_counter()
-
-    # A <libsfx> section generates the ROM canvas itself, so `original` is
-    # optional when one is present (it will be replaced on first dispatch).
-    has_libsfx = any(s.kind is SectionKind.LIBSFX for s in spec.sections)
-
-    if original_rom is None and spec.original is not None:
-        original_rom = (source_root / Path(str(spec.original))).resolve()
-    if original_rom is None:
-        if not has_libsfx:
-            raise HandlerError("BuildSpec has no `original` and no `original_rom` was given")
-        smc = None
-        rom = bytearray()
-    else:
-        original_rom = Path(original_rom)
-        if not original_rom.exists():
-            raise HandlerError(f"original ROM not found: {original_rom}")
-        raw = original_rom.read_bytes()
-        smc, body = _strip_smc_header(raw)
-        rom = bytearray(body)
-        # Pre-expand ROM to cover declared freespace using pad_byte, so gap fill
-        # between source tail and first section write matches project expectations.
-        if spec.freespace:
-            hi_max = max(hi for _, hi in spec.freespace)
-            if hi_max > len(rom):
-                rom.extend(bytes([spec.pad_byte & 0xFF]) * (hi_max - len(rom)))
-
-    # Resolve build-files root: source_root + spec.path (if provided).
-    files_root = source_root
-    if spec.path is not None:
-        files_root = (source_root / Path(str(spec.path))).resolve()
-
-    ctx = BuildContext(
-        allocator=FreespaceAllocator.from_pairs(list(spec.freespace)) if spec.freespace else None,
-        labels=dict(spec.labels) if hasattr(spec, "labels") and spec.labels else {},
+    session = _BuildSession(
+        spec, source_root=source_root, original_rom=original_rom,
+        cache=cache, only=only, skip=skip, parallel=parallel,
+        reporter=reporter, script_filter=script_filter,
     )
+    session.announce()
+    session.run(0, len(spec.sections))
+    return session.finish(out_path, t0=t0)
+
 
-    # Inherit project-level [rom.build.section.placement] into inline script
-    # sections that didn't declare their own. DataDef-derived sections already
-    # inherit via resolve._section_from_datadef.
-    _default_placement = (spec.section_defaults or {}).get("placement")
-    if _default_placement:
+@dataclass
+class _SessionSnapshot:
+    """Rewind point for `_BuildSession.restore()` — everything the section
+    loop mutates: the working rom, allocator cursor, label registry and the
+    accumulated per-section results."""
+    rom: bytes
+    allocator: Optional[object]
+    labels: dict[str, int]
+    section_results: list[SectionResult]
+    skipped: list[Section]
+    cache_hits: int
+
+
+class _BuildSession:
+    """One `build()` run, split into resumable phases.
+
+    `build()` is `announce()` + `run(0, n)` + `finish()`. Splitting the
+    section loop on an index lets step mode (`retrotool.build.steps`) run
+    the sections before the stepped script once, `snapshot()` the result,
+    and per step `restore()` + `run(target, n)` + `finish()` — the source
+    ROM read, cache-key hashing and every prefix handler happen once per
+    bisect instead of once per step.
+
+    `prepared` maps a section index to an unfiltered `_PreparedScript`
+    computed ahead of time; the gather phase then only re-applies the
+    current `script_filter` mask (see `handlers.apply_script_filter`)
+    instead of re-encoding the script file.
+    """
+
+    def __init__(
+        self,
+        spec: BuildSpec,
+        *,
+        source_root: Path,
+        original_rom: Optional[Path] = None,
+        cache: Optional[BuildCache] = None,
+        only: Optional[set[str]] = None,
+        skip: Optional[set[str]] = None,
+        parallel: Optional[int] = None,
+        reporter: Optional[Reporter] = None,
+        script_filter: Optional[ScriptFilter] = None,
+    ) -> None:
+        self.spec = spec
+        self.cache = cache
+        self.reporter = reporter
+        self.script_filter = script_filter
+        self.only = only
+        self.skip = skip
+        self.prepared: dict[int, object] = {}
+        # False in step-batch worker processes: replayed steps would all
+        # `put` the same artifacts, racing each other on the cache files.
+        self.fill_cache = True
+        # Lazily-read source ROM file bytes (SMC header included) for
+        # `finish(delta="ips")`; batch workers point it at shared memory.
+        self.original_bytes: Optional[bytes] = None
+        # Rom as seen by a section submitted right after the last `run()`
+        # stopped — i.e. before the end-of-run drain applied any trailing
+        # parallel writes. Step mode prepares the stepped script against it
+        # so its source snapshot matches what a single-pass build observes.
+        self.resume_view: Optional[bytes] = None
+
+        # A <libsfx> section generates the ROM canvas itself, so `original` is
+        # optional when one is present (it will be replaced on first dispatch).
+        has_libsfx = any(s.kind is SectionKind.LIBSFX for s in spec.sections)
+
+        if original_rom is None and spec.original is not None:
+            original_rom = (source_root / Path(str(spec.original))).resolve()
+        if original_rom is None:
+            if not has_libsfx:
+                raise HandlerError("BuildSpec has no `original` and no `original_rom` was given")
+            smc = None
+            rom = bytearray()
+        else:
+            original_rom = Path(original_rom)
+            if not original_rom.exists():
+                raise HandlerError(f"original ROM not found: {original_rom}")
+            raw = original_rom.read_bytes()
+            smc, body = _strip_smc_header(raw)
+            rom = bytearray(body)
+            # Pre-expand ROM to cover declared freespace using pad_byte, so gap fill
+            # between source tail and first section write matches project expectations.
+            if spec.freespace:
+                hi_max = max(hi for _, hi in spec.freespace)
+                if hi_max > len(rom):
+                    rom.extend(bytes([spec.pad_byte & 0xFF]) * (hi_max - len(rom)))
+        self.original_rom: Optional[Path] = original_rom
+        self.smc = smc
+        self.rom = rom
+
+        # Resolve build-files root: source_root + spec.path (if provided).
+        files_root = source_root
+        if spec.path is not None:
+            files_root = (source_root / Path(str(spec.path))).resolve()
+        self.files_root = files_root
+
+        self.ctx = BuildContext(
+            allocator=FreespaceAllocator.from_pairs(
+                list(spec.freespace),
+                policy=spec.freespace_policy, bank_size=spec.freespace_bank,
+            ) if spec.freespace else None,
+            labels=dict(spec.labels) if hasattr(spec, "labels") and spec.labels else {},
+        )
+
+        # Inherit project-level [rom.build.section.placement] into inline script
+        # sections that didn't declare their own. DataDef-derived sections already
+        # inherit via resolve._section_from_datadef.
+        _default_placement = (spec.section_defaults or {}).get("placement")
+        if _default_placement:
+            for _sec in spec.sections:
+                if _sec.kind is SectionKind.SCRIPT and not _sec.placement:
+                    _sec.placement = dict(_default_placement)
+
+        # Populate Section.address_type from spec mapping. The extract path does
+        # this in extract.py; build needs the same so handlers don't fall back to
+        # LoROM1 when the project is HiROM/SA-1/etc. Matches the rule documented
+        # at extract.py:464.
+        _spec_addr_type = spec.address_type()
         for _sec in spec.sections:
-            if _sec.kind is SectionKind.SCRIPT and not _sec.placement:
-                _sec.placement = dict(_default_placement)
-
-    # Populate Section.address_type from spec mapping. The extract path does
-    # this in extract.py; build needs the same so handlers don't fall back to
-    # LoROM1 when the project is HiROM/SA-1/etc. Matches the rule documented
-    # at extract.py:464.
-    _spec_addr_type = spec.address_type()
-    for _sec in spec.sections:
-        if _sec.address_type is None:
-            _sec.address_type = _spec_addr_type
-
-    section_results: list[SectionResult] = []
-    skipped: list[Section] = []
-    cache_hits = 0
-    keep_kind = _section_kinds_filter(only, skip)
-    # A non-empty script_filter mutates handler output for the matched
-    # sections without changing inputs the cache key sees. Forcing a
-    # cache miss here is simpler and safer than embedding filter state
-    # into the key (the filter changes per CLI invocation; persisted
-    # entries would churn).
-    _filter_active = script_filter is not None and not script_filter.is_empty()
-
-    def _section_is_kept(section: Section) -> bool:
-        if keep_kind is not None and not keep_kind(section):
+            if _sec.address_type is None:
+                _sec.address_type = _spec_addr_type
+
+        self.section_results: list[SectionResult] = []
+        self.skipped: list[Section] = []
+        self.cache_hits = 0
+        self.keep_kind = _section_kinds_filter(only, skip)
+        # A non-empty script_filter mutates handler output for the matched
+        # sections without changing inputs the cache key sees. Forcing a
+        # cache miss here is simpler and safer than embedding filter state
+        # into the key (the filter changes per CLI invocation; persisted
+        # entries would churn).
+        _filter_active = script_filter is not None and not script_filter.is_empty()
+
+        # Resolve cache state per section once: avoids re-hashing input files in
+        # the freespace pre-pass and the apply loop.
+        self.section_cache_keys: dict[int, str] = {}
+        self.cache_hit_set: set[int] = set()
+        if cache:
+            for i, section in enumerate(spec.sections):
+                if not self.section_is_kept(section):
+                    continue
+                # Script sections produce filter-dependent output; bypass cache
+                # when the filter is active so step-mode iterations don't all
+                # collapse to the first build's cached writes.
+                if _filter_active and section.kind in (
+                    SectionKind.SCRIPT, SectionKind.WINDOWED_SCRIPT,
+                ):
+                    continue
+                key = _section_cache_key(section, files_root)
+                if key:
+                    self.section_cache_keys[i] = key
+                    if cache.has(key):
+                        self.cache_hit_set.add(i)
+
+        # Pre-pass: reserve freespace for every cached section we will replay.
+        # Cache stores absolute PCs baked by a prior allocator pass; a fresh
+        # alloc() for a non-cached section processed earlier in iteration order
+        # would otherwise hand out the same bytes. Reserving up-front makes the
+        # fix order-independent.
+        if cache and self.ctx.allocator is not None:
+            for i in sorted(self.cache_hit_set):
+                try:
+                    entry = cache.get(self.section_cache_keys[i])
+                    blob = entry.artifact.read_bytes()
+                    ranges = _unpack_writes(blob)
+                except (OSError, AttributeError, ValueError):
+                    continue  # apply loop will raise with a clearer error
+                for off, data in ranges:
+                    self.ctx.allocator.reserve(off, len(data))
+
+        # Resolution: None → serial (1). 0 → cpu_count (auto). N>0 → N workers.
+        # Default-serial reflects post-optimization reality: at sub-second build
+        # times the worker-coordination overhead exceeds the parallel gain.
+        if parallel is None:
+            self.max_workers = 1
+        elif parallel == 0:
+            self.max_workers = os.cpu_count() or 1
+        else:
+            self.max_workers = max(1, parallel)
+
+    def __getstate__(self) -> dict:
+        # Pickled into step-batch worker processes. The working rom travels
+        # separately (shared memory); the reporter and the `keep_kind`
+        # closure don't pickle and are rebuilt / dropped on the other side.
+        state = self.__dict__.copy()
+        state["reporter"] = None
+        state["keep_kind"] = None
+        state["rom"] = bytearray()
+        state["resume_view"] = None
+        state["original_bytes"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.keep_kind = _section_kinds_filter(self.only, self.skip)
+
+    def section_is_kept(self, section: Section) -> bool:
+        if self.keep_kind is not None and not self.keep_kind(section):
             return False
         if section.condition is not None and not evaluate_condition(
-            section.condition, spec.vars, source=section.source or "",
+            section.condition, self.spec.vars, source=section.source or "",
         ):
             return False
         return True
 
-    # Resolve cache state per section once: avoids re-hashing input files in
-    # the freespace pre-pass and the apply loop.
-    section_cache_keys: dict[int, str] = {}
-    cache_hit_set: set[int] = set()
-    if cache:
-        for i, section in enumerate(spec.sections):
-            if not _section_is_kept(section):
-                continue
-            # Script sections produce filter-dependent output; bypass cache
-            # when the filter is active so step-mode iterations don't all
-            # collapse to the first build's cached writes.
-            if _filter_active and section.kind in (
-                SectionKind.SCRIPT, SectionKind.WINDOWED_SCRIPT,
-            ):
-                continue
-            key = _section_cache_key(section, files_root)
-            if key:
-                section_cache_keys[i] = key
-                if cache.has(key):
-                    cache_hit_set.add(i)
-
-    # Pre-pass: reserve freespace for every cached section we will replay.
-    # Cache stores absolute PCs baked by a prior allocator pass; a fresh
-    # alloc() for a non-cached section processed earlier in iteration order
-    # would otherwise hand out the same bytes. Reserving up-front makes the
-    # fix order-independent.
-    if cache and ctx.allocator is not None:
-        for i in sorted(cache_hit_set):
-            try:
-                entry = cache.get(section_cache_keys[i])
-                blob = entry.artifact.read_bytes()
-                ranges = _unpack_writes(blob)
-            except (OSError, AttributeError, ValueError):
-                continue  # apply loop will raise with a clearer error
-            for off, data in ranges:
-                ctx.allocator.reserve(off, len(data))
-
-    # Notify reporter about every section so the progress UI can lay out rows
-    # in declared order.
-    if reporter is not None:
-        reporter.build_started(len(spec.sections))
-        for i, section in enumerate(spec.sections):
-            reporter.section_queued(i, _section_label(section), section.kind.value)
-
-    # Single-pass interleaved gather + apply. Parallel-eligible sections are
-    # submitted at their declared index against a snapshot of `rom` AS OF
-    # that moment (so any prior serial section's writes — libsfx canvas,
-    # asar patches — are visible in the worker's scratch). When a serial
-    # section is reached, we drain pending parallel futures whose declared
-    # index precedes it and apply their writes first; the serial handler
-    # then runs against the post-drain rom, matching legacy ordering.
-    futures: dict[int, Future[_GatherResult]] = {}
-    pool: Optional[ThreadPoolExecutor] = None
-    # Resolution: None → serial (1). 0 → cpu_count (auto). N>0 → N workers.
-    # Default-serial reflects post-optimization reality: at sub-second build
-    # times the worker-coordination overhead exceeds the parallel gain.
-    if parallel is None:
-        max_workers = 1
-    elif parallel == 0:
-        max_workers = os.cpu_count() or 1
-    else:
-        max_workers = max(1, parallel)
-    if max_workers and max_workers > 1:
-        pool = ThreadPoolExecutor(
-            max_workers=max_workers, thread_name_prefix="retrotool-gather",
-        )
-
-    def _submit(idx: int, section: Section) -> None:
-        # Snapshot rom AT SUBMISSION TIME — captures all preceding serial
-        # writes so the worker scratch matches what serial execution would
-        # have observed. Pure-write handlers don't read rom, but they do
-        # call `_write(allow_grow=False)` which checks `len(scratch)`; an
-        # empty pre-libsfx snapshot would fail any rep at a high offset.
-        # Script workers read the snapshot to populate `_PreparedScript.
-        # source_snapshot` (used by overflow placement and `slot-measure
-        # =source-entry`) but do NOT touch the live rom or shared state.
-        scratch = bytearray(rom)
-        is_script_parallel = _is_script_parallel_eligible(section)
-
-        # Fire GATHER from inside the worker (i.e. when a pool thread actually
-        # picks the task up) rather than at submit-time. Otherwise the
-        # reporter's per-section timer starts at queue-time and elapsed_ms
-        # conflates queue-wait with actual work time. Fire GATHER_DONE in
-        # `finally` so the reporter can drop the section out of the live
-        # "active" region the moment the worker returns — without it, finished
-        # tasks pile up visibly until the main thread eventually drains them.
-        def _run() -> _GatherResult:
-            if reporter is not None:
-                reporter.section_status(idx, SectionStatus.GATHER)
-            try:
-                if is_script_parallel:
-                    return _gather_script_prepare(
-                        section, files_root, scratch,
-                        script_filter=script_filter,
-                    )
-                return _gather_parallel(section, files_root, scratch)
-            finally:
-                if reporter is not None:
-                    reporter.section_status(idx, SectionStatus.GATHER_DONE)
-
-        if pool is None:
-            fut: Future[_GatherResult] = Future()
-            try:
-                fut.set_result(_run())
-            except Exception as exc:  # noqa: BLE001
-                fut.set_exception(exc)
-            futures[idx] = fut
+    def announce(self) -> None:
+        """Notify the reporter about every section so the progress UI can
+        lay out rows in declared order."""
+        if self.reporter is None:
             return
-        futures[idx] = pool.submit(_run)
-
-    applied: set[int] = set()
-
-    def _apply_gathered(idx: int, section: Section) -> None:
-        """Wait on `futures[idx]`, apply its result to `rom`, fire DONE.
+        self.reporter.build_started(len(self.spec.sections))
+        for i, section in enumerate(self.spec.sections):
+            self.reporter.section_queued(i, _section_label(section), section.kind.value)
+
+    def snapshot(self) -> _SessionSnapshot:
+        allocator = self.ctx.allocator
+        return _SessionSnapshot(
+            rom=bytes(self.rom),
+            allocator=allocator.snapshot() if allocator is not None else None,
+            labels=dict(self.ctx.labels),
+            section_results=list(self.section_results),
+            skipped=list(self.skipped),
+            cache_hits=self.cache_hits,
+        )
 
-        Two result shapes:
-          * Pure-write (REP/INS/BIN/GRAPHICS/FIXED_RECORDS, opt-in ASAR):
-            memcpy `gathered.data` into `rom` at `gathered.writes` offsets.
-          * Script-prepared: invoke the handler against the live rom with
-            `prepared=gathered.prepared` so placement/fixup-resolve sees
-            the fully-populated `ctx.allocator` and `ctx.labels`.
+    def restore(self, snap: _SessionSnapshot) -> None:
+        self.rom[:] = snap.rom
+        if self.ctx.allocator is not None:
+            self.ctx.allocator.restore(snap.allocator)
+        self.ctx.labels = dict(snap.labels)
+        self.section_results = list(snap.section_results)
+        self.skipped = list(snap.skipped)
+        self.cache_hits = snap.cache_hits
+
+    def run(self, start: int, stop: int) -> None:
+        """Run sections `[start, stop)` against the working rom.
+
+        Single-pass interleaved gather + apply. Parallel-eligible sections are
+        submitted at their declared index against a snapshot of `rom` AS OF
+        that moment (so any prior serial section's writes — libsfx canvas,
+        asar patches — are visible in the worker's scratch). When a serial
+        section is reached, we drain pending parallel futures whose declared
+        index precedes it and apply their writes first; the serial handler
+        then runs against the post-drain rom, matching legacy ordering.
+        Every section in the range is applied before returning.
         """
-        try:
-            gathered = futures[idx].result()
-        except Exception as exc:  # noqa: BLE001
-            if reporter is not None:
-                reporter.section_status(idx, SectionStatus.ERROR, note=str(exc))
-            raise
-        if reporter is not None:
-            reporter.section_status(idx, SectionStatus.APPLY)
-        bytes_written = 0
-
-        if _is_script_parallel_eligible(section):
-            # Script worker — invoke handler against live rom with the
-            # prepared payload (may be None when `script_prepare` declined,
-            # e.g. legacy concat mode; the handler then encodes inline).
-            handler = get_handler(section.kind)
-            if handler is None:
-                raise HandlerError(
-                    f"{section.source}: no handler for <{section.kind.value}>"
-                )
-            try:
-                raw = handler(
-                    rom, section, files_root, ctx,
-                    prepared=gathered.prepared,
-                    script_filter=script_filter,
-                )
-            except Exception as exc:  # noqa: BLE001
-                if reporter is not None:
-                    reporter.section_status(
-                        idx, SectionStatus.ERROR, note=str(exc),
-                    )
-                raise
-            writes = [raw] if isinstance(raw, WriteRange) else list(raw)
-            bytes_written = sum(w.length for w in writes)
-        else:
-            writes = gathered.writes
-            for wr, data in zip(gathered.writes, gathered.data):
-                end = wr.offset + len(data)
-                if end > len(rom):
-                    rom.extend(b"\x00" * (end - len(rom)))
-                rom[wr.offset:end] = data
-                bytes_written += len(data)
-
-        section_results.append(SectionResult(section=section, write=writes))
-        export_name = section.attrs.get("export-label")
-        if export_name and writes:
-            ctx.labels[export_name] = writes[0].offset
-        if cache and idx in section_cache_keys:
-            cache.put(
-                section_cache_keys[idx],
-                _pack_writes(bytes(rom), writes),
-                meta={"kind": section.kind.value,
-                      "source": section.source or ""},
-            )
-        applied.add(idx)
-        if reporter is not None:
-            reporter.section_status(
-                idx, SectionStatus.DONE, bytes_written=bytes_written,
+        spec = self.spec
+        rom = self.rom
+        ctx = self.ctx
+        cache = self.cache
+        reporter = self.reporter
+        script_filter = self.script_filter
+        files_root = self.files_root
+        section_cache_keys = self.section_cache_keys
+
+        futures: dict[int, Future[_GatherResult]] = {}
+        pool: Optional[ThreadPoolExecutor] = None
+        if self.max_workers > 1:
+            pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="retrotool-gather",
             )
 
-    def _drain_through(upto_idx: int) -> None:
-        """Apply any pending parallel-gather results with index < upto_idx,
-        in declared order. Called before any serial-section work so that
-        serial handlers (asar, script, etc.) observe prior parallel writes."""
-        for j in sorted(j for j in futures if j < upto_idx and j not in applied):
-            _apply_gathered(j, spec.sections[j])
-
-    try:
-        for i, section in enumerate(spec.sections):
-            if not _section_is_kept(section):
-                skipped.append(section)
+        def _submit(idx: int, section: Section) -> None:
+            is_script_parallel = _is_script_parallel_eligible(section)
+            if is_script_parallel and idx in self.prepared:
+                # Encode phase already done (step mode) — only the filter
+                # mask is per-build, and it is cheap enough to run inline.
+                from retrotool.build.handlers import apply_script_filter
+                fut: Future[_GatherResult] = Future()
+                try:
+                    fut.set_result(_GatherResult(prepared=apply_script_filter(
+                        self.prepared[idx], section, script_filter,
+                    )))
+                except Exception as exc:  # noqa: BLE001
+                    fut.set_exception(exc)
+                futures[idx] = fut
+                return
+            # Snapshot rom AT SUBMISSION TIME — captures all preceding serial
+            # writes so the worker scratch matches what serial execution would
+            # have observed. Pure-write handlers don't read rom, but they do
+            # call `_write(allow_grow=False)` which checks `len(scratch)`; an
+            # empty pre-libsfx snapshot would fail any rep at a high offset.
+            # Script workers read the snapshot to populate `_PreparedScript.
+            # source_snapshot` (used by overflow placement and `slot-measure
+            # =source-entry`) but do NOT touch the live rom or shared state.
+            scratch = bytearray(rom)
+
+            # Fire GATHER from inside the worker (i.e. when a pool thread actually
+            # picks the task up) rather than at submit-time. Otherwise the
+            # reporter's per-section timer starts at queue-time and elapsed_ms
+            # conflates queue-wait with actual work time. Fire GATHER_DONE in
+            # `finally` so the reporter can drop the section out of the live
+            # "active" region the moment the worker returns — without it, finished
+            # tasks pile up visibly until the main thread eventually drains them.
+            def _run() -> _GatherResult:
                 if reporter is not None:
-                    reason = "filtered" if keep_kind and not keep_kind(section) else "condition"
-                    reporter.section_status(i, SectionStatus.SKIPPED, note=reason)
-                continue
-
-            handler = get_handler(section.kind)
-            if handler is None:
-                raise HandlerError(
-                    f"{section.source}: no handler for <{section.kind.value}> "
-                    f"(landing in a later phase)"
-                )
-
-            # Cache hit — apply stored writes directly. (Cached sections
-            # don't need a snapshot; their bytes are already known.)
-            if i in cache_hit_set:
-                # Drain any earlier parallel work first so writes apply in
-                # declared order — a later cache-hit section that overlaps
-                # an earlier parallel write would otherwise lose data.
-                _drain_through(i)
-                key = section_cache_keys[i]
+                    reporter.section_status(idx, SectionStatus.GATHER)
                 try:
-                    entry = cache.get(key)
-                    blob = entry.artifact.read_bytes()
-                    ranges = _unpack_writes(blob)
-                except (OSError, AttributeError, ValueError) as exc:
+                    if is_script_parallel:
+                        return _gather_script_prepare(
+                            section, files_root, scratch,
+                            script_filter=script_filter,
+                        )
+                    return _gather_parallel(section, files_root, scratch)
+                finally:
+                    if reporter is not None:
+                        reporter.section_status(idx, SectionStatus.GATHER_DONE)
+
+            if pool is None:
+                fut = Future()
+                try:
+                    fut.set_result(_run())
+                except Exception as exc:  # noqa: BLE001
+                    fut.set_exception(exc)
+                futures[idx] = fut
+                return
+            futures[idx] = pool.submit(_run)
+
+        applied: set[int] = set()
+
+        def _apply_gathered(idx: int, section: Section) -> None:
+            """Wait on `futures[idx]`, apply its result to `rom`, fire DONE.
+
+            Two result shapes:
+              * Pure-write (REP/INS/BIN/GRAPHICS/FIXED_RECORDS, opt-in ASAR):
+                memcpy `gathered.data` into `rom` at `gathered.writes` offsets.
+              * Script-prepared: invoke the handler against the live rom with
+                `prepared=gathered.prepared` so placement/fixup-resolve sees
+                the fully-populated `ctx.allocator` and `ctx.labels`.
+            """
+            try:
+                gathered = futures[idx].result()
+            except Exception as exc:  # noqa: BLE001
+                if reporter is not None:
+                    reporter.section_status(idx, SectionStatus.ERROR, note=str(exc))
+                raise
+            if reporter is not None:
+                reporter.section_status(idx, SectionStatus.APPLY)
+            bytes_written = 0
+
+            if _is_script_parallel_eligible(section):
+                # Script worker — invoke handler against live rom with the
+                # prepared payload (may be None when `script_prepare` declined,
+                # e.g. legacy concat mode; the handler then encodes inline).
+                handler = get_handler(section.kind)
+                if handler is None:
                     raise HandlerError(
-                        f"{section.source}: cached artifact unreadable for "
-                        f"key {key[:12]}…: {exc}"
-                    ) from exc
-                cached_writes: list[WriteRange] = []
-                bytes_written = 0
-                for off, data in ranges:
-                    end = off + len(data)
+                        f"{section.source}: no handler for <{section.kind.value}>"
+                    )
+                try:
+                    raw = handler(
+                        rom, section, files_root, ctx,
+                        prepared=gathered.prepared,
+                        script_filter=script_filter,
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    if reporter is not None:
+                        reporter.section_status(
+                            idx, SectionStatus.ERROR, note=str(exc),
+                        )
+                    raise
+                writes = [raw] if isinstance(raw, WriteRange) else list(raw)
+                bytes_written = sum(w.length for w in writes)
+            else:
+                writes = gathered.writes
+                for wr, data in zip(gathered.writes, gathered.data):
+                    end = wr.offset + len(data)
                     if end > len(rom):
                         rom.extend(b"\x00" * (end - len(rom)))
-                    rom[off:end] = data
-                    cached_writes.append(WriteRange(offset=off, length=len(data)))
+                    rom[wr.offset:end] = data
                     bytes_written += len(data)
-                section_results.append(SectionResult(
-                    section=section, write=cached_writes, cache_hit=True,
-                ))
-                cache_hits += 1
-                if reporter is not None:
-                    reporter.section_status(
-                        i, SectionStatus.CACHE_HIT, bytes_written=bytes_written,
-                    )
-                continue
 
-            # Parallel-eligible: snapshot rom NOW, dispatch worker, continue.
-            # We don't apply yet — apply happens when a later serial section
-            # drains us, or at end-of-loop. Script-parallel sections push only
-            # the encode phase to the worker; placement (which calls
-            # ctx.allocator and reads ctx.labels) runs serially in apply.
-            if _is_parallel_eligible(section) or _is_script_parallel_eligible(section):
-                _submit(i, section)
-                continue
-
-            # Serial path — asar / libsfx / project / fixed_records.
-            # Drain prior parallel work first so the handler observes those
-            # writes, then run against the shared rom.
-            _drain_through(i)
-            if reporter is not None:
-                reporter.section_status(i, SectionStatus.GATHER)
-            try:
-                raw = handler(rom, section, files_root, ctx)
-            except Exception as exc:  # noqa: BLE001
-                if reporter is not None:
-                    reporter.section_status(
-                        i, SectionStatus.ERROR, note=str(exc),
-                    )
-                raise
-            writes = [raw] if isinstance(raw, WriteRange) else list(raw)
-            bytes_written = sum(w.length for w in writes)
-            section_results.append(SectionResult(section=section, write=writes))
+            self.section_results.append(SectionResult(section=section, write=writes))
             export_name = section.attrs.get("export-label")
             if export_name and writes:
                 ctx.labels[export_name] = writes[0].offset
-            if cache and i in section_cache_keys:
+            if cache and self.fill_cache and idx in section_cache_keys:
                 cache.put(
-                    section_cache_keys[i],
+                    section_cache_keys[idx],
                     _pack_writes(bytes(rom), writes),
                     meta={"kind": section.kind.value,
                           "source": section.source or ""},
                 )
-            applied.add(i)
+            applied.add(idx)
             if reporter is not None:
                 reporter.section_status(
-                    i, SectionStatus.DONE, bytes_written=bytes_written,
+                    idx, SectionStatus.DONE, bytes_written=bytes_written,
                 )
 
-        # End-of-loop drain: trailing parallel sections (no later serial
-        # section to force a flush) apply now, in declared order.
-        _drain_through(len(spec.sections))
-    finally:
-        if pool is not None:
-            pool.shutdown(wait=True, cancel_futures=True)
-
-    # Revision byte patch. Convention: plain digits parse as decimal; anything
-    # else is treated as hex (with optional `0x`/`$` prefix stripped).
-    if spec.revbyteloc is not None and spec.revision is not None:
-        rev_str = spec.revision.strip()
-        if rev_str.isdigit():
-            rev_byte = int(rev_str)
-        else:
-            rev_byte = int(rev_str.removeprefix("0x").removeprefix("$"), 16)
-        rom[spec.revbyteloc] = rev_byte & 0xFF
-
-    if spec.pad:
-        _pad_to_next_size(rom, spec.pad_byte)
-
-    csum = _patch_checksum(rom)
-
-    out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    if smc is not None:
-        out_path.write_bytes(smc + bytes(rom))
-    else:
-        out_path.write_bytes(bytes(rom))
-
-    # Mesen2 SRAM sync (post-ROM-write). Copies the source ROM's .srm
-    # to the output ROM's .srm so an in-progress save state transfers
-    # across builds. Refuses to clobber the source .srm (would happen if
-    # source and output share a stem). Silent no-op when source .srm
-    # doesn't exist.
-    if spec.sync_sram and original_rom is not None:
-        from retrotool.debugger.mesen_saves import resolve_saves_dir, sync_sram
-        saves = resolve_saves_dir(spec.mesen_saves_dir)
-        sync_sram(original_rom, out_path, saves_dir=saves,
-                  archive=spec.archive_sram)
-
-    # Diff output (post-ROM-write). `spec.diff` may be "ips", "xdelta", or
-    # "both" (comma-separated values accepted as well).
-    diffs: list[DiffResult] = []
-    if spec.diff and original_rom is not None:
-        formats = [f.strip().lower() for f in spec.diff.replace("+", ",").split(",") if f.strip()]
-        if formats == ["both"]:
-            formats = ["ips", "xdelta"]
-        for fmt in formats:
-            diffs.append(write_diff(
-                fmt, original_path=original_rom, modified_path=out_path,
-            ))
-
-    result = BuildResult(
-        rom_path=out_path,
-        rom_size=len(rom),
-        sections=section_results,
-        skipped=skipped,
-        checksum=csum,
-        duration_ms=int((perf_counter() - t0) * 1000),
-        diffs=diffs,
-        cache_hits=cache_hits,
-    )
-    if reporter is not None:
-        summary = (
-            f"built {out_path.name} · {len(rom):,}b · "
-            f"{len(section_results)} section(s) "
-            f"({cache_hits} cached, {len(skipped)} skipped) · "
-            f"{result.duration_ms} ms"
+        def _drain_through(upto_idx: int) -> None:
+            """Apply any pending parallel-gather results with index < upto_idx,
+            in declared order. Called before any serial-section work so that
+            serial handlers (asar, script, etc.) observe prior parallel writes."""
+            for j in sorted(j for j in futures if j < upto_idx and j not in applied):
+                _apply_gathered(j, spec.sections[j])
+
+        try:
+            for i in range(start, stop):
+                section = spec.sections[i]
+                if not self.section_is_kept(section):
+                    self.skipped.append(section)
+                    if reporter is not None:
+                        reason = (
+                            "filtered"
+                            if self.keep_kind and not self.keep_kind(section)
+                            else "condition"
+                        )
+                        reporter.section_status(i, SectionStatus.SKIPPED, note=reason)
+                    continue
+
+                handler = get_handler(section.kind)
+                if handler is None:
+                    raise HandlerError(
+                        f"{section.source}: no handler for <{section.kind.value}> "
+                        f"(landing in a later phase)"
+                    )
+
+                # Cache hit — apply stored writes directly. (Cached sections
+                # don't need a snapshot; their bytes are already known.)
+                if i in self.cache_hit_set:
+                    # Drain any earlier parallel work first so writes apply in
+                    # declared order — a later cache-hit section that overlaps
+                    # an earlier parallel write would otherwise lose data.
+                    _drain_through(i)
+                    key = section_cache_keys[i]
+                    try:
+                        entry = cache.get(key)
+                        blob = entry.artifact.read_bytes()
+                        ranges = _unpack_writes(blob)
+                    except (OSError, AttributeError, ValueError) as exc:
+                        raise HandlerError(
+                            f"{section.source}: cached artifact unreadable for "
+                            f"key {key[:12]}…: {exc}"
+                        ) from exc
+                    cached_writes: list[WriteRange] = []
+                    bytes_written = 0
+                    for off, data in ranges:
+                        end = off + len(data)
+                        if end > len(rom):
+                            rom.extend(b"\x00" * (end - len(rom)))
+                        rom[off:end] = data
+                        cached_writes.append(WriteRange(offset=off, length=len(data)))
+                        bytes_written += len(data)
+                    self.section_results.append(SectionResult(
+                        section=section, write=cached_writes, cache_hit=True,
+                    ))
+                    self.cache_hits += 1
+                    if reporter is not None:
+                        reporter.section_status(
+                            i, SectionStatus.CACHE_HIT, bytes_written=bytes_written,
+                        )
+                    continue
+
+                # Parallel-eligible: snapshot rom NOW, dispatch worker, continue.
+                # We don't apply yet — apply happens when a later serial section
+                # drains us, or at end-of-loop. Script-parallel sections push only
+                # the encode phase to the worker; placement (which calls
+                # ctx.allocator and reads ctx.labels) runs serially in apply.
+                if _is_parallel_eligible(section) or _is_script_parallel_eligible(section):
+                    _submit(i, section)
+                    continue
+
+                # Serial path — asar / libsfx / project / fixed_records.
+                # Drain prior parallel work first so the handler observes those
+                # writes, then run against the shared rom.
+                _drain_through(i)
+                if reporter is not None:
+                    reporter.section_status(i, SectionStatus.GATHER)
+                try:
+                    raw = handler(rom, section, files_root, ctx)
+                except Exception as exc:  # noqa: BLE001
+                    if reporter is not None:
+                        reporter.section_status(
+                            i, SectionStatus.ERROR, note=str(exc),
+                        )
+                    raise
+                writes = [raw] if isinstance(raw, WriteRange) else list(raw)
+                bytes_written = sum(w.length for w in writes)
+                self.section_results.append(SectionResult(section=section, write=writes))
+                export_name = section.attrs.get("export-label")
+                if export_name and writes:
+                    ctx.labels[export_name] = writes[0].offset
+                if cache and self.fill_cache and i in section_cache_keys:
+                    cache.put(
+                        section_cache_keys[i],
+                        _pack_writes(bytes(rom), writes),
+                        meta={"kind": section.kind.value,
+                              "source": section.source or ""},
+                    )
+                applied.add(i)
+                if reporter is not None:
+                    reporter.section_status(
+                        i, SectionStatus.DONE, bytes_written=bytes_written,
+                    )
+
+            if stop < len(spec.sections):
+                self.resume_view = bytes(rom)
+            # End-of-loop drain: trailing parallel sections (no later serial
+            # section to force a flush) apply now, in declared order.
+            _drain_through(stop)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def finish(
+        self, out_path: Path, *, t0: float, delta: Optional[str] = None,
+    ) -> BuildResult:
+        """Post-process the working rom (revbyte, pad, checksum), write it to
+        `out_path`, then run SRAM sync + diffs. Mutates `self.rom`; callers
+        that keep building from the same session `restore()` first.
+
+        `delta="ips"` writes an IPS patch against the source ROM file to
+        `out_path` instead of the ROM itself (step batches: hundreds of
+        patches are far smaller than hundreds of ROM copies). SRAM sync and
+        `spec.diff` need the ROM on disk and are skipped; the patch is the
+        only entry in `BuildResult.diffs` and `rom_path` points at it."""
+        if delta is not None and delta != "ips":
+            raise HandlerError(f"unknown step delta format: {delta!r} (expected 'ips')")
+        spec = self.spec
+        rom = self.rom
+        original_rom = self.original_rom
+
+        # Revision byte patch. Convention: plain digits parse as decimal; anything
+        # else is treated as hex (with optional `0x`/`$` prefix stripped).
+        if spec.revbyteloc is not None and spec.revision is not None:
+            rev_str = spec.revision.strip()
+            if rev_str.isdigit():
+                rev_byte = int(rev_str)
+            else:
+                rev_byte = int(rev_str.removeprefix("0x").removeprefix("$"), 16)
+            rom[spec.revbyteloc] = rev_byte & 0xFF
+
+        if spec.pad:
+            _pad_to_next_size(rom, spec.pad_byte)
+
+        csum = _patch_checksum(rom)
+
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        body = self.smc + bytes(rom) if self.smc is not None else bytes(rom)
+        if delta is not None:
+            if original_rom is None:
+                raise HandlerError(
+                    "delta output needs an original ROM to diff against"
+                )
+            if self.original_bytes is None:
+                self.original_bytes = original_rom.read_bytes()
+            diff = write_ips(self.original_bytes, body, out_path)
+            return self._result(out_path, csum=csum, diffs=[diff], t0=t0)
+        out_path.write_bytes(body)
+
+        # Mesen2 SRAM sync (post-ROM-write). Copies the source ROM's .srm
+        # to the output ROM's .srm so an in-progress save state transfers
+        # across builds. Refuses to clobber the source .srm (would happen if
+        # source and output share a stem). Silent no-op when source .srm
+        # doesn't exist.
+        if spec.sync_sram and original_rom is not None:
+            from retrotool.debugger.mesen_saves import resolve_saves_dir, sync_sram
+            saves = resolve_saves_dir(spec.mesen_saves_dir)
+            sync_sram(original_rom, out_path, saves_dir=saves,
+                      archive=spec.archive_sram)
+
+        # Diff output (post-ROM-write). `spec.diff` may be "ips", "xdelta", or
+        # "both" (comma-separated values accepted as well).
+        diffs: list[DiffResult] = []
+        if spec.diff and original_rom is not None:
+            formats = [f.strip().lower() for f in spec.diff.replace("+", ",").split(",") if f.strip()]
+            if formats == ["both"]:
+                formats = ["ips", "xdelta"]
+            for fmt in formats:
+                diffs.append(write_diff(
+                    fmt, original_path=original_rom, modified_path=out_path,
+                ))
+
+        return self._result(out_path, csum=csum, diffs=diffs, t0=t0)
+
+    def _result(
+        self, out_path: Path, *, csum: Optional[int],
+        diffs: list[DiffResult], t0: float,
+    ) -> BuildResult:
+        rom = self.rom
+        result = BuildResult(
+            rom_path=out_path,
+            rom_size=len(rom),
+            sections=list(self.section_results),
+            skipped=list(self.skipped),
+            checksum=csum,
+            duration_ms=int((perf_counter() - t0) * 1000),
+            diffs=diffs,
+            cache_hits=self.cache_hits,
+            freespace=(
+                self.ctx.allocator.stats()
+                if self.ctx.allocator is not None else None
+            ),
         )
-        reporter.build_done(ok=True, summary=summary)
-    return result
+        if self.reporter is not None:
+            summary = (
+                f"built {out_path.name} · {len(rom):,}b · "
+                f"{len(self.section_results)} section(s) "
+                f"({self.cache_hits} cached, {len(self.skipped)} skipped) · "
+                f"{result.duration_ms} ms"
+            )
+            self.reporter.build_done(ok=True, summary=summary)
+        return result
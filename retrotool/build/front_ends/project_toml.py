@@ -94,6 +94,23 @@ _TRUTHY_STR = {"true", "1", "yes", "on"}
 _FALSY_STR = {"false", "0", "no", "off"}
 
 
+def _coerce_freespace_bank(v: Any) -> Optional[int]:
+    """Coerce `[rom.build].freespace-bank`: "lorom" / "hirom" (bank size in
+    PC bytes), an explicit size, or false/absent for no bank restriction."""
+    if v is None or v is False:
+        return None
+    if isinstance(v, str) and v.lower() in ("lorom", "hirom"):
+        from retrotool.build.overflow import BANK_SIZES
+        return BANK_SIZES[v.lower()]
+    size = _coerce_offset(v, "[rom.build].freespace-bank")
+    if size is None or size <= 0:
+        raise SchemaError(
+            f"[rom.build].freespace-bank must be \"lorom\", \"hirom\" or a "
+            f"positive size; got {v!r}"
+        )
+    return size
+
+
 def _coerce_jobs(v: Any, field: str) -> Optional[int]:
     """Coerce a jobs= value. None → None (use default). String "auto" or
     integer 0 → 0 (resolves to os.cpu_count() at run time). Positive int →
@@ -292,6 +309,19 @@ def parse_project_toml_dict(
                 raise SchemaError(f"[rom.build].freespace[{i}] invalid range {pair!r}")
             spec.freespace.append((lo, hi))
 
+    policy = mb.get("freespace-policy", mb.get("freespace_policy"))
+    if policy is not None:
+        from retrotool.build.overflow import FREESPACE_POLICIES
+        if policy not in FREESPACE_POLICIES:
+            raise SchemaError(
+                f"[rom.build].freespace-policy must be one of "
+                f"{', '.join(FREESPACE_POLICIES)}; got {policy!r}"
+            )
+        spec.freespace_policy = policy
+    spec.freespace_bank = _coerce_freespace_bank(
+        mb.get("freespace-bank", mb.get("freespace_bank"))
+    )
+
     raw_labels = mb.get("labels", [])
     if raw_labels:
         if not isinstance(raw_labels, list):
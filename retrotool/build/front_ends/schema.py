@@ -85,7 +85,7 @@ SECTION_ATTRS: dict[SectionKind, AttrSpec] = {
             "encode", "compression",
             # PNG (SuperFamiconv) encode mode + tilemap projection
             "color-zero", "no-flip", "tile-count", "colors", "palettes",
-            "palette-from-png",
+            "palette-from-png", "engine", "dedupe-tiles",
             "map-offset", "tile-base", "map-cols", "map-entries",
             "map-base-entry", "priority", "palette-anchors",
         }) | _SHARED_EXT,
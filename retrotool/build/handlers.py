@@ -8,7 +8,7 @@ the build.
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -187,6 +187,13 @@ def _attr_hex(v: Optional[str]) -> Optional[int]:
     return int(s, 10)
 
 
+def _is_png_graphics(section: Section) -> bool:
+    """True when a graphics section goes through the PNG encoder (and its
+    `engine=`) rather than the raw write-through path."""
+    is_png = bool(section.files) and str(section.files[0]).lower().endswith(".png")
+    return bool(is_png or section.attrs.get("format") or section.attrs.get("map-offset"))
+
+
 def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteRange:
     """PNG → SuperFamiconv tiles (+ optional projected tilemap), written into the
     ROM. Lets edited word-art / UI graphics round-trip back in at build time.
@@ -195,6 +202,10 @@ def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteR
       file=          one .png (required)         offset=        tiles dest (required)
       bpp=2|4|8 (4)  color-zero=RRGGBB           no-flip=bool   tile-count=N (pad tiles)
       format=tiles|tilemap (auto: tilemap when map-offset set)
+      engine=auto|native|superfamiconv (auto) — `encode_png` engine; `auto`
+                     encodes palette-from-png sections in-process, and
+                     `superfamiconv` forces the external tool per section
+      dedupe-tiles=bool (true) — `false` keeps every tile cell (no_discard)
     Tilemap projection (format=tilemap):
       map-offset=    dest of the 16-bit entries (required)
       tile-base=     added to tile indices (VRAM tile slot the DMA targets)
@@ -209,6 +220,7 @@ def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteR
     from retrotool.graphics import (
         encode_png, grouped_palette_bytes, png_palette_rgb, project_tilemap,
     )
+    from retrotool.graphics.superfamiconv import ENCODE_ENGINES, NativeEncodeError
 
     if section.offset is None:
         raise HandlerError(f"{section.source}: <graphics> png requires offset")
@@ -223,6 +235,12 @@ def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteR
     colors = _attr_hex(a.get("colors")) or (4 if bpp == 2 else 16)
     palettes = _attr_hex(a.get("palettes")) or 8
     no_flip = (a.get("no-flip") or "").lower() in ("1", "true", "yes", "on")
+    no_discard = (a.get("dedupe-tiles") or "").lower() in ("0", "false", "no", "off")
+    engine = (a.get("engine") or "auto").lower()
+    if engine not in ENCODE_ENGINES:
+        raise HandlerError(
+            f"{section.source}: unknown engine={engine!r} "
+            f"(expected one of {', '.join(ENCODE_ENGINES)})")
     # palette-from-png: pack against the indexed PNG's OWN palette order so tile
     # pixel indices line up with a ROM's fixed CGRAM (SuperFamiconv would
     # otherwise re-sort colours). PLTE laid out as [shared idx0] + (colors-1)
@@ -231,9 +249,13 @@ def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteR
     if (a.get("palette-from-png") or "").lower() in ("1", "true", "yes", "on"):
         fixed_palette = grouped_palette_bytes(
             png_palette_rgb(png), subpalettes=palettes, colors_per=colors)
-    enc = encode_png(png, bpp=bpp, colors=colors, palettes=palettes,
-                     color_zero=a.get("color-zero"), no_flip=no_flip,
-                     fixed_palette=fixed_palette)
+    try:
+        enc = encode_png(png, bpp=bpp, colors=colors, palettes=palettes,
+                         color_zero=a.get("color-zero"), no_flip=no_flip,
+                         no_discard=no_discard, fixed_palette=fixed_palette,
+                         engine=engine)
+    except NativeEncodeError as exc:
+        raise HandlerError(f"{section.source}: engine=native: {exc}") from None
 
     tile_bytes = bpp * 8
     tiles = enc.tiles
@@ -278,7 +300,7 @@ def _handle_graphics_png(rom: bytearray, section: Section, root: Path) -> WriteR
         skip_tiles = {i for i in range(len(enc.tiles) // tile_bytes)
                       if not any(enc.tiles[i * tile_bytes:(i + 1) * tile_bytes])}
         map_bytes = project_tilemap(
-            enc.entries, enc.cols, enc.rows,
+            enc.tilemap, enc.cols, enc.rows,
             tile_base=_attr_hex(a.get("tile-base")) or 0,
             base_entry=_attr_hex(a.get("map-base-entry")) or 0,
             dest_cols=_attr_hex(a.get("map-cols")) or 32,
@@ -300,11 +322,13 @@ def handle_graphics(rom: bytearray, section: Section, root: Path, ctx: Optional[
         tiles + optional projected tilemap (see `_handle_graphics_png`).
       * raw planar binary — written through (identity bitplane only; named
         transforms like MBuild's "2bpp-to-1bpp-il" land later).
+        `dedupe-tiles=true` drops repeated tiles (exact matches, first-seen
+        order, `bpp` default 4). No remap table or tilemap is emitted, so
+        tilemaps pointing into the block must be rebuilt to match.
     """
     if section.offset is None:
         raise HandlerError(f"{section.source}: <graphics> requires offset")
-    is_png = bool(section.files) and str(section.files[0]).lower().endswith(".png")
-    if is_png or section.attrs.get("format") or section.attrs.get("map-offset"):
+    if _is_png_graphics(section):
         return _handle_graphics_png(rom, section, root)
     data = _read_concat(section, root)
     if not _is_identity_bitplane(section.codec):
@@ -312,11 +336,30 @@ def handle_graphics(rom: bytearray, section: Section, root: Path, ctx: Optional[
             f"{section.source}: bitplane transform encode={section.codec!r} not yet "
             f"implemented (only raw passthrough supported)"
         )
+    if (section.attrs.get("dedupe-tiles") or "").lower() in ("1", "true", "yes", "on"):
+        data = _dedupe_raw_tiles(data, section)
     grow = (section.grow or "replace").lower()
     allow_grow = grow == "insert"
     return _write(rom, section.offset, data, allow_grow=allow_grow, source=section.source or "")
 
 
+def _dedupe_raw_tiles(data: bytes, section: Section) -> bytes:
+    from retrotool.graphics import dedupe_sheet
+    from retrotool.graphics.tiles import TILE_BYTES, decode_tile_sheet, encode_tile_sheet
+
+    bpp = section.bpp or 4
+    if bpp not in TILE_BYTES:
+        raise HandlerError(f"{section.source}: dedupe-tiles: unsupported bpp={bpp}")
+    tile_bytes = TILE_BYTES[bpp]
+    if len(data) % tile_bytes:
+        raise HandlerError(
+            f"{section.source}: dedupe-tiles: {len(data)} bytes is not a whole number "
+            f"of {bpp}bpp tiles ({tile_bytes} bytes each)")
+    sheet = decode_tile_sheet(data, 0, len(data) // tile_bytes, bpp)
+    unique, _ = dedupe_sheet(sheet, flips=False)
+    return encode_tile_sheet(unique, bpp)
+
+
 def _is_identity_bitplane(encode: Optional[str]) -> bool:
     return (encode or "").lower() in {"", "raw", "planar"}
 
@@ -928,20 +971,9 @@ def _script_prepare_relocate(
     filters (no block/window suffix) are honored by the section-level
     `--only` / `--skip` mechanism; they don't reach this code.
     """
-    from retrotool.build.driver import section_ids_for_filter
     from retrotool.script.encode import encode_script_file  # deferred
 
-    if script_filter is not None and not script_filter.is_empty():
-        ids = section_ids_for_filter(section)
-        if (script_filter.has_block_filter(ids)
-                or script_filter.has_window_filter(ids)):
-            raise HandlerError(
-                f"{section.source}: --only block/window filter requires "
-                f"placement.mode='overflow' (relocate mode rewrites the "
-                f"pointer table — partial rebuild would risk pointer drift). "
-                f"Either drop the block selector or switch the section to "
-                f"overflow mode."
-            )
+    _reject_relocate_filter(section, script_filter)
 
     script_path = _resolve(Path(str(section.files[0])), root)
     table_path = _resolve(Path(str(section.table)), root)
@@ -989,6 +1021,84 @@ def _script_prepare_relocate(
     )
 
 
+def _reject_relocate_filter(
+    section: Section, script_filter: Optional[ScriptFilter],
+) -> None:
+    """Raise when block/window rules target a relocate-mode section."""
+    if script_filter is None or script_filter.is_empty():
+        return
+    from retrotool.build.driver import section_ids_for_filter
+    ids = section_ids_for_filter(section)
+    if (script_filter.has_block_filter(ids)
+            or script_filter.has_window_filter(ids)):
+        raise HandlerError(
+            f"{section.source}: --only block/window filter requires "
+            f"placement.mode='overflow' (relocate mode rewrites the "
+            f"pointer table — partial rebuild would risk pointer drift). "
+            f"Either drop the block selector or switch the section to "
+            f"overflow mode."
+        )
+
+
+def apply_script_filter(
+    prepared: Optional[_PreparedScript], section: Section,
+    script_filter: Optional[ScriptFilter],
+) -> Optional[_PreparedScript]:
+    """Narrow an unfiltered `script_prepare()` payload to `script_filter`.
+
+    Overflow mode: entries outside the allowed block range are masked to
+    `b"\\x00"` (the auto-window handler treats that as "preserve source
+    bytes"), and non-allowed windows are dropped from the per-entry
+    windowed list. Relocate mode rejects block/window rules outright.
+
+    Pure — returns a new payload (lists copied) and leaves `prepared`
+    untouched, so step mode can encode a script once and re-mask it per
+    step. Masking is the last thing `_script_prepare_overflow` does, so
+    `apply_script_filter(script_prepare(snap, s, root), s, sf)` equals
+    `script_prepare(snap, s, root, script_filter=sf)`.
+    """
+    if prepared is None:
+        return None
+    if prepared.mode == "relocate":
+        _reject_relocate_filter(section, script_filter)
+        return prepared
+    if script_filter is None or script_filter.is_empty():
+        return prepared
+    if prepared.auto_entries is None:
+        return prepared
+    from retrotool.build.driver import section_ids_for_filter
+    ids = section_ids_for_filter(section)
+    auto_entries = list(prepared.auto_entries)
+    windowed = prepared.windowed
+    if script_filter.has_block_filter(ids):
+        # Mask non-allowed entries to the empty-placeholder sentinel.
+        # `_emit_auto_window_writes` short-circuits on `enc == b"\\x00"`
+        # (handlers.py: empty-placeholder skip), preserving source ROM
+        # bytes for those slots verbatim.
+        for i in range(len(auto_entries)):
+            if not script_filter.block_allowed(ids, i):
+                auto_entries[i] = (b"\x00", None, [], {}, False)
+    if windowed is not None and (
+        script_filter.has_block_filter(ids)
+        or script_filter.has_window_filter(ids)
+    ):
+        new_windowed: list = []
+        for i, entry_windows in enumerate(windowed):
+            if entry_windows is None:
+                new_windowed.append(None)
+                continue
+            if not script_filter.block_allowed(ids, i):
+                new_windowed.append(None)
+                continue
+            kept = [
+                w for w_idx, w in enumerate(entry_windows)
+                if script_filter.window_allowed(ids, i, w_idx)
+            ]
+            new_windowed.append(kept if kept else None)
+        windowed = new_windowed
+    return replace(prepared, auto_entries=auto_entries, windowed=windowed)
+
+
 def script_prepare(
     rom_snapshot: bytes, section: Section, root: Path,
     script_filter: Optional[ScriptFilter] = None,
@@ -2019,13 +2129,10 @@ def _script_prepare_overflow(
     the live rom in apply phase. No allocator, no labels.
 
     When `script_filter` carries block/window rules that match this section,
-    non-allowed entries are masked to `b"\\x00"` (the auto-window handler
-    treats that as "preserve source bytes"), and non-allowed windows are
-    dropped from the per-entry windowed list. The pointer table is never
-    rewritten in overflow mode, so masking is a clean no-op for the masked
-    entries.
+    the encoded payload is narrowed by `apply_script_filter` as the final
+    step. The pointer table is never rewritten in overflow mode, so masking
+    is a clean no-op for the masked entries.
     """
-    from retrotool.build.driver import section_ids_for_filter
     from retrotool.script.encode import (
         encode_script_file,
         encode_windowed_script_file,
@@ -2105,36 +2212,7 @@ def _script_prepare_overflow(
             script_path, table_path, fallback_table=fallback_path,
         )
 
-    if script_filter is not None and not script_filter.is_empty():
-        ids = section_ids_for_filter(section)
-        if script_filter.has_block_filter(ids):
-            # Mask non-allowed entries to the empty-placeholder sentinel.
-            # `_emit_auto_window_writes` short-circuits on `enc == b"\\x00"`
-            # (handlers.py: empty-placeholder skip), preserving source ROM
-            # bytes for those slots verbatim.
-            for i in range(len(auto_entries)):
-                if not script_filter.block_allowed(ids, i):
-                    auto_entries[i] = (b"\x00", None, [], {}, False)
-        if windowed is not None and (
-            script_filter.has_block_filter(ids)
-            or script_filter.has_window_filter(ids)
-        ):
-            new_windowed: list = []
-            for i, entry_windows in enumerate(windowed):
-                if entry_windows is None:
-                    new_windowed.append(None)
-                    continue
-                if not script_filter.block_allowed(ids, i):
-                    new_windowed.append(None)
-                    continue
-                kept = [
-                    w for w_idx, w in enumerate(entry_windows)
-                    if script_filter.window_allowed(ids, i, w_idx)
-                ]
-                new_windowed.append(kept if kept else None)
-            windowed = new_windowed
-
-    return _PreparedScript(
+    prepared = _PreparedScript(
         mode="overflow",
         auto_entries=auto_entries,
         windowed=windowed,
@@ -2145,6 +2223,7 @@ def _script_prepare_overflow(
         source_snapshot=bytes(rom_snapshot),
         has_window_markers=has_window_markers,
     )
+    return apply_script_filter(prepared, section, script_filter)
 
 
 def _handle_script_windowed(
@@ -7,8 +7,9 @@ A strategy decides:
 
 Game-specific mechanics live in strategy plugins. The framework provides:
 
-  - `FreespaceAllocator` — bump-allocator over a list of (lo, hi) byte ranges
-    in PC-offset space.
+  - `FreespaceAllocator` — allocator over a list of (lo, hi) byte ranges in
+    PC-offset space: legacy bump, or first-/best-fit over a hole index, with
+    optional bank-boundary avoidance and fragmentation stats.
   - `OverflowStrategy` ABC — `pack(entry, allocator) -> Packed` returns the
     inline replacement plus zero or more `(offset, bytes)` tail writes.
   - A pluggable `register / get / list_strategies` registry.
@@ -28,6 +29,9 @@ Handler integration (script / fixed-records / etc.) lands in Phase 6c.
 """
 from __future__ import annotations
 
+import bisect
+import random
+import re
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Callable, Optional
@@ -50,55 +54,363 @@ class FreespaceExhausted(RuntimeError):
     pass
 
 
+# Allocation policies understood by `FreespaceAllocator(policy=...)`.
+FREESPACE_POLICIES = ("bump", "first-fit", "best-fit")
+
+# PC-offset bytes per ROM bank, for `bank_size=` (`[rom.build].freespace-bank`).
+BANK_SIZES = {"lorom": 0x8000, "hirom": 0x10000}
+
+
+@dataclass(frozen=True)
+class FreespaceStats:
+    """Freespace usage / fragmentation snapshot (`FreespaceAllocator.stats()`).
+
+    `lost` counts bytes no later request can reach: the `bump` policy's
+    skipped range tails, the gaps it skips to keep a request inside one bank,
+    and the gaps below its `reserve()`d writes. `fragmentation` is `1 - largest_hole / free`:
+    0.0 when all free space is one hole, approaching 1.0 as it scatters.
+    """
+    total: int
+    free: int
+    lost: int
+    holes: int
+    largest_hole: int
+    allocations: int
+
+    @property
+    def used(self) -> int:
+        return self.total - self.free - self.lost
+
+    @property
+    def fragmentation(self) -> float:
+        if self.free <= 0:
+            return 0.0
+        return 1.0 - self.largest_hole / self.free
+
+
 class FreespaceAllocator:
-    """Bump-allocate fixed-size requests across a list of ranges, in order."""
+    """Allocate overflow bytes from a list of freespace ranges.
+
+    Policies:
+
+      * `bump` (default) — the historical allocator: ranges are used in
+        declaration order and a range that can't fit a request is skipped
+        for good; `reserve()` never gives back the gap below a reserved
+        write. Kept as the default so existing projects place bytes
+        exactly where they always have.
+      * `first-fit` — free space is a set of holes; a request takes the
+        lowest-address hole that fits, and `reserve()` splits holes, so
+        nothing is stranded. Holes live in an address-ordered tree that
+        tracks the largest hole under each node, so the lookup is
+        O(log n) in the number of holes.
+      * `best-fit` — as `first-fit`, but takes the smallest hole that fits
+        (lowest address on ties). Holes are indexed by `(size, lo)` in a
+        sorted list, so the lookup is a binary search; it keeps large
+        holes intact for large entries.
+
+    With a bank size, a hole of at least `2n - 1` bytes always fits `n`, so
+    both hole lookups only step past holes just big enough to fit `n` bytes
+    on paper but split by a bank boundary.
+
+    `bank_size` (e.g. `BANK_SIZES["lorom"]`) keeps every allocation inside
+    one bank — a request that would straddle a boundary starts at the next
+    one; `alloc(n, bank_size=...)` overrides it per request. Placement is
+    a pure function of the request sequence.
+    """
 
-    def __init__(self, ranges: list[FreespaceRange]):
+    def __init__(
+        self,
+        ranges: list[FreespaceRange],
+        *,
+        policy: str = "bump",
+        bank_size: Optional[int] = None,
+    ):
+        if policy not in FREESPACE_POLICIES:
+            raise ValueError(
+                f"unknown freespace policy {policy!r}; expected one of "
+                f"{', '.join(FREESPACE_POLICIES)}"
+            )
+        if bank_size is not None and bank_size <= 0:
+            raise ValueError("bank_size must be > 0")
+        self.policy = policy
+        self.bank_size = bank_size
         self._ranges = list(ranges)
-        self._cursor = 0  # index into self._ranges
+        self._cursor = 0  # index into self._ranges (bump)
+        self._lost = 0    # bump: bytes skipped below allocations / reserves
+        self._total = sum(max(0, r.remaining) for r in self._ranges)
+        self._allocations = 0
+        # Hole index (first-fit / best-fit): lo → hi, both orderings, and
+        # the address tree first-fit searches.
+        self._holes: dict[int, int] = {}
+        self._starts: list[int] = []
+        self._sizes: list[tuple[int, int]] = []
+        self._tree = _HoleTree()
+        if policy != "bump":
+            for lo, hi in _merge_ranges((r.lo, r.hi) for r in self._ranges):
+                self._add_hole(lo, hi)
+            self._total = sum(hi - lo for lo, hi in self._holes.items())
 
     @classmethod
-    def from_pairs(cls, pairs: list[tuple[int, int]]) -> "FreespaceAllocator":
-        return cls([FreespaceRange(lo, hi) for lo, hi in pairs])
+    def from_pairs(
+        cls, pairs: list[tuple[int, int]], **kwargs,
+    ) -> "FreespaceAllocator":
+        return cls([FreespaceRange(lo, hi) for lo, hi in pairs], **kwargs)
 
-    def alloc(self, n: int) -> int:
-        """Return PC offset where `n` bytes can be written. Bumps the cursor."""
+    def alloc(self, n: int, *, bank_size: Optional[int] = None) -> int:
+        """Return PC offset where `n` bytes can be written and mark it used."""
         if n <= 0:
             raise ValueError("alloc(n) requires n > 0")
+        bank = bank_size if bank_size is not None else self.bank_size
+        if bank is not None and n > bank:
+            raise FreespaceExhausted(
+                f"{n} bytes can't fit inside one {bank:#x}-byte bank"
+            )
+        if self.policy == "bump":
+            off = self._alloc_bump(n, bank)
+        else:
+            off = self._alloc_hole(n, bank)
+        self._allocations += 1
+        return off
+
+    def _alloc_bump(self, n: int, bank: Optional[int]) -> int:
         while self._cursor < len(self._ranges):
             r = self._ranges[self._cursor]
-            if r.remaining >= n:
-                off = r.lo
-                r.lo += n
+            off = _fit(r.lo, r.hi, n, bank)
+            if off is not None:
+                self._lost += off - r.lo
+                r.lo = off + n
                 return off
             self._cursor += 1
         raise FreespaceExhausted(f"no freespace range fits {n} bytes")
 
+    def _alloc_hole(self, n: int, bank: Optional[int]) -> int:
+        holes = self._holes
+        if self.policy == "best-fit":
+            sizes = self._sizes
+            for i in range(bisect.bisect_left(sizes, (n, -1)), len(sizes)):
+                lo = sizes[i][1]
+                off = _fit(lo, holes[lo], n, bank)
+                if off is not None:
+                    break
+            else:
+                off = None
+        else:
+            off = self._tree.first_fit(n, bank)
+        if off is None:
+            raise FreespaceExhausted(
+                f"no freespace hole fits {n} bytes "
+                f"({self.remaining()} free in {len(holes)} hole(s))"
+            )
+        self._carve(off, off + n)
+        return off
+
     def reserve(self, off: int, n: int) -> bool:
         """Mark `[off, off+n)` as consumed if it lies inside a freespace range.
 
         Used when replaying cached writes: the cache already holds an absolute
-        PC that was allocated in a prior build, so the cursor must be advanced
-        past it or a later `alloc()` will hand out the same bytes. Only
-        advances monotonically (never reclaims gaps below the cursor).
+        PC that was allocated in a prior build, so later `alloc()` calls must
+        not hand out the same bytes. With `bump` the range start only
+        advances monotonically (never reclaims gaps below the cursor); the
+        hole policies carve exactly `[off, off+n)` out of the free set.
 
         Returns True if the write intersected a freespace range, else False.
         """
         if n <= 0:
             return False
         end = off + n
+        if self.policy != "bump":
+            return self._carve(off, end)
         for idx, r in enumerate(self._ranges):
             if off < r.hi and end > r.lo:
-                if end > r.lo:
-                    r.lo = min(r.hi, max(r.lo, end))
+                self._lost += max(0, off - r.lo)
+                r.lo = min(r.hi, max(r.lo, end))
                 if r.lo >= r.hi and idx >= self._cursor:
                     self._cursor = max(self._cursor, idx + 1)
                 return True
         return False
 
     def remaining(self) -> int:
+        if self.policy != "bump":
+            return sum(hi - lo for lo, hi in self._holes.items())
         return sum(r.remaining for r in self._ranges[self._cursor:])
 
+    def holes(self) -> list[tuple[int, int]]:
+        """Free `(lo, hi)` ranges still reachable by `alloc()`, by address."""
+        if self.policy != "bump":
+            return [(lo, self._holes[lo]) for lo in self._starts]
+        return sorted(
+            (r.lo, r.hi) for r in self._ranges[self._cursor:] if r.remaining > 0
+        )
+
+    def stats(self) -> FreespaceStats:
+        holes = self.holes()
+        free = sum(hi - lo for lo, hi in holes)
+        lost = 0
+        if self.policy == "bump":
+            lost = self._lost + sum(
+                r.remaining for r in self._ranges[:self._cursor] if r.remaining > 0
+            )
+        return FreespaceStats(
+            total=self._total,
+            free=free,
+            lost=lost,
+            holes=len(holes),
+            largest_hole=max((hi - lo for lo, hi in holes), default=0),
+            allocations=self._allocations,
+        )
+
+    def snapshot(self) -> object:
+        """Opaque copy of the allocation state; `restore()` rewinds to it.
+
+        Step-mode builds snapshot once after the shared prefix and restore
+        before each step so every step allocates from the same state.
+        """
+        if self.policy != "bump":
+            return (self._allocations, tuple(self.holes()))
+        return (
+            self._allocations, self._cursor, self._lost,
+            tuple((r.lo, r.hi) for r in self._ranges),
+        )
+
+    def restore(self, state: object) -> None:
+        if self.policy != "bump":
+            self._allocations, holes = state  # type: ignore[misc]
+            self._holes = {}
+            self._starts = []
+            self._sizes = []
+            self._tree = _HoleTree()
+            for lo, hi in holes:
+                self._add_hole(lo, hi)
+            return
+        self._allocations, cursor, self._lost, ranges = state  # type: ignore[misc]
+        self._cursor = cursor
+        self._ranges = [FreespaceRange(lo, hi) for lo, hi in ranges]
+
+    # ---- hole index -------------------------------------------------------
+
+    def _add_hole(self, lo: int, hi: int) -> None:
+        if hi <= lo:
+            return
+        self._holes[lo] = hi
+        bisect.insort(self._starts, lo)
+        bisect.insort(self._sizes, (hi - lo, lo))
+        self._tree.add(lo, hi)
+
+    def _drop_hole(self, lo: int) -> int:
+        hi = self._holes.pop(lo)
+        del self._starts[bisect.bisect_left(self._starts, lo)]
+        del self._sizes[bisect.bisect_left(self._sizes, (hi - lo, lo))]
+        self._tree.drop(lo)
+        return hi
+
+    def _carve(self, off: int, end: int) -> bool:
+        """Remove `[off, end)` from the free set; True if any of it was free."""
+        starts = self._starts
+        i = max(bisect.bisect_right(starts, off) - 1, 0)
+        hit = []
+        while i < len(starts) and starts[i] < end:
+            lo = starts[i]
+            if self._holes[lo] > off:
+                hit.append(lo)
+            i += 1
+        for lo in hit:
+            hi = self._drop_hole(lo)
+            self._add_hole(lo, min(hi, off))
+            self._add_hole(max(lo, end), hi)
+        return bool(hit)
+
+
+class _HoleTree:
+    """Holes in a treap keyed by start address. Each node is
+    `[lo, hi, priority, left, right, largest]`, `largest` being the biggest
+    hole in its subtree, so subtrees too small for a request are skipped
+    and the lowest-address fit is found in O(log n). Priorities come from a
+    fixed-seed RNG: the shape (not the placement) depends on them."""
+
+    __slots__ = ("_root", "_rng")
+
+    def __init__(self) -> None:
+        self._root: Optional[list] = None
+        self._rng = random.Random(0)
+
+    def add(self, lo: int, hi: int) -> None:
+        left, right = _treap_split(self._root, lo)
+        node = [lo, hi, self._rng.random(), None, None, hi - lo]
+        self._root = _treap_merge(_treap_merge(left, node), right)
+
+    def drop(self, lo: int) -> None:
+        left, right = _treap_split(self._root, lo)
+        _, right = _treap_split(right, lo + 1)
+        self._root = _treap_merge(left, right)
+
+    def first_fit(self, n: int, bank: Optional[int]) -> Optional[int]:
+        """Lowest offset any hole can hold `n` bytes at, or None."""
+        return _treap_first_fit(self._root, n, bank)
+
+
+def _treap_update(node: list) -> list:
+    largest = node[1] - node[0]
+    for child in (node[3], node[4]):
+        if child is not None and child[5] > largest:
+            largest = child[5]
+    node[5] = largest
+    return node
+
+
+def _treap_split(node: Optional[list], key: int):
+    """Split into (nodes with lo < key, nodes with lo >= key)."""
+    if node is None:
+        return None, None
+    if node[0] < key:
+        node[4], right = _treap_split(node[4], key)
+        return _treap_update(node), right
+    left, node[3] = _treap_split(node[3], key)
+    return left, _treap_update(node)
+
+
+def _treap_merge(a: Optional[list], b: Optional[list]) -> Optional[list]:
+    """Join two treaps, every key of `a` below every key of `b`."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a[2] > b[2]:
+        a[4] = _treap_merge(a[4], b)
+        return _treap_update(a)
+    b[3] = _treap_merge(a, b[3])
+    return _treap_update(b)
+
+
+def _treap_first_fit(node: Optional[list], n: int, bank: Optional[int]) -> Optional[int]:
+    if node is None or node[5] < n:
+        return None
+    off = _treap_first_fit(node[3], n, bank)
+    if off is None:
+        off = _fit(node[0], node[1], n, bank)
+        if off is None:
+            off = _treap_first_fit(node[4], n, bank)
+    return off
+
+
+def _fit(lo: int, hi: int, n: int, bank: Optional[int]) -> Optional[int]:
+    """Lowest offset in `[lo, hi)` holding `n` bytes without crossing a
+    `bank`-sized boundary (when `bank` is set); None if there is none."""
+    off = lo
+    if bank is not None and off // bank != (off + n - 1) // bank:
+        off = (off // bank + 1) * bank
+    return off if off + n <= hi else None
+
+
+def _merge_ranges(pairs) -> list[tuple[int, int]]:
+    """Sort `(lo, hi)` pairs and coalesce overlapping / touching ones."""
+    merged: list[list[int]] = []
+    for lo, hi in sorted(p for p in pairs if p[1] > p[0]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [(lo, hi) for lo, hi in merged]
+
 
 # ---- strategy ABC + result ------------------------------------------------
 
@@ -481,7 +793,7 @@ def split_ctrl_aware(
     terminator: Optional[int] = 0x00,
     event_script: bool = False,
     text_enter: int = 0x10,
-) -> Callable[[bytes, int], int]:
+) -> CtrlAwareSplitter:
     """Latest safe byte-boundary split, control-code aware.
 
     Two calling shapes (mutually exclusive at the conceptual level —
@@ -504,88 +816,160 @@ def split_ctrl_aware(
     For non-event data, stops at the first `terminator`. For event-script
     data, returns the last safe split inside a text window
     ([text_enter]..[terminator]).
+
+    The returned splitter compiles the ctrl table once; see
+    `CtrlAwareSplitter` for the scan-once / split-many form.
     """
     if ctrl_table is None:
         ctrl_table = {0xFF: (default_length, dict(ctrl_lengths or {}))}
-    # Freeze a fast lookup with primitives only — the closure shouldn't
-    # re-dict-lookup per byte.
-    prefix_set = frozenset(ctrl_table.keys())
-    prefix_info = {
-        p: (dl, dict(cmds)) for p, (dl, cmds) in ctrl_table.items()
-    }
+    return CtrlAwareSplitter(
+        ctrl_table, terminator=terminator,
+        event_script=event_script, text_enter=text_enter,
+    )
 
-    def _splitter(encoded: bytes, budget: int) -> int:
+
+# Byte classes in `CtrlAwareSplitter._kind`.
+_PLAIN, _CTRL, _TERM, _ENTER = 0, 1, 2, 3
+
+
+class SplitPoints:
+    """Every safe split offset of one encoded entry, from a single scan.
+
+    `safe[i]` is 1 when `i` ends a whole token before the scan stopped;
+    `text_safe` (event scripts) additionally requires `i` to sit inside a
+    text window. `split(budget)` is then a reverse search — any number of
+    budgets against the same entry cost one scan.
+    """
+    __slots__ = ("safe", "text_safe")
+
+    def __init__(self, safe: bytearray, text_safe: Optional[bytearray]):
+        self.safe = safe
+        self.text_safe = text_safe
+
+    def split(self, budget: int) -> int:
         if budget <= 0:
             return 0
-        pos = 0
-        last_safe = 0
-        in_text = False
-        last_text_safe = 0
+        marks = self.text_safe if self.text_safe is not None else self.safe
+        return max(marks.rfind(1, 0, budget + 1), 0)
+
+
+class CtrlAwareSplitter:
+    """Compiled `split_ctrl_aware` splitter: `splitter(encoded, budget)`.
+
+    The ctrl table is flattened into 256-slot arrays at construction: a
+    byte-class table, and per prefix byte a 256-entry length table indexed
+    by the cmd byte (`None` for standalone 1-byte prefixes, which never peek).
+    `scan(encoded)` walks the entry once, visiting only ctrl / terminator /
+    text-enter bytes (found with a compiled byte-class regex), and records every safe
+    split in a `SplitPoints`. The most recent scan is kept, so splitting the
+    same entry at several budgets rescans nothing.
+    """
+
+    def __init__(
+        self,
+        ctrl_table: dict,
+        *,
+        terminator: Optional[int] = 0x00,
+        event_script: bool = False,
+        text_enter: int = 0x10,
+    ):
+        self.event_script = event_script
+        kind = bytearray(256)
+        lengths: list[Optional[list[int]]] = [None] * 256
+        defaults = [1] * 256
+        pad = 1
+        for p, (dl, cmds) in ctrl_table.items():
+            if dl == 1 and not cmds:
+                # 1-byte standalone ctrl that doubles as terminator ends the
+                # entry instead.
+                if terminator is not None and p == terminator:
+                    continue
+                kind[p] = _CTRL
+                continue
+            table = [dl] * 256
+            for cmd, length in cmds.items():
+                table[cmd] = length
+            kind[p] = _CTRL
+            lengths[p] = table
+            defaults[p] = dl
+            pad = max(pad, max(table))
+        if terminator is not None and not kind[terminator]:
+            kind[terminator] = _TERM
+        if event_script and not kind[text_enter]:
+            kind[text_enter] = _ENTER
+        self._kind = bytes(kind)
+        self._lengths = lengths
+        self._defaults = defaults
+        self._pad = pad
+        special = bytes(b for b in range(256) if kind[b])
+        self._special = (
+            re.compile(b"[" + b"".join(re.escape(bytes([b])) for b in special) + b"]")
+            if special else None
+        )
+        self._last: Optional[tuple[bytes, SplitPoints]] = None
+
+    def __call__(self, encoded: bytes, budget: int) -> int:
+        if budget <= 0:
+            return 0
+        return self.scan(encoded).split(budget)
+
+    def scan(self, encoded: bytes) -> SplitPoints:
+        # Keyed on an immutable copy, so a bytearray edited in place and
+        # scanned again is rescanned.
+        key = bytes(encoded)
+        last = self._last
+        if last is not None and last[0] == key:
+            return last[1]
+        points = self._scan(key)
+        self._last = (key, points)
+        return points
+
+    def _scan(self, encoded: bytes) -> SplitPoints:
         n = len(encoded)
-        while pos < n:
-            b = encoded[pos]
-            if b in prefix_set:
-                default_len, cmds = prefix_info[b]
-                # 1-byte standalone ctrl that doubles as terminator: take
-                # the terminator branch so the entry actually ends here.
-                if (
-                    default_len == 1 and not cmds
-                    and terminator is not None and b == terminator
-                ):
-                    if event_script:
-                        if pos + 1 <= budget:
-                            if in_text:
-                                in_text = False
-                            last_safe = pos + 1
-                            pos += 1
-                            continue
-                        else:
-                            break
-                    else:
-                        break
-                # Determine length: peek the cmd byte if available; for
-                # 1-byte standalone (no cmds, default=1) skip the peek.
-                if default_len == 1 and not cmds:
+        # Positions past the end only become safe when a truncated ctrl
+        # token claims them (its declared length runs off the data).
+        safe = bytearray(b"\x01") * (n + 1) + bytearray(self._pad)
+        text = bytearray(len(safe)) if self.event_script else None
+        special = self._special
+        kind = self._kind
+        lengths = self._lengths
+        in_text = False
+        pos = 0
+        for m in special.finditer(encoded) if special is not None else ():
+            q = m.start()
+            if q < pos:
+                continue            # cmd / argument byte of the previous ctrl
+            if in_text and q > pos:
+                text[pos + 1:q + 1] = safe[pos + 1:q + 1]
+            b = encoded[q]
+            k = kind[b]
+            if k == _CTRL:
+                table = lengths[b]
+                if table is None:
                     cl = 1
-                elif pos + 1 < n:
-                    cl = cmds.get(encoded[pos + 1], default_len)
-                else:
-                    cl = default_len
-                if pos + cl <= budget:
-                    last_safe = pos + cl
-                    if event_script and in_text:
-                        last_text_safe = pos + cl
-                    pos += cl
+                elif q + 1 < n:
+                    cl = table[encoded[q + 1]]
                 else:
-                    break
-            elif terminator is not None and b == terminator:
-                if event_script:
-                    if pos + 1 <= budget:
-                        if in_text:
-                            in_text = False
-                        last_safe = pos + 1
-                        pos += 1
-                    else:
-                        break
-                else:
-                    break
-            elif event_script and b == text_enter:
+                    cl = self._defaults[b]
+                end = q + cl
+                if cl > 1:
+                    safe[q + 1:end] = bytes(cl - 1)
+                safe[end] = 1
+                if in_text:
+                    text[end] = 1
+                pos = end
+            elif k == _TERM:
+                if not self.event_script:
+                    safe[q + 1:] = bytes(len(safe) - q - 1)
+                    return SplitPoints(safe, text)
+                in_text = False
+                pos = q + 1
+            else:  # _ENTER
                 in_text = True
-                if pos + 1 <= budget:
-                    last_safe = pos + 1
-                    pos += 1
-                else:
-                    break
-            else:
-                if pos + 1 <= budget:
-                    last_safe = pos + 1
-                    if event_script and in_text:
-                        last_text_safe = pos + 1
-                    pos += 1
-                else:
-                    break
-        return last_text_safe if event_script else last_safe
-    return _splitter
+                pos = q + 1
+        if in_text and n > pos:
+            text[pos + 1:n + 1] = safe[pos + 1:n + 1]
+        return SplitPoints(safe, text)
 
 
 def _splitter_ctrl_aware_factory(arg: object, *, ctx: Optional[dict] = None) -> Callable[[bytes, int], int]:
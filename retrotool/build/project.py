@@ -305,6 +305,14 @@ def _print_build_summary(
         f"(cache hits: {result.cache_hits}, skipped: {len(result.skipped)})",
         file=stream,
     )
+    fs = getattr(result, "freespace", None)
+    if fs is not None:
+        print(
+            f"freespace: {fs.used}/{fs.total} bytes used · {fs.holes} hole(s), "
+            f"largest {fs.largest_hole} · fragmentation {fs.fragmentation:.0%}"
+            + (f" · {fs.lost} lost" if fs.lost else ""),
+            file=stream,
+        )
     for d in result.diffs:
         if d.skipped:
             print(f"diff:      {d.format} skipped — {d.note}", file=stream)
@@ -431,6 +439,8 @@ def iter_step_builds(
     parallel: Optional[int] = None,
     reporter=None,
     output_namer: Optional[Callable[[int, int, Path], Path]] = None,
+    jobs: Optional[int] = None,
+    delta: Optional[str] = None,
 ) -> Iterator[tuple[int, int, "BuildResult", Path]]:
     """Yield one `(step_idx, total_steps, BuildResult, output_path)` per
     successive (cumulative) block range.
@@ -446,55 +456,47 @@ def iter_step_builds(
     default `<stem>.stepNNN<suffix>` naming used by `--script-step-batch`.
     Pass a no-op (returning the same path) to overwrite a single ROM each
     step, mirroring the interactive CLI mode.
+
+    Steps share one `StepBuilder` (see `retrotool.build.steps`): the source
+    ROM, the sections declared before `section` and the script encode are
+    processed once, and each step replays only `section` onwards. Output is
+    byte-identical to one `build()` per step.
+
+    `jobs` fans steps 2..N out to that many worker processes (`0` = auto,
+    `None` = serial, the default); results are still yielded in step
+    order. Only meaningful with distinct per-step outputs (batch naming).
+    `delta="ips"` writes `<step output>.ips` patches against the source
+    ROM instead of full ROMs; the yielded path is the patch.
     """
-    from retrotool.build import (
-        IndexRange, ScriptFilter, ScriptTarget, build,
-    )
+    from retrotool.build.steps import StepBuilder, step_ranges
 
-    if section.count is None:
-        raise ValueError(
-            f"section {section.source!r} has no count= (can't enumerate blocks)"
-        )
-    total = int(section.count)
-    if block_hi is None:
-        block_hi = total - 1
-    block_hi = min(block_hi, total - 1)
-    if block_lo > block_hi:
-        raise ValueError(f"empty block range {block_lo}..{block_hi}")
-    progress = max(1, progress)
-    n_steps = ((block_hi - block_lo) // progress) + 1
-
-    section_id = (
-        section.from_datadef
-        or section.attrs.get("name")
-        or section.attrs.get("alias")
-        or ""
+    ranges = step_ranges(
+        section, block_lo=block_lo, block_hi=block_hi, progress=progress,
+    )
+    n_steps = len(ranges)
+    builder = StepBuilder(
+        spec, section=section, source_root=source_root, cache=cache,
+        only=only, skip=skip, parallel=parallel, reporter=reporter,
     )
-    if not section_id:
-        raise ValueError(
-            f"section {section.source!r} has no usable name; set "
-            f"[section.name] or use --only with a datadef name"
-        )
 
     def _default_namer(step_idx: int, total_n: int, base: Path) -> Path:
         return base.with_name(f"{base.stem}.step{step_idx:03d}{base.suffix}")
     namer = output_namer or _default_namer
 
+    outputs: list[Path] = []
     for step in range(1, n_steps + 1):
-        cur_hi = min(block_lo + step * progress - 1, block_hi)
-        sf = ScriptFilter()
-        sf.add(ScriptTarget(
-            section_id=section_id,
-            block_range=IndexRange(block_lo, cur_hi),
-            window_range=extra_window_range,
-        ))
         step_out = namer(step, n_steps, out_path)
-        result = build(
-            spec, source_root=source_root, out_path=step_out, cache=cache,
-            only=only, skip=skip,
-            parallel=parallel, reporter=reporter,
-            script_filter=sf,
-        )
+        if delta is not None:
+            step_out = step_out.with_suffix(step_out.suffix + f".{delta}")
+        outputs.append(step_out)
+    results = builder.build_batch(
+        [
+            (builder.filter_for(block_range, extra_window_range), step_out)
+            for block_range, step_out in zip(ranges, outputs)
+        ],
+        jobs=jobs, delta=delta,
+    )
+    for step, (result, step_out) in enumerate(zip(results, outputs), start=1):
         yield step, n_steps, result, step_out
 
 
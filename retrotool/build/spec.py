@@ -145,6 +145,12 @@ class BuildSpec:
     # Top-level freespace ranges (PC half-open) shared across handlers that
     # need overflow allocation. Each pair is [lo, hi).
     freespace: list[tuple[int, int]] = field(default_factory=list)
+    # `FreespaceAllocator` policy for the pool above (`[rom.build]
+    # .freespace-policy`): "bump" (historical default), "first-fit" or
+    # "best-fit". `freespace_bank` (`.freespace-bank`) is the bank size in
+    # PC bytes that no single allocation may straddle; None = unrestricted.
+    freespace_policy: str = "bump"
+    freespace_bank: Optional[int] = None
     # Global label registry populated from `[[build.labels]]`. Sections may
     # also register labels dynamically via `export-label=`.
     labels: dict[str, int] = field(default_factory=dict)
@@ -183,8 +189,8 @@ class BuildSpec:
     # `retrotool.debugger.mesen_saves.resolve_saves_dir`.
     mesen_saves_dir: Optional[str] = None
     # When `sync_sram=True` and a pre-existing destination SRM would be
-    # clobbered, tar.gz the existing file into
-    # `<saves>/<dst_stem>_archive_<timestamp>.tar.gz` first. Only active
+    # clobbered, store the existing file in the content-addressed
+    # `<saves>/<dst_stem>_archive/` first. Only active
     # when the destination differs from the source (identical content is
     # redundant to archive). Default True — safe-by-default for iterative
     # playtest runs that might have accumulated state.
@@ -0,0 +1,329 @@
+"""Incremental step builds for `--script-step` / `--script-step-batch`.
+
+Bisecting a script means building the same spec N times, each with one more
+block range of the stepped section enabled. A plain `build()` per step
+re-reads the source ROM, re-hashes every cache key, re-runs every section
+and re-encodes the whole script file N times — even though only the stepped
+section's output actually changes between steps.
+
+`StepBuilder` splits the build at the stepped section:
+
+  1. **Prefix (once).** Sections declared before it run once through a
+     `_BuildSession`; the working rom, allocator and label registry are
+     snapshotted.
+  2. **Encode (once).** The stepped script is encoded unfiltered against the
+     rom exactly as a single-pass build would have submitted it.
+  3. **Per step.** Restore the snapshot, re-mask the encoded payload to the
+     step's block range (`handlers.apply_script_filter`), place it, run the
+     sections after it, post-process and write.
+
+Placement is replayed rather than patched in place: which blocks overflow
+into freespace, and where, depends on every block before them, so replaying
+from the snapshot is what keeps each step byte-identical to a standalone
+`build(..., script_filter=...)` of the same range.
+
+Steps are independent given the snapshot, so `StepBuilder.build_batch()`
+can fan them out to worker processes that share the base rom through
+`multiprocessing.shared_memory`, and can emit IPS patches against the
+source ROM instead of full ROM copies.
+"""
+from __future__ import annotations
+
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, Optional, Sequence
+
+from retrotool.build.driver import (
+    BuildResult, _BuildSession, _SessionSnapshot, section_ids_for_filter,
+)
+from retrotool.build.handlers import script_prepare
+from retrotool.build.reporter import Reporter
+from retrotool.build.script_filter import IndexRange, ScriptFilter, ScriptTarget
+from retrotool.build.spec import BuildSpec, Section, SectionKind
+from retrotool.core.cache import BuildCache
+
+
+_SCRIPT_KINDS = (SectionKind.SCRIPT, SectionKind.WINDOWED_SCRIPT)
+
+
+def step_section_id(section: Section) -> str:
+    """The filter ID step mode targets `section` by — DataDef name, then
+    `name=` / `alias=`. Raises `ValueError` when the section has none."""
+    section_id = (
+        section.from_datadef
+        or section.attrs.get("name")
+        or section.attrs.get("alias")
+        or ""
+    )
+    if not section_id:
+        raise ValueError(
+            f"section {section.source!r} has no usable name; set "
+            f"[section.name] or use --only with a datadef name"
+        )
+    return section_id
+
+
+def step_ranges(
+    section: Section,
+    *,
+    block_lo: int = 0,
+    block_hi: Optional[int] = None,
+    progress: int = 1,
+) -> list[IndexRange]:
+    """Cumulative block ranges, one per step: `[lo..lo+p-1]`,
+    `[lo..lo+2p-1]`, …, `[lo..hi]`. `block_hi` defaults to (and is clamped
+    at) the section's last block."""
+    if section.count is None:
+        raise ValueError(
+            f"section {section.source!r} has no count= (can't enumerate blocks)"
+        )
+    total = int(section.count)
+    if block_hi is None:
+        block_hi = total - 1
+    block_hi = min(block_hi, total - 1)
+    if block_lo > block_hi:
+        raise ValueError(f"empty block range {block_lo}..{block_hi}")
+    progress = max(1, progress)
+    n_steps = ((block_hi - block_lo) // progress) + 1
+    return [
+        IndexRange(block_lo, min(block_lo + step * progress - 1, block_hi))
+        for step in range(1, n_steps + 1)
+    ]
+
+
+def step_filter(
+    section_id: str,
+    block_range: IndexRange,
+    window_range: Optional[IndexRange] = None,
+) -> ScriptFilter:
+    """The `ScriptFilter` a single step builds with."""
+    sf = ScriptFilter()
+    sf.add(ScriptTarget(
+        section_id=section_id,
+        block_range=block_range,
+        window_range=window_range,
+    ))
+    return sf
+
+
+class StepBuilder:
+    """Build successive block ranges of one script section from a shared base.
+
+    Each `build_step()` produces the same bytes as
+    `build(spec, ..., script_filter=step_filter(...))` would, but only the
+    first call pays for the source ROM read, cache-key hashing, the sections
+    declared before the stepped one, and the script encode.
+
+    Every step must target the same section ID (the split point is chosen
+    from it). `cache` follows `build()` semantics with an active script
+    filter: script sections bypass it, everything else replays or fills it.
+    """
+
+    def __init__(
+        self,
+        spec: BuildSpec,
+        *,
+        section: Section,
+        source_root: Path,
+        original_rom: Optional[Path] = None,
+        cache: Optional[BuildCache] = None,
+        only: Optional[set[str]] = None,
+        skip: Optional[set[str]] = None,
+        parallel: Optional[int] = None,
+        reporter: Optional[Reporter] = None,
+    ) -> None:
+        self.spec = spec
+        self.section = section
+        self.section_id = step_section_id(section)
+        self.source_root = Path(source_root)
+        self.original_rom = original_rom
+        self.cache = cache
+        self.only = only
+        self.skip = skip
+        self.parallel = parallel
+        self.reporter = reporter
+        self._session: Optional[_BuildSession] = None
+        self._base: Optional[_SessionSnapshot] = None
+        self._split = self._split_index()
+
+    def _split_index(self) -> int:
+        """Index of the first script section the step filter can affect.
+
+        Usually the stepped section itself; an earlier script section that
+        answers to the same ID would also be re-masked by every step, so the
+        prefix must stop before it.
+        """
+        sid = self.section_id.lower()
+        for i, s in enumerate(self.spec.sections):
+            if s.kind in _SCRIPT_KINDS and sid in section_ids_for_filter(s):
+                return i
+        for i, s in enumerate(self.spec.sections):
+            if s is self.section:
+                return i
+        raise ValueError(
+            f"section {self.section.source!r} is not part of the spec"
+        )
+
+    def filter_for(
+        self, block_range: IndexRange,
+        window_range: Optional[IndexRange] = None,
+    ) -> ScriptFilter:
+        return step_filter(self.section_id, block_range, window_range)
+
+    def _start(self, script_filter: ScriptFilter) -> _BuildSession:
+        session = _BuildSession(
+            self.spec, source_root=self.source_root,
+            original_rom=self.original_rom, cache=self.cache,
+            only=self.only, skip=self.skip, parallel=self.parallel,
+            reporter=self.reporter, script_filter=script_filter,
+        )
+        session.announce()
+        session.run(0, self._split)
+        target = self.spec.sections[self._split]
+        if session.section_is_kept(target):
+            view = session.resume_view
+            try:
+                session.prepared[self._split] = script_prepare(
+                    view if view is not None else bytes(session.rom),
+                    target, session.files_root,
+                )
+            except Exception:  # noqa: BLE001
+                # Leave the section on the regular gather path so the error
+                # surfaces from the step build with its reporter events.
+                pass
+        self._base = session.snapshot()
+        self._session = session
+        return session
+
+    def build_step(
+        self, script_filter: ScriptFilter, out_path: Path,
+        *, delta: Optional[str] = None,
+    ) -> BuildResult:
+        """Build one step (the section narrowed by `script_filter`) and
+        write it to `out_path` — the ROM, or with `delta="ips"` an IPS
+        patch against the source ROM."""
+        t0 = perf_counter()
+        session = self._session
+        if session is None:
+            session = self._start(script_filter)
+        else:
+            session.restore(self._base)
+            session.script_filter = script_filter
+            session.announce()
+        session.run(self._split, len(self.spec.sections))
+        return session.finish(out_path, t0=t0, delta=delta)
+
+    def build_batch(
+        self,
+        steps: Sequence[tuple[ScriptFilter, Path]],
+        *,
+        jobs: Optional[int] = None,
+        delta: Optional[str] = None,
+    ) -> Iterator[BuildResult]:
+        """Build every `(script_filter, out_path)` step; yield results in
+        step order.
+
+        The first step runs in-process (it builds the shared prefix and
+        fills the cache). With `jobs` > 1 (`0` = `os.cpu_count()`), the
+        remaining steps fan out to a process pool: the post-prefix base rom
+        — plus the source ROM when `delta="ips"` — is placed in one
+        `SharedMemory` block every worker restores from, and each worker
+        writes its own outputs. `jobs=None` / `1` builds serially. Workers
+        run without a reporter and don't write to the build cache.
+        """
+        steps = list(steps)
+        if not steps:
+            return
+        first_filter, first_out = steps[0]
+        yield self.build_step(first_filter, first_out, delta=delta)
+        rest = steps[1:]
+        if not rest:
+            return
+        workers = _resolve_workers(jobs, len(rest))
+        if workers <= 1:
+            for sf, out in rest:
+                yield self.build_step(sf, out, delta=delta)
+            return
+        yield from self._run_pool(rest, workers=workers, delta=delta)
+
+    def _run_pool(
+        self,
+        steps: list[tuple[ScriptFilter, Path]],
+        *,
+        workers: int,
+        delta: Optional[str],
+    ) -> Iterator[BuildResult]:
+        session = self._session
+        base = self._base
+        assert session is not None and base is not None
+        original = b""
+        if delta is not None and session.original_rom is not None:
+            if session.original_bytes is None:
+                session.original_bytes = session.original_rom.read_bytes()
+            original = session.original_bytes
+        shm = SharedMemory(create=True, size=max(1, len(base.rom) + len(original)))
+        try:
+            shm.buf[:len(base.rom)] = base.rom
+            shm.buf[len(base.rom):len(base.rom) + len(original)] = original
+            payload = pickle.dumps((session, replace(base, rom=b""), self._split))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_batch_worker_init,
+                initargs=(payload, shm.name, len(base.rom), len(original)),
+            ) as pool:
+                futures = [
+                    pool.submit(_batch_worker_step, sf, Path(out), delta)
+                    for sf, out in steps
+                ]
+                for fut in futures:
+                    yield fut.result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _resolve_workers(jobs: Optional[int], n_tasks: int) -> int:
+    """Step-batch process count: `None` → 1 (serial), `0` → cpu count,
+    otherwise `jobs`; never more than there are steps."""
+    if jobs is None:
+        return 1
+    n = (os.cpu_count() or 1) if jobs == 0 else max(1, jobs)
+    return min(n, n_tasks)
+
+
+# ---- batch worker processes -------------------------------------------------
+
+# Per-process state installed by `_batch_worker_init`: the unpickled session,
+# the prefix snapshot (its rom a view into shared memory), the split index and
+# the SharedMemory handle keeping that view alive.
+_WORKER: dict = {}
+
+
+def _batch_worker_init(
+    payload: bytes, shm_name: str, rom_len: int, original_len: int,
+) -> None:
+    session, base, split = pickle.loads(payload)
+    shm = SharedMemory(name=shm_name)
+    view = shm.buf
+    base.rom = view[:rom_len]
+    if original_len:
+        session.original_bytes = view[rom_len:rom_len + original_len]
+    session.max_workers = 1   # the pool already owns every core
+    session.fill_cache = False
+    _WORKER.update(session=session, base=base, split=split, shm=shm)
+
+
+def _batch_worker_step(
+    script_filter: ScriptFilter, out_path: Path, delta: Optional[str],
+) -> BuildResult:
+    t0 = perf_counter()
+    session = _WORKER["session"]
+    session.restore(_WORKER["base"])
+    session.script_filter = script_filter
+    session.run(_WORKER["split"], len(session.spec.sections))
+    return session.finish(out_path, t0=t0, delta=delta)
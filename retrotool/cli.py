@@ -11,6 +11,7 @@ Subcommands:
                            [--only NAMES] [--skip NAMES]
                            [--script-step | --script-step-batch]
                            [--script-step-progress N]
+                           [--script-step-jobs N] [--script-step-ips]
                            [-j N] [--progress|--no-progress] [-D NAME=VALUE]
     retrotool extract <path> [--lang CODE | --dest DIR] [--only/--skip ...]
     retrotool migrate <path> [--in-place]
@@ -175,6 +176,15 @@ def _run_script_step(args: argparse.Namespace) -> int:
 
     progress_per_step = max(1, args.script_step_progress or 1)
 
+    if not args.script_step_batch and (
+        args.script_step_jobs is not None or args.script_step_ips
+    ):
+        sys.stderr.write(
+            "error: --script-step-jobs / --script-step-ips require "
+            "--script-step-batch\n"
+        )
+        return 2
+
     if args.no_progress:
         reporter = None
     else:
@@ -196,7 +206,8 @@ def _run_script_step(args: argparse.Namespace) -> int:
     )
     print(
         "mode: " + (
-            "batch (one ROM per step)"
+            ("batch (one IPS patch per step)" if args.script_step_ips
+             else "batch (one ROM per step)")
             if args.script_step_batch
             else "interactive (Enter=advance, q=quit, j N=jump to step N)"
         )
@@ -217,6 +228,8 @@ def _run_script_step(args: argparse.Namespace) -> int:
         parallel=resolved_jobs,
         reporter=reporter,
         output_namer=namer,
+        jobs=args.script_step_jobs,
+        delta="ips" if args.script_step_ips else None,
     )
     if args.script_step_batch:
         with reporter or _NullCm():
@@ -358,6 +371,15 @@ def _build_parser() -> argparse.ArgumentParser:
     bb.add_argument("--script-step-progress", type=int, default=1,
                     metavar="N",
                     help="block-count increment per step (default 1).")
+    bb.add_argument("--script-step-jobs", type=int, default=None,
+                    metavar="N",
+                    help="--script-step-batch only: build steps in N "
+                         "worker processes sharing the post-prefix base "
+                         "ROM (0 = os.cpu_count()). Default: serial.")
+    bb.add_argument("--script-step-ips", action="store_true",
+                    help="--script-step-batch only: write "
+                         "<stem>.stepNNN.sfc.ips patches against the source "
+                         "ROM instead of full ROMs.")
     bb.add_argument("-j", "--jobs", type=int, default=None,
                     help="gather-phase worker thread count. Default: 1 "
                          "(serial) — overridable via [rom.build].jobs in "
@@ -1,5 +1,13 @@
 """retrotool.debugger — Mesen2-Diz IPC integration."""
-from retrotool.debugger.automation import paused, run_until_breakpoint, snapshot_registers
+from retrotool.debugger.async_client import PAUSE_EVENTS, AsyncMesenClient
+from retrotool.debugger.automation import (
+    paused,
+    paused_async,
+    run_until_breakpoint,
+    run_until_breakpoint_async,
+    snapshot_registers,
+    snapshot_registers_async,
+)
 from retrotool.debugger.breakpoints import (
     Breakpoint,
     BreakpointError,
@@ -10,25 +18,66 @@ from retrotool.debugger.breakpoints import (
 )
 from retrotool.debugger.client import (
     DEFAULT_PIPE_NAME,
+    DEFAULT_WINDOW,
+    IpcBatch,
     IpcError,
+    IpcPending,
+    MEMORY_ENCODINGS,
     IpcResponse,
     MesenClient,
     derive_pipe_name,
 )
-from retrotool.debugger.memory_watch import MemoryRegion, diff_bytes, watch
+from retrotool.debugger.memory_watch import (
+    DiffRun,
+    MemoryRegion,
+    SnapshotRing,
+    diff_bytes,
+    diff_runs,
+    watch,
+    watch_async,
+    watch_runs,
+)
+from retrotool.debugger.trace import (
+    TRACE_CODECS,
+    TraceFormatError,
+    TraceReader,
+    TraceRegion,
+    TraceWriter,
+    record_trace,
+)
 
 __all__ = [
     "MesenClient",
+    "AsyncMesenClient",
+    "PAUSE_EVENTS",
     "IpcError",
     "IpcResponse",
+    "IpcBatch",
+    "IpcPending",
+    "DEFAULT_WINDOW",
+    "MEMORY_ENCODINGS",
     "DEFAULT_PIPE_NAME",
     "derive_pipe_name",
     "MemoryRegion",
     "diff_bytes",
+    "diff_runs",
+    "DiffRun",
+    "SnapshotRing",
     "watch",
+    "watch_async",
+    "watch_runs",
+    "TRACE_CODECS",
+    "TraceFormatError",
+    "TraceReader",
+    "TraceRegion",
+    "TraceWriter",
+    "record_trace",
     "paused",
+    "paused_async",
     "run_until_breakpoint",
+    "run_until_breakpoint_async",
     "snapshot_registers",
+    "snapshot_registers_async",
     "Breakpoint",
     "BreakpointError",
     "make_mesen_breakpoints",
@@ -0,0 +1,274 @@
+"""asyncio Mesen2-Diz IPC client: awaitable requests, many in flight at once.
+
+`AsyncMesenClient` speaks the same newline-JSON protocol as `MesenClient`
+over asyncio streams. One reader task owns the socket's read side and
+resolves each request's future as its response arrives, so any number of
+tasks can `await` commands concurrently (watch loops, screenshot capture,
+state dumps) without blocking each other or spinning a core.
+
+Responses are matched in request order, or by `requestId` when the client
+tags requests (`request_ids=True`) and the server echoes the tag. A line
+carrying an `"event"` key instead of `"success"` is an unsolicited
+notification (breakpoint hit, pause, ...) and is fanned out to `subscribe`
+queues. `wait_until_paused` wakes on such an event when the server sends
+one, and otherwise falls back to exponential-backoff `getStatus` polling.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import platform
+from collections import deque
+from typing import Any, Iterable, Optional
+
+from retrotool.debugger import client as _client
+from retrotool.debugger.client import (
+    DEFAULT_PIPE_NAME,
+    IpcError,
+    IpcResponse,
+    _check_encoding,
+    _response,
+    memory_bytes,
+    read_params,
+    write_params,
+)
+
+# Stream line limit. `readMemory` of a whole WRAM bank is ~0.5 MB of JSON.
+_LINE_LIMIT = 1 << 26
+
+# Events that mean "the emulator has stopped"; `wait_until_paused` wakes on them.
+PAUSE_EVENTS = frozenset({"paused", "breakpointHit", "break"})
+
+
+class AsyncMesenClient:
+    """Newline-JSON client on asyncio streams. Use as `async with`."""
+
+    def __init__(self, pipe_name: str = DEFAULT_PIPE_NAME, timeout: float = 5.0,
+                 *, request_ids: bool = False, memory_encoding: str = "list"):
+        self.pipe_name = pipe_name
+        self.timeout = timeout
+        self.request_ids = request_ids
+        self.memory_encoding = _check_encoding(memory_encoding)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._order: deque[asyncio.Future] = deque()
+        self._by_id: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._subscribers: list[tuple[Optional[frozenset], asyncio.Queue]] = []
+        self._closed_error: Optional[IpcError] = None
+
+    # --- connection ------------------------------------------------------
+    async def connect(self) -> None:
+        if self._writer is not None:
+            return
+        if platform.system() == "Windows":
+            raise IpcError("Windows named-pipe transport not bundled; install pywin32 shim")
+        path = _client._pipe_path(self.pipe_name)
+        if not os.path.exists(path):
+            raise IpcError(f"Mesen pipe not found: {path} (is the emulator running?)")
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(path, limit=_LINE_LIMIT), self.timeout
+        )
+        self._closed_error = None
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def close(self) -> None:
+        writer, task = self._writer, self._reader_task
+        self._writer = self._reader = None
+        self._reader_task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        self._fail_pending(IpcError("client closed"))
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    # --- reader ----------------------------------------------------------
+    async def _read_loop(self) -> None:
+        assert self._reader is not None
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                doc = json.loads(line)
+                if "event" in doc and "success" not in doc:
+                    self._publish(doc)
+                    continue
+                fut = self._by_id.pop(doc.get("requestId"), None) if self._by_id else None
+                if fut is None:
+                    # Untagged response: the oldest request still waiting.
+                    while self._order and self._order[0].done():
+                        self._order.popleft()
+                    if not self._order:
+                        continue
+                    fut = self._order.popleft()
+                if not fut.done():
+                    fut.set_result(_response(doc))
+        except (OSError, ValueError) as exc:
+            self._fail_pending(IpcError(f"Pipe read failed: {exc}"))
+            return
+        self._fail_pending(IpcError("Pipe closed unexpectedly"))
+
+    def _fail_pending(self, error: IpcError) -> None:
+        self._closed_error = error
+        for fut in list(self._order) + list(self._by_id.values()):
+            if not fut.done():
+                fut.set_exception(error)
+        self._order.clear()
+        self._by_id.clear()
+        for _, queue in self._subscribers:
+            queue.put_nowait(None)
+
+    def _publish(self, doc: dict) -> None:
+        name = doc.get("event")
+        for names, queue in self._subscribers:
+            if names is None or name in names:
+                queue.put_nowait(doc)
+
+    # --- request/response -----------------------------------------------
+    def _send(self, command: str, params: dict) -> asyncio.Future:
+        if self._writer is None:
+            raise IpcError("not connected")
+        if self._closed_error is not None:
+            raise self._closed_error
+        payload = {"command": command, **params}
+        fut = asyncio.get_running_loop().create_future()
+        if self.request_ids:
+            payload["requestId"] = self._next_id
+            self._by_id[self._next_id] = fut
+            self._next_id += 1
+        self._order.append(fut)
+        self._writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+        return fut
+
+    async def request(self, command: str, **params: Any) -> IpcResponse:
+        if self._writer is None:
+            await self.connect()
+        fut = self._send(command, params)
+        assert self._writer is not None
+        await self._writer.drain()
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            raise IpcError(f"{command}: no response within {self.timeout}s") from None
+
+    async def call(self, command: str, **params: Any) -> dict:
+        """Like request, but raises on failure + returns data directly."""
+        return (await self.request(command, **params)).result(command)
+
+    async def pipeline(self, requests: Iterable[tuple[str, dict]]) -> list[IpcResponse]:
+        """Write every request, then await all responses (in request order)."""
+        if self._writer is None:
+            await self.connect()
+        futs = [self._send(command, params) for command, params in requests]
+        assert self._writer is not None
+        await self._writer.drain()
+        try:
+            return list(await asyncio.wait_for(
+                asyncio.gather(*(asyncio.shield(f) for f in futs)), self.timeout
+            ))
+        except asyncio.TimeoutError:
+            raise IpcError(f"pipeline: no response within {self.timeout}s") from None
+
+    # --- events ----------------------------------------------------------
+    def subscribe(self, *events: str) -> asyncio.Queue:
+        """A queue receiving every pushed event doc named in `events` (all
+        events if none given). `None` is queued when the connection ends."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append((frozenset(events) if events else None, queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers = [s for s in self._subscribers if s[1] is not queue]
+
+    async def wait_until_paused(self, *, timeout: Optional[float] = None,
+                                min_interval: float = 0.001,
+                                max_interval: float = 0.1) -> Optional[dict]:
+        """Wait for the emulator to pause → final `getStatus` data, or `None`
+        after `timeout` seconds. Polls with exponential backoff between
+        `min_interval` and `max_interval`; a pause event cuts the wait short."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        events = self.subscribe(*PAUSE_EVENTS)
+        delay = min_interval
+        try:
+            while True:
+                status = await self.get_status()
+                if status.get("paused"):
+                    return status
+                wait = delay
+                if deadline is not None:
+                    left = deadline - loop.time()
+                    if left <= 0:
+                        return None
+                    wait = min(wait, left)
+                try:
+                    if await asyncio.wait_for(events.get(), wait) is None:
+                        raise self._closed_error or IpcError("Pipe closed unexpectedly")
+                except asyncio.TimeoutError:
+                    delay = min(delay * 2, max_interval)
+        finally:
+            self.unsubscribe(events)
+
+    # --- convenience wrappers -------------------------------------------
+    async def read_memory(self, memory_type: str, address: int, length: int) -> bytes:
+        return memory_bytes(await self.call(
+            "readMemory", **read_params(memory_type, address, length, self.memory_encoding)
+        ))
+
+    async def write_memory(self, memory_type: str, address: int, payload: bytes) -> None:
+        await self.call("writeMemory",
+                        **write_params(memory_type, address, payload, self.memory_encoding))
+
+    async def get_cpu_state(self) -> dict:
+        return await self.call("getCpuState")
+
+    async def set_cpu_state(self, **state) -> None:
+        await self.call("setCpuState", **state)
+
+    async def pause(self) -> None:
+        await self.call("pause")
+
+    async def resume(self) -> None:
+        await self.call("resume")
+
+    async def step(self, count: int = 1) -> None:
+        await self.call("step", count=count)
+
+    async def add_breakpoint(self, address: int, memory_type: str = "SnesMemory",
+                             break_on: str = "exec") -> int:
+        data = await self.call("addBreakpoint", address=address, memoryType=memory_type,
+                               type=break_on)
+        return int(data.get("id", -1))
+
+    async def remove_breakpoint(self, bp_id: int) -> None:
+        await self.call("removeBreakpoint", id=bp_id)
+
+    async def evaluate(self, expr: str) -> Any:
+        return (await self.call("evaluate", expression=expr)).get("value")
+
+    async def take_screenshot(self, path: str) -> None:
+        await self.call("takeScreenshot", path=path)
+
+    async def get_rom_info(self) -> dict:
+        return await self.call("getRomInfo")
+
+    async def get_status(self) -> dict:
+        return await self.call("getStatus")
@@ -1,9 +1,11 @@
 """High-level automation patterns over IPC."""
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Iterator
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
 
+from retrotool.debugger.async_client import AsyncMesenClient
 from retrotool.debugger.client import MesenClient
 
 
@@ -22,8 +24,18 @@ def paused(client: MesenClient) -> Iterator[None]:
 
 
 def run_until_breakpoint(client: MesenClient, bp_addr: int, memory_type: str = "SnesPrgRom",
-                         timeout_steps: int = 10_000_000) -> bool:
-    """Add a one-shot breakpoint, resume, poll until hit or timeout."""
+                         timeout_steps: int = 10_000_000, *,
+                         timeout: Optional[float] = 60.0,
+                         min_interval: float = 0.001,
+                         max_interval: float = 0.1) -> bool:
+    """Add a one-shot breakpoint, resume, poll until hit or timeout.
+
+    Polls `getStatus` at most `timeout_steps` times, sleeping between polls
+    with exponential backoff from `min_interval` to `max_interval` seconds,
+    and gives up after `timeout` seconds of wall-clock time (`None` = no
+    limit)."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = min_interval
     bp_id = client.add_breakpoint(bp_addr, memory_type, "exec")
     try:
         client.resume()
@@ -33,6 +45,14 @@ def run_until_breakpoint(client: MesenClient, bp_addr: int, memory_type: str = "
                 pc = client.get_cpu_state().get("pc")
                 if pc == bp_addr:
                     return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+            else:
+                time.sleep(delay)
+            delay = min(delay * 2, max_interval)
         return False
     finally:
         client.remove_breakpoint(bp_id)
@@ -41,3 +61,38 @@ def run_until_breakpoint(client: MesenClient, bp_addr: int, memory_type: str = "
 def snapshot_registers(client: MesenClient) -> dict:
     with paused(client):
         return client.get_cpu_state()
+
+
+@asynccontextmanager
+async def paused_async(client: AsyncMesenClient) -> AsyncIterator[None]:
+    """`paused` for an `AsyncMesenClient`."""
+    status = await client.get_status()
+    was_paused = bool(status.get("paused"))
+    if not was_paused:
+        await client.pause()
+    try:
+        yield
+    finally:
+        if not was_paused:
+            await client.resume()
+
+
+async def run_until_breakpoint_async(client: AsyncMesenClient, bp_addr: int,
+                                     memory_type: str = "SnesPrgRom",
+                                     timeout: Optional[float] = 60.0) -> bool:
+    """Add a one-shot breakpoint, resume, and wait (pause event or backoff
+    polling — no busy loop) until the emulator stops. True if it stopped at
+    `bp_addr`; False if it stopped elsewhere or `timeout` seconds passed."""
+    bp_id = await client.add_breakpoint(bp_addr, memory_type, "exec")
+    try:
+        await client.resume()
+        if await client.wait_until_paused(timeout=timeout) is None:
+            return False
+        return (await client.get_cpu_state()).get("pc") == bp_addr
+    finally:
+        await client.remove_breakpoint(bp_id)
+
+
+async def snapshot_registers_async(client: AsyncMesenClient) -> dict:
+    async with paused_async(client):
+        return await client.get_cpu_state()
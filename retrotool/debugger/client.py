@@ -1,16 +1,38 @@
-"""Mesen2-Diz IPC client. Unix/Windows named pipe, newline-delimited JSON."""
+"""Mesen2-Diz IPC client. Unix/Windows named pipe, newline-delimited JSON.
+
+Besides one-at-a-time `request` / `call`, the client can pipeline: `pipeline`
+writes a window of request lines in one send and only then reads their
+responses, so N commands cost one round trip per window instead of N.
+Responses are matched in order, or by `requestId` when the client tags its
+requests (`request_ids=True`) and the server echoes the tag. `batch()` queues
+requests (or a whole `IpcPlan`) and sends them together on exit.
+
+Memory payloads travel as a JSON list of ints by default. With
+`memory_encoding="base64"` or `"hex"` the client asks for (and writes) a
+single string instead; responses are decoded whatever form they arrive in.
+"""
 from __future__ import annotations
 
+import base64
+import binascii
 import json
 import os
 import platform
 import re
 import socket
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 DEFAULT_PIPE_NAME = "Mesen2Diz_DebuggerIpc"
 
+# Requests in flight per `pipeline` window. Bounded so neither side's socket
+# buffer fills while the other is still writing.
+DEFAULT_WINDOW = 256
+
+# Wire forms of memory payloads: JSON int list, or one base64 / hex string.
+MEMORY_ENCODINGS = ("list", "base64", "hex")
+
 
 class IpcError(RuntimeError):
     pass
@@ -34,15 +56,134 @@ class IpcResponse:
     data: Optional[dict] = None
     error: Optional[str] = None
 
+    def result(self, command: str) -> dict:
+        """`data`, or `IpcError` naming `command` if the request failed."""
+        if not self.success:
+            raise IpcError(f"{command}: {self.error}")
+        return self.data or {}
+
+
+def _check_encoding(encoding: str) -> str:
+    if encoding not in MEMORY_ENCODINGS:
+        raise ValueError(f"unknown memory encoding {encoding!r} (expected one of {MEMORY_ENCODINGS})")
+    return encoding
+
+
+def read_params(memory_type: str, address: int, length: int, encoding: str = "list") -> dict:
+    """`readMemory` parameters, asking for `encoding` unless it is the default."""
+    params = {"memoryType": memory_type, "address": address, "length": length}
+    if encoding != "list":
+        params["encoding"] = encoding
+    return params
+
+
+def write_params(memory_type: str, address: int, payload: bytes, encoding: str = "list") -> dict:
+    """`writeMemory` parameters with `payload` in `encoding`."""
+    params = {"memoryType": memory_type, "address": address}
+    if encoding == "base64":
+        params["bytes"] = base64.b64encode(payload).decode("ascii")
+        params["encoding"] = encoding
+    elif encoding == "hex":
+        params["bytes"] = bytes(payload).hex()
+        params["encoding"] = encoding
+    else:
+        params["bytes"] = list(payload)
+    return params
+
+
+def memory_bytes(data: dict) -> bytes:
+    """The payload of a `readMemory` response: a `bytes` int list, a
+    `base64` / `hex` string, or a `bytes` string tagged by `encoding`."""
+    raw = data.get("bytes")
+    encoding = data.get("encoding")
+    if raw is None:
+        for key in ("base64", "hex"):
+            if key in data:
+                raw, encoding = data[key], key
+                break
+        else:
+            return b""
+    if not isinstance(raw, str):
+        return bytes(raw)
+    try:
+        if encoding == "hex":
+            return bytes.fromhex(raw)
+        return base64.b64decode(raw, validate=True)
+    except (ValueError, binascii.Error) as exc:
+        raise IpcError(f"readMemory: bad {encoding or 'base64'} payload: {exc}") from None
+
+
+def _response(doc: dict) -> IpcResponse:
+    return IpcResponse(
+        success=bool(doc.get("success")),
+        data=doc.get("data"),
+        error=doc.get("error"),
+    )
+
+
+class IpcPending:
+    """A request queued in an `IpcBatch`; `response` is filled when the batch
+    is sent."""
+
+    __slots__ = ("command", "params", "response")
+
+    def __init__(self, command: str, params: dict) -> None:
+        self.command = command
+        self.params = params
+        self.response: Optional[IpcResponse] = None
+
+    def result(self) -> dict:
+        """The response data, raising `IpcError` like `MesenClient.call`."""
+        if self.response is None:
+            raise IpcError(f"{self.command}: batch not sent yet")
+        return self.response.result(self.command)
+
+
+class IpcBatch:
+    """Requests queued for one pipelined send (see `MesenClient.batch`)."""
+
+    def __init__(self, client: "MesenClient", window: int = DEFAULT_WINDOW) -> None:
+        self.client = client
+        self.window = window
+        self.pending: list[IpcPending] = []
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def request(self, command: str, **params: Any) -> IpcPending:
+        p = IpcPending(command, params)
+        self.pending.append(p)
+        return p
+
+    def add_plan(self, plan) -> list[IpcPending]:
+        """Queue every step of an `IpcPlan` (anything with `.steps` of
+        `.command` / `.params`)."""
+        return [self.request(step.command, **step.params) for step in plan.steps]
+
+    def flush(self) -> list[IpcResponse]:
+        """Send everything queued so far; returns the responses in order."""
+        queued, self.pending = self.pending, []
+        responses = self.client.pipeline(
+            ((p.command, p.params) for p in queued), window=self.window
+        )
+        for p, r in zip(queued, responses):
+            p.response = r
+        return responses
+
 
 class MesenClient:
-    """Minimal newline-JSON client. Reconnect-safe, synchronous request/response."""
+    """Minimal newline-JSON client. Reconnect-safe, synchronous request/response,
+    with pipelined `pipeline` / `batch` for bulk traffic."""
 
-    def __init__(self, pipe_name: str = DEFAULT_PIPE_NAME, timeout: float = 5.0):
+    def __init__(self, pipe_name: str = DEFAULT_PIPE_NAME, timeout: float = 5.0,
+                 *, request_ids: bool = False, memory_encoding: str = "list"):
         self.pipe_name = pipe_name
         self.timeout = timeout
+        self.request_ids = request_ids
+        self.memory_encoding = _check_encoding(memory_encoding)
         self._sock: Optional[socket.socket] = None
         self._buf = bytearray()
+        self._next_id = 0
 
     # --- connection ------------------------------------------------------
     def connect(self) -> None:
@@ -78,26 +219,72 @@ class MesenClient:
 
     # --- request/response -----------------------------------------------
     def request(self, command: str, **params: Any) -> IpcResponse:
+        return self.pipeline([(command, params)])[0]
+
+    def _encode(self, command: str, params: dict) -> tuple[bytes, Optional[int]]:
+        payload = {"command": command, **params}
+        rid = None
+        if self.request_ids:
+            rid = payload["requestId"] = self._next_id
+            self._next_id += 1
+        return (json.dumps(payload) + "\n").encode("utf-8"), rid
+
+    def pipeline(self, requests: Iterable[tuple[str, dict]], *,
+                 window: int = DEFAULT_WINDOW) -> list[IpcResponse]:
+        """Send `(command, params)` requests `window` at a time, writing each
+        window before reading any of its responses. Returns responses in
+        request order."""
+        if window < 1:
+            raise ValueError(f"pipeline window must be >= 1, got {window}")
         if self._sock is None:
             self.connect()
-        payload = {"command": command, **params}
-        line = (json.dumps(payload) + "\n").encode("utf-8")
         assert self._sock is not None
-        self._sock.sendall(line)
-        raw = self._read_line()
-        doc = json.loads(raw)
-        return IpcResponse(
-            success=bool(doc.get("success")),
-            data=doc.get("data"),
-            error=doc.get("error"),
-        )
+        out: list[IpcResponse] = []
+        chunk: list[tuple[bytes, Optional[int]]] = []
+        for command, params in requests:
+            chunk.append(self._encode(command, params))
+            if len(chunk) == window:
+                out.extend(self._exchange(chunk))
+                chunk = []
+        if chunk:
+            out.extend(self._exchange(chunk))
+        return out
+
+    def _exchange(self, chunk: list[tuple[bytes, Optional[int]]]) -> list[IpcResponse]:
+        assert self._sock is not None
+        self._sock.sendall(b"".join(line for line, _ in chunk))
+        slots: list[Optional[IpcResponse]] = [None] * len(chunk)
+        by_id = {rid: i for i, (_, rid) in enumerate(chunk) if rid is not None}
+        oldest = 0
+        for _ in chunk:
+            doc = json.loads(self._read_line())
+            i = by_id.pop(doc.get("requestId"), None)
+            if i is None:
+                # Untagged (or unknown) response: the oldest unanswered request.
+                while slots[oldest] is not None:
+                    oldest += 1
+                i = oldest
+                by_id.pop(chunk[i][1], None)
+            slots[i] = _response(doc)
+        return slots  # type: ignore[return-value]
+
+    @contextmanager
+    def batch(self, window: int = DEFAULT_WINDOW) -> Iterator[IpcBatch]:
+        """Queue requests in the block, send them pipelined on exit. Results are
+        on each `IpcPending` afterwards. Nothing is sent if the block raises."""
+        b = IpcBatch(self, window)
+        yield b
+        b.flush()
+
+    def run_plan(self, plan, window: int = DEFAULT_WINDOW) -> list[IpcResponse]:
+        """Send every step of an `IpcPlan` pipelined; responses in step order."""
+        b = IpcBatch(self, window)
+        b.add_plan(plan)
+        return b.flush()
 
     def call(self, command: str, **params: Any) -> dict:
         """Like request, but raises on failure + returns data directly."""
-        r = self.request(command, **params)
-        if not r.success:
-            raise IpcError(f"{command}: {r.error}")
-        return r.data or {}
+        return self.request(command, **params).result(command)
 
     def _read_line(self) -> str:
         assert self._sock is not None
@@ -113,11 +300,12 @@ class MesenClient:
 
     # --- convenience wrappers -------------------------------------------
     def read_memory(self, memory_type: str, address: int, length: int) -> bytes:
-        data = self.call("readMemory", memoryType=memory_type, address=address, length=length)
-        return bytes(data.get("bytes", []))
+        return memory_bytes(self.call(
+            "readMemory", **read_params(memory_type, address, length, self.memory_encoding)
+        ))
 
     def write_memory(self, memory_type: str, address: int, payload: bytes) -> None:
-        self.call("writeMemory", memoryType=memory_type, address=address, bytes=list(payload))
+        self.call("writeMemory", **write_params(memory_type, address, payload, self.memory_encoding))
 
     def get_cpu_state(self) -> dict:
         return self.call("getCpuState")
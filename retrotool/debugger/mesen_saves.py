@@ -6,22 +6,31 @@ output ROM's SRM lets the emulator start the new build at the same save
 state — no manual copy step, no fresh-game reset for every rebuild.
 
 When `archive=True`, an existing destination SRM that differs from the
-source is packed into a timestamped `.tar.gz` beside the live SRM before
+source is stored in a content-addressed archive beside the live SRM before
 being overwritten — iterative testing stays safe from accidental loss of
 playtest state.
 
+The archive (`<stem>_archive/`) keeps one gzip object per distinct save under
+`objects/<aa>/<sha256>.srm.gz` plus an append-only `index.tsv` naming each
+entry `<YYYY-MM-DD>/<stem>_<HHMMSS>.srm`. Dedupe is one existence check on
+the object path and adding a save appends one index line, then writes one
+object, so sync cost does not grow with the archive. A legacy `<stem>_archive.tar.gz`
+is imported the first time the new archive is created.
+
 Defaults target the Linux user config path. Windows/macOS paths can be
 passed explicitly via `saves_dir`.
 """
 from __future__ import annotations
 
-import io
+import gzip
+import hashlib
+import os
 import shutil
 import tarfile
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 
 _DEFAULT_LINUX = Path.home() / ".config" / "Mesen2" / "Saves"
@@ -36,9 +45,9 @@ class SramSyncResult:
     """Outcome of a `sync_sram` call.
 
     - `copied` — destination SRM path, or None if source was absent.
-    - `archived` — path of the tar.gz snapshot taken before overwrite,
-      or None if no archive was created (dest missing, identical to
-      source, or archiving disabled).
+    - `archived` — the `SramArchive` directory the old destination was
+      stored in, or None if nothing was archived (dest missing, identical
+      to source or already archived, or archiving disabled).
     """
     copied: Optional[Path] = None
     archived: Optional[Path] = None
@@ -56,64 +65,133 @@ def resolve_saves_dir(override: Optional[str]) -> Path:
     return Path(override).expanduser()
 
 
-def _archive_srm(srm_path: Path, *, now: Optional[float] = None) -> Optional[Path]:
-    """Append `srm_path` to `<stem>_archive.tar.gz` beside it.
+_INDEX_NAME = "index.tsv"
+# How much of the index tail is checked for same-second name collisions.
+_INDEX_TAIL = 64 * 1024
+
+
+@dataclass(frozen=True)
+class SramEntry:
+    """One archived save: its entry name, content hash, size and mtime."""
+    name: str
+    digest: str
+    size: int
+    mtime: int
+
+
+def _parse_index_line(line: str) -> Optional[SramEntry]:
+    parts = line.split("\t")
+    if len(parts) != 4:
+        return None
+    return SramEntry(parts[1], parts[0], int(parts[2]), int(parts[3]))
+
 
-    Single archive per ROM; entries laid out as
-    `<YYYY-MM-DD>/<stem>_<HHMMSS>.srm`. Existing archive entries are
-    preserved on rewrite (tar.gz is not append-friendly, so we round-trip
-    through memory).
+class SramArchive:
+    """Content-addressed SRM archive rooted at a directory.
+
+    Objects are `objects/<aa>/<sha256>.srm.gz`; `index.tsv` lines are
+    `digest<TAB>name<TAB>size<TAB>mtime`, appended in archive order.
+    """
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+        self.index_path = self.root / _INDEX_NAME
+
+    def _object(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.srm.gz"
+
+    def __contains__(self, data: bytes) -> bool:
+        return self._object(hashlib.sha256(data).hexdigest()).exists()
+
+    def _recent_entries(self) -> list[SramEntry]:
+        """Entries in the tail of the index (same-second collisions and
+        interrupted adds can only involve recent entries)."""
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - _INDEX_TAIL)
+            f.seek(start)
+            lines = f.read().decode("utf-8", "replace").splitlines()
+        if start:
+            lines = lines[1:]                  # first line may be cut short
+        return [e for e in map(_parse_index_line, lines) if e is not None]
+
+    def add(self, data: bytes, name: str, *, mtime: Optional[int] = None) -> Optional[SramEntry]:
+        """Store `data` as entry `name` → the new entry, or `None` when the
+        same bytes are already archived. A taken `name` gets `_1`, `_2`, ...
+        before its extension.
+
+        The index line is appended before the object is written, so an
+        existing object always has its entry. If an earlier add stopped
+        between the two, the object is written now and that entry returned.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        obj = self._object(digest)
+        if obj.exists():
+            return None
+        recent = self._recent_entries()
+        entry = next((e for e in recent if e.digest == digest), None)
+        if entry is None:
+            taken = {e.name for e in recent}
+            if name in taken:
+                stem, ext = os.path.splitext(name)
+                i = 1
+                while f"{stem}_{i}{ext}" in taken:
+                    i += 1
+                name = f"{stem}_{i}{ext}"
+            entry = SramEntry(name, digest, len(data),
+                              int(time.time() if mtime is None else mtime))
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(f"{entry.digest}\t{entry.name}\t{entry.size}\t{entry.mtime}\n")
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(data, mtime=0))
+        os.replace(tmp, obj)
+        return entry
+
+    def entries(self) -> list[SramEntry]:
+        """Every entry, oldest first."""
+        if not self.index_path.exists():
+            return []
+        lines = self.index_path.read_text(encoding="utf-8").splitlines()
+        return [e for e in map(_parse_index_line, lines) if e is not None]
+
+    def read(self, entry: Union[SramEntry, str]) -> bytes:
+        """The archived bytes of an entry (or of a digest)."""
+        digest = entry.digest if isinstance(entry, SramEntry) else entry
+        return gzip.decompress(self._object(digest).read_bytes())
+
+
+def _import_tar(archive: SramArchive, legacy: Path) -> None:
+    """Copy the entries of an old single-file `.tar.gz` archive in."""
+    with tarfile.open(legacy, "r:gz") as tf:
+        for m in tf.getmembers():
+            buf = tf.extractfile(m) if m.isfile() else None
+            if buf is not None:
+                archive.add(buf.read(), m.name, mtime=int(m.mtime))
+
+
+def _archive_srm(srm_path: Path, *, now: Optional[float] = None) -> Optional[Path]:
+    """Add `srm_path` to the `<stem>_archive/` content-addressed archive.
 
-    Returns the archive path when a new entry was added, or `None` when
-    `srm_path`'s bytes already appear in the archive — the same save
-    state need not be archived twice.
+    The entry is named `<YYYY-MM-DD>/<stem>_<HHMMSS>.srm`. Returns the
+    archive directory when a new entry was added, or `None` when
+    `srm_path`'s bytes are already archived — the same save state need not
+    be archived twice.
     """
     lt = time.localtime(now)
     date_dir = time.strftime("%Y-%m-%d", lt)
     ts = time.strftime("%H%M%S", lt)
-    archive = srm_path.parent / f"{srm_path.stem}_archive.tar.gz"
-    new_bytes = srm_path.read_bytes()
-
-    # Read existing entries into memory (info + payload). Skip entries
-    # that byte-match the incoming SRM — already archived, no add needed.
-    existing: list[tuple[tarfile.TarInfo, bytes]] = []
-    if archive.exists():
-        with tarfile.open(archive, "r:gz") as tf:
-            for m in tf.getmembers():
-                if not m.isfile():
-                    continue
-                buf = tf.extractfile(m)
-                data = buf.read() if buf is not None else b""
-                if data == new_bytes:
-                    return None
-                existing.append((m, data))
-
-    # Resolve the final entry name, avoiding collision with same-second
-    # rebuilds already in the archive.
-    existing_names = {info.name for info, _ in existing}
-    arcname = f"{date_dir}/{srm_path.stem}_{ts}.srm"
-    if arcname in existing_names:
-        i = 1
-        while f"{date_dir}/{srm_path.stem}_{ts}_{i}.srm" in existing_names:
-            i += 1
-        arcname = f"{date_dir}/{srm_path.stem}_{ts}_{i}.srm"
-
-    # Rewrite archive: existing entries preserved, new entry appended.
-    with tarfile.open(archive, "w:gz") as tf:
-        for info, data in existing:
-            new_info = tarfile.TarInfo(name=info.name)
-            new_info.size = len(data)
-            new_info.mtime = info.mtime
-            new_info.mode = info.mode
-            new_info.uid = info.uid
-            new_info.gid = info.gid
-            tf.addfile(new_info, io.BytesIO(data))
-        entry_info = tarfile.TarInfo(name=arcname)
-        entry_info.size = len(new_bytes)
-        entry_info.mtime = int(srm_path.stat().st_mtime)
-        entry_info.mode = 0o644
-        tf.addfile(entry_info, io.BytesIO(new_bytes))
-    return archive
+    root = srm_path.parent / f"{srm_path.stem}_archive"
+    archive = SramArchive(root)
+    legacy = srm_path.parent / f"{srm_path.stem}_archive.tar.gz"
+    if not archive.index_path.exists() and legacy.exists():
+        _import_tar(archive, legacy)
+    entry = archive.add(srm_path.read_bytes(), f"{date_dir}/{srm_path.stem}_{ts}.srm",
+                        mtime=int(srm_path.stat().st_mtime))
+    return root if entry is not None else None
 
 
 def sync_sram(
@@ -127,7 +205,7 @@ def sync_sram(
 
     If `archive=True` and the destination SRM already exists with content
     different from the source, the existing destination is packed into a
-    timestamped tar.gz in the same directory before being overwritten.
+    content-addressed archive in the same directory before being overwritten.
 
     Returns a `SramSyncResult` with `copied` / `archived` paths populated
     as applicable. `copied` is None when the source SRM does not exist
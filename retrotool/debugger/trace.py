@@ -0,0 +1,381 @@
+"""Frame-by-frame RAM traces, delta-compressed on disk.
+
+`record_trace` steps the emulator and captures a set of memory regions
+every `step_between` steps into a `.rtrace` file; `TraceReader` replays,
+searches and exports it while holding one frame in memory at a time.
+
+File layout (little-endian)::
+
+    "RTTRACE1" | u32 meta length | meta JSON (regions, codec, keyframe_every, ...)
+    frame chunks:  u32 size | i64 tick | u8 keyframe | <size> compressed bytes
+    index:         per frame  u64 chunk offset | i64 tick | u8 keyframe
+    footer:        u64 index offset | u32 frame count | "RTTRACE$"
+
+A frame is every region's bytes concatenated. Keyframes (every
+`keyframe_every` frames, and the first) store the frame itself; the others
+store it XORed with the previous frame — mostly zero bytes, which zlib (or
+LZ4, if installed) squeezes to a few hundred bytes even for 128 KiB of WRAM.
+Reading frame N decodes forward from the nearest keyframe at or before it.
+A file whose recording died before `close` has no index; the reader then
+rebuilds it by walking the chunk headers.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Sequence, Union
+
+from retrotool.debugger.client import MesenClient, memory_bytes
+from retrotool.debugger.memory_watch import MemoryRegion
+
+TRACE_MAGIC = b"RTTRACE1"
+_FOOTER_MAGIC = b"RTTRACE$"
+_CHUNK = struct.Struct("<IqB")
+_INDEX = struct.Struct("<QqB")
+_FOOTER = struct.Struct("<QI8s")
+
+TRACE_CODECS = ("zlib", "lz4")
+
+
+class TraceFormatError(ValueError):
+    """Not a trace file, or a damaged one."""
+
+
+def _lz4():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise ValueError("trace codec 'lz4' needs the lz4 package (pip install lz4)") from None
+    return lz4.frame
+
+
+def _compressor(codec: str, level: int):
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, level)
+    if codec == "lz4":
+        return _lz4().compress
+    raise ValueError(f"unknown trace codec {codec!r} (expected one of {TRACE_CODECS})")
+
+
+def _decompressor(codec: str):
+    if codec == "zlib":
+        return zlib.decompress
+    if codec == "lz4":
+        return _lz4().decompress
+    raise TraceFormatError(f"unknown trace codec {codec!r}")
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    n = len(a)
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(n, "little")
+
+
+@dataclass(frozen=True)
+class TraceRegion:
+    """A named memory region captured in every frame."""
+    name: str
+    memory_type: str
+    address: int
+    length: int
+
+    def as_memory_region(self) -> MemoryRegion:
+        return MemoryRegion(self.memory_type, self.address, self.length)
+
+
+class TraceWriter:
+    """Append frames to a trace file. Use as a context manager (or call
+    `close`) so the index and footer get written."""
+
+    def __init__(self, path: Union[str, Path], regions: Sequence[TraceRegion], *,
+                 keyframe_every: int = 256, codec: str = "zlib", level: int = 6,
+                 step_between: int = 1) -> None:
+        if not regions:
+            raise ValueError("a trace needs at least one region")
+        names = [r.name for r in regions]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate trace region names: {names}")
+        if keyframe_every < 1:
+            raise ValueError(f"keyframe_every must be >= 1, got {keyframe_every}")
+        self.path = Path(path)
+        self.regions = list(regions)
+        self.keyframe_every = keyframe_every
+        self.codec = codec
+        self.frame_size = sum(r.length for r in regions)
+        self._compress = _compressor(codec, level)
+        self._index: list[tuple[int, int, int]] = []
+        self._prev: Optional[bytes] = None
+        meta = json.dumps({
+            "version": 1,
+            "codec": codec,
+            "keyframe_every": keyframe_every,
+            "step_between": step_between,
+            "regions": [vars(r) for r in self.regions],
+        }).encode("utf-8")
+        self._f: Optional[BinaryIO] = open(self.path, "wb")
+        self._f.write(TRACE_MAGIC + struct.pack("<I", len(meta)) + meta)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, frame: Union[bytes, Sequence[bytes]], tick: Optional[int] = None) -> None:
+        """Append one frame: the regions' bytes concatenated, or one buffer
+        per region. `tick` defaults to the frame number."""
+        if self._f is None:
+            raise ValueError("trace writer is closed")
+        data = frame if isinstance(frame, (bytes, bytearray, memoryview)) else b"".join(frame)
+        data = bytes(data)
+        if len(data) != self.frame_size:
+            raise ValueError(f"frame is {len(data)} bytes, regions need {self.frame_size}")
+        n = len(self._index)
+        key = self._prev is None or n % self.keyframe_every == 0
+        body = self._compress(data if key else _xor(self._prev, data))
+        tick = n if tick is None else tick
+        self._index.append((self._f.tell(), tick, int(key)))
+        self._f.write(_CHUNK.pack(len(body), tick, int(key)) + body)
+        self._prev = data
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        f, self._f = self._f, None
+        with f:
+            index_at = f.tell()
+            f.write(b"".join(_INDEX.pack(*entry) for entry in self._index))
+            f.write(_FOOTER.pack(index_at, len(self._index), _FOOTER_MAGIC))
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def record_trace(client: MesenClient, path: Union[str, Path], regions: Sequence[TraceRegion],
+                 frames: int, *, step_between: int = 1, keyframe_every: int = 256,
+                 codec: str = "zlib", level: int = 6) -> int:
+    """Capture `regions` now and after each of `frames` steps of
+    `step_between` → number of frames written (`frames + 1`). Each tick's
+    step and region reads go out as one pipelined round trip."""
+    reads = [r.as_memory_region().read_request(client.memory_encoding) for r in regions]
+    with TraceWriter(path, regions, keyframe_every=keyframe_every, codec=codec,
+                     level=level, step_between=step_between) as w:
+        w.add([memory_bytes(r.result("readMemory")) for r in client.pipeline(reads)], 0)
+        tick = [("step", {"count": step_between})] + reads
+        for n in range(1, frames + 1):
+            stepped, *got = client.pipeline(tick)
+            stepped.result("step")
+            w.add([memory_bytes(r.result("readMemory")) for r in got], n * step_between)
+        return len(w)
+
+
+class TraceReader:
+    """Random access, replay, search and export over a trace file."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._f: BinaryIO = open(self.path, "rb")
+        try:
+            self._load()
+        except Exception:
+            self._f.close()
+            raise
+        self._cache: Optional[tuple[int, bytes]] = None
+
+    def _load(self) -> None:
+        f = self._f
+        head = f.read(12)
+        if len(head) < 12 or head[:8] != TRACE_MAGIC:
+            raise TraceFormatError(f"{self.path}: not a retrotool trace")
+        (meta_len,) = struct.unpack("<I", head[8:])
+        try:
+            meta = json.loads(f.read(meta_len))
+        except ValueError as exc:
+            raise TraceFormatError(f"{self.path}: bad trace header: {exc}") from None
+        self.meta = meta
+        self.codec = meta["codec"]
+        self.keyframe_every = meta["keyframe_every"]
+        self.step_between = meta.get("step_between", 1)
+        self.regions = [TraceRegion(**r) for r in meta["regions"]]
+        self.frame_size = sum(r.length for r in self.regions)
+        self._decompress = _decompressor(self.codec)
+        self._data_start = 12 + meta_len
+        self._offsets: list[int] = []
+        self.ticks: list[int] = []
+        self._keys: list[bool] = []
+        self.complete = self._read_index()
+        if not self.complete:
+            self._scan_chunks()
+
+    def _read_index(self) -> bool:
+        f = self._f
+        end = f.seek(0, 2)
+        if end < self._data_start + _FOOTER.size:
+            return False
+        f.seek(end - _FOOTER.size)
+        index_at, count, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != _FOOTER_MAGIC or index_at + count * _INDEX.size + _FOOTER.size != end:
+            return False
+        f.seek(index_at)
+        raw = f.read(count * _INDEX.size)
+        for off, tick, key in _INDEX.iter_unpack(raw):
+            self._offsets.append(off)
+            self.ticks.append(tick)
+            self._keys.append(bool(key))
+        return True
+
+    def _scan_chunks(self) -> None:
+        """Rebuild the index from chunk headers (recording never closed);
+        a torn last chunk is dropped."""
+        f = self._f
+        end = f.seek(0, 2)
+        pos = self._data_start
+        while pos + _CHUNK.size <= end:
+            f.seek(pos)
+            size, tick, key = _CHUNK.unpack(f.read(_CHUNK.size))
+            if pos + _CHUNK.size + size > end:
+                break
+            self._offsets.append(pos)
+            self.ticks.append(tick)
+            self._keys.append(bool(key))
+            pos += _CHUNK.size + size
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    # --- decoding --------------------------------------------------------
+    def _chunk(self, i: int) -> bytes:
+        f = self._f
+        f.seek(self._offsets[i])
+        size, _, _ = _CHUNK.unpack(f.read(_CHUNK.size))
+        try:
+            body = self._decompress(f.read(size))
+        except Exception as exc:
+            raise TraceFormatError(f"{self.path}: frame {i} is corrupt: {exc}") from None
+        if len(body) != self.frame_size:
+            raise TraceFormatError(f"{self.path}: frame {i} has {len(body)} bytes, "
+                                   f"expected {self.frame_size}")
+        return body
+
+    def _decode(self, i: int, prev: Optional[bytes]) -> bytes:
+        body = self._chunk(i)
+        if self._keys[i]:
+            return body
+        if prev is None:
+            raise TraceFormatError(f"{self.path}: frame {i} has no keyframe before it")
+        return _xor(prev, body)
+
+    def frame(self, i: int) -> bytes:
+        """Frame `i` (all regions concatenated). Negative `i` counts from the end."""
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"frame {i} out of range for {n} frames")
+        cached = self._cache
+        if cached is not None and cached[0] <= i and not any(self._keys[cached[0] + 1:i + 1]):
+            start, data = cached
+        else:
+            start = i
+            while not self._keys[start]:
+                start -= 1
+            data = self._decode(start, None)
+        for k in range(start + 1, i + 1):
+            data = self._decode(k, data)
+        self._cache = (i, data)
+        return data
+
+    def _region_slice(self, name: str) -> tuple[TraceRegion, int]:
+        at = 0
+        for r in self.regions:
+            if r.name == name:
+                return r, at
+            at += r.length
+        raise KeyError(f"no trace region named {name!r}")
+
+    def region(self, i: int, name: str) -> bytes:
+        """Region `name`'s bytes in frame `i`."""
+        r, at = self._region_slice(name)
+        return self.frame(i)[at:at + r.length]
+
+    def frames(self, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple[int, bytes]]:
+        """Replay `(tick, frame)` for frames `start` .. `stop - 1`, decoding
+        each chunk once."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        data = self.frame(start)
+        yield self.ticks[start], data
+        for k in range(start + 1, stop):
+            data = self._decode(k, data)
+            yield self.ticks[k], data
+        self._cache = (stop - 1, data)
+
+    # --- search / export -------------------------------------------------
+    def _locate(self, address: int, region: Optional[str]) -> int:
+        """Frame offset of `address` (in a region's own address space)."""
+        at = 0
+        for r in self.regions:
+            if (region is None or r.name == region) and r.address <= address < r.address + r.length:
+                return at + address - r.address
+            at += r.length
+        where = f"region {region!r}" if region else "any region"
+        raise KeyError(f"address {address:#x} is not in {where}")
+
+    def find(self, address: int, value: int, *, region: Optional[str] = None,
+             start: int = 0) -> Optional[int]:
+        """First frame ≥ `start` where the byte at `address` *became* `value`
+        (differs from `value` in the frame before, or is the first frame
+        searched) → frame number, or `None`."""
+        off = self._locate(address, region)
+        prev = None
+        for k, (_, data) in enumerate(self.frames(start), start):
+            v = data[off]
+            if v == value and prev != value:
+                return k
+            prev = v
+        return None
+
+    def byte_series(self, address: int, *, region: Optional[str] = None,
+                    start: int = 0, stop: Optional[int] = None) -> list[tuple[int, int]]:
+        """`(tick, value)` of the byte at `address` for each frame."""
+        off = self._locate(address, region)
+        return [(t, data[off]) for t, data in self.frames(start, stop)]
+
+    def export_csv(self, out: Union[str, Path], addresses: Sequence[int], *,
+                   region: Optional[str] = None, start: int = 0,
+                   stop: Optional[int] = None) -> None:
+        """One CSV row per frame: tick, then the byte at each address."""
+        offs = [self._locate(a, region) for a in addresses]
+        with open(out, "w", newline="") as fh:
+            w = csv.writer(fh)
+            w.writerow(["tick"] + [f"{a:#x}" for a in addresses])
+            for tick, data in self.frames(start, stop):
+                w.writerow([tick] + [data[o] for o in offs])
+
+    def export_raw(self, out: Union[str, Path], *, region: Optional[str] = None,
+                   start: int = 0, stop: Optional[int] = None) -> int:
+        """Write frames (or one region of each) back to back as raw bytes →
+        number of frames written."""
+        lo, hi = 0, self.frame_size
+        if region is not None:
+            r, lo = self._region_slice(region)
+            hi = lo + r.length
+        n = 0
+        with open(out, "wb") as fh:
+            for _, data in self.frames(start, stop):
+                fh.write(data[lo:hi])
+                n += 1
+        return n
@@ -31,7 +31,7 @@ def build_tmx(level: Level, tileset_source: str = "tiles.tsx") -> str:
             "height": str(layer.height),
         })
         data_el = ET.SubElement(layer_el, "data", {"encoding": "csv"})
-        rows = [",".join(str(t + 1) for t in row) for row in layer.tile_indices]
+        rows = [",".join(str(t + 1) for t in row) for row in layer.tile_rows()]
         data_el.text = "\n" + ",\n".join(rows) + "\n"
 
     if level.triggers or level.spawns:
@@ -4,16 +4,30 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Any
 
+from retrotool.graphics.tilemap import Tilemap
+
 
 @dataclass
 class TileLayer:
+    """One BG layer. `tile_indices` is a grid of tile numbers or a `Tilemap`
+    (exporters read its tile-index field)."""
     name: str
     width: int
     height: int
-    tile_indices: list[list[int]]
+    tile_indices: list[list[int]] | Tilemap
     priority: bool = False
     palette: int = 0
 
+    @classmethod
+    def from_tilemap(cls, name: str, tilemap: Tilemap, **kwargs) -> "TileLayer":
+        return cls(name, tilemap.width, tilemap.height, tilemap, **kwargs)
+
+    def tile_rows(self) -> list:
+        """Tile indices as rows, whichever form `tile_indices` holds."""
+        if isinstance(self.tile_indices, Tilemap):
+            return self.tile_indices.tile_rows()
+        return self.tile_indices
+
 
 @dataclass
 class CollisionCell:
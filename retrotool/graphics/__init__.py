@@ -1,20 +1,34 @@
 """retrotool.graphics — tile/palette/sprite/tilemap codecs."""
 from retrotool.graphics.palette import (
     Palette,
+    RgbaLut,
     bgr555_to_rgb888,
+    bgr555_block_to_rgb888,
     decode_palette,
+    decode_palette_set,
     encode_palette,
+    lut_for,
+    rgb888_block_to_bgr555,
     rgb888_to_bgr555,
 )
+from retrotool.graphics.ppu import (
+    BgLayer,
+    Scene,
+    composite_indices,
+    render_scene,
+    render_scenes,
+)
 from retrotool.graphics.sprites import (
     Atlas,
     AtlasEntry,
+    AtlasStats,
     SpriteFrame,
     SpritePiece,
     pack_atlas,
     render_frame,
 )
 from retrotool.graphics.tilemap import (
+    Tilemap,
     TilemapEntry,
     decode_tilemap,
     encode_tilemap,
@@ -32,6 +46,7 @@ from retrotool.graphics.superfamiconv import (
     png_to_tiles,
     sfc_run,
 )
+from retrotool.graphics.tileindex import TileIndex, dedupe_sheet
 from retrotool.graphics.tiles import (
     TILE_BYTES,
     TILE_H,
@@ -39,18 +54,32 @@ from retrotool.graphics.tiles import (
     Tile,
     composite_to_image,
     decode_tile,
+    decode_tile_sheet,
     decode_tiles,
     encode_tile,
+    encode_tile_sheet,
     tile_to_rgba,
 )
-from retrotool.graphics.ppm import write_ppm
+from retrotool.graphics.ppm import write_ppm, write_ppm_rows
+from retrotool.graphics.png import (
+    PngFormatError,
+    PngImage,
+    read_png,
+    write_png,
+    write_png_rows,
+)
 
 __all__ = [
     "Palette",
+    "RgbaLut",
     "bgr555_to_rgb888",
     "rgb888_to_bgr555",
+    "bgr555_block_to_rgb888",
     "decode_palette",
+    "decode_palette_set",
     "encode_palette",
+    "lut_for",
+    "rgb888_block_to_bgr555",
     "Tile",
     "TILE_W",
     "TILE_H",
@@ -58,8 +87,13 @@ __all__ = [
     "decode_tile",
     "encode_tile",
     "decode_tiles",
+    "decode_tile_sheet",
+    "encode_tile_sheet",
     "tile_to_rgba",
+    "TileIndex",
+    "dedupe_sheet",
     "composite_to_image",
+    "Tilemap",
     "TilemapEntry",
     "decode_tilemap",
     "encode_tilemap",
@@ -70,7 +104,13 @@ __all__ = [
     "render_frame",
     "Atlas",
     "AtlasEntry",
+    "AtlasStats",
     "pack_atlas",
+    "BgLayer",
+    "Scene",
+    "composite_indices",
+    "render_scene",
+    "render_scenes",
     "SFCNotFoundError",
     "EncodedGraphics",
     "encode_png",
@@ -81,4 +121,10 @@ __all__ = [
     "png_to_map",
     "sfc_run",
     "write_ppm",
+    "write_ppm_rows",
+    "write_png",
+    "write_png_rows",
+    "PngFormatError",
+    "PngImage",
+    "read_png",
 ]
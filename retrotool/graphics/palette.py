@@ -1,7 +1,21 @@
-"""SNES BGR555 palette handling. Convert to/from RGB888."""
+"""SNES BGR555 palette handling. Convert to/from RGB888.
+
+Whole CGRAM blocks convert in bulk: the low / high bytes of every BGR555 word
+are split with slices, each 5-bit channel is pulled out with a 256-byte
+`bytes.translate` table (the green bits that straddle both bytes are joined
+with one big-int OR), and the channels are interleaved back with strided
+stores. Per-color Python work is gone; `decode_palette` / `encode_palette`
+are views over `bgr555_block_to_rgb888` / `rgb888_block_to_bgr555`.
+
+Conversions are memoized by content: `decode_palette_set` caches on the raw
+CGRAM bytes and `Palette.rgba_lut` on the packed colors, so identical palette
+sets seen by several sections (or frames) are converted once.
+"""
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 from typing import Iterable, Sequence
 
 
@@ -17,22 +31,86 @@ def rgb888_to_bgr555(r: int, g: int, b: int) -> int:
     return ((b >> 3) & 0x1F) << 10 | ((g >> 3) & 0x1F) << 5 | ((r >> 3) & 0x1F)
 
 
+def _table(fn) -> bytes:
+    return bytes(fn(v) & 0xFF for v in range(256))
+
+
+def _expand5(v: int) -> int:
+    v &= 0x1F
+    return (v << 3) | (v >> 2)
+
+
+# BGR555 low byte (gggrrrrr) / high byte (-bbbbbgg) → channel bits.
+_R_FROM_LO = _table(_expand5)
+_G_FROM_LO = _table(lambda v: v >> 5)
+_G_FROM_HI = _table(lambda v: (v & 3) << 3)
+_B_FROM_HI = _table(lambda v: _expand5(v >> 2))
+_EXPAND5 = _table(_expand5)
+# RGB888 channel → BGR555 low / high byte bits.
+_LO_FROM_R = _table(lambda v: v >> 3)
+_LO_FROM_G = _table(lambda v: ((v >> 3) & 7) << 5)
+_HI_FROM_G = _table(lambda v: v >> 6)
+_HI_FROM_B = _table(lambda v: (v >> 3) << 2)
+
+
+def _or_bytes(a: bytes, b: bytes) -> bytes:
+    """Bytewise OR of two equal-length buffers."""
+    n = len(a)
+    return (int.from_bytes(a, "big") | int.from_bytes(b, "big")).to_bytes(n, "big")
+
+
+def bgr555_block_to_rgb888(data: bytes) -> bytes:
+    """Little-endian BGR555 words → packed RGB888 (3 bytes per color)."""
+    if len(data) % 2:
+        raise ValueError(f"BGR555 block length {len(data)} is odd")
+    data = bytes(data)
+    lo, hi = data[0::2], data[1::2]
+    out = bytearray(len(lo) * 3)
+    out[0::3] = lo.translate(_R_FROM_LO)
+    out[1::3] = _or_bytes(lo.translate(_G_FROM_LO), hi.translate(_G_FROM_HI)).translate(_EXPAND5)
+    out[2::3] = hi.translate(_B_FROM_HI)
+    return bytes(out)
+
+
+def rgb888_block_to_bgr555(rgb: bytes) -> bytes:
+    """Packed RGB888 → little-endian BGR555 words (inverse of
+    `bgr555_block_to_rgb888`, dropping the low 3 bits of each channel)."""
+    if len(rgb) % 3:
+        raise ValueError(f"RGB888 block length {len(rgb)} is not a multiple of 3")
+    rgb = bytes(rgb)
+    r, g, b = rgb[0::3], rgb[1::3], rgb[2::3]
+    out = bytearray(len(r) * 2)
+    out[0::2] = _or_bytes(r.translate(_LO_FROM_R), g.translate(_LO_FROM_G))
+    out[1::2] = _or_bytes(g.translate(_HI_FROM_G), b.translate(_HI_FROM_B))
+    return bytes(out)
+
+
+def _pack_rgb(colors: Iterable[Sequence[int]]) -> bytes:
+    return bytes(chain.from_iterable(c[:3] for c in colors))
+
+
+@lru_cache(maxsize=1024)
+def _rgb_block(raw: bytes) -> tuple[tuple[int, int, int], ...]:
+    rgb = bgr555_block_to_rgb888(raw)
+    return tuple(zip(rgb[0::3], rgb[1::3], rgb[2::3]))
+
+
+def _read_block(data: bytes, offset: int, count: int) -> bytes:
+    raw = bytes(data[offset:offset + count * 2])
+    if offset < 0 or len(raw) != count * 2:
+        raise IndexError(
+            f"palette of {count} colors at offset {offset} runs past {len(data)} bytes"
+        )
+    return raw
+
+
 def decode_palette(data: bytes, offset: int = 0, count: int = 16) -> list[tuple[int, int, int]]:
     """Read `count` BGR555 entries → list of RGB888 tuples."""
-    out: list[tuple[int, int, int]] = []
-    for i in range(count):
-        word = data[offset + i * 2] | (data[offset + i * 2 + 1] << 8)
-        out.append(bgr555_to_rgb888(word))
-    return out
+    return list(_rgb_block(_read_block(data, offset, count)))
 
 
 def encode_palette(rgb: Sequence[tuple[int, int, int]]) -> bytes:
-    out = bytearray()
-    for r, g, b in rgb:
-        w = rgb888_to_bgr555(r, g, b)
-        out.append(w & 0xFF)
-        out.append((w >> 8) & 0xFF)
-    return bytes(out)
+    return rgb888_block_to_bgr555(_pack_rgb(rgb))
 
 
 @dataclass
@@ -49,6 +127,11 @@ class Palette:
     def to_bytes(self) -> bytes:
         return encode_palette(self.colors)
 
+    def rgba_lut(self) -> "RgbaLut":
+        """This palette's `RgbaLut`, shared by every palette with the same
+        colors and transparent index."""
+        return _cached_lut(_pack_rgb(self.colors), self.transparent_index)
+
     def rgba(self, index: int) -> tuple[int, int, int, int]:
         r, g, b = self.colors[index]
         a = 0 if index == self.transparent_index else 255
@@ -62,3 +145,102 @@ class Palette:
 
     def __iter__(self) -> Iterable[tuple[int, int, int]]:
         return iter(self.colors)
+
+
+class RgbaLut:
+    """Index → RGBA lookup for one palette, applied to whole index buffers.
+
+    Built once from `palette.rgba(i)` for every entry (so any object with
+    `rgba()` and `len()` works) as one 256-byte `bytes.translate` table per
+    channel; converting a buffer is four translates and four strided stores.
+    """
+
+    __slots__ = ("size", "_tables", "_opaque")
+
+    @classmethod
+    def from_rgb(cls, rgb: bytes, transparent_index: int = 0) -> "RgbaLut":
+        """Build from packed RGB888 (as `bgr555_block_to_rgb888` returns);
+        `transparent_index` gets alpha 0, every other color 255."""
+        size = min(len(rgb) // 3, 256)
+        self = cls.__new__(cls)
+        tables = []
+        for c in range(3):
+            t = bytearray(256)
+            t[:size] = rgb[c:size * 3:3]
+            tables.append(bytes(t))
+        alpha = bytearray(256)
+        alpha[:size] = b"\xff" * size
+        if 0 <= transparent_index < size:
+            alpha[transparent_index] = 0
+        tables.append(bytes(alpha))
+        self.size = size
+        self._tables = tuple(tables)
+        self._opaque = bytes(alpha)
+        return self
+
+    def __init__(self, palette) -> None:
+        size = min(len(palette), 256)
+        chans = [bytearray(256) for _ in range(4)]
+        for i in range(size):
+            for c, v in enumerate(palette.rgba(i)):
+                chans[c][i] = v
+        self.size = size
+        self._tables = tuple(bytes(t) for t in chans)
+        self._opaque = bytes(0xFF if a else 0 for a in chans[3])
+
+    def _check(self, indices: bytes) -> None:
+        if indices and max(indices) >= self.size:
+            raise IndexError(
+                f"palette index {max(indices)} out of range for {self.size} colors"
+            )
+
+    def convert(self, indices: bytes) -> bytes:
+        """`len(indices) * 4` RGBA bytes — `palette.rgba(i)` per index."""
+        self._check(indices)
+        out = bytearray(len(indices) * 4)
+        for c, table in enumerate(self._tables):
+            out[c::4] = indices.translate(table)
+        return bytes(out)
+
+    def opaque_mask(self, indices: bytes) -> bytes:
+        """4 bytes per index: `FF FF FF FF` where its alpha is non-zero, else 0."""
+        self._check(indices)
+        alpha = indices.translate(self._opaque)
+        out = bytearray(len(indices) * 4)
+        for c in range(4):
+            out[c::4] = alpha
+        return bytes(out)
+
+    def table(self) -> bytes:
+        """The whole LUT as `size * 4` RGBA bytes (row `i` = color `i`)."""
+        return self.convert(bytes(range(self.size)))
+
+
+@lru_cache(maxsize=1024)
+def _cached_lut(rgb: bytes, transparent_index: int) -> RgbaLut:
+    return RgbaLut.from_rgb(rgb, transparent_index)
+
+
+def lut_for(palette) -> RgbaLut:
+    """The `RgbaLut` for `palette`: cached for a `Palette`, built from
+    `rgba()` for any other palette-like object."""
+    if isinstance(palette, Palette):
+        return palette.rgba_lut()
+    return RgbaLut(palette)
+
+
+def decode_palette_set(data: bytes, offset: int = 0, palettes: int = 8,
+                       colors: int = 16, transparent_index: int = 0) -> list[Palette]:
+    """Read `palettes` consecutive `colors`-entry palettes (a CGRAM block).
+
+    Conversion is cached on the raw bytes, so sections sharing a palette set
+    decode it once; each call still returns fresh, independently mutable
+    `Palette` objects.
+    """
+    raw = _read_block(data, offset, palettes * colors)
+    rgb = _rgb_block(raw)
+    return [
+        Palette(colors=list(rgb[i * colors:(i + 1) * colors]),
+                transparent_index=transparent_index)
+        for i in range(palettes)
+    ]
@@ -0,0 +1,264 @@
+"""Minimal PNG reader / writer — SNES graphics I/O without an image library.
+
+`read_png` handles non-interlaced PNGs in the layouts art tools emit for SNES
+work: indexed (1/2/4/8-bit, with optional `tRNS` alpha), 8-bit grayscale,
+gray+alpha, RGB and RGBA. Anything else (16-bit channels, Adam7 interlace)
+raises `PngFormatError`, which callers treat as "use an external tool".
+
+`write_png` / `write_png_rows` emit 8-bit RGBA, RGB or indexed PNGs. Rows are
+compressed and flushed as IDAT chunks while they arrive, so a generator of
+rows never needs a second full-size buffer.
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Channels per pixel by IHDR colour type.
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class PngFormatError(ValueError):
+    """Not a PNG, or a PNG layout this reader doesn't decode."""
+
+
+@dataclass
+class PngImage:
+    """A decoded PNG. `rgba` is row-major 8-bit RGBA for every colour type;
+    indexed images also keep their raw `indices` (one byte per pixel) and
+    `palette` (PLTE order)."""
+    width: int
+    height: int
+    rgba: bytes
+    indices: Optional[bytes] = None
+    palette: Optional[list[tuple[int, int, int]]] = None
+
+
+def _chunks(data: bytes):
+    i = 8
+    while i + 8 <= len(data):
+        ln = struct.unpack(">I", data[i:i + 4])[0]
+        yield data[i + 4:i + 8], data[i + 8:i + 8 + ln]
+        i += 12 + ln
+
+
+def _unfilter(raw: bytes, height: int, stride: int, bpp: int) -> bytearray:
+    """Undo the per-scanline PNG filters → `height * stride` bytes."""
+    out = bytearray(height * stride)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        ftype = raw[pos]
+        line = bytearray(raw[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        if ftype == 1:
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xFF
+        elif ftype == 2:
+            line = bytearray((a + b) & 0xFF for a, b in zip(line, prev))
+        elif ftype == 3:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif ftype == 4:
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                line[i] = (line[i] + pred) & 0xFF
+        elif ftype != 0:
+            raise PngFormatError(f"bad PNG filter type {ftype} on row {y}")
+        out[y * stride:(y + 1) * stride] = line
+        prev = line
+    return out
+
+
+def _unpack_indices(rows: bytes, width: int, height: int, depth: int, stride: int) -> bytes:
+    """Sub-byte indexed rows → one index byte per pixel."""
+    if depth == 8:
+        return bytes(rows)
+    per = 8 // depth
+    mask = (1 << depth) - 1
+    # Per byte value: its `per` unpacked indices, most significant first.
+    table = [
+        bytes((b >> (8 - depth * (k + 1))) & mask for k in range(per)) for b in range(256)
+    ]
+    out = bytearray()
+    for y in range(height):
+        line = b"".join(table[b] for b in rows[y * stride:(y + 1) * stride])
+        out += line[:width]
+    return bytes(out)
+
+
+def read_png(source: Union[str, Path, bytes]) -> PngImage:
+    """Decode a PNG file (or its bytes) → `PngImage`."""
+    data = source if isinstance(source, (bytes, bytearray)) else Path(source).read_bytes()
+    if data[:8] != PNG_SIGNATURE:
+        raise PngFormatError(f"{'<bytes>' if isinstance(source, (bytes, bytearray)) else source}: not a PNG")
+    ihdr = None
+    plte: Optional[bytes] = None
+    trns = b""
+    idat = []
+    for typ, body in _chunks(data):
+        if typ == b"IHDR":
+            ihdr = struct.unpack(">IIBBBBB", body[:13])
+        elif typ == b"PLTE":
+            plte = body
+        elif typ == b"tRNS":
+            trns = body
+        elif typ == b"IDAT":
+            idat.append(body)
+        elif typ == b"IEND":
+            break
+    if ihdr is None:
+        raise PngFormatError("PNG has no IHDR chunk")
+    width, height, depth, ctype, _, _, interlace = ihdr
+    if interlace:
+        raise PngFormatError("interlaced PNGs are not supported")
+    if ctype not in _CHANNELS or (depth != 8 and not (ctype == 3 and depth in (1, 2, 4))):
+        raise PngFormatError(f"unsupported PNG layout: colour type {ctype}, {depth}-bit")
+    channels = _CHANNELS[ctype]
+    stride = (width * channels * depth + 7) // 8
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as exc:
+        raise PngFormatError(f"corrupt PNG image data: {exc}") from None
+    if len(raw) < height * (stride + 1):
+        raise PngFormatError("truncated PNG image data")
+    rows = _unfilter(raw, height, stride, max(1, channels * depth // 8))
+
+    n = width * height
+    rgba = bytearray(n * 4)
+    if ctype == 3:
+        if plte is None:
+            raise PngFormatError("indexed PNG has no PLTE chunk")
+        palette = [(plte[j], plte[j + 1], plte[j + 2]) for j in range(0, len(plte) - len(plte) % 3, 3)]
+        indices = _unpack_indices(rows, width, height, depth, stride)
+        for c in range(3):
+            table = bytearray(256)
+            table[:len(palette)] = bytes(p[c] for p in palette)
+            rgba[c::4] = indices.translate(bytes(table))
+        alpha = bytearray(b"\xff" * 256)
+        alpha[:len(trns)] = trns[:256]
+        rgba[3::4] = indices.translate(bytes(alpha))
+        return PngImage(width, height, bytes(rgba), indices=indices, palette=palette)
+    if ctype == 0:
+        rgba[0::4] = rgba[1::4] = rgba[2::4] = rows
+        rgba[3::4] = b"\xff" * n
+    elif ctype == 4:
+        rgba[0::4] = rgba[1::4] = rgba[2::4] = rows[0::2]
+        rgba[3::4] = rows[1::2]
+    elif ctype == 2:
+        for c in range(3):
+            rgba[c::4] = rows[c::3]
+        rgba[3::4] = b"\xff" * n
+    else:
+        rgba[:] = rows
+    return PngImage(width, height, bytes(rgba))
+
+
+PNG_MODES = ("rgba", "rgb", "indexed")
+
+# Flush compressed image data as an IDAT chunk once this much is pending.
+_IDAT_CHUNK = 1 << 16
+
+
+def _chunk(typ: bytes, body: bytes) -> bytes:
+    return (struct.pack(">I", len(body)) + typ + body
+            + struct.pack(">I", zlib.crc32(typ + body) & 0xFFFFFFFF))
+
+
+def write_png_rows(
+    path: Union[str, Path],
+    width: int,
+    height: int,
+    rows: Iterable[Union[bytes, bytearray, memoryview]],
+    *,
+    mode: str = "rgba",
+    palette: Optional[Sequence[tuple[int, int, int]]] = None,
+    transparent_index: Optional[int] = None,
+    level: int = 6,
+) -> None:
+    """Write a PNG from `height` rows produced one at a time.
+
+    `mode="rgba"` / `"rgb"` rows hold 4 / 3 bytes per pixel; `"indexed"`
+    rows hold one palette index per pixel and need `palette` (up to 256 RGB
+    entries — a `Palette` works). `transparent_index` then gets alpha 0 via
+    `tRNS`. Rows are stored unfiltered; `level` is the zlib level.
+    """
+    if mode not in PNG_MODES:
+        raise ValueError(f"unknown PNG mode {mode!r} (expected one of {PNG_MODES})")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"PNG dimensions must be positive (got {width}x{height})")
+    ctype, channels = {"rgba": (6, 4), "rgb": (2, 3), "indexed": (3, 1)}[mode]
+    head = [PNG_SIGNATURE, _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, ctype, 0, 0, 0))]
+    if mode == "indexed":
+        if palette is None:
+            raise ValueError("indexed PNG needs a palette")
+        colors = list(palette)
+        if not 0 < len(colors) <= 256:
+            raise ValueError(f"indexed PNG palette needs 1-256 colours, got {len(colors)}")
+        head.append(_chunk(b"PLTE", b"".join(bytes(c[:3]) for c in colors)))
+        if transparent_index is not None and 0 <= transparent_index < len(colors):
+            head.append(_chunk(b"tRNS", b"\xff" * transparent_index + b"\x00"))
+    row_len = width * channels
+    comp = zlib.compressobj(level)
+    with open(path, "wb") as f:
+        f.write(b"".join(head))
+        pending = []
+        size = 0
+        n = 0
+        for row in rows:
+            if len(row) != row_len:
+                raise ValueError(f"row {n} length {len(row)} != {row_len}")
+            if n >= height:
+                raise ValueError(f"more than {height} rows")
+            out = comp.compress(b"\x00" + bytes(row))
+            if out:
+                pending.append(out)
+                size += len(out)
+                if size >= _IDAT_CHUNK:
+                    f.write(_chunk(b"IDAT", b"".join(pending)))
+                    pending, size = [], 0
+            n += 1
+        if n != height:
+            raise ValueError(f"got {n} rows, expected {height}")
+        pending.append(comp.flush())
+        f.write(_chunk(b"IDAT", b"".join(pending)))
+        f.write(_chunk(b"IEND", b""))
+
+
+def write_png(
+    path: Union[str, Path],
+    width: int,
+    height: int,
+    pixels: Union[bytes, bytearray, memoryview],
+    *,
+    mode: str = "rgba",
+    palette: Optional[Sequence[tuple[int, int, int]]] = None,
+    transparent_index: Optional[int] = None,
+    level: int = 6,
+) -> None:
+    """Write a whole `width` x `height` buffer as PNG (see `write_png_rows`).
+    Takes `(width, height, rgba)` from `render_tilemap` / `composite_to_image`
+    / `render_scene` as-is."""
+    channels = {"rgba": 4, "rgb": 3, "indexed": 1}.get(mode, 4)
+    row_len = width * channels
+    if len(pixels) != row_len * max(height, 0):
+        raise ValueError(
+            f"pixels length {len(pixels)} != width*height*{channels} = {row_len * height}"
+        )
+    view = memoryview(pixels)
+    write_png_rows(
+        path, width, height,
+        (view[y * row_len:(y + 1) * row_len] for y in range(height)),
+        mode=mode, palette=palette, transparent_index=transparent_index, level=level,
+    )
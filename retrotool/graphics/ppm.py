@@ -6,12 +6,14 @@ decimals (P3). No alpha channel; alpha is stripped on write.
 
 This pairs naturally with `retrotool.graphics.tiles.composite_to_image`,
 which returns `(width, height, rgba_bytes)` — pass the same triple
-straight into `write_ppm`.
+straight into `write_ppm`. `write_ppm_rows` takes rows from a generator
+instead, for images too large to hold twice. (PNG output lives in
+`retrotool.graphics.png`.)
 """
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Union
 
 
 def write_ppm(
@@ -50,39 +52,55 @@ def write_ppm(
             f"pixels length {len(pixels)} != width*height*{bpp} = {expected}"
         )
 
-    rgb = _strip_alpha(pixels) if has_alpha else bytes(pixels)
-    out_path = Path(path)
-    if binary:
-        header = f"P6\n{width} {height}\n255\n".encode("ascii")
-        out_path.write_bytes(header + rgb)
-    else:
-        out_path.write_text(_to_p3_text(width, height, rgb), encoding="ascii")
+    row_len = width * bpp
+    view = memoryview(pixels)
+    write_ppm_rows(
+        path, width, height,
+        (view[y * row_len:(y + 1) * row_len] for y in range(height)),
+        binary=binary, has_alpha=has_alpha,
+    )
+
+
+def write_ppm_rows(
+    path: Union[str, Path],
+    width: int,
+    height: int,
+    rows: Iterable[Union[bytes, bytearray, memoryview]],
+    *,
+    binary: bool = True,
+    has_alpha: bool = True,
+) -> None:
+    """Streaming `write_ppm`: `rows` yields `height` rows of `width` pixels
+    (RGBA or RGB per `has_alpha`), each written as it arrives — the full
+    image never has to exist in memory.
+
+    Raises:
+        ValueError: dimensions are non-positive, a row has the wrong length,
+            or `rows` doesn't yield exactly `height` rows.
+    """
+    if width <= 0 or height <= 0:
+        raise ValueError(f"PPM dimensions must be positive (got {width}x{height})")
+    row_len = width * (4 if has_alpha else 3)
+    with open(path, "wb") as f:
+        f.write(f"{'P6' if binary else 'P3'}\n{width} {height}\n255\n".encode("ascii"))
+        n = 0
+        for row in rows:
+            if len(row) != row_len:
+                raise ValueError(f"row {n} length {len(row)} != {row_len}")
+            if n >= height:
+                raise ValueError(f"more than {height} rows")
+            rgb = _strip_alpha(row) if has_alpha else bytes(row)
+            f.write(rgb if binary else (" ".join(map(str, rgb)) + "\n").encode("ascii"))
+            n += 1
+    if n != height:
+        raise ValueError(f"got {n} rows, expected {height}")
 
 
 def _strip_alpha(rgba: Union[bytes, bytearray, memoryview]) -> bytes:
     """RGBA → RGB. Drop every 4th byte."""
+    rgba = bytes(rgba)
     out = bytearray((len(rgba) // 4) * 3)
-    j = 0
-    for i in range(0, len(rgba), 4):
-        out[j] = rgba[i]
-        out[j + 1] = rgba[i + 1]
-        out[j + 2] = rgba[i + 2]
-        j += 3
+    out[0::3] = rgba[0::4]
+    out[1::3] = rgba[1::4]
+    out[2::3] = rgba[2::4]
     return bytes(out)
-
-
-def _to_p3_text(width: int, height: int, rgb: bytes) -> str:
-    """Build the P3 ASCII body: header + one 'R G B' triplet per pixel,
-    `width` triplets per line for readability."""
-    lines = [f"P3\n{width} {height}\n255"]
-    triplets_per_line = width
-    pixel_count = (width * height)
-    pos = 0
-    for row_start in range(0, pixel_count, triplets_per_line):
-        row = []
-        for px in range(triplets_per_line):
-            r = rgb[pos]; g = rgb[pos + 1]; b = rgb[pos + 2]
-            row.append(f"{r} {g} {b}")
-            pos += 3
-        lines.append(" ".join(row))
-    return "\n".join(lines) + "\n"
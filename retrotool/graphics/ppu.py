@@ -0,0 +1,264 @@
+"""SNES PPU-style scene compositor: BG1-BG4 + OAM sprites → one frame.
+
+`render_scene` layers up to four BG tilemaps and a list of 8x8 OAM pieces the
+way the PPU orders them for BG modes 0, 1, 3 and 7, against a 256-color CGRAM:
+
+  * every layer is rendered as a plane of CGRAM indices (one byte per pixel,
+    0 = transparent — color 0 of every sub-palette is never drawn), split into
+    a high- and low-priority plane by each tilemap entry's priority bit;
+  * sprites are resolved first among themselves — the lowest OAM index with an
+    opaque pixel wins — and that pixel's priority (0-3) picks its slot, which
+    reproduces the hardware's sprite-priority quirk;
+  * slots are stacked back to front with whole-plane masked merges, uncovered
+    pixels show the backdrop (CGRAM color 0), and the final index plane goes
+    through one `RgbaLut` conversion.
+
+Palette placement follows the mode: mode 0 gives each BG its own 32-color
+block of 2bpp palettes, 2bpp/4bpp layers elsewhere use 4-/16-color palettes
+from CGRAM 0, 8bpp layers (mode 3 BG1, mode 7) index CGRAM directly, and
+sprites use the 4bpp palettes at CGRAM 128. Mode 7 is rendered untransformed
+(scroll only; the affine matrix, EXTBG and color math are not modeled).
+
+Tilemaps may be grids of `TilemapEntry` or of raw 16-bit tilemap words, so
+array-backed maps (rows of `array('H')`) render without building entries.
+`render_scenes` fans a batch of scenes out to a process pool.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+from retrotool.graphics.palette import Palette
+from retrotool.graphics.sprites import SpritePiece
+from retrotool.graphics.tilemap import TilemapEntry
+from retrotool.graphics.tiles import TILE_H, TILE_W, Tile
+
+SCREEN_W = 256
+SCREEN_H = 224
+
+# Bits per pixel of BG1..BG4 in each supported mode.
+MODE_BPP: dict[int, tuple[int, ...]] = {
+    0: (2, 2, 2, 2),
+    1: (4, 4, 2),
+    3: (8, 4),
+    7: (8,),
+}
+
+# Front-to-back draw order. ("S", n) = sprites of priority n; (bg, True/False)
+# = BG number `bg`, high / low tile priority.
+_ORDER: dict[object, tuple[tuple, ...]] = {
+    0: (("S", 3), (1, True), (2, True), ("S", 2), (1, False), (2, False),
+        ("S", 1), (3, True), (4, True), ("S", 0), (3, False), (4, False)),
+    1: (("S", 3), (1, True), (2, True), ("S", 2), (1, False), (2, False),
+        ("S", 1), (3, True), ("S", 0), (3, False)),
+    (1, "bg3"): ((3, True), ("S", 3), (1, True), (2, True), ("S", 2),
+                 (1, False), (2, False), ("S", 1), ("S", 0), (3, False)),
+    3: (("S", 3), (1, True), ("S", 2), (2, True), ("S", 1), (1, False),
+        ("S", 0), (2, False)),
+    7: (("S", 3), ("S", 2), ("S", 1), (1, False), ("S", 0)),
+}
+
+_SPRITE_CGRAM = 128
+_MARGIN = TILE_W          # off-screen border sprites are clipped against
+
+# Byte → FF if non-zero: the "is drawn" mask of an index plane.
+_NONZERO = bytes([0] + [0xFF] * 255)
+
+
+@dataclass
+class BgLayer:
+    """One BG layer: a tilemap grid (rows of `TilemapEntry` or tilemap words),
+    the tiles it indexes, and its scroll offsets. The map wraps at its edges."""
+    tilemap: Sequence[Sequence[Union[TilemapEntry, int]]]
+    tiles: Sequence[Tile]
+    scroll_x: int = 0
+    scroll_y: int = 0
+    enabled: bool = True
+
+
+@dataclass
+class Scene:
+    """Everything one frame needs. `layers[i]` is BG(i+1) (`None` = off);
+    `sprites` is OAM order (index 0 is frontmost) and indexes `sprite_tiles`.
+    `bg3_priority` is the mode 1 BG3-to-front bit ($2105 bit 3)."""
+    mode: int
+    cgram: Sequence[tuple[int, int, int]]
+    layers: Sequence[Optional[BgLayer]] = ()
+    sprites: Sequence[SpritePiece] = ()
+    sprite_tiles: Sequence[Tile] = ()
+    bg3_priority: bool = False
+    width: int = SCREEN_W
+    height: int = SCREEN_H
+    name: str = ""
+
+
+def _word(e: Union[TilemapEntry, int]) -> int:
+    return e if isinstance(e, int) else e.to_word()
+
+
+def _color_table(bpp: int, base: int, palette: int) -> bytes:
+    """Tile pixel value → CGRAM index for one sub-palette (0 stays 0)."""
+    if bpp == 8:
+        return bytes(range(256))
+    n = 1 << bpp
+    first = base + palette * n
+    return bytes(0 if i % n == 0 else first + i % n for i in range(256))
+
+
+def _bg_planes(layer: BgLayer, bpp: int, base: int, mode7: bool,
+               width: int, height: int) -> tuple[bytes, bytes]:
+    """Render a BG layer → (high, low) screen-sized CGRAM-index planes."""
+    rows = layer.tilemap
+    map_h = len(rows)
+    map_w = len(rows[0]) if map_h else 0
+    if not map_w:
+        empty = bytes(width * height)
+        return empty, empty
+    pw, ph = map_w * TILE_W, map_h * TILE_H
+    planes = (bytearray(pw * ph), bytearray(pw * ph))   # (low, high)
+    blocks: dict[int, bytes] = {}
+    tables: dict[int, bytes] = {}
+    for ty, row in enumerate(rows):
+        for tx, e in enumerate(row):
+            word = _word(e)
+            if mode7:
+                word &= 0xFF
+            block = blocks.get(word)
+            if block is None:
+                tile = layer.tiles[word & 0x3FF]
+                if word & 0xC000:
+                    tile = tile.flipped(h=bool(word & 0x4000), v=bool(word & 0x8000))
+                pal = (word >> 10) & 7
+                table = tables.get(pal)
+                if table is None:
+                    table = tables[pal] = _color_table(bpp, base, pal)
+                block = blocks[word] = tile.data.translate(table)
+            if block.count(0) != len(block):
+                plane = planes[1 if word & 0x2000 else 0]
+                dst = ty * TILE_H * pw + tx * TILE_W
+                for src in range(0, TILE_W * TILE_H, TILE_W):
+                    plane[dst:dst + TILE_W] = block[src:src + TILE_W]
+                    dst += pw
+    lo, hi = planes
+    return (_window(hi, pw, ph, layer.scroll_x, layer.scroll_y, width, height),
+            _window(lo, pw, ph, layer.scroll_x, layer.scroll_y, width, height))
+
+
+def _window(plane: bytes, pw: int, ph: int, sx: int, sy: int,
+            width: int, height: int) -> bytes:
+    """The `width` x `height` view of a wrapping `pw` x `ph` plane at (sx, sy)."""
+    out = bytearray(width * height)
+    x0 = sx % pw
+    reps = (x0 + width + pw - 1) // pw
+    for y in range(height):
+        start = ((sy + y) % ph) * pw
+        row = plane[start:start + pw]
+        if reps > 1:
+            row = row * reps
+        out[y * width:(y + 1) * width] = row[x0:x0 + width]
+    return bytes(out)
+
+
+def _sprite_planes(scene: Scene) -> list[bytes]:
+    """Resolve OAM → four screen planes, one per sprite priority 0-3."""
+    width, height = scene.width, scene.height
+    bw = width + 2 * _MARGIN
+    bh = height + 2 * _MARGIN
+    idx = bytearray(bw * bh)
+    prio = bytearray(bw * bh)
+    tables: dict[int, bytes] = {}
+    # Back to front, so lower OAM indices overwrite higher ones.
+    for p in reversed(scene.sprites):
+        x, y = p.x + _MARGIN, p.y + _MARGIN
+        if not (0 <= x <= bw - TILE_W and 0 <= y <= bh - TILE_H):
+            continue
+        tile = scene.sprite_tiles[p.tile_index]
+        if p.h_flip or p.v_flip:
+            tile = tile.flipped(h=p.h_flip, v=p.v_flip)
+        table = tables.get(p.palette & 7)
+        if table is None:
+            table = tables[p.palette & 7] = _color_table(4, _SPRITE_CGRAM, p.palette & 7)
+        block = tile.data.translate(table)
+        prow = bytes([p.priority & 3]) * TILE_W
+        dst = y * bw + x
+        for src in range(0, TILE_W * TILE_H, TILE_W):
+            row = block[src:src + TILE_W]
+            m = int.from_bytes(row.translate(_NONZERO), 'big')
+            if m:
+                keep = ~m
+                cur = int.from_bytes(idx[dst:dst + TILE_W], 'big')
+                idx[dst:dst + TILE_W] = ((cur & keep) | int.from_bytes(row, 'big')).to_bytes(TILE_W, 'big')
+                cur = int.from_bytes(prio[dst:dst + TILE_W], 'big')
+                pv = int.from_bytes(prow, 'big') & m
+                prio[dst:dst + TILE_W] = ((cur & keep) | pv).to_bytes(TILE_W, 'big')
+            dst += bw
+    idx_view = _window(idx, bw, bh, _MARGIN, _MARGIN, width, height)
+    prio_view = _window(prio, bw, bh, _MARGIN, _MARGIN, width, height)
+    drawn = int.from_bytes(idx_view.translate(_NONZERO), 'big')
+    idx_int = int.from_bytes(idx_view, 'big')
+    out = []
+    n = width * height
+    for k in range(4):
+        sel = int.from_bytes(prio_view.translate(bytes(0xFF if v == k else 0 for v in range(256))), 'big')
+        out.append((idx_int & sel & drawn).to_bytes(n, 'big'))
+    return out
+
+
+def composite_indices(scene: Scene) -> bytes:
+    """The frame as CGRAM indices (`width * height` bytes, 0 = backdrop)."""
+    if scene.mode not in MODE_BPP:
+        raise ValueError(f"unsupported BG mode {scene.mode} (expected 0, 1, 3 or 7)")
+    bpps = MODE_BPP[scene.mode]
+    if len(scene.layers) > len(bpps):
+        raise ValueError(
+            f"mode {scene.mode} has {len(bpps)} BG layer(s), got {len(scene.layers)}"
+        )
+    width, height = scene.width, scene.height
+    slots: dict[tuple, bytes] = {}
+    for i, layer in enumerate(scene.layers):
+        if layer is None or not layer.enabled:
+            continue
+        base = i * 32 if scene.mode == 0 else 0
+        hi, lo = _bg_planes(layer, bpps[i], base, scene.mode == 7, width, height)
+        slots[(i + 1, True)] = hi
+        slots[(i + 1, False)] = lo
+    if scene.sprites:
+        for k, plane in enumerate(_sprite_planes(scene)):
+            slots[("S", k)] = plane
+    key = (1, "bg3") if scene.mode == 1 and scene.bg3_priority else scene.mode
+    acc = 0
+    for slot in reversed(_ORDER[key]):
+        plane = slots.get(slot)
+        if plane is None:
+            continue
+        m = int.from_bytes(plane.translate(_NONZERO), 'big')
+        if m:
+            acc = (acc & ~m) | int.from_bytes(plane, 'big')
+    return acc.to_bytes(width * height, 'big')
+
+
+def render_scene(scene: Scene) -> tuple[int, int, bytes]:
+    """Composite `scene` → ``(width, height, rgba_bytes)``, fully opaque."""
+    indices = composite_indices(scene)
+    colors = list(scene.cgram)[:256]
+    colors += [(0, 0, 0)] * (256 - len(colors))
+    lut = Palette(colors=colors, transparent_index=-1).rgba_lut()
+    return scene.width, scene.height, lut.convert(indices)
+
+
+def render_scenes(scenes: Sequence[Scene], *, jobs: Optional[int] = None,
+                  chunksize: int = 8) -> list[tuple[int, int, bytes]]:
+    """`render_scene` over a batch, in order. `jobs` > 1 (`0` = cpu count)
+    renders in a process pool; `None` / `1` renders in-process."""
+    scenes = list(scenes)
+    if jobs is None:
+        workers = 1
+    else:
+        workers = (os.cpu_count() or 1) if jobs == 0 else max(1, jobs)
+    workers = min(workers, len(scenes))
+    if workers <= 1:
+        return [render_scene(s) for s in scenes]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_scene, scenes, chunksize=max(1, chunksize)))
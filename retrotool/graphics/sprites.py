@@ -6,9 +6,10 @@ referencing a shared palette. Common SNES OAM sizes: 8x8, 16x16, 32x32, 64x64.
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Sequence
+from typing import Optional, Sequence
 
-from retrotool.graphics.tiles import TILE_H, TILE_W, Tile
+from retrotool.graphics.palette import RgbaLut, lut_for
+from retrotool.graphics.tiles import TILE_H, TILE_W, Tile, _blit_masked
 
 
 @dataclass
@@ -47,22 +48,19 @@ def render_frame(frame: SpriteFrame, tiles: Sequence[Tile], palettes: Sequence)
     if w == 0:
         return 0, 0, 0, 0, b''
     buf = bytearray(w * h * 4)
+    stride = w * 4
+    luts: dict[int, RgbaLut] = {}
     for p in frame.pieces:
         tile = tiles[p.tile_index]
         if p.h_flip or p.v_flip:
             tile = tile.flipped(h=p.h_flip, v=p.v_flip)
-        pal = palettes[p.palette] if p.palette < len(palettes) else palettes[0]
-        px = p.x - min_x
-        py = p.y - min_y
-        for ty in range(TILE_H):
-            dst = ((py + ty) * w + px) * 4
-            for tx in range(TILE_W):
-                r, g, b, a = pal.rgba(tile.pixels[ty][tx])
-                if a == 0:
-                    dst += 4
-                    continue
-                buf[dst] = r; buf[dst + 1] = g; buf[dst + 2] = b; buf[dst + 3] = a
-                dst += 4
+        pal_index = p.palette if p.palette < len(palettes) else 0
+        lut = luts.get(pal_index)
+        if lut is None:
+            lut = luts[pal_index] = lut_for(palettes[pal_index])
+        # Transparent (alpha 0) pixels leave earlier pieces visible.
+        _blit_masked(buf, stride, p.x - min_x, p.y - min_y,
+                     lut.convert(tile.data), lut.opaque_mask(tile.data))
     return -min_x, -min_y, w, h, bytes(buf)
 
 
@@ -77,6 +75,22 @@ class AtlasEntry:
     origin_y: int = 0
 
 
+@dataclass(frozen=True)
+class AtlasStats:
+    """Packing report (`Atlas.stats()`). `efficiency` is the share of the
+    atlas area covered by packed (unique) frame pixels."""
+    frames: int
+    unique: int
+    packed_area: int
+    atlas_area: int
+
+    @property
+    def efficiency(self) -> float:
+        if self.atlas_area <= 0:
+            return 0.0
+        return self.packed_area / self.atlas_area
+
+
 @dataclass
 class Atlas:
     width: int
@@ -84,44 +98,218 @@ class Atlas:
     rgba: bytes
     entries: list[AtlasEntry]
 
+    def stats(self) -> AtlasStats:
+        rects = {(e.x, e.y, e.width, e.height) for e in self.entries if e.width and e.height}
+        return AtlasStats(
+            frames=len(self.entries),
+            unique=len(rects),
+            packed_area=sum(w * h for _, _, w, h in rects),
+            atlas_area=self.width * self.height,
+        )
+
+
+ATLAS_METHODS = ("rows", "skyline", "maxrects")
+
+
+def _trim(w: int, h: int, rgba: bytes) -> tuple[int, int, int, int, bytes]:
+    """Crop fully transparent borders → (left, top, width, height, rgba)."""
+    stride = w * 4
+    rows = [y for y in range(h) if rgba[y * stride + 3:(y + 1) * stride:4].count(0) != w]
+    if not rows:
+        return 0, 0, 0, 0, b''
+    top, bottom = rows[0], rows[-1] + 1
+    cols = 0
+    for y in range(top, bottom):
+        cols |= int.from_bytes(rgba[y * stride + 3:(y + 1) * stride:4], 'big')
+    alpha = cols.to_bytes(w, 'big')
+    left = next(x for x in range(w) if alpha[x])
+    right = next(x for x in range(w - 1, -1, -1) if alpha[x]) + 1
+    if (left, top, right, bottom) == (0, 0, w, h):
+        return 0, 0, w, h, rgba
+    tw = right - left
+    out = b''.join(
+        rgba[y * stride + left * 4:y * stride + right * 4] for y in range(top, bottom)
+    )
+    return left, top, tw, bottom - top, out
+
+
+def _pack_rows(sizes: list[tuple[int, int]], columns: int, padding: int) -> list[tuple[int, int]]:
+    """The original layout: `columns` frames per row, rows as tall as their
+    tallest frame."""
+    out = []
+    y = 0
+    for start in range(0, len(sizes), columns):
+        row = sizes[start:start + columns]
+        x = 0
+        for w, _ in row:
+            out.append((x, y))
+            x += w + padding
+        y += max(h for _, h in row) + padding
+    return out
+
+
+def _pack_skyline(sizes: list[tuple[int, int]], width: int) -> list[tuple[int, int]]:
+    """Bottom-left skyline packing into a `width`-wide strip. `sizes`
+    include padding; returns positions in input order."""
+    skyline = [[0, 0, width]]            # [x, y, segment width]
+    pos: list[tuple[int, int]] = [(0, 0)] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    for i in order:
+        w, h = sizes[i]
+        best = None
+        for si in range(len(skyline)):
+            x = skyline[si][0]
+            if x + w > width:
+                break
+            y = 0
+            span = 0
+            sj = si
+            while span < w:
+                y = max(y, skyline[sj][1])
+                span += skyline[sj][2]
+                sj += 1
+            if best is None or (y + h, x) < (best[0] + h, best[1]):
+                best = (y, x, si)
+        y, x, si = best
+        pos[i] = (x, y)
+        # Replace the covered segments with the new top edge.
+        new = [x, y + h, w]
+        end = x + w
+        j = si
+        while j < len(skyline) and skyline[j][0] < end:
+            seg_end = skyline[j][0] + skyline[j][2]
+            if seg_end > end:
+                skyline[j][2] = seg_end - end
+                skyline[j][0] = end
+                break
+            del skyline[j]
+        skyline.insert(si, new)
+        # Merge equal-height neighbours.
+        k = 0
+        while k + 1 < len(skyline):
+            if skyline[k][1] == skyline[k + 1][1]:
+                skyline[k][2] += skyline[k + 1][2]
+                del skyline[k + 1]
+            else:
+                k += 1
+    return pos
+
+
+def _pack_maxrects(sizes: list[tuple[int, int]], width: int) -> list[tuple[int, int]]:
+    """MaxRects (best-short-side-fit) packing into a `width`-wide strip."""
+    height = sum(h for _, h in sizes) or 1
+    free = [(0, 0, width, height)]
+    pos: list[tuple[int, int]] = [(0, 0)] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: -max(sizes[i]))
+    for i in order:
+        w, h = sizes[i]
+        best = None
+        for fx, fy, fw, fh in free:
+            if w <= fw and h <= fh:
+                # Prefer low placements so the strip stays short, then BSSF.
+                score = (fy + h, min(fw - w, fh - h), max(fw - w, fh - h), fx)
+                if best is None or score < best[0]:
+                    best = (score, fx, fy)
+        _, x, y = best
+        pos[i] = (x, y)
+        kept, cut = [], []
+        for r in free:
+            fx, fy, fw, fh = r
+            if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+                kept.append(r)
+                continue
+            if x > fx:
+                cut.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw:
+                cut.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy:
+                cut.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh:
+                cut.append((fx, y + h, fw, fy + fh - y - h))
+        # Untouched rectangles are already maximal; only the new pieces can
+        # be contained in another free rectangle.
+        cut.sort(key=lambda r: -r[2] * r[3])
+        for r in cut:
+            rx, ry, rw, rh = r
+            if not any(rx >= ox and ry >= oy and rx + rw <= ox + ow and ry + rh <= oy + oh
+                       for ox, oy, ow, oh in kept):
+                kept.append(r)
+        free = kept
+    return pos
+
 
 def pack_atlas(frames: Sequence[SpriteFrame], tiles: Sequence[Tile], palettes: Sequence,
-               columns: int = 8, padding: int = 1) -> Atlas:
-    """Simple row-packed atlas. Rows have uniform cell size per row."""
+               columns: int = 8, padding: int = 1, *, method: str = "rows",
+               max_width: Optional[int] = None, dedupe: bool = False,
+               trim: bool = False) -> Atlas:
+    """Render every frame and pack the results into one RGBA atlas.
+
+    `method`:
+
+      * `rows` (default) — `columns` frames per row, uniform row height.
+      * `skyline` — bottom-left skyline; fast, good for thousands of frames.
+      * `maxrects` — MaxRects best-short-side-fit; tightest, slower.
+
+    The packers lay frames into a strip `max_width` wide (default: about the
+    square root of the total area, never narrower than the widest frame);
+    frames are never rotated. `trim` crops fully transparent borders (the
+    entry's origin moves with the crop), and `dedupe` packs identical rendered
+    frames once — their entries share one rectangle.
+    """
+    if method not in ATLAS_METHODS:
+        raise ValueError(f"unknown atlas method {method!r} (expected one of {ATLAS_METHODS})")
     rendered = []
     for f in frames:
         ox, oy, w, h, rgba = render_frame(f, tiles, palettes)
+        if trim:
+            left, top, w, h, rgba = _trim(w, h, rgba)
+            ox, oy = ox - left, oy - top
         rendered.append((f.name, ox, oy, w, h, rgba))
 
-    # Greedy row packing
-    entries: list[AtlasEntry] = []
-    rows: list[list[tuple]] = []
-    cur_row: list[tuple] = []
-    for item in rendered:
-        cur_row.append(item)
-        if len(cur_row) == columns:
-            rows.append(cur_row)
-            cur_row = []
-    if cur_row:
-        rows.append(cur_row)
-
-    row_heights = [max((h for _, _, _, _, h, _ in r), default=0) for r in rows]
-    row_widths = [sum(w + padding for _, _, _, w, _, _ in r) - padding if r else 0 for r in rows]
-    atlas_w = max(row_widths) if row_widths else 0
-    atlas_h = sum(row_heights) + padding * (len(rows) - 1 if rows else 0)
-    buf = bytearray(atlas_w * atlas_h * 4)
+    # Unique images to place, and which one each frame shows.
+    images: list[tuple[int, int, bytes]] = []
+    slot_of: list[int] = []
+    seen: dict[tuple[int, int, bytes], int] = {}
+    for _, _, _, w, h, rgba in rendered:
+        key = (w, h, rgba)
+        slot = seen.get(key) if dedupe else None
+        if slot is None:
+            slot = len(images)
+            images.append(key)
+            if dedupe:
+                seen[key] = slot
+        slot_of.append(slot)
 
-    y_cursor = 0
-    for row, row_h in zip(rows, row_heights):
-        x_cursor = 0
-        for name, ox, oy, w, h, rgba in row:
-            for yy in range(h):
-                src = yy * w * 4
-                dst = ((y_cursor + yy) * atlas_w + x_cursor) * 4
-                buf[dst:dst + w * 4] = rgba[src:src + w * 4]
-            entries.append(AtlasEntry(name=name, x=x_cursor, y=y_cursor,
-                                      width=w, height=h, origin_x=ox, origin_y=oy))
-            x_cursor += w + padding
-        y_cursor += row_h + padding
+    if method == "rows":
+        positions = _pack_rows([(w, h) for w, h, _ in images], columns, padding)
+    else:
+        padded = [(w + padding, h + padding) if w and h else (0, 0) for w, h, _ in images]
+        if max_width is None:
+            area = sum(w * h for w, h in padded)
+            max_width = int(area ** 0.5 + 0.5)
+        strip = max([max_width] + [w for w, _ in padded])
+        placeable = [i for i, (w, h) in enumerate(padded) if w and h]
+        pack = _pack_skyline if method == "skyline" else _pack_maxrects
+        placed = pack([padded[i] for i in placeable], strip) if placeable else []
+        positions = [(0, 0)] * len(images)
+        for i, xy in zip(placeable, placed):
+            positions[i] = xy
 
+    atlas_w = max((x + w for (x, _), (w, _, _) in zip(positions, images)), default=0)
+    atlas_h = max((y + h for (_, y), (_, h, _) in zip(positions, images)), default=0)
+    buf = bytearray(atlas_w * atlas_h * 4)
+    for (x, y), (w, h, rgba) in zip(positions, images):
+        if not w:
+            continue
+        row = w * 4
+        dst = (y * atlas_w + x) * 4
+        for src in range(0, h * row, row):
+            buf[dst:dst + row] = rgba[src:src + row]
+            dst += atlas_w * 4
+
+    entries: list[AtlasEntry] = []
+    for (name, ox, oy, w, h, _), slot in zip(rendered, slot_of):
+        x, y = positions[slot]
+        entries.append(AtlasEntry(name=name, x=x, y=y, width=w, height=h,
+                                  origin_x=ox, origin_y=oy))
     return Atlas(width=atlas_w, height=atlas_h, rgba=bytes(buf), entries=entries)
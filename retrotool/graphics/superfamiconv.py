@@ -6,17 +6,25 @@ the bundled `retrotool_libsfx` wheel, falls back to `$PATH`.
 Usage:
     from retrotool.graphics import png_to_tiles, png_to_palette, png_to_map
     tiles = png_to_tiles("sprite.png", bpp=4)
+
+`encode_png` encodes in-process when the palette is fixed (no palette
+optimisation needed) and only shells out to SuperFamiconv otherwise.
 """
 from __future__ import annotations
 
 import struct
 import subprocess
 import tempfile
+from array import array
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 from retrotool._toolchain import ToolchainError, superfamiconv
+from retrotool.graphics.png import PngFormatError, read_png
+from retrotool.graphics.tileindex import dedupe_sheet
+from retrotool.graphics.tilemap import Tilemap
+from retrotool.graphics.tiles import encode_tile_sheet
 
 
 # Back-compat alias. New code should import ToolchainError from retrotool.
@@ -164,15 +172,26 @@ class EncodedGraphics:
 
     tiles    — raw planar tile bytes (deduplicated unless no_discard)
     palette  — raw BGR555 palette bytes (`colors` * `palettes` words)
-    entries  — flat row-major list[TilemapEntry] (len == cols*rows), referencing
-               `tiles`; .palette is the SuperFamiconv subpalette index
+    tilemap  — `Tilemap` of raw words (cols x rows), referencing `tiles`; the
+               palette field is the SuperFamiconv subpalette index
     cols/rows — tilemap dimensions (image size / tile size)
+    entries  — flat row-major list[TilemapEntry], built on demand from `tilemap`
     """
     tiles: bytes
     palette: bytes
-    entries: list  # list[TilemapEntry]
-    cols: int
-    rows: int
+    tilemap: Tilemap
+
+    @property
+    def cols(self) -> int:
+        return self.tilemap.width
+
+    @property
+    def rows(self) -> int:
+        return self.tilemap.height
+
+    @property
+    def entries(self) -> list:
+        return [e for row in self.tilemap.to_entries() for e in row]
 
     def subpalette_colors(self, sub: int, count: int = 4) -> list[tuple[int, int, int]]:
         """RGB888 of the `count` colours in subpalette `sub` (for remapping)."""
@@ -185,6 +204,97 @@ class EncodedGraphics:
         return out
 
 
+ENCODE_ENGINES = ("auto", "native", "superfamiconv")
+
+
+class NativeEncodeError(ValueError):
+    """The in-process encoder can't handle this PNG / option combination."""
+
+
+def _snes_word(r: int, g: int, b: int) -> int:
+    return (r >> 3) | ((g >> 3) << 5) | ((b >> 3) << 10)
+
+
+def _encode_png_native(
+    png: str | Path,
+    *,
+    bpp: int,
+    colors: int,
+    fixed_palette: bytes,
+    no_flip: bool,
+    no_discard: bool,
+) -> EncodedGraphics:
+    """Encode `png` against `fixed_palette` without SuperFamiconv.
+
+    Colours are matched in SNES (BGR555) space. Each 8x8 tile takes the first
+    subpalette holding all of its colours; alpha-0 pixels and the subpalette's
+    colour 0 become index 0. Tiles are deduplicated in raster order through a
+    `TileIndex` (first occurrence wins; flipped matches unless `no_flip`).
+    """
+    if colors > (1 << bpp):
+        raise NativeEncodeError(f"{colors} colours don't fit {bpp}bpp tiles")
+    try:
+        img = read_png(png)
+    except PngFormatError as exc:
+        raise NativeEncodeError(str(exc)) from None
+    if img.width % 8 or img.height % 8:
+        raise NativeEncodeError(
+            f"{png}: {img.width}x{img.height} is not a multiple of the 8x8 tile size")
+    words = [fixed_palette[i] | (fixed_palette[i + 1] << 8)
+             for i in range(0, len(fixed_palette) - 1, 2)]
+    subs = [words[k:k + colors] for k in range(0, len(words) - colors + 1, colors)]
+    if not subs:
+        raise NativeEncodeError("fixed palette holds no complete subpalette")
+    # Per subpalette: SNES colour word → first index holding it.
+    lookups = []
+    for sub in subs:
+        lut: dict[int, int] = {}
+        for i, w in enumerate(sub):
+            lut.setdefault(w & 0x7FFF, i)
+        lookups.append(lut)
+
+    rgba = img.rgba
+    cols, rows = img.width // 8, img.height // 8
+    stride = img.width * 4
+    # Pixel RGBA value → SNES word (None = transparent), shared across tiles.
+    word_of: dict[bytes, Optional[int]] = {}
+    tiles: list[bytes] = []
+    pals: list[int] = []
+    for ty in range(rows):
+        for tx in range(cols):
+            px = []
+            for y in range(8):
+                start = (ty * 8 + y) * stride + tx * 32
+                line = rgba[start:start + 32]
+                for x in range(0, 32, 4):
+                    key = line[x:x + 4]
+                    w = word_of.get(key, -1)
+                    if w == -1:
+                        w = word_of[key] = (
+                            None if key[3] == 0 else _snes_word(key[0], key[1], key[2]))
+                    px.append(w)
+            needed = {w for w in px if w is not None}
+            for sub_index, lut in enumerate(lookups):
+                if needed.issubset(lut.keys()):
+                    break
+            else:
+                raise NativeEncodeError(
+                    f"{png}: tile ({tx},{ty}) has colours outside every subpalette")
+            tiles.append(bytes(0 if w is None else lut[w] for w in px))
+            pals.append(sub_index)
+    if no_discard:
+        unique = b"".join(tiles)
+        refs = [(i, False, False) for i in range(len(tiles))]
+    else:
+        unique, refs = dedupe_sheet(b"".join(tiles), flips=not no_flip)
+    words = array("H", (index | (pal << 10) | (h << 14) | (v << 15)
+                        for (index, h, v), pal in zip(refs, pals)))
+    return EncodedGraphics(
+        tiles=encode_tile_sheet(unique, bpp), palette=fixed_palette,
+        tilemap=Tilemap(cols, rows, words),
+    )
+
+
 def encode_png(
     png: str | Path,
     *,
@@ -198,21 +308,43 @@ def encode_png(
     tile_width: int = 8,
     tile_height: int = 8,
     fixed_palette: Optional[bytes] = None,
+    engine: str = "auto",
 ) -> EncodedGraphics:
-    """PNG -> (tiles, palette, tilemap entries) in one SuperFamiconv pass.
+    """PNG -> (tiles, palette, `Tilemap`) in one SuperFamiconv pass.
 
     The three SuperFamiconv stages are run with a shared palette so the returned
     tiles and map are mutually consistent. Use this as the reusable building
     block for "insert edited word-art / graphics back into a ROM" workflows;
-    pair with `retrotool.graphics.project_tilemap` to place the entries into an
+    pair with `retrotool.graphics.project_tilemap` to place the map into an
     engine-specific (sparse / windowed) destination tilemap.
 
     `fixed_palette` (raw BGR555 bytes) skips SuperFamiconv's palette extraction
     and packs against the supplied order instead — required when reinserting into
     a ROM whose CGRAM order is fixed, so pixel indices match (see
     `grouped_palette_bytes` / `png_palette_rgb`).
+
+    `engine`: with a fixed palette, 8x8 tiles and `mode="snes"`, `"auto"`
+    (default) encodes in-process (`_encode_png_native`) — no subprocesses or
+    temp files — and falls back to SuperFamiconv for anything it can't handle.
+    Palette optimisation always needs SuperFamiconv. `"native"` never falls
+    back (raises `NativeEncodeError`); `"superfamiconv"` always shells out.
     """
-    from retrotool.graphics.tilemap import TilemapEntry
+    if engine not in ENCODE_ENGINES:
+        raise ValueError(f"unknown encode engine {engine!r} (expected one of {ENCODE_ENGINES})")
+    if engine != "superfamiconv":
+        native_ok = (fixed_palette is not None and mode == "snes"
+                     and (tile_width, tile_height) == (8, 8))
+        if native_ok:
+            try:
+                return _encode_png_native(
+                    png, bpp=bpp, colors=colors, fixed_palette=fixed_palette,
+                    no_flip=no_flip, no_discard=no_discard)
+            except NativeEncodeError:
+                if engine == "native":
+                    raise
+        elif engine == "native":
+            raise NativeEncodeError(
+                "in-process encode needs fixed_palette, mode='snes' and 8x8 tiles")
 
     w, h = _png_dimensions(png)
     with tempfile.TemporaryDirectory() as td:
@@ -233,9 +365,7 @@ def encode_png(
             png, tiles=til_p, palette=pal_p, bpp=bpp, mode=mode,
             tile_width=tile_width, tile_height=tile_height)
 
-    entries = [TilemapEntry.from_word(map_bytes[i] | (map_bytes[i + 1] << 8))
-               for i in range(0, len(map_bytes), 2)]
     return EncodedGraphics(
         tiles=tiles, palette=pal_bytes,
-        entries=entries, cols=w // tile_width, rows=h // tile_height,
+        tilemap=Tilemap.decode(map_bytes, 0, w // tile_width, h // tile_height),
     )
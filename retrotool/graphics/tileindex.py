@@ -0,0 +1,127 @@
+"""Flip-aware tile deduplication.
+
+`TileIndex` keeps the unique 8x8 tiles seen so far and answers, for any tile,
+which stored tile it is and with which flips — the `(index, h_flip, v_flip)`
+triple a SNES tilemap entry encodes. Tiles are the flat 64-byte index form
+(`Tile.data` / `decode_tile_sheet` output).
+
+Every stored tile is hashed under all four orientations (as-is, H, V, HV), so
+a lookup is one dict probe whatever the flip. `add_sheet` derives the flipped
+variants for a whole sheet at once: reversing the flat buffer flips every tile
+both ways (and reverses tile order), and an 8-byte row view reorders rows for
+the V flip, so per-tile Python work is just the probe.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from retrotool.graphics.tiles import TILE_H, TILE_W, encode_tile_sheet
+
+TileRef = tuple[int, bool, bool]     # (unique tile index, h_flip, v_flip)
+
+_TILE_PX = TILE_W * TILE_H
+
+
+def _vflip_sheet(sheet: bytes) -> bytes:
+    """Every tile of a flat index sheet flipped vertically (rows reversed)."""
+    rows = memoryview(sheet).cast("Q")       # one 8-pixel row per item
+    out = bytearray(len(sheet))
+    flipped = memoryview(out).cast("Q")
+    for y in range(TILE_H):
+        flipped[y::TILE_H] = rows[TILE_H - 1 - y::TILE_H]
+    return bytes(out)
+
+
+def _variants(data: bytes) -> list[tuple[bytes, bool, bool]]:
+    v = _vflip_sheet(data)
+    return [(data, False, False), (v[::-1], True, False), (v, False, True),
+            (data[::-1], True, True)]
+
+
+class TileIndex:
+    """Unique tiles in first-seen order, with flip-aware lookup.
+
+    `flips=False` matches tiles only as-is (for sprite sheets or hardware
+    without flip bits).
+    """
+
+    __slots__ = ("flips", "tiles", "_refs")
+
+    def __init__(self, *, flips: bool = True) -> None:
+        self.flips = flips
+        self.tiles: list[bytes] = []
+        self._refs: dict[bytes, TileRef] = {}
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def find(self, data: bytes) -> Optional[TileRef]:
+        """The stored tile `data` shows, or `None`."""
+        return self._refs.get(bytes(data))
+
+    def _store(self, data: bytes, variants) -> TileRef:
+        index = len(self.tiles)
+        self.tiles.append(data)
+        refs = self._refs
+        for vdata, h, v in variants:
+            refs.setdefault(vdata, (index, h, v))
+        return (index, False, False)
+
+    def add(self, data: bytes) -> TileRef:
+        """Look `data` up, storing it as a new unique tile on a miss."""
+        data = bytes(data)
+        if len(data) != _TILE_PX:
+            raise ValueError(f"tile needs {_TILE_PX} pixels, got {len(data)}")
+        ref = self._refs.get(data)
+        if ref is not None:
+            return ref
+        variants = _variants(data) if self.flips else [(data, False, False)]
+        return self._store(data, variants)
+
+    def add_sheet(self, sheet: bytes) -> list[TileRef]:
+        """`add` every tile of a flat index sheet; one ref per tile."""
+        sheet = bytes(sheet)
+        if len(sheet) % _TILE_PX:
+            raise ValueError(
+                f"sheet length {len(sheet)} is not a multiple of {_TILE_PX}"
+            )
+        n = len(sheet) // _TILE_PX
+        if self.flips:
+            vsheet = _vflip_sheet(sheet)
+            hvsheet = sheet[::-1]                # tile k ↔ tile n-1-k
+            hsheet = vsheet[::-1]
+        refs_get = self._refs.get
+        out: list[TileRef] = []
+        for i in range(n):
+            lo = i * _TILE_PX
+            data = sheet[lo:lo + _TILE_PX]
+            ref = refs_get(data)
+            if ref is None:
+                if self.flips:
+                    rlo = (n - 1 - i) * _TILE_PX
+                    variants = [
+                        (data, False, False),
+                        (hsheet[rlo:rlo + _TILE_PX], True, False),
+                        (vsheet[lo:lo + _TILE_PX], False, True),
+                        (hvsheet[rlo:rlo + _TILE_PX], True, True),
+                    ]
+                else:
+                    variants = [(data, False, False)]
+                ref = self._store(data, variants)
+            out.append(ref)
+        return out
+
+    def sheet(self) -> bytes:
+        """The unique tiles as one flat index sheet."""
+        return b"".join(self.tiles)
+
+    def to_planar(self, bpp: int) -> bytes:
+        """The unique tiles encoded as SNES planar tile data."""
+        return encode_tile_sheet(self.sheet(), bpp)
+
+
+def dedupe_sheet(sheet: bytes, *, flips: bool = True) -> tuple[bytes, list[TileRef]]:
+    """Deduplicate a flat index sheet → (unique sheet, one ref per input tile)."""
+    index = TileIndex(flips=flips)
+    refs = index.add_sheet(sheet)
+    return index.sheet(), refs
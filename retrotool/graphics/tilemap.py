@@ -6,13 +6,22 @@ SNES BG tilemap entry (16-bit word):
   bit  13    : priority
   bit  14    : H flip
   bit  15    : V flip
+
+`Tilemap` holds a whole map as one `array('H')` of raw words; its field
+accessors work on the word buffer's high / low byte planes with
+`bytes.translate`, so no per-cell objects are built. `render_tilemap`,
+`project_tilemap` and `graphics.ppu` accept it (or any grid of raw words)
+wherever they take `TilemapEntry` grids.
 """
 from __future__ import annotations
 
+import sys
+from array import array
 from dataclasses import dataclass
-from typing import Sequence
+from typing import Iterator, Sequence, Union
 
-from retrotool.graphics.tiles import TILE_H, TILE_W, Tile
+from retrotool.graphics.palette import RgbaLut, lut_for
+from retrotool.graphics.tiles import TILE_H, TILE_W, Tile, _blit
 
 
 @dataclass
@@ -43,20 +52,136 @@ class TilemapEntry:
         )
 
 
+# High-byte → field tables (palette bits 10-12, priority 13, flips 14/15).
+_HI_TILE = bytes(b & 0x03 for b in range(256))
+_HI_PALETTE = bytes((b >> 2) & 0x07 for b in range(256))
+_HI_PRIORITY = bytes((b >> 5) & 1 for b in range(256))
+_HI_HFLIP = bytes((b >> 6) & 1 for b in range(256))
+_HI_VFLIP = bytes((b >> 7) & 1 for b in range(256))
+
+
+class Tilemap:
+    """A `width` x `height` tilemap stored as raw 16-bit words, row-major.
+
+    Indexing a `Tilemap` yields rows (`array('H')` slices), so it works as a
+    grid of words. The field accessors return one value per cell in row-major
+    order: `tile_indices()` as `array('H')`, the rest as `bytes`.
+    """
+
+    __slots__ = ("width", "height", "words")
+
+    def __init__(self, width: int, height: int, words: "array | None" = None) -> None:
+        if words is None:
+            words = array("H", bytes(width * height * 2))
+        elif not isinstance(words, array) or words.typecode != "H":
+            words = array("H", words)
+        if len(words) != width * height:
+            raise ValueError(
+                f"tilemap {width}x{height} needs {width * height} words, got {len(words)}"
+            )
+        self.width = width
+        self.height = height
+        self.words = words
+
+    @classmethod
+    def decode(cls, data: bytes, offset: int, width: int, height: int) -> "Tilemap":
+        """Read `width * height` little-endian words at `offset`."""
+        n = width * height
+        raw = data[offset:offset + n * 2]
+        if len(raw) < n * 2:
+            raise ValueError(
+                f"tilemap data truncated: {width}x{height} needs {n * 2} bytes "
+                f"at {offset:#x}, have {len(raw)}"
+            )
+        words = array("H")
+        words.frombytes(raw)
+        if sys.byteorder == "big":
+            words.byteswap()
+        return cls(width, height, words)
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[Sequence["TilemapEntry | int"]]) -> "Tilemap":
+        height = len(entries)
+        width = len(entries[0]) if height else 0
+        return cls(width, height, array("H", (
+            e if isinstance(e, int) else e.to_word() for row in entries for e in row
+        )))
+
+    def to_bytes(self) -> bytes:
+        """The map as little-endian words (the `encode_tilemap` layout)."""
+        if sys.byteorder == "big":
+            words = array("H", self.words)
+            words.byteswap()
+            return words.tobytes()
+        return self.words.tobytes()
+
+    def to_entries(self) -> list[list["TilemapEntry"]]:
+        from_word = TilemapEntry.from_word
+        return [[from_word(w) for w in row] for row in self]
+
+    def entry(self, x: int, y: int) -> "TilemapEntry":
+        return TilemapEntry.from_word(self.words[y * self.width + x])
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __getitem__(self, y: int) -> array:
+        if not -self.height <= y < self.height:
+            raise IndexError(f"tilemap row {y} out of range")
+        y %= self.height
+        return self.words[y * self.width:(y + 1) * self.width]
+
+    def __iter__(self) -> Iterator[array]:
+        w = self.width
+        for y in range(self.height):
+            yield self.words[y * w:(y + 1) * w]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Tilemap):
+            return NotImplemented
+        return (self.width, self.height, self.words) == (other.width, other.height, other.words)
+
+    def _high(self) -> bytes:
+        return self.to_bytes()[1::2]
+
+    def tile_indices(self) -> array:
+        raw = self.to_bytes()
+        out = bytearray(len(raw))
+        out[0::2] = raw[0::2]
+        out[1::2] = raw[1::2].translate(_HI_TILE)
+        tiles = array("H")
+        tiles.frombytes(bytes(out))
+        if sys.byteorder == "big":
+            tiles.byteswap()
+        return tiles
+
+    def palettes(self) -> bytes:
+        return self._high().translate(_HI_PALETTE)
+
+    def priorities(self) -> bytes:
+        return self._high().translate(_HI_PRIORITY)
+
+    def h_flips(self) -> bytes:
+        return self._high().translate(_HI_HFLIP)
+
+    def v_flips(self) -> bytes:
+        return self._high().translate(_HI_VFLIP)
+
+    def tile_rows(self) -> list[array]:
+        """Tile indices as rows — e.g. `extraction.level.TileLayer.tile_indices`."""
+        tiles = self.tile_indices()
+        w = self.width
+        return [tiles[y * w:(y + 1) * w] for y in range(self.height)]
+
+
 def decode_tilemap(data: bytes, offset: int, width: int, height: int) -> list[list[TilemapEntry]]:
-    out: list[list[TilemapEntry]] = []
-    for y in range(height):
-        row: list[TilemapEntry] = []
-        for x in range(width):
-            i = offset + (y * width + x) * 2
-            word = data[i] | (data[i + 1] << 8)
-            row.append(TilemapEntry.from_word(word))
-        out.append(row)
-    return out
+    """Decode to `TilemapEntry` grid. Use `Tilemap.decode` to skip building
+    per-cell objects."""
+    return Tilemap.decode(data, offset, width, height).to_entries()
 
 
 def project_tilemap(
-    entries: Sequence[TilemapEntry],
+    entries: Union[Sequence[TilemapEntry], Sequence[int], "Tilemap"],
     src_cols: int,
     src_rows: int,
     *,
@@ -70,6 +195,7 @@ def project_tilemap(
 ) -> bytes:
     """Place a small `src_cols`x`src_rows` tilemap (flat, row-major `entries`)
     into a larger destination tilemap stream, returning `dest_entries`*2 bytes.
+    `entries` may also be raw tilemap words or a `Tilemap`.
 
     For engines that DMA a fixed window of a BG tilemap (the rest stays blank),
     this re-projects a freshly-encoded plate into the right window:
@@ -86,29 +212,33 @@ def project_tilemap(
 
     Cells whose destination slot falls outside [0, dest_entries) are dropped.
     """
+    if isinstance(entries, Tilemap):
+        entries = entries.words
     out = bytearray(dest_entries * 2)
+    prio_bit = 0x2000 if force_priority else 0
     for iy in range(src_rows):
         for ix in range(src_cols):
             e = entries[iy * src_cols + ix]
-            if skip_tiles is not None and e.tile in skip_tiles:
+            if isinstance(e, int):
+                word, tile, pal = e, e & 0x3FF, (e >> 10) & 7
+            else:
+                word, tile, pal = e.to_word(), e.tile, e.palette
+            if skip_tiles is not None and tile in skip_tiles:
                 continue
-            pal = palette_remap.get(e.palette, e.palette) if palette_remap else e.palette
-            placed = TilemapEntry(
-                tile=e.tile + tile_base,
-                palette=pal,
-                priority=force_priority or e.priority,
-                h_flip=e.h_flip,
-                v_flip=e.v_flip,
-            )
+            if palette_remap:
+                pal = palette_remap.get(pal, pal)
             slot = base_entry + iy * dest_cols + ix
             if 0 <= slot < dest_entries:
-                w = placed.to_word()
+                w = (((tile + tile_base) & 0x3FF) | ((pal & 0x7) << 10)
+                     | (word & 0xE000) | prio_bit)
                 out[slot * 2] = w & 0xFF
                 out[slot * 2 + 1] = (w >> 8) & 0xFF
     return bytes(out)
 
 
-def encode_tilemap(entries: Sequence[Sequence[TilemapEntry]]) -> bytes:
+def encode_tilemap(entries: Union[Sequence[Sequence[TilemapEntry]], Tilemap]) -> bytes:
+    if isinstance(entries, Tilemap):
+        return entries.to_bytes()
     out = bytearray()
     for row in entries:
         for e in row:
@@ -118,7 +248,7 @@ def encode_tilemap(entries: Sequence[Sequence[TilemapEntry]]) -> bytes:
     return bytes(out)
 
 
-def render_tilemap(entries: Sequence[Sequence[TilemapEntry]], tiles: Sequence[Tile],
+def render_tilemap(entries: Union[Sequence[Sequence[TilemapEntry]], Tilemap], tiles: Sequence[Tile],
                    palettes: Sequence, transparent_if_priority: bool = False) -> tuple[int, int, bytes]:
     """Render a tilemap grid into an RGBA buffer. palettes is list of Palette objects.
 
@@ -140,20 +270,30 @@ def render_tilemap(entries: Sequence[Sequence[TilemapEntry]], tiles: Sequence[Ti
     out_w = w * TILE_W
     out_h = h * TILE_H
     buf = bytearray(out_w * out_h * 4)  # zero-init -> fully transparent
+    stride = out_w * 4
+    luts: dict[int, RgbaLut] = {}
+    blocks: dict[tuple[int, int, int], bytes] = {}
     for ty, row in enumerate(entries):
         for tx, e in enumerate(row):
-            if transparent_if_priority and e.priority:
+            if isinstance(e, int):
+                t, pal, prio, flip = e & 0x3FF, (e >> 10) & 7, e & 0x2000, e >> 14
+            else:
+                t, pal, prio = e.tile, e.palette, e.priority
+                flip = (1 if e.h_flip else 0) | (2 if e.v_flip else 0)
+            if transparent_if_priority and prio:
                 # Skip — leaves this tile's 8x8 pixel region at the buffer's
                 # zero-init RGBA(0,0,0,0), i.e. fully transparent.
                 continue
-            tile = tiles[e.tile]
-            if e.h_flip or e.v_flip:
-                tile = tile.flipped(h=e.h_flip, v=e.v_flip)
-            pal = palettes[e.palette] if e.palette < len(palettes) else palettes[0]
-            for y in range(TILE_H):
-                dst = ((ty * TILE_H + y) * out_w + tx * TILE_W) * 4
-                for x in range(TILE_W):
-                    r, g, b, a = pal.rgba(tile.pixels[y][x])
-                    buf[dst] = r; buf[dst + 1] = g; buf[dst + 2] = b; buf[dst + 3] = a
-                    dst += 4
+            pal_index = pal if pal < len(palettes) else 0
+            key = (t, flip, pal_index)
+            rgba = blocks.get(key)
+            if rgba is None:
+                tile = tiles[t]
+                if flip:
+                    tile = tile.flipped(h=bool(flip & 1), v=bool(flip & 2))
+                lut = luts.get(pal_index)
+                if lut is None:
+                    lut = luts[pal_index] = lut_for(palettes[pal_index])
+                rgba = blocks[key] = lut.convert(tile.data)
+            _blit(buf, stride, tx * TILE_W, ty * TILE_H, rgba)
     return out_w, out_h, bytes(buf)
@@ -1,8 +1,9 @@
 """SNES planar tile codec. 1BPP-IL, 2BPP, 4BPP, 8BPP. 8x8 tiles."""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, Sequence
+from typing import Iterable, Optional, Sequence
+
+from retrotool.graphics.palette import lut_for
 
 TILE_W = 8
 TILE_H = 8
@@ -11,6 +12,111 @@ TILE_H = 8
 TILE_BYTES = {1: 8, 2: 16, 4: 32, 8: 64}
 
 
+# ---- sheet codec -----------------------------------------------------------
+#
+# A tile sheet is decoded to one flat `bytes` of palette indices — tile-major,
+# then row, then column (the `(N, 8, 8)` layout, 64 bytes per tile). Both
+# directions work a whole plane at a time with C-level bulk operations instead
+# of per-pixel loops:
+#
+#   * strided slicing gathers one plane's row bytes for every tile
+#     (`region[pair*16 + 2*y :: tile_bytes]`);
+#   * `bytes.translate` with a per-(plane, column) table turns each row byte
+#     into that column's contribution (`bit << plane`, or back again);
+#   * contributions never share bits, so OR-ing them as big integers
+#     (`int.from_bytes`) merges a whole column across the sheet at once;
+#   * strided slice assignment interleaves columns / planes into the output.
+
+# _DECODE_LUT[plane][x]: planar row byte → (bit of column x) << plane.
+_DECODE_LUT = [
+    [bytes(((b >> (7 - x)) & 1) << plane for b in range(256)) for x in range(TILE_W)]
+    for plane in range(8)
+]
+# _ENCODE_LUT[plane][x]: palette index → (bit `plane` of it) << (7 - x).
+_ENCODE_LUT = [
+    [bytes(((v >> plane) & 1) << (7 - x) for v in range(256)) for x in range(TILE_W)]
+    for plane in range(8)
+]
+
+
+def _or_bytes(parts: Iterable[bytes], size: int) -> bytes:
+    """Bitwise OR of equal-length byte strings whose set bits don't overlap."""
+    acc = 0
+    for part in parts:
+        acc |= int.from_bytes(part, 'big')
+    return acc.to_bytes(size, 'big')
+
+
+def _plane_rows(region: bytes, count: int, bpp: int, plane: int) -> bytes:
+    """One byte per tile row (tile-major) holding bitplane `plane`."""
+    if bpp == 1:
+        return bytes(region)
+    size = TILE_BYTES[bpp]
+    out = bytearray(count * TILE_H)
+    base = (plane // 2) * 16 + (plane & 1)
+    for y in range(TILE_H):
+        out[y::TILE_H] = region[base + 2 * y::size]
+    return bytes(out)
+
+
+def decode_tile_sheet(data: bytes, offset: int, count: int, bpp: int) -> bytes:
+    """Decode `count` consecutive planar tiles → `count * 64` palette indices.
+
+    Output is the `(count, 8, 8)` index array flattened: tile `i`, row `y`,
+    column `x` lives at `i * 64 + y * 8 + x`. Same planar layouts as
+    `decode_tile` (1BPP-IL, 2/4/8BPP plane pairs).
+    """
+    if bpp not in TILE_BYTES:
+        raise ValueError(f"Unsupported bpp: {bpp}")
+    size = TILE_BYTES[bpp]
+    region = data[offset:offset + count * size]
+    if len(region) < count * size:
+        raise ValueError(
+            f"tile data truncated: {count} x {bpp}bpp tiles need {count * size} "
+            f"bytes at {offset:#x}, have {len(region)}"
+        )
+    n_rows = count * TILE_H
+    planes = [_plane_rows(region, count, bpp, k) for k in range(bpp)]
+    out = bytearray(n_rows * TILE_W)
+    for x in range(TILE_W):
+        out[x::TILE_W] = _or_bytes(
+            (planes[k].translate(_DECODE_LUT[k][x]) for k in range(bpp)), n_rows,
+        )
+    return bytes(out)
+
+
+def encode_tile_sheet(indices: bytes, bpp: int) -> bytes:
+    """Inverse of `decode_tile_sheet`: flat `(N, 8, 8)` indices → planar bytes.
+
+    Index bits above `bpp` are ignored, as with `encode_tile`.
+    """
+    if bpp not in TILE_BYTES:
+        raise ValueError(f"Unsupported bpp: {bpp}")
+    if len(indices) % (TILE_W * TILE_H):
+        raise ValueError(
+            f"index buffer length {len(indices)} is not a multiple of "
+            f"{TILE_W * TILE_H}"
+        )
+    count = len(indices) // (TILE_W * TILE_H)
+    n_rows = count * TILE_H
+    columns = [indices[x::TILE_W] for x in range(TILE_W)]
+    planes = [
+        _or_bytes((columns[x].translate(_ENCODE_LUT[k][x]) for x in range(TILE_W)), n_rows)
+        for k in range(bpp)
+    ]
+    if bpp == 1:
+        return planes[0]
+    size = TILE_BYTES[bpp]
+    out = bytearray(count * size)
+    for k, rows in enumerate(planes):
+        base = (k // 2) * 16 + (k & 1)
+        for y in range(TILE_H):
+            out[base + 2 * y::size] = rows[y::TILE_H]
+    return bytes(out)
+
+
+# ---- per-tile API (views over the sheet codec) ------------------------------
+
 def decode_tile(data: bytes, offset: int, bpp: int) -> list[list[int]]:
     """Decode a single 8x8 planar tile → 8-row list of 8-col palette indices.
 
@@ -20,81 +126,98 @@ def decode_tile(data: bytes, offset: int, bpp: int) -> list[list[int]]:
       8BPP: 4 plane-pair groups × 16 bytes = 64 bytes
       1BPP-IL: 8 rows × 1 byte (single plane)
     """
-    if bpp not in TILE_BYTES:
-        raise ValueError(f"Unsupported bpp: {bpp}")
-    if bpp == 1:
-        return _decode_1bpp(data, offset)
-    return _decode_planar_pairs(data, offset, bpp)
-
-
-def _decode_1bpp(data: bytes, offset: int) -> list[list[int]]:
-    out = [[0] * TILE_W for _ in range(TILE_H)]
-    for y in range(TILE_H):
-        b = data[offset + y]
-        for x in range(TILE_W):
-            out[y][x] = (b >> (7 - x)) & 1
-    return out
-
-
-def _decode_planar_pairs(data: bytes, offset: int, bpp: int) -> list[list[int]]:
-    out = [[0] * TILE_W for _ in range(TILE_H)]
-    pairs = bpp // 2                           # 1 for 2BPP, 2 for 4BPP, 4 for 8BPP
-    for pair in range(pairs):
-        base = offset + pair * 16              # each plane-pair = 16 bytes
-        low_plane_bit = pair * 2
-        for y in range(TILE_H):
-            lo = data[base + y * 2]
-            hi = data[base + y * 2 + 1]
-            for x in range(TILE_W):
-                bit = 7 - x
-                v0 = (lo >> bit) & 1
-                v1 = (hi >> bit) & 1
-                out[y][x] |= (v0 << low_plane_bit) | (v1 << (low_plane_bit + 1))
-    return out
+    px = decode_tile_sheet(data, offset, 1, bpp)
+    return [list(px[y * TILE_W:(y + 1) * TILE_W]) for y in range(TILE_H)]
 
 
 def encode_tile(pixels: Sequence[Sequence[int]], bpp: int) -> bytes:
     """Inverse of decode_tile. `pixels` is 8x8 palette indices."""
-    if bpp not in TILE_BYTES:
-        raise ValueError(f"Unsupported bpp: {bpp}")
-    if bpp == 1:
-        return _encode_1bpp(pixels)
-    return _encode_planar_pairs(pixels, bpp)
+    return encode_tile_sheet(bytes(v & 0xFF for row in pixels for v in row[:TILE_W]), bpp)
 
 
-def _encode_1bpp(pixels: Sequence[Sequence[int]]) -> bytes:
-    out = bytearray(TILE_H)
-    for y in range(TILE_H):
-        b = 0
-        for x in range(TILE_W):
-            b |= (pixels[y][x] & 1) << (7 - x)
-        out[y] = b
-    return bytes(out)
+_TILE_PX = TILE_W * TILE_H
 
 
-def _encode_planar_pairs(pixels: Sequence[Sequence[int]], bpp: int) -> bytes:
-    pairs = bpp // 2
-    out = bytearray(TILE_BYTES[bpp])
-    for pair in range(pairs):
-        base = pair * 16
-        low_plane_bit = pair * 2
-        for y in range(TILE_H):
-            lo = hi = 0
-            for x in range(TILE_W):
-                px = pixels[y][x]
-                v0 = (px >> low_plane_bit) & 1
-                v1 = (px >> (low_plane_bit + 1)) & 1
-                lo |= v0 << (7 - x)
-                hi |= v1 << (7 - x)
-            out[base + y * 2] = lo
-            out[base + y * 2 + 1] = hi
-    return bytes(out)
+class _ReadOnlyRows(list):
+    """`Tile.pixels`: reads and compares like a list of lists, but refuses
+    writes. The tile's pixels live in immutable `bytes`, so an in-place edit
+    of a copy would otherwise vanish silently. `copy` / `deepcopy` and
+    slicing give plain, editable lists."""
+
+    __slots__ = ()
+
+    def _read_only(self, *_args, **_kwargs):
+        raise TypeError(
+            "Tile.pixels is read-only; use tile.with_pixel(x, y, value) or "
+            "Tile.from_rows(rows, bpp) to build an edited tile")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> list:
+        return [list(row) if isinstance(row, _ReadOnlyRows) else row for row in self]
+
+    def __reduce_ex__(self, protocol):
+        return list, (self.__deepcopy__(None),)
 
 
-@dataclass
 class Tile:
-    pixels: list[list[int]]
-    bpp: int
+    """One 8x8 tile: 64 palette indices, row-major, in an immutable `bytes`.
+
+    A flat 64-byte `bytes` is ~100 bytes of heap against ~2.5 KB for the
+    equivalent `list[list[int]]`, so a full VRAM tile set stays in the low
+    hundreds of KB. (A `memoryview` into the sheet would avoid the copy but
+    costs more per object than the 64 bytes it saves.) Flipped variants are
+    built once on first use and cached on the tile.
+
+    `Tile(pixels, bpp)` accepts nested rows (as before) or a flat 64-byte
+    buffer. `pixels` reads back as read-only rows: `tile.pixels[y][x] = c`
+    raises `TypeError` (edit through `with_pixel` / `from_rows` instead).
+    """
+
+    __slots__ = ("data", "bpp", "_flips")
+
+    def __init__(self, pixels: "Sequence[Sequence[int]] | bytes", bpp: int) -> None:
+        if isinstance(pixels, (bytes, bytearray, memoryview)):
+            data = bytes(pixels)
+        else:
+            data = bytes(v for row in pixels for v in row[:TILE_W])
+        if len(data) != _TILE_PX:
+            raise ValueError(f"tile needs {_TILE_PX} pixels, got {len(data)}")
+        self.data = data
+        self.bpp = bpp
+        self._flips: Optional[list] = None
+
+    @classmethod
+    def _wrap(cls, data: bytes, bpp: int) -> "Tile":
+        """Adopt an already-validated 64-byte `data` without copying."""
+        tile = cls.__new__(cls)
+        tile.data = data
+        tile.bpp = bpp
+        tile._flips = None
+        return tile
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[int]], bpp: int) -> "Tile":
+        """A tile from 8 rows of 8 palette indices (e.g. edited `pixels`)."""
+        return cls(rows, bpp)
+
+    def with_pixel(self, x: int, y: int, value: int) -> "Tile":
+        """A copy of the tile with pixel (x, y) set to `value`."""
+        if not (0 <= x < TILE_W and 0 <= y < TILE_H):
+            raise IndexError(f"pixel ({x}, {y}) outside the 8x8 tile")
+        i = y * TILE_W + x
+        d = self.data
+        return Tile._wrap(d[:i] + bytes((value & 0xFF,)) + d[i + 1:], self.bpp)
+
+    @property
+    def pixels(self) -> list[list[int]]:
+        d = self.data
+        return _ReadOnlyRows(_ReadOnlyRows(d[y * TILE_W:(y + 1) * TILE_W])
+                             for y in range(TILE_H))
 
     @property
     def width(self) -> int:
@@ -104,37 +227,88 @@ class Tile:
     def height(self) -> int:
         return TILE_H
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Tile):
+            return NotImplemented
+        return self.bpp == other.bpp and self.data == other.data
+
+    def __hash__(self) -> int:
+        return hash((self.data, self.bpp))
+
+    def __repr__(self) -> str:
+        return f"Tile(data={self.data.hex()}, bpp={self.bpp})"
+
     @classmethod
     def decode(cls, data: bytes, offset: int, bpp: int) -> "Tile":
-        return cls(pixels=decode_tile(data, offset, bpp), bpp=bpp)
+        return cls._wrap(decode_tile_sheet(data, offset, 1, bpp), bpp)
 
     def encode(self) -> bytes:
-        return encode_tile(self.pixels, self.bpp)
+        return encode_tile_sheet(self.data, self.bpp)
 
     def flipped(self, h: bool = False, v: bool = False) -> "Tile":
-        px = self.pixels
-        if h:
-            px = [row[::-1] for row in px]
-        if v:
-            px = list(reversed(px))
-        return Tile(pixels=[list(r) for r in px], bpp=self.bpp)
+        """The tile mirrored horizontally and/or vertically (cached)."""
+        key = (1 if h else 0) | (2 if v else 0)
+        if not key:
+            return self
+        flips = self._flips
+        if flips is None:
+            flips = self._flips = [self, None, None, None]
+        tile = flips[key]
+        if tile is None:
+            d = self.data
+            if key == 3:
+                out = d[::-1]
+            else:
+                out = b"".join(d[y * TILE_W:(y + 1) * TILE_W] for y in reversed(range(TILE_H)))
+                if key == 1:
+                    out = out[::-1]
+            tile = flips[key] = Tile._wrap(out, self.bpp)
+        return tile
 
 
 def decode_tiles(data: bytes, offset: int, count: int, bpp: int) -> list[Tile]:
-    size = TILE_BYTES[bpp]
-    return [Tile.decode(data, offset + i * size, bpp) for i in range(count)]
+    px = decode_tile_sheet(data, offset, count, bpp)
+    wrap = Tile._wrap
+    return [wrap(px[base:base + _TILE_PX], bpp) for base in range(0, count * _TILE_PX, _TILE_PX)]
+
+
+# ---- RGBA rendering ----------------------------------------------------------
+#
+# Renderers convert each distinct (tile, flip, palette) once through an
+# `RgbaLut` into a 256-byte RGBA block, then blit it row by row with slice
+# assignment. `palette.rgba(index)` is only called while building the LUT.
+
+_ROW_BYTES = TILE_W * 4
+
+
+def _blit(buf: bytearray, stride: int, x: int, y: int, rgba: bytes) -> None:
+    """Copy an 8x8 RGBA block into `buf` (row pitch `stride` bytes) at (x, y)."""
+    dst = y * stride + x * 4
+    for src in range(0, TILE_H * _ROW_BYTES, _ROW_BYTES):
+        buf[dst:dst + _ROW_BYTES] = rgba[src:src + _ROW_BYTES]
+        dst += stride
+
+
+def _blit_masked(buf: bytearray, stride: int, x: int, y: int,
+                 rgba: bytes, mask: bytes) -> None:
+    """Like `_blit`, but only pixels whose `mask` bytes are FF are written."""
+    full = (1 << (_ROW_BYTES * 8)) - 1
+    dst = y * stride + x * 4
+    for src in range(0, TILE_H * _ROW_BYTES, _ROW_BYTES):
+        m = mask[src:src + _ROW_BYTES]
+        if m.count(0xFF) == _ROW_BYTES:
+            buf[dst:dst + _ROW_BYTES] = rgba[src:src + _ROW_BYTES]
+        elif m.count(0) != _ROW_BYTES:
+            mi = int.from_bytes(m, 'big')
+            cur = int.from_bytes(buf[dst:dst + _ROW_BYTES], 'big')
+            new = int.from_bytes(rgba[src:src + _ROW_BYTES], 'big')
+            buf[dst:dst + _ROW_BYTES] = ((cur & (full ^ mi)) | (new & mi)).to_bytes(_ROW_BYTES, 'big')
+        dst += stride
 
 
 def tile_to_rgba(tile: Tile, palette) -> bytes:
     """Flatten tile pixels to RGBA byte buffer using palette.rgba(index)."""
-    out = bytearray(TILE_W * TILE_H * 4)
-    i = 0
-    for row in tile.pixels:
-        for idx in row:
-            r, g, b, a = palette.rgba(idx)
-            out[i] = r; out[i + 1] = g; out[i + 2] = b; out[i + 3] = a
-            i += 4
-    return bytes(out)
+    return lut_for(palette).convert(tile.data)
 
 
 def composite_to_image(tiles: Iterable[Tile], palette, cols: int, padding_color=(0, 0, 0, 0)):
@@ -145,19 +319,11 @@ def composite_to_image(tiles: Iterable[Tile], palette, cols: int, padding_color=
     rows = (len(tiles) + cols - 1) // cols
     w = cols * TILE_W
     h = rows * TILE_H
-    buf = bytearray(w * h * 4)
-    pr, pg, pb, pa = palette_bg = (*padding_color,) if len(padding_color) == 4 else (*padding_color, 0)
-    # Prefill with padding color
-    for i in range(0, len(buf), 4):
-        buf[i] = palette_bg[0]; buf[i + 1] = palette_bg[1]
-        buf[i + 2] = palette_bg[2]; buf[i + 3] = palette_bg[3]
+    palette_bg = (*padding_color,) if len(padding_color) == 4 else (*padding_color, 0)
+    buf = bytearray(bytes(palette_bg) * (w * h))
+    lut = lut_for(palette)
+    stride = w * 4
     for idx, tile in enumerate(tiles):
-        tx = (idx % cols) * TILE_W
-        ty = (idx // cols) * TILE_H
-        for y in range(TILE_H):
-            dst = ((ty + y) * w + tx) * 4
-            for x in range(TILE_W):
-                r, g, b, a = palette.rgba(tile.pixels[y][x])
-                buf[dst] = r; buf[dst + 1] = g; buf[dst + 2] = b; buf[dst + 3] = a
-                dst += 4
+        _blit(buf, stride, (idx % cols) * TILE_W, (idx // cols) * TILE_H,
+              lut.convert(tile.data))
     return w, h, bytes(buf)
@@ -1,19 +1,45 @@
 """retrotool.heuristics — automated data structure discovery."""
-from retrotool.heuristics.graphics import GraphicsCandidate, scan_graphics, shannon_entropy
-from retrotool.heuristics.mapper import Region, RegionKind, fill_gaps, merge_regions
-from retrotool.heuristics.pointers import PointerTableCandidate, scan_pointer_tables
-from retrotool.heuristics.text import TextBlock, scan_text
+from retrotool.heuristics.graphics import (
+    GraphicsCandidate,
+    scan_graphics,
+    scan_graphics_multi,
+    shannon_entropy,
+)
+from retrotool.heuristics.mapper import (
+    Region,
+    RegionKind,
+    RomMap,
+    classify_rom,
+    fill_gaps,
+    merge_regions,
+    resolve_overlaps,
+)
+from retrotool.heuristics.pointers import (
+    PointerTableCandidate,
+    scan_pointer_tables,
+    scan_pointer_tables_multi,
+    table_targets,
+)
+from retrotool.heuristics.text import TextBlock, scan_text, scan_text_table, table_byte_classes
 
 __all__ = [
     "PointerTableCandidate",
     "scan_pointer_tables",
+    "scan_pointer_tables_multi",
+    "table_targets",
     "TextBlock",
     "scan_text",
+    "scan_text_table",
+    "table_byte_classes",
     "GraphicsCandidate",
     "scan_graphics",
+    "scan_graphics_multi",
     "shannon_entropy",
     "Region",
     "RegionKind",
     "merge_regions",
     "fill_gaps",
+    "resolve_overlaps",
+    "RomMap",
+    "classify_rom",
 ]
@@ -2,11 +2,24 @@
 
 Heuristic: graphics blocks have high byte-value entropy but show structure
 when reshaped as 8x8 tiles (adjacent bytes often correlate in bitplane pairs).
+
+Scanning scores every window in one pass over the ROM. The ROM is cut into
+blocks (the gcd of every window and step size); each block's byte histogram
+is built once as a packed integer with one lane per byte value, and each
+window's histogram is a running lane-wise sum (add the block entering, drop
+the one leaving) — no per-window recount. Entropy then needs one table
+lookup per lane, and is skipped for windows with too few distinct bytes to
+reach `min_entropy`. Adjacent-byte differences are computed once for the whole
+ROM, so a window's correlation is two running sums. Several window shapes
+(one per bpp candidate) share the same block pass.
 """
 from __future__ import annotations
 
 import math
+from collections import Counter, deque
 from dataclasses import dataclass
+from math import gcd
+from typing import Sequence
 
 
 @dataclass
@@ -21,11 +34,8 @@ class GraphicsCandidate:
 def shannon_entropy(data: bytes) -> float:
     if not data:
         return 0.0
-    counts = [0] * 256
-    for b in data:
-        counts[b] += 1
     n = len(data)
-    return -sum((c / n) * math.log2(c / n) for c in counts if c)
+    return -sum((c / n) * math.log2(c / n) for c in Counter(data).values())
 
 
 def _plane_pair_correlation(data: bytes) -> float:
@@ -38,6 +48,122 @@ def _plane_pair_correlation(data: bytes) -> float:
     return 1.0 - (total / (len(data) - 1) / 255.0)
 
 
+def _abs_diffs(rom: bytes) -> bytes:
+    """`d[i] = |rom[i] - rom[i-1]|` (and `d[0] = 0`), for the whole ROM.
+
+    Lane-wise on two big integers with a 16-bit lane per byte: `x | 0x100`
+    minus `y` cannot borrow across lanes, and bit 8 of each lane says which
+    of `x - y` / `y - x` is the non-negative one."""
+    n = len(rom)
+    if n < 2:
+        return bytes(n)
+    x = bytearray(2 * n)
+    x[2::2] = rom[1:]
+    y = bytearray(2 * n)
+    y[2::2] = rom[:-1]
+    xi, yi = int.from_bytes(x, "little"), int.from_bytes(y, "little")
+    guard = int.from_bytes(b"\x00\x01" * n, "little")       # 0x0100 per lane
+    ones = guard >> 8
+    low = guard - ones                                         # 0x00FF per lane
+    fwd, back = (xi | guard) - yi, (yi | guard) - xi
+    sign = fwd >> 8 & ones                                     # 1 where x >= y
+    pick = (sign << 8) - sign                                  # 0xFF there
+    d = (fwd & pick) | (back & (low ^ pick))
+    return d.to_bytes(2 * n, "little")[::2]
+
+
+def _lane_kind(limit: int) -> tuple[int, str]:
+    """Narrowest (lane bits, array code) that counts up to `limit`."""
+    for bits, code in ((8, "B"), (16, "H"), (32, "I")):
+        if limit < 1 << bits:
+            return bits, code
+    return 64, "Q"
+
+
+def _score_windows(
+    rom: bytes,
+    shapes: Sequence[tuple[int, int]],
+    min_entropy: float,
+    min_correlation: float,
+) -> dict[tuple[int, int], list[tuple[int, float, float]]]:
+    """For each `(window_bytes, step_bytes)` shape → `(offset, entropy,
+    correlation)` of every window at a multiple of the step that passes both
+    thresholds (offsets `0 .. len(rom) - window_bytes - 1`, as before)."""
+    rom = bytes(rom)
+    n = len(rom)
+    out: dict[tuple[int, int], list[tuple[int, float, float]]] = {s: [] for s in shapes}
+    if any(s == 0 for _, s in shapes):
+        raise ValueError("window step must not be zero")
+    live = [s for s in shapes if s[0] > 0 and s[1] > 0 and n - s[0] > 0]
+    if not live:
+        return out
+    block = 0
+    for w, s in live:
+        block = gcd(gcd(block, w), s)
+    max_w = max(w for w, _ in live)
+    block_bits, _ = _lane_kind(block)
+    win_bits, win_code = _lane_kind(max_w)
+    onehot = [1 << (block_bits * v) for v in range(256)]
+    widen = block_bits != win_bits
+    block_lane_bytes = block_bits // 8
+    lane_bytes = win_bits // 8
+    flog = [0.0] + [c * math.log2(c) for c in range(1, max_w + 1)]
+    flog_at = flog.__getitem__
+    # H <= log2(distinct values), so windows with too few distinct bytes are
+    # rejected from a bit count (OR-fold each lane onto its bit 0) instead of
+    # the 256-lane entropy sum.
+    ones = int.from_bytes(b"\x01".ljust(lane_bytes, b"\x00") * 256, "little")
+    folds = [1 << i for i in range(win_bits.bit_length() - 2, -1, -1)]
+    min_distinct = 2.0 ** min_entropy
+    diffs = _abs_diffs(rom)
+
+    states = []   # [window_bytes, step_bytes, window_blocks, hist, diff_sum, results]
+    for w, s in live:
+        states.append([w, s, w // block, 0, 0, out[(w, s)]])
+    recent: deque[tuple[int, int]] = deque(maxlen=max_w // block + 1)
+    last_end = max(((n - w - 1) // s) * s + w for w, s in live)
+    for k in range(-(-last_end // block)):
+        lo = k * block
+        h = sum(map(onehot.__getitem__, rom[lo:lo + block]))
+        if widen:
+            # Re-pack each block lane at window lane width, byte column by
+            # byte column (little-endian: low bytes first, zero padding above).
+            packed = h.to_bytes(256 * block_lane_bytes, "little")
+            spread = bytearray(256 * lane_bytes)
+            for j in range(block_lane_bytes):
+                spread[j::lane_bytes] = packed[j::block_lane_bytes]
+            h = int.from_bytes(spread, "little")
+        ds = sum(diffs[lo:lo + block])
+        recent.append((h, ds))
+        end = lo + block
+        for st in states:
+            w, s, wb = st[0], st[1], st[2]
+            st[3] += h
+            st[4] += ds
+            if len(recent) > wb:
+                old_h, old_ds = recent[-1 - wb]
+                st[3] -= old_h
+                st[4] -= old_ds
+            start = end - w
+            if start < 0 or start % s or start >= n - w:
+                continue
+            total = st[4] - diffs[start]          # pair (start-1, start) is outside
+            corr = 1.0 - (total / (w - 1) / 255.0) if w > 1 else 0.0
+            if corr < min_correlation:
+                continue
+            hist = st[3]
+            seen = hist
+            for f in folds:
+                seen |= seen >> f
+            if (seen & ones).bit_count() < min_distinct:
+                continue
+            lanes = memoryview(hist.to_bytes(256 * lane_bytes, "little")).cast(win_code)
+            ent = math.log2(w) - sum(map(flog_at, lanes)) / w
+            if ent >= min_entropy:
+                st[5].append((start, ent, corr))
+    return out
+
+
 def scan_graphics(
     rom: bytes,
     bpp: int = 4,
@@ -49,15 +175,33 @@ def scan_graphics(
 ) -> list[GraphicsCandidate]:
     """Slide a `window_tiles` sized window across ROM; score each."""
     window_bytes = tile_bytes * window_tiles
-    step_bytes = tile_bytes * step_tiles
-    out: list[GraphicsCandidate] = []
-    for off in range(0, len(rom) - window_bytes, step_bytes):
-        block = rom[off:off + window_bytes]
-        ent = shannon_entropy(block)
-        corr = _plane_pair_correlation(block)
-        if ent >= min_entropy and corr >= min_correlation:
-            out.append(GraphicsCandidate(
-                offset=off, length=window_bytes, bpp=bpp,
-                entropy=ent, plane_correlation=corr,
-            ))
+    shape = (window_bytes, tile_bytes * step_tiles)
+    hits = _score_windows(rom, [shape], min_entropy, min_correlation)[shape]
+    return [
+        GraphicsCandidate(offset=off, length=window_bytes, bpp=bpp,
+                          entropy=ent, plane_correlation=corr)
+        for off, ent, corr in hits
+    ]
+
+
+def scan_graphics_multi(
+    rom: bytes,
+    bpps: Sequence[int] = (2, 4, 8),
+    window_tiles: int = 32,
+    step_tiles: int = 4,
+    min_entropy: float = 4.0,
+    min_correlation: float = 0.5,
+) -> list[GraphicsCandidate]:
+    """`scan_graphics` for several bpp candidates in one pass (tile size
+    `8 * bpp` bytes each). Sorted by offset, then bpp."""
+    shapes = {bpp: (8 * bpp * window_tiles, 8 * bpp * step_tiles) for bpp in bpps}
+    scored = _score_windows(rom, list(dict.fromkeys(shapes.values())),
+                            min_entropy, min_correlation)
+    out = [
+        GraphicsCandidate(offset=off, length=shape[0], bpp=bpp,
+                          entropy=ent, plane_correlation=corr)
+        for bpp, shape in shapes.items()
+        for off, ent, corr in scored[shape]
+    ]
+    out.sort(key=lambda c: (c.offset, c.bpp))
     return out
@@ -1,8 +1,35 @@
-"""ROM region classifier. Aggregate heuristics into a region map."""
+"""ROM region classifier. Aggregate heuristics into a region map.
+
+`classify_rom` runs the graphics, text and pointer-table scanners (plus
+optional LZSS trial decodes) over ROM shards, in worker processes when
+asked, and flattens the candidates into one `RomMap` — the most confident
+region wins each byte. Maps can be cached by ROM hash and written as JSON
+or a standalone HTML page.
+"""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Literal
+import html
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from math import lcm
+from pathlib import Path
+from typing import Literal, Optional, Sequence, Union
+
+from retrotool.compression.detector import scan_lzss
+from retrotool.compression.lzss import LZSSParams
+from retrotool.core.address import SFCAddressType
+from retrotool.core.cache import BuildCache, sha256_bytes, sha256_many
+from retrotool.heuristics.graphics import GraphicsCandidate, scan_graphics_multi
+from retrotool.heuristics.pointers import (
+    PointerTableCandidate,
+    scan_pointer_tables_multi,
+    table_targets,
+)
+from retrotool.heuristics.text import TextBlock, scan_text_table
+from retrotool.script.table import Table
 
 RegionKind = Literal["code", "text", "graphics", "compressed", "pointer_table", "data", "unknown"]
 
@@ -51,3 +78,287 @@ def fill_gaps(regions: list[Region], rom_size: int, gap_kind: RegionKind = "unkn
     if cursor < rom_size:
         out.append(Region(offset=cursor, length=rom_size - cursor, kind=gap_kind))
     return out
+
+
+# --- whole-ROM classification ----------------------------------------------
+
+# Entropy (bits/byte) from which a high-entropy window reads as compressed
+# data rather than graphics.
+COMPRESSED_ENTROPY = 7.2
+
+_KIND_COLORS = {
+    "code": "#c65353", "text": "#4caf50", "graphics": "#4a89c8",
+    "compressed": "#a066c8", "pointer_table": "#d4a62a", "data": "#8c8c8c",
+    "unknown": "#e0e0e0",
+}
+_TEXT_MARGIN = 0x1000
+
+
+def resolve_overlaps(regions: Sequence[Region], rom_size: int) -> list[Region]:
+    """Flatten overlapping regions: every byte goes to the most confident
+    region covering it. Same-kind neighbours are then merged (keeping the
+    best confidence and its note); uncovered bytes are left out."""
+    order = sorted(range(len(regions)),
+                   key=lambda k: (regions[k].confidence, regions[k].kind, regions[k].note))
+    owner = array("I", bytes(4 * rom_size))
+    points = {0, rom_size}
+    for k in order:
+        r = regions[k]
+        a, b = max(0, r.offset), min(rom_size, r.offset + r.length)
+        if a < b:
+            owner[a:b] = array("I", [k + 1]) * (b - a)
+            points.update((a, b))
+    pieces: list[Region] = []
+    bounds = sorted(points)
+    for a, b in zip(bounds, bounds[1:]):
+        k = owner[a]
+        if not k:
+            continue
+        src = regions[k - 1]
+        last = pieces[-1] if pieces else None
+        if last is not None and last.offset + last.length == a and last.kind == src.kind:
+            last.length = b - last.offset
+            if src.confidence > last.confidence:
+                last.confidence, last.note = src.confidence, src.note
+        else:
+            pieces.append(Region(a, b - a, src.kind, src.confidence, src.note))
+    return pieces
+
+
+@dataclass
+class RomMap:
+    """`classify_rom` result: non-overlapping regions covering the ROM."""
+    sha256: str
+    size: int
+    regions: list[Region]
+
+    def totals(self) -> dict[str, int]:
+        """Bytes per region kind."""
+        out: dict[str, int] = {}
+        for r in self.regions:
+            out[r.kind] = out.get(r.kind, 0) + r.length
+        return out
+
+    def to_dict(self) -> dict:
+        return {"sha256": self.sha256, "size": self.size,
+                "regions": [asdict(r) for r in self.regions]}
+
+    @classmethod
+    def from_dict(cls, doc: dict) -> "RomMap":
+        return cls(doc["sha256"], doc["size"], [Region(**r) for r in doc["regions"]])
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def write_json(self, path: Union[str, Path]) -> None:
+        Path(path).write_text(self.to_json() + "\n", encoding="utf-8")
+
+    def to_html(self, title: str = "ROM map") -> str:
+        """A standalone page: a proportional strip of the ROM plus a table."""
+        size = max(1, self.size)
+        strip = "".join(
+            f'<div style="width:{100 * r.length / size:.4f}%;background:{_KIND_COLORS[r.kind]}" '
+            f'title="{r.offset:06X} {r.kind} {r.length:#x}"></div>'
+            for r in self.regions
+        )
+        legend = " ".join(
+            f'<span><i style="background:{_KIND_COLORS[k]}"></i>{k} {n:#x}</span>'
+            for k, n in sorted(self.totals().items())
+        )
+        rows = "\n".join(
+            f"<tr><td>{r.offset:06X}</td><td>{r.offset + r.length - 1:06X}</td>"
+            f"<td>{r.length:#x}</td><td>{r.kind}</td><td>{r.confidence:.2f}</td>"
+            f"<td>{html.escape(r.note)}</td></tr>"
+            for r in self.regions
+        )
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font: 13px monospace; margin: 1em; }}
+.strip {{ display: flex; height: 28px; border: 1px solid #444; }}
+.legend span {{ margin-right: 1.5em; }}
+.legend i {{ display: inline-block; width: 10px; height: 10px; margin-right: 4px; }}
+td, th {{ padding: 1px 8px; text-align: left; }}
+</style></head><body>
+<h1>{html.escape(title)}</h1>
+<p>{self.size:#x} bytes, SHA-256 {self.sha256}</p>
+<div class="strip">{strip}</div>
+<p class="legend">{legend}</p>
+<table><tr><th>start</th><th>end</th><th>length</th><th>kind</th><th>confidence</th><th>note</th></tr>
+{rows}
+</table></body></html>
+"""
+
+    def write_html(self, path: Union[str, Path], title: str = "ROM map") -> None:
+        Path(path).write_text(self.to_html(title), encoding="utf-8")
+
+
+def _graphics_region(c: GraphicsCandidate) -> Region:
+    if c.entropy >= COMPRESSED_ENTROPY:
+        conf = 0.3 + 0.2 * min(1.0, (c.entropy - COMPRESSED_ENTROPY) / (8.0 - COMPRESSED_ENTROPY))
+        return Region(c.offset, c.length, "compressed", conf, f"entropy {c.entropy:.2f}")
+    conf = 0.4 + 0.4 * max(0.0, (c.plane_correlation - 0.5) / 0.5)
+    return Region(c.offset, c.length, "graphics", conf,
+                  f"{c.bpp}bpp? entropy {c.entropy:.2f}")
+
+
+def _text_region(t: TextBlock) -> Region:
+    conf = t.printable_ratio * min(1.0, t.length / 64)
+    return Region(t.offset, t.length, "text", conf, f"coverage {t.printable_ratio:.2f}")
+
+
+def _pointer_region(c: PointerTableCandidate) -> Region:
+    conf = 0.9 * min(1.0, c.count / 32) * c.monotonic_fraction ** 2
+    return Region(c.offset, c.count * c.entry_size, "pointer_table", conf,
+                  f"{c.count} x u{8 * c.entry_size} -> {c.target_low:06X}-{c.target_high:06X}")
+
+
+def _clip(regions: list[Region], start: int, end: int) -> list[Region]:
+    out = []
+    for r in regions:
+        a, b = max(start, r.offset), min(end, r.offset + r.length)
+        if a < b:
+            out.append(Region(a, b - a, r.kind, r.confidence, r.note))
+    return out
+
+
+def _run_shard(rom: bytes, table: Optional[Table], opts: dict,
+               task: tuple[str, int, int]) -> list[Region]:
+    """One scanner over one task range → its regions, clipped to the range."""
+    scanner, start, end = task
+    n = len(rom)
+    extra: list[Region] = []      # not clipped: LZSS blocks lie wherever tables point
+    if scanner == "graphics":
+        # Start on the window grid of every depth, one widest window early.
+        grid = lcm(*(32 * bpp for bpp in opts["bpps"]))
+        margin = 256 * max(opts["bpps"])
+        a = max(0, (start - margin) // grid * grid)
+        cands = scan_graphics_multi(rom[a:min(n, end + margin)], bpps=opts["bpps"])
+        found = [_graphics_region(c) for c in cands]
+        for r in found:
+            r.offset += a
+    elif scanner == "text":
+        a = max(0, start - _TEXT_MARGIN)
+        blocks = scan_text_table(rom[a:min(n, end + _TEXT_MARGIN)], table)
+        found = [_text_region(t) for t in blocks]
+        for r in found:
+            r.offset += a
+    else:
+        # One walk over the task's whole range: where the walk resumes after
+        # a table depends on every table before it, so it cannot restart at
+        # a shard edge. LZSS trials still go shard by shard.
+        size = 2 if scanner == "pointers16" else 3
+        cands = scan_pointer_tables_multi(
+            rom, entry_sizes=(size,), address_type=opts["address_type"],
+            start=start, stop=end,
+        )
+        found = [_pointer_region(c) for c in cands]
+        if opts["lzss_presets"]:
+            shard = opts["shard_size"]
+            for s in range(start, end, shard):
+                extra += _lzss_regions(rom, [c for c in cands if s <= c.offset < s + shard], opts)
+    return [r for r in _clip(found, start, end) + extra
+            if r.confidence >= opts["min_confidence"]]
+
+
+_WORKER: dict = {}
+
+
+def _init_worker(rom: bytes, table: Optional[Table], opts: dict) -> None:
+    _WORKER.update(rom=rom, table=table, opts=opts)
+
+
+def _worker_shard(task: tuple[str, int, int]) -> list[Region]:
+    return _run_shard(_WORKER["rom"], _WORKER["table"], _WORKER["opts"], task)
+
+
+def _lzss_regions(rom: bytes, tables: list[PointerTableCandidate], opts: dict,
+                  limit: int = 1024) -> list[Region]:
+    """Trial-decompress at the targets of pointer tables (up to `limit`)."""
+    targets: set[int] = set()
+    for c in tables:
+        if _pointer_region(c).confidence >= opts["min_confidence"]:
+            targets.update(t for t in table_targets(rom, c, opts["address_type"]) if t is not None)
+    out: list[Region] = []
+    for t in sorted(targets)[:limit]:
+        for c in scan_lzss(rom, list(opts["lzss_presets"]), start=t, end=min(t + 1, len(rom) - 4)):
+            conf = 0.5 + 0.4 * min(1.0, (c.ratio - 1) / 2)
+            out.append(Region(c.offset, c.consumed, "compressed", conf,
+                              f"{c.scheme} -> {c.decompressed_size:#x} bytes"))
+    return out
+
+
+def _table_fingerprint(table: Optional[Table]) -> Optional[str]:
+    if table is None:
+        return None
+    doc = [sorted(table.val_map.items()), table.ctrl_prefixes,
+           sorted((p, d, sorted(c.items())) for p, (d, c) in table.ctrl_table().items())]
+    return sha256_bytes(json.dumps(doc).encode("utf-8"))
+
+
+def classify_rom(
+    rom: bytes,
+    *,
+    table: Optional[Table] = None,
+    address_type: int = SFCAddressType.LOROM1,
+    bpps: Sequence[int] = (2, 4, 8),
+    min_confidence: float = 0.2,
+    lzss_presets: Sequence[tuple[str, LZSSParams]] = (),
+    shard_size: int = 0x80000,
+    jobs: Optional[int] = 0,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> RomMap:
+    """Run every heuristic over `rom` and flatten the results into one map.
+
+    The graphics/entropy and text (through `table`, or ASCII if `None`)
+    scanners each run per `shard_size` shard; shards are scanned with a
+    margin and clipped, so regions crossing a shard edge come back whole
+    after merging. The 2-/3-byte pointer-table scanners each walk the whole
+    ROM in one task, since a table's end decides where the walk resumes, so
+    the map does not depend on `shard_size`. With `lzss_presets`, pointer-table
+    targets are also trial-decompressed. Candidates under `min_confidence`
+    are dropped, overlaps go to the most confident region
+    (`resolve_overlaps`), and the rest of the ROM is `unknown`.
+
+    `jobs` > 1 scans shards in a process pool (`0` = one worker per CPU,
+    the default; `None` / `1` = in-process). With `cache_dir`, the map is
+    stored under the hash of the ROM and these options and reused."""
+    rom = bytes(rom)
+    if shard_size <= 0 or shard_size % 0x1000:
+        raise ValueError(f"shard_size must be a positive multiple of 0x1000, got {shard_size:#x}")
+    opts = {"address_type": address_type, "bpps": tuple(bpps),
+            "min_confidence": min_confidence, "lzss_presets": tuple(lzss_presets),
+            "shard_size": shard_size}
+    digest = sha256_bytes(rom)
+    cache = key = None
+    if cache_dir is not None:
+        cache = BuildCache(cache_dir)
+        key = sha256_many([rom, json.dumps({
+            **opts, "table": _table_fingerprint(table), "shard_size": shard_size,
+            "lzss_presets": [f"{name}:{params!r}" for name, params in lzss_presets],
+        }, sort_keys=True).encode("utf-8")])
+        entry = cache.get(key)
+        if entry is not None:
+            return RomMap.from_dict(json.loads(entry.artifact.read_text(encoding="utf-8")))
+
+    n = len(rom)
+    tasks = [("pointers24", 0, n), ("pointers16", 0, n)] + [
+        (scanner, s, min(n, s + shard_size))
+        for scanner in ("graphics", "text")
+        for s in range(0, n, shard_size)]
+    workers = 1 if jobs is None else ((os.cpu_count() or 1) if jobs == 0 else max(1, jobs))
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        results = [_run_shard(rom, table, opts, t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(rom, table, opts)) as pool:
+            results = list(pool.map(_worker_shard, tasks))
+    found = [r for part in results for r in part]
+
+    regions = fill_gaps(resolve_overlaps(found, n), n)
+    result = RomMap(digest, n, regions)
+    if cache is not None:
+        cache.put(key, result.to_json(indent=None).encode("utf-8"),
+                  {"rom_sha256": digest, "size": n})
+    return result
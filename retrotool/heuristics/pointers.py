@@ -1,11 +1,36 @@
-"""Pointer table scanner. Locate candidate pointer tables in a ROM."""
+"""Pointer table scanner. Locate candidate pointer tables in a ROM.
+
+Every little-endian word in the ROM is decoded once (one `array('H')` per
+byte parity) and classified with lookup tables instead of an `SFCAddress`
+per candidate. All SNES→PC mappings are linear within a half bank ($8000
+bytes), so a mapper reduces to one base PC offset per half-bank page; from
+that, a 64K table answers "does this 16-bit pointer land in `valid_range`"
+for a fixed bank, and a (bank, high byte) table does the same for 24-bit
+pointers (only pages cut by the range edge need an exact check).
+
+The valid flags of each stride residue are then split into runs by a regex,
+which gives every start offset's run length at once. The scan visits the
+same offsets as a naive walk (advance by `step`, jump past each table
+found) but only stops where a table can start, so whole-ROM scans are
+linear. `scan_pointer_tables_multi` shares the decoded words across several
+entry sizes and banks.
+"""
 from __future__ import annotations
 
+import io
+import re
+import sys
+from array import array
+from contextlib import redirect_stdout
 from dataclasses import dataclass
+from functools import lru_cache
+from math import gcd
+from typing import Iterable, Optional
 
 from retrotool.core.address import SFCAddress, SFCAddressType
-from retrotool.core.binary import read_u16_le, read_u24_le
 
+_PAGE = 0x8000            # SNES→PC mappings are linear within a half bank
+_PAGES = 0x1000000 // _PAGE
 
 @dataclass
 class PointerTableCandidate:
@@ -15,6 +40,193 @@ class PointerTableCandidate:
     target_low: int          # PC offset range of targets (min)
     target_high: int
     monotonic_fraction: float
+    bank: Optional[int] = None   # bank byte given for 2-byte entries (None = implicit)
+
+
+@lru_cache(maxsize=None)
+def _page_bases(address_type: int) -> tuple[Optional[int], ...]:
+    """PC offset of each half-bank page's first byte (`None` = not ROM)."""
+    bases: list[Optional[int]] = []
+    with redirect_stdout(io.StringIO()):     # some mappers print on bad input
+        for page in range(_PAGES):
+            snes = page * _PAGE
+            first = SFCAddress(snes, address_type).get_address(SFCAddressType.PC)
+            last = SFCAddress(snes + _PAGE - 1, address_type).get_address(SFCAddressType.PC)
+            ok = first is not None and last == first + _PAGE - 1
+            bases.append(first if ok else None)
+    return tuple(bases)
+
+
+def _page_window(base: Optional[int], low: int, high: int) -> tuple[int, int]:
+    """In-page offsets [lo, hi) whose target lands in [low, high)."""
+    if base is None:
+        return 0, 0
+    lo, hi = max(0, low - base), min(_PAGE, high - base)
+    return (lo, hi) if lo < hi else (0, 0)
+
+
+def _u16_table(bases, bank: int, low: int, high: int) -> bytes:
+    """16-bit pointer value → 1 if `bank:value` targets [low, high)."""
+    out = bytearray()
+    for half in (0, 1):
+        page = bank * 2 + half
+        lo, hi = _page_window(bases[page] if page < _PAGES else None, low, high)
+        out += bytes(lo) + b"\x01" * (hi - lo) + bytes(_PAGE - hi)
+    return bytes(out)
+
+
+def _u24_classes(bases, low: int, high: int) -> bytes:
+    """(bank << 8 | high byte) → 0 never valid, 1 always valid, 2 depends
+    on the low bits (the page is cut by the range edge)."""
+    out = []
+    for page in range(_PAGES):
+        lo, hi = _page_window(bases[page], low, high)
+        c = 0 if lo == hi else (1 if (lo, hi) == (0, _PAGE) else 2)
+        out.append(bytes([c]) * 0x80)        # a page spans 128 high-byte values
+    return b"".join(out)
+
+
+class _Words:
+    """The ROM's little-endian u16 at every offset, as one array per parity."""
+
+    def __init__(self, rom: bytes):
+        self.n = len(rom)
+        self.parity = []
+        for q in (0, 1):
+            m = max(0, (self.n - q) // 2)
+            words = array("H")
+            words.frombytes(rom[q:q + 2 * m])
+            if sys.byteorder == "big":
+                words.byteswap()
+            self.parity.append(words)
+
+    def classify(self, table: bytes, start: int = 0, stop: Optional[int] = None) -> bytearray:
+        """`table[u16 at p]` for every offset p in [start, stop) (`start`
+        even); 0 where no full word fits (the ROM's last byte)."""
+        stop = self.n if stop is None else min(stop, self.n)
+        out = bytearray(max(0, stop - start))
+        get = table.__getitem__
+        for q, words in enumerate(self.parity):
+            lo, hi = start // 2, min(len(words), (stop - q + 1) // 2)
+            if lo < hi:
+                out[q:q + 2 * (hi - lo):2] = bytes(map(get, words[lo:hi]))
+        return out
+
+
+def _snes(rom: bytes, pos: int, entry_size: int, bank: Optional[int]) -> int:
+    if entry_size == 2:
+        rel = rom[pos] | rom[pos + 1] << 8
+        return ((bank if bank is not None else pos >> 16) << 16) | rel
+    return rom[pos] | rom[pos + 1] << 8 | rom[pos + 2] << 16
+
+
+def _to_pc(bases, snes: int) -> Optional[int]:
+    base = bases[snes // _PAGE] if snes // _PAGE < _PAGES else None
+    return None if base is None else base + snes % _PAGE
+
+
+def _valid_flags(rom: bytes, words: _Words, bases, entry_size: int, bank: Optional[int],
+                 low: int, high: int, lo: int, hi: int) -> bytearray:
+    """For offsets [lo, hi) (`lo` even): 1 where the entry there targets
+    [low, high), else 0."""
+    n = len(rom)
+    if entry_size == 2:
+        if bank is not None:
+            return words.classify(_u16_table(bases, bank, low, high), lo, hi)
+        # Implicit bank = the entry's own 64K PC segment.
+        return bytearray().join(
+            words.classify(_u16_table(bases, seg >> 16, low, high),
+                           max(seg, lo), min(seg + 0x10000, hi))
+            for seg in range(lo & ~0xFFFF, hi, 0x10000)
+        )
+    cls = words.classify(_u24_classes(bases, low, high), lo, hi + 2)
+    valid = bytearray(max(0, hi - lo))
+    m = min(hi, n - 2) - lo
+    if m > 0:
+        valid[:m] = cls[1:m + 1]
+    pos = valid.find(2)
+    while pos != -1:
+        pc = _to_pc(bases, _snes(rom, lo + pos, 3, None))
+        valid[pos] = pc is not None and low <= pc < high
+        pos = valid.find(2, pos + 1)
+    return valid
+
+
+def _starts(valid: bytearray, lo: int, entry_size: int,
+            min_entries: int) -> list[list[tuple[int, int, int]]]:
+    """Per stride residue, the runs long enough to hold a table, as
+    `(first offset, offsets that can start a table, offset past the run)`;
+    `valid[0]` is offset `lo`."""
+    run = re.compile(rb"\x01{%d,}" % min_entries)
+    out = []
+    for r in range(entry_size):
+        runs = []
+        for m in run.finditer(bytes(valid[r::entry_size])):
+            a, b = m.span()
+            runs.append((lo + r + a * entry_size, b - a - min_entries + 1,
+                         lo + r + b * entry_size))
+        out.append(runs)
+    return out
+
+
+def _next_start(runs, idx: int, i: int, entry_size: int, step: int) -> tuple[int, Optional[tuple]]:
+    """First offset >= i, congruent to i mod `step`, that starts a table in
+    `runs[idx:]` → (new idx, (offset, run end) or None)."""
+    while idx < len(runs) and runs[idx][0] + (runs[idx][1] - 1) * entry_size < i:
+        idx += 1
+    g = gcd(entry_size, step)
+    mod = step // g
+    for j in range(idx, len(runs)):
+        first, good, end = runs[j]
+        if (i - first) % g:
+            return idx, None                 # whole residue is off the step grid
+        k0 = max(0, -((first - i) // entry_size))
+        # k * entry_size ≡ i - first (mod step)
+        k = ((i - first) // g % mod) * pow(entry_size // g, -1, mod) % mod if mod > 1 else 0
+        k += (k0 - k + mod - 1) // mod * mod
+        if k < good:
+            return idx, (first + k * entry_size, end)
+    return idx, None
+
+
+def _scan(rom: bytes, valid: bytearray, lo: int, bases, entry_size: int,
+          bank: Optional[int], min_entries: int, max_entries: int, step: int,
+          start: int, stop: int) -> list[PointerTableCandidate]:
+    out: list[PointerTableCandidate] = []
+    if max_entries < min_entries:
+        return out
+    residues = _starts(valid, lo, entry_size, min_entries)
+    cursor = [0] * entry_size
+    i = start
+    while True:
+        best = None
+        for r, runs in enumerate(residues):
+            cursor[r], hit = _next_start(runs, cursor[r], i, entry_size, step)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        if best is None or best[0] >= stop:
+            return out
+        pos, end = best
+        count = min((end - pos) // entry_size, max_entries)
+        targets = [_to_pc(bases, _snes(rom, p, entry_size, bank))
+                   for p in range(pos, pos + count * entry_size, entry_size)]
+        monotonic = sum(b > a for a, b in zip([-1] + targets, targets))
+        out.append(PointerTableCandidate(
+            offset=pos, entry_size=entry_size, count=count,
+            target_low=min(targets), target_high=max(targets),
+            monotonic_fraction=monotonic / count,
+            bank=bank if entry_size == 2 else None,
+        ))
+        i = pos + count * entry_size
+
+
+def _check(entry_size: int, min_entries: int, step: int) -> None:
+    if entry_size not in (2, 3):
+        raise ValueError("entry_size must be 2 or 3")
+    if min_entries < 1:
+        raise ValueError("min_entries must be at least 1")
+    if step < 1:
+        raise ValueError("step must be positive")
 
 
 def scan_pointer_tables(
@@ -31,41 +243,61 @@ def scan_pointer_tables(
 
     For 2-byte pointers, `bank` supplies the bank byte. If None, uses each
     pointer's own implicit bank (typically the bank where the table lives)."""
-    if entry_size not in (2, 3):
-        raise ValueError("entry_size must be 2 or 3")
+    _check(entry_size, min_entries, step)
+    return scan_pointer_tables_multi(
+        rom, entry_sizes=(entry_size,), banks=(bank,), address_type=address_type,
+        min_entries=min_entries, max_entries=max_entries, valid_range=valid_range,
+        step=step,
+    )
+
+
+def scan_pointer_tables_multi(
+    rom: bytes,
+    entry_sizes: Iterable[int] = (2, 3),
+    banks: Iterable[int | None] = (None,),
+    address_type: int = SFCAddressType.LOROM1,
+    min_entries: int = 8,
+    max_entries: int = 512,
+    valid_range: tuple[int, int] | None = None,
+    step: int = 2,
+    *,
+    start: int = 0,
+    stop: int | None = None,
+) -> list[PointerTableCandidate]:
+    """`scan_pointer_tables` for every entry size, and every bank for 2-byte
+    entries, in one sweep over the decoded words. Sorted by offset; each
+    candidate's `entry_size` / `bank` says which scan found it.
+
+    `start` / `stop` limit where tables may begin (the walk starts at
+    `start`; a table may run past `stop`), so a ROM can be scanned in
+    shards while offsets, banks and targets stay whole-ROM."""
+    entry_sizes = tuple(entry_sizes)
+    banks = tuple(banks)
+    for size in entry_sizes:
+        _check(size, min_entries, step)
+    rom = bytes(rom)
     low, high = valid_range if valid_range else (0, len(rom))
+    n = len(rom)
+    start = max(0, start)
+    stop = n if stop is None else min(stop, n)
+    bases = _page_bases(address_type)
+    words = _Words(rom)
+    lo = start - start % 2
     out: list[PointerTableCandidate] = []
-    i = 0
-    while i <= len(rom) - entry_size * min_entries:
-        count = 0
-        last_target = -1
-        monotonic = 0
-        j = i
-        tmin = len(rom)
-        tmax = 0
-        while count < max_entries and j + entry_size <= len(rom):
-            if entry_size == 2:
-                rel = read_u16_le(rom, j)
-                snes = ((bank if bank is not None else (j >> 16)) << 16) | rel
-            else:
-                snes = read_u24_le(rom, j)
-            pc = SFCAddress(snes, address_type).get_address(SFCAddressType.PC)
-            if pc is None or not (low <= pc < high):
-                break
-            if pc > last_target:
-                monotonic += 1
-            last_target = pc
-            tmin = min(tmin, pc)
-            tmax = max(tmax, pc)
-            count += 1
-            j += entry_size
-        if count >= min_entries:
-            out.append(PointerTableCandidate(
-                offset=i, entry_size=entry_size, count=count,
-                target_low=tmin, target_high=tmax,
-                monotonic_fraction=monotonic / count,
-            ))
-            i = j
-        else:
-            i += step
+    for size in entry_sizes:
+        hi = min(n, stop + max_entries * size)
+        for bank in (banks if size == 2 else (None,)):
+            valid = _valid_flags(rom, words, bases, size, bank, low, high, lo, hi)
+            out += _scan(rom, valid, lo, bases, size, bank, min_entries, max_entries,
+                         step, start, stop)
+    out.sort(key=lambda c: (c.offset, c.entry_size, -1 if c.bank is None else c.bank))
     return out
+
+
+def table_targets(rom: bytes, candidate: PointerTableCandidate,
+                  address_type: int = SFCAddressType.LOROM1) -> list[Optional[int]]:
+    """PC offset each entry of `candidate` points at (`None` if unmapped)."""
+    bases = _page_bases(address_type)
+    size = candidate.entry_size
+    return [_to_pc(bases, _snes(rom, p, size, candidate.bank))
+            for p in range(candidate.offset, candidate.offset + candidate.count * size, size)]
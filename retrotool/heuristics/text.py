@@ -1,7 +1,20 @@
-"""Text block detection. Find regions of printable bytes."""
+"""Text block detection. Find regions of printable bytes.
+
+`scan_text` looks for plain ASCII. `scan_text_table` looks for bytes that
+decode through a game's `.tbl`: the table is compiled to a 256-entry byte
+class array, the ROM is mapped through it with `bytes.translate` (bytes a
+multi-byte entry or control code consumes are marked with shifted masks on
+one big integer), and a regex over the mask finds the blocks — no Python
+loop per ROM byte.
+"""
 from __future__ import annotations
 
+import math
+import re
 from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from retrotool.script.table import Table
 
 
 @dataclass
@@ -9,6 +22,7 @@ class TextBlock:
     offset: int
     length: int
     printable_ratio: float
+    score: float = 0.0
 
 
 def scan_text(
@@ -42,3 +56,120 @@ def scan_text(
             start = None
             printable = 0
     return out
+
+
+# Byte-class flags produced by `table_byte_classes`.
+CLASS_CHAR = 0x01        # decodes on its own (a 1-byte table entry)
+CLASS_LEAD = 0x02        # first byte of a multi-byte table entry
+CLASS_CTRL = 0x04        # control-code prefix
+CLASS_END = 0x08         # caller-given terminator
+
+# A byte repeated this often in a row is fill, never text.
+_FILL_RUN = 16
+_SAME = re.compile(rb"\x00{%d,}" % (_FILL_RUN - 1))
+
+
+def _entry_bytes(table: Table) -> Iterable[bytes]:
+    """The raw bytes of every table entry (leading zero bytes kept)."""
+    char_bytes = table.char_bytes
+    for value, ch in table.val_map.items():
+        raw = char_bytes.get(ch)
+        if raw is None or int.from_bytes(raw, "big") != value:
+            raw = value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
+        yield raw
+
+
+def table_byte_classes(table: Optional[Table], terminators: Iterable[int] = ()) -> bytes:
+    """Compile `table` into 256 `CLASS_*` flag bytes, one per byte value.
+    `None` stands for plain printable ASCII ($20-$7E)."""
+    classes = bytearray(256)
+    if table is None:
+        classes[0x20:0x7F] = bytes([CLASS_CHAR]) * 0x5F
+        for b in terminators:
+            classes[b] |= CLASS_END
+        return bytes(classes)
+    for raw in _entry_bytes(table):
+        classes[raw[0]] |= CLASS_CHAR if len(raw) == 1 else CLASS_LEAD
+    for prefix in table.ctrl_prefixes:
+        classes[prefix] |= CLASS_CTRL
+    for b in terminators:
+        classes[b] |= CLASS_END
+    return bytes(classes)
+
+
+def _spans(table: Optional[Table]) -> dict[int, list[int]]:
+    """Extra bytes consumed after a lead / prefix byte → the bytes that do."""
+    if table is None:
+        return {}
+    extra = [0] * 256
+    for raw in _entry_bytes(table):
+        extra[raw[0]] = max(extra[raw[0]], len(raw) - 1)
+    for prefix, (default, cmds) in table.ctrl_table().items():
+        extra[prefix] = max(extra[prefix], default - 1, *(n - 1 for n in cmds.values()))
+    groups: dict[int, list[int]] = {}
+    for b, n in enumerate(extra):
+        if n > 0:
+            groups.setdefault(n, []).append(b)
+    return groups
+
+
+def _decodable(rom: bytes, table: Optional[Table], classes: bytes) -> bytes:
+    """1 for every ROM byte a table token covers (including the bytes after
+    a multi-byte lead or control prefix), 0 elsewhere; fill runs are 0."""
+    n = len(rom)
+    if not n:
+        return b""
+    good = int.from_bytes(rom.translate(bytes(1 if c else 0 for c in classes)), "big")
+    for extra, leads in _spans(table).items():
+        marks = bytearray(256)
+        for b in leads:
+            marks[b] = 1
+        m = int.from_bytes(rom.translate(bytes(marks)), "big")
+        for k in range(1, extra + 1):
+            good |= m >> 8 * k              # byte i marks byte i + k
+    mask = bytearray(good.to_bytes(n, "big"))
+    # same[i] == 0 ⇔ rom[i] == rom[i - 1], so fill is a long zero run.
+    whole = int.from_bytes(rom, "big")
+    same = (whole ^ (whole >> 8)).to_bytes(n, "big")
+    for fill in _SAME.finditer(same, 1):
+        a, b = fill.span()
+        mask[a - 1:b] = bytes(b - a + 1)
+    return bytes(mask)
+
+
+def scan_text_table(
+    rom: bytes,
+    table: Optional[Table],
+    min_length: int = 16,
+    min_coverage: float = 0.9,
+    max_gap: int = 2,
+    terminators: Iterable[int] = (),
+) -> list[TextBlock]:
+    """Find text that decodes through `table`, best candidates first.
+
+    Each ROM byte is classed through `table_byte_classes` (plus the bytes a
+    multi-byte entry or control code consumes). A block is a run of
+    decodable bytes that may skip over up to `max_gap` undecodable ones; it
+    is kept when at least `min_length` long with decode coverage of at
+    least `min_coverage`. `printable_ratio` holds that coverage and
+    `score` (coverage weighted by log length) orders the result. With
+    `table=None` the scan looks for printable ASCII."""
+    rom = bytes(rom)
+    mask = _decodable(rom, table, table_byte_classes(table, terminators))
+    # A block long and covered enough has at least `need` decodable bytes;
+    # the regex only stops at runs that do.
+    need = max(1, math.ceil(min_length * min_coverage - 1e-9))
+    step = rb"(?:\x01|\x00{1,%d}\x01)" % max_gap if max_gap > 0 else rb"\x01"
+    run = re.compile(rb"\x01%s{%d,}" % (step, need - 1))
+    out: list[TextBlock] = []
+    for m in run.finditer(mask):
+        a, b = m.span()
+        length = b - a
+        if length < min_length:
+            continue
+        coverage = mask.count(1, a, b) / length
+        if coverage >= min_coverage:
+            out.append(TextBlock(offset=a, length=length, printable_ratio=coverage,
+                                 score=coverage * math.log2(length)))
+    out.sort(key=lambda t: (-t.score, t.offset))
+    return out
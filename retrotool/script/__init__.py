@@ -1,5 +1,8 @@
 """retrotool.script — table codec, extraction, insertion, DTE, validation."""
-from retrotool.script.dte import apply_dte, build_dte_table, find_digraphs, savings_estimate
+from retrotool.script.dte import (
+    DteResult, apply_dte, build_dte_table, find_digraphs, free_codes, optimize_dte,
+    savings_estimate,
+)
 from retrotool.script.extractor import Script, ScriptEntry, extract_script
 from retrotool.script.inserter import InsertedScript, compile_script
 from retrotool.script.table import Table
@@ -16,6 +19,9 @@ __all__ = [
     "build_dte_table",
     "apply_dte",
     "savings_estimate",
+    "optimize_dte",
+    "free_codes",
+    "DteResult",
     "ValidationReport",
     "round_trip",
     "check_max_length",
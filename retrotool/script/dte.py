@@ -1,55 +1,415 @@
-"""Dual-Tile Encoding (DTE) helper. Find highest-frequency digraphs + assign codes."""
+"""Dual-Tile / Multi-Tile Encoding (DTE/MTE) helpers.
+
+`find_digraphs` is the quick one-pass frequency count. `optimize_dte` is the
+real dictionary builder: greedy selection where every pick is applied to the
+corpus before the next one is chosen, so counts always reflect what is left
+after earlier substitutions (a plain top-N over the original counts
+overestimates savings — `th`, `he` and `e ` all claim the same letters).
+
+Selection is a lazy greedy over candidate substrings:
+
+  - the corpus is cut into maximal mergeable runs (opaque `[..]` / `{HH}`
+    spans and `skip_chars` split it) and identical runs are collapsed with a
+    multiplicity, so a script full of repeated words is parsed once per
+    distinct word;
+  - candidates are substrings of 2..`max_token_len` characters, longer ones
+    counted only where their prefix already pays for a code;
+  - the runs are joined into one corpus whose current longest-match parse
+    (as `Table.encode_text` will do it) is kept as a per-position symbol
+    length array, and every candidate's positions are indexed once;
+  - a max-heap holds each candidate's upper-bound gain; a popped candidate
+    is re-priced exactly by re-parsing only the few characters after each
+    of its occurrences, up to the first position that already was a symbol
+    boundary (the parses agree from there on), and pushed back if it no
+    longer leads. A pick rewrites just those spans and adjusts token usage
+    counts for them, so a pick costs time in its occurrences, not in the
+    length of the runs holding them;
+  - a learned token whose every use moved into a longer one hands its code
+    back.
+
+With a `Table`, only characters the table can encode are merged, codes are
+drawn from the byte values it leaves unused, per-character byte widths come
+from the table, and multi-character tokens it already declares take part in
+the parse but are never re-learned. The result renders straight to a `.tbl`
+fragment.
+"""
 from __future__ import annotations
 
-from collections import Counter
+import bisect
+import heapq
+import re
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from retrotool.script.table import Table
+
+
+# `[HH..]` literals / named tokens and `{HH}` bytecodes are opaque to DTE —
+# never merged, never split.
+_OPAQUE_RE = re.compile(r'\[[^\]]*\]|\{[0-9A-Fa-f]{2}\}')
+
+# Joins mergeable runs into one corpus string; never part of a token.
+_SEP = '\0'
 
 
 def find_digraphs(texts: list[str], top_n: int = 128,
                   skip_chars: str = " \n\t") -> list[tuple[str, int]]:
-    """Return top N digraphs by frequency. Skip digraphs containing `skip_chars`."""
+    """Return top N digraphs by frequency. Skip digraphs containing `skip_chars`.
+
+    One-pass count over the original text — see `optimize_dte` for a
+    selection that accounts for overlapping picks."""
     counter: Counter[str] = Counter()
     for t in texts:
-        for i in range(len(t) - 1):
-            pair = t[i:i + 2]
-            if any(c in skip_chars for c in pair):
-                continue
-            counter[pair] += 1
+        counter.update(map(str.__add__, t, t[1:]))
+    if skip_chars:
+        for pair in [p for p in counter if p[0] in skip_chars or p[1] in skip_chars]:
+            del counter[pair]
     return counter.most_common(top_n)
 
 
 def build_dte_table(texts: list[str], codes: list[int],
                     skip_chars: str = " \n\t") -> dict[str, int]:
-    """Map top digraphs (by frequency) to the given code values."""
-    pairs = find_digraphs(texts, top_n=len(codes), skip_chars=skip_chars)
-    return {p[0]: c for p, c in zip(pairs, codes)}
+    """Map the best digraphs to the given code values.
+
+    Digraphs are picked by `optimize_dte` (recounted after each pick), so the
+    map holds at most `len(codes)` entries and can hold fewer when the
+    remaining digraphs no longer occur."""
+    return optimize_dte(texts, codes, skip_chars=skip_chars).mapping
 
 
 def apply_dte(text: str, dte_map: dict[str, int]) -> str:
-    """Rewrite `text`, replacing digraphs with their single-character DTE equivalents.
+    """Rewrite `text`, replacing DTE/MTE tokens with their code equivalents.
 
-    DTE code is emitted as a bracketed [HH] literal for downstream Table.encode_text."""
+    Longest match first (the same rule `Table.encode_text` applies once the
+    fragment is part of the table). `[..]` / `{HH}` spans are copied
+    unchanged. DTE code is emitted as a bracketed [HH] literal for
+    downstream Table.encode_text."""
+    max_len = max((len(k) for k in dte_map), default=0)
     out = []
-    i = 0
-    while i < len(text):
-        pair = text[i:i + 2]
-        if len(pair) == 2 and pair in dte_map:
-            out.append(f"[{dte_map[pair]:02X}]")
-            i += 2
+    pos = 0
+    for m in _OPAQUE_RE.finditer(text):
+        _apply_span(text, pos, m.start(), dte_map, max_len, out)
+        out.append(m.group())
+        pos = m.end()
+    _apply_span(text, pos, len(text), dte_map, max_len, out)
+    return ''.join(out)
+
+
+def _apply_span(text: str, i: int, end: int, dte_map: dict[str, int],
+                max_len: int, out: list[str]) -> None:
+    while i < end:
+        for plen in range(min(max_len, end - i), 1, -1):
+            code = dte_map.get(text[i:i + plen])
+            if code is not None:
+                out.append(f"[{code:02X}]")
+                i += plen
+                break
         else:
             out.append(text[i])
             i += 1
-    return ''.join(out)
 
 
 def savings_estimate(texts: list[str], dte_map: dict[str, int]) -> int:
-    """Bytes saved by applying dte_map (each replaced digraph saves 1 byte)."""
+    """Bytes saved by applying dte_map (a token of N chars saves N-1 bytes)."""
+    max_len = max((len(k) for k in dte_map), default=0)
     total = 0
     for t in texts:
         i = 0
-        while i < len(t) - 1:
-            if t[i:i + 2] in dte_map:
-                total += 1
-                i += 2
+        n = len(t)
+        while i < n - 1:
+            for plen in range(min(max_len, n - i), 1, -1):
+                if t[i:i + plen] in dte_map:
+                    total += plen - 1
+                    i += plen
+                    break
             else:
                 i += 1
     return total
+
+
+def free_codes(table: Table, width: int = 1) -> list[int]:
+    """Code values of `width` bytes that `table` leaves unused.
+
+    A value is free when the table doesn't decode it, it isn't a control
+    prefix, and (for 1-byte codes) it isn't the lead byte of a longer
+    declared code; a 2-byte code's lead byte must not be a 1-byte code."""
+    if width not in (1, 2):
+        raise ValueError(f"code width must be 1 or 2, got {width}")
+    used = table.val_map
+    ctrl = set(table.ctrl_prefixes)
+    leads = {b[0] for b in table.char_bytes.values() if len(b) > 1}
+    if width == 1:
+        return [v for v in range(0x100)
+                if v not in used and v not in ctrl and v not in leads]
+    singles = {b[0] for b in table.char_bytes.values() if len(b) == 1}
+    return [v for v in range(0x100, 0x10000)
+            if v not in used and (v >> 8) not in ctrl and (v >> 8) not in singles]
+
+
+@dataclass
+class DteResult:
+    """Outcome of `optimize_dte`.
+
+    `entries` lists `(token, code)` sorted by code. `original_size` is the
+    encoded size of the mergeable text before substitution (opaque spans and
+    skipped chars excluded); `savings` is the bytes the selected merges
+    removed from it.
+    """
+    entries: list[tuple[str, int]] = field(default_factory=list)
+    original_size: int = 0
+    savings: int = 0
+    code_width: int = 1
+
+    @property
+    def mapping(self) -> dict[str, int]:
+        return dict(self.entries)
+
+    @property
+    def encoded_size(self) -> int:
+        return self.original_size - self.savings
+
+    def to_tbl(self) -> str:
+        """`.tbl` fragment — one `HH=token` line per entry (`\\n` escaped)."""
+        digits = 2 * self.code_width
+        lines = []
+        for token, code in self.entries:
+            token = token.replace('\n', '\\n')
+            lines.append(f"{code:0{digits}X}={token}\n")
+        return ''.join(lines)
+
+    def write_tbl(self, path: Union[str, Path]) -> None:
+        Path(path).write_text(self.to_tbl(), encoding='utf-8')
+
+
+def optimize_dte(
+    texts: Iterable[str],
+    codes: Optional[Iterable[int]] = None,
+    *,
+    table: Optional[Table] = None,
+    max_token_len: int = 2,
+    code_width: int = 1,
+    skip_chars: str = " \n\t",
+    entry_cost: int = 0,
+    min_gain: int = 1,
+) -> DteResult:
+    """Build a DTE (`max_token_len=2`) or MTE dictionary for `texts`.
+
+    `codes` are the values to assign, lowest first; defaults to
+    `free_codes(table, code_width)` when a `table` is given. Each pick is
+    the token that saves the most bytes given every earlier pick, measured
+    by re-parsing the affected text the way `Table.encode_text` will
+    (longest match first). A pick must save at least `min_gain` (>= 1) bytes after
+    charging `entry_cost` (e.g. the ROM bytes an MTE dictionary entry
+    costs). Stops when codes run out or no pick qualifies. Ties break on
+    the token text, so the result is deterministic.
+    """
+    if max_token_len < 2:
+        raise ValueError(f"max_token_len must be >= 2, got {max_token_len}")
+    if min_gain < 1:
+        # A zero-gain pick changes nothing, so the greedy loop would never end.
+        raise ValueError(f"min_gain must be >= 1, got {min_gain}")
+    if codes is None:
+        if table is None:
+            raise ValueError("optimize_dte needs `codes` or a `table` to draw codes from")
+        codes = free_codes(table, code_width)
+    free = sorted(set(codes))
+
+    # ---- segments: maximal mergeable runs, identical runs collapsed --------
+    blocked = set(skip_chars) | {'=', _SEP}   # `=` can't appear in a .tbl value
+    if table is not None:
+        width = {ch: len(b) for ch, b in table.char_bytes.items() if len(ch) == 1}
+        tokens = {k: len(b) for k, b in table.char_bytes.items() if len(k) > 1}
+    else:
+        width = {}
+        tokens = {}
+    splitter = re.compile('|'.join(
+        [_OPAQUE_RE.pattern] + [re.escape(c) for c in sorted(blocked)]
+    ))
+    seg_freq: Counter[str] = Counter()
+    for text in texts:
+        seg_freq.update(p for p in splitter.split(text) if p)
+    if table is not None:
+        # Characters the table can't encode split runs too.
+        for seg in [s for s in seg_freq if not set(s) <= width.keys()]:
+            f = seg_freq.pop(seg)
+            run: list[str] = []
+            for ch in seg + _SEP:
+                if ch in width:
+                    run.append(ch)
+                elif run:
+                    seg_freq[''.join(run)] += f
+                    run = []
+    else:
+        for seg in seg_freq:
+            for ch in seg:
+                width.setdefault(ch, 1)
+    segs = list(seg_freq)
+    freq = [seg_freq[s] for s in segs]
+    original_size = sum(f * sum(width[ch] for ch in s) for s, f in zip(segs, freq))
+
+    # One corpus string, every run followed by a separator no token contains.
+    # `blen[i]` is the length of the parse symbol starting at i (0 inside a
+    # symbol; separators are 1-char symbols), so the current longest-match
+    # parse of the whole corpus is one bytearray; `pos_freq[i]` is the
+    # multiplicity of the run holding position i.
+    corpus = ''.join(s + _SEP for s in segs)
+    uniform = all(f == 1 for f in freq)
+    pos_freq = array('I')
+    for s, f in zip(segs, freq):
+        pos_freq.extend(array('I', [f]) * (len(s) + 1))
+    parse_len = max([max_token_len, *map(len, tokens)])
+    width[_SEP] = 0
+    learned: dict[str, int] = {}
+    usage: Counter[str] = Counter()
+    if tokens:
+        blen = bytearray(len(corpus))
+        i = 0
+        while i < len(corpus):
+            plen, _ = _longest(corpus, i, tokens, width, parse_len)
+            blen[i] = plen
+            if plen > 1:
+                usage[corpus[i:i + plen]] += pos_freq[i]
+            i += plen
+    else:
+        blen = bytearray(b'\x01') * len(corpus)
+    encoded = original_size - sum(
+        u * (sum(width[ch] for ch in tok) - tokens[tok]) for tok, u in usage.items()
+    )
+
+    # ---- candidates: substrings, grown only from frequent prefixes ---------
+    # `occ[tok]` lists every (overlapping) corpus position of a candidate;
+    # the corpus never changes, so these stay valid while the parse moves.
+    def unit(tok: str) -> int:
+        return sum(width[ch] for ch in tok) - code_width
+
+    bound: dict[str, int] = {}
+    occ: dict[str, list[int]] = {}
+    prev: Optional[dict[str, list[int]]] = None
+    for length in range(2, max_token_len + 1):
+        found: defaultdict[str, list[int]] = defaultdict(list)
+        if prev is None:
+            for i, tok in enumerate(map(str.__add__, corpus, corpus[1:])):
+                found[tok].append(i)
+        else:
+            for positions in prev.values():
+                for i in positions:
+                    found[corpus[i:i + length]].append(i)
+        prev = {}
+        for tok, positions in found.items():
+            if _SEP in tok:
+                continue
+            c = len(positions) if uniform else sum(pos_freq[i] for i in positions)
+            b = c * unit(tok)
+            if b - entry_cost >= min_gain:
+                prev[tok] = positions
+                if tok not in tokens:
+                    bound[tok] = b
+                    occ[tok] = positions
+        if not prev:
+            break
+
+    def reparse(tok: str, commit: bool) -> int:
+        """Gain of adding `tok`: re-parse from each boundary where it now
+        wins up to the first position that was already a boundary (the
+        parses agree from there on). `commit` applies the new parse."""
+        nonlocal encoded
+        size = len(tok)
+        tokens[tok] = code_width
+        gain = 0
+        resume = 0
+        for p in occ[tok]:
+            if p < resume:
+                continue
+            b = blen[p]
+            if not b or b >= size:
+                continue
+            # No longer token matched here before, so `tok` is the pick.
+            q = p + size
+            new_size = code_width
+            new = [(p, size)] if commit else None
+            while not blen[q]:
+                plen, w = _longest(corpus, q, tokens, width, parse_len)
+                new_size += w
+                if commit:
+                    new.append((q, plen))
+                q += plen
+            resume = q
+            f = pos_freq[p]
+            old = 0
+            j = p
+            while j < q:
+                plen = blen[j]
+                if plen > 1:
+                    sym = corpus[j:j + plen]
+                    old += tokens[sym]
+                    if commit:
+                        usage[sym] -= f
+                else:
+                    old += width[corpus[j]]
+                j += plen
+            delta = f * (old - new_size)
+            gain += delta
+            if commit:
+                encoded -= delta
+                blen[p:q] = bytes(q - p)
+                for i, plen in new:
+                    blen[i] = plen
+                    if plen > 1:
+                        usage[corpus[i:i + plen]] += f
+        if not commit:
+            del tokens[tok]
+        return gain
+
+    # Lazy greedy: heap values are upper bounds, a popped token is re-priced
+    # exactly and only taken if it still beats the next bound. A token worth
+    # nothing now can gain value from a later pick (`th` once `en` makes
+    # `th|en` beat `t|he|n`), so while codes remain, every pass that took
+    # something is followed by another over the untaken candidates.
+    heap: list[tuple[int, str]] = []
+    taken = True
+    while free:
+        if not heap:
+            if not taken:
+                break
+            heap = [(-b, tok) for tok, b in bound.items() if tok not in tokens]
+            heapq.heapify(heap)
+            taken = False
+            continue
+        _, tok = heapq.heappop(heap)
+        if tok in tokens:
+            continue
+        g = reparse(tok, False)
+        if heap and g < -heap[0][0]:
+            if g - entry_cost >= min_gain:
+                heapq.heappush(heap, (-g, tok))
+            continue
+        if g - entry_cost < min_gain:
+            heap = []   # nothing left in this pass is worth a code
+            continue
+        taken = True
+
+        reparse(tok, True)
+        learned[tok] = free.pop(0)
+        # A learned token every use of which moved into a longer one gives
+        # its code back; it can be picked again if it regains value.
+        for old in [t for t in learned if t != tok and usage[t] <= 0]:
+            del tokens[old]
+            bisect.insort(free, learned.pop(old))
+            heapq.heappush(heap, (-bound[old], old))
+
+    entries = sorted(learned.items(), key=lambda e: e[1])
+    return DteResult(entries=entries, original_size=original_size,
+                     savings=original_size - encoded, code_width=code_width)
+
+
+def _longest(corpus: str, i: int, tokens: dict[str, int], width: dict[str, int],
+             max_len: int) -> tuple[int, int]:
+    """Longest-match symbol at `i` → (length, byte size)."""
+    for plen in range(max_len, 1, -1):
+        w = tokens.get(corpus[i:i + plen])
+        if w is not None:
+            return plen, w
+    return 1, width[corpus[i]]
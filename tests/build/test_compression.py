@@ -112,6 +112,35 @@ def test_graphics_raw_passthrough(tmp_path):
     assert out.read_bytes()[0x3000:0x3020] == tile_bytes
 
 
+def test_graphics_raw_dedupe_tiles_drops_repeated_tiles(tmp_path):
+    rom_path = _make_lorom(tmp_path)
+    a, b = bytes(range(16)), bytes(range(16, 32))    # two 2bpp tiles
+    (tmp_path / "tiles.bin").write_bytes(a + b + a + a + b)
+    out = tmp_path / "out.sfc"
+    original = rom_path.read_bytes()
+
+    # The shared `dedupe` flag leaves raw tile data alone.
+    spec = BuildSpec(sections=[Section(
+        kind=SectionKind.GRAPHICS, offset=0x3000, bpp=2, dedupe=True,
+        files=[PurePosixPath("tiles.bin")], attrs={"dedupe": "true"},
+    )])
+    build(spec, source_root=tmp_path, out_path=out, original_rom=rom_path)
+    assert out.read_bytes()[0x3000:0x3050] == a + b + a + a + b
+
+    spec = BuildSpec(sections=[Section(
+        kind=SectionKind.GRAPHICS, offset=0x3000, bpp=2,
+        files=[PurePosixPath("tiles.bin")], attrs={"dedupe-tiles": "true"},
+    )])
+    build(spec, source_root=tmp_path, out_path=out, original_rom=rom_path)
+    written = out.read_bytes()
+    assert written[0x3000:0x3020] == a + b
+    assert written[0x3020:0x3050] == original[0x3020:0x3050]
+
+    (tmp_path / "tiles.bin").write_bytes(a + b[:8])
+    with pytest.raises(HandlerError, match="whole number"):
+        build(spec, source_root=tmp_path, out_path=out, original_rom=rom_path)
+
+
 def test_graphics_unknown_transform_errors(tmp_path):
     rom_path = _make_lorom(tmp_path)
     (tmp_path / "t.bin").write_bytes(b"\x00")
@@ -2,6 +2,8 @@
 inline-redirect). Handler integration lands in Phase 6c."""
 from __future__ import annotations
 
+import random
+
 import pytest
 
 from retrotool.build.overflow import (
@@ -65,6 +67,117 @@ def test_freespace_reserve_exhausts_range_and_rolls_over():
     assert a.alloc(8) == 0x200
 
 
+def test_first_fit_reuses_space_bump_would_strand():
+    pairs = [(0x100, 0x108), (0x200, 0x300)]
+    bump = FreespaceAllocator.from_pairs(pairs)
+    assert bump.alloc(0x10) == 0x200        # skips the 8-byte range for good
+    assert bump.alloc(4) == 0x210
+    assert bump.stats().lost == 8
+
+    ff = FreespaceAllocator.from_pairs(pairs, policy="first-fit")
+    assert ff.alloc(0x10) == 0x200
+    assert ff.alloc(4) == 0x100             # small request fills the hole
+    assert ff.stats().lost == 0
+
+
+def test_hole_policy_reserve_reclaims_gap_below():
+    a = FreespaceAllocator.from_pairs([(0x100, 0x200)], policy="first-fit")
+    assert a.reserve(0x180, 0x40) is True
+    assert a.holes() == [(0x100, 0x180), (0x1C0, 0x200)]
+    assert a.alloc(0x10) == 0x100
+    assert a.reserve(0x500, 0x10) is False
+
+
+def test_best_fit_picks_smallest_hole():
+    a = FreespaceAllocator.from_pairs(
+        [(0x000, 0x100), (0x200, 0x210), (0x300, 0x340)], policy="best-fit",
+    )
+    assert a.alloc(0x10) == 0x200           # exact fit
+    assert a.alloc(0x20) == 0x300           # 0x40 hole beats 0x100 hole
+    assert a.alloc(0x80) == 0x000
+    stats = a.stats()
+    assert (stats.total, stats.free, stats.holes, stats.largest_hole) == (
+        0x150, 0xA0, 2, 0x80,
+    )
+    assert stats.allocations == 3
+    assert stats.fragmentation == pytest.approx(1 - 0x80 / 0xA0)
+
+
+def test_bank_size_avoids_crossing_boundary():
+    for policy in ("bump", "first-fit", "best-fit"):
+        a = FreespaceAllocator.from_pairs(
+            [(0x7FF0, 0x8100)], policy=policy, bank_size=0x8000,
+        )
+        assert a.alloc(0x08) == 0x7FF0
+        assert a.alloc(0x10) == 0x8000, policy   # would straddle $8000
+        with pytest.raises(FreespaceExhausted):
+            a.alloc(0x9000)
+    # Per-request override; hole policies keep the skipped bytes usable.
+    a = FreespaceAllocator.from_pairs([(0x7FF0, 0x8100)], policy="first-fit")
+    assert a.alloc(0x20, bank_size=0x8000) == 0x8000
+    assert a.alloc(0x10) == 0x7FF0
+
+
+def test_hole_policy_snapshot_restore():
+    a = FreespaceAllocator.from_pairs([(0, 0x100)], policy="best-fit")
+    a.alloc(0x10)
+    state = a.snapshot()
+    first = [a.alloc(0x20), a.alloc(0x08)]
+    a.restore(state)
+    assert [a.alloc(0x20), a.alloc(0x08)] == first
+    assert a.stats().allocations == 3
+
+
+def test_bump_counts_bank_gap_and_reserve_gap_as_lost():
+    a = FreespaceAllocator.from_pairs([(0x7FF0, 0x10100)], bank_size=0x8000)
+    assert a.alloc(0x20) == 0x8000          # 0x7FF0-0x8000 skipped for good
+    stats = a.stats()
+    assert (stats.total, stats.free, stats.lost, stats.used) == (
+        0x8110, 0x80E0, 0x10, 0x20,
+    )
+    assert a.reserve(0x8100, 0x10) is True  # 0x8020-0x8100 skipped
+    stats = a.stats()
+    assert (stats.lost, stats.used) == (0x10 + 0xE0, 0x30)
+    state = a.snapshot()
+    assert a.alloc(0x7EE0) == 0x8110
+    assert a.alloc(0x20) == 0x10000         # 0xFFF0-0x10000 skipped
+    assert a.stats().lost == 0x100
+    a.restore(state)
+    assert a.stats().lost == 0xF0
+
+
+def test_first_fit_matches_linear_scan():
+    rng = random.Random(1)
+    for bank in (None, 0x100):
+        a = FreespaceAllocator.from_pairs(
+            [(i * 0x400, i * 0x400 + rng.randint(0x80, 0x3FF)) for i in range(64)],
+            policy="first-fit", bank_size=bank,
+        )
+        for _ in range(400):
+            if rng.random() < 0.3:
+                a.reserve(rng.randrange(0x10000), rng.randint(1, 0x40))
+                continue
+            n = rng.randint(1, 0xC0)
+            expected = None
+            for lo, hi in a.holes():
+                off = lo
+                if bank and off // bank != (off + n - 1) // bank:
+                    off = (off // bank + 1) * bank
+                if off + n <= hi:
+                    expected = off
+                    break
+            if expected is None:
+                with pytest.raises(FreespaceExhausted):
+                    a.alloc(n)
+            else:
+                assert a.alloc(n) == expected
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        FreespaceAllocator.from_pairs([(0, 1)], policy="worst-fit")
+
+
 def test_fail_strategy_passes_short_entry():
     s = FailStrategy()
     p = s.pack(Entry("e", b"abc", max_inline=8), allocator=None)
@@ -334,6 +334,26 @@ def test_freespace_invalid_pair(tmp_path):
         parse_project_toml(tmp_path / "project.toml")
 
 
+def test_freespace_policy_and_bank(tmp_path):
+    (tmp_path / "project.toml").write_text(
+        '[rom]\nfile="base.sfc"\n[rom.build]\nfreespace=[[0x100, 0x200]]\n'
+        'freespace-policy="best-fit"\nfreespace-bank="lorom"\n',
+        encoding="utf-8"
+    )
+    spec = parse_project_toml(tmp_path / "project.toml")
+    assert spec.freespace_policy == "best-fit"
+    assert spec.freespace_bank == 0x8000
+
+
+def test_freespace_policy_invalid(tmp_path):
+    (tmp_path / "project.toml").write_text(
+        '[rom]\nfile="base.sfc"\n[rom.build]\nfreespace-policy="worst-fit"\n',
+        encoding="utf-8"
+    )
+    with pytest.raises(SchemaError, match="freespace-policy"):
+        parse_project_toml(tmp_path / "project.toml")
+
+
 def test_mesen_table_parsed(tmp_path):
     (tmp_path / "project.toml").write_text(textwrap.dedent("""
         [rom]
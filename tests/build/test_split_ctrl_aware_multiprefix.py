@@ -166,3 +166,42 @@ def test_factory_prefers_ctrl_table_over_ctrl_lengths():
     # If factory used ctrl_lengths (FF as default 2-byte ctrl + term=0xFF
     # mismatch), it would walk wrong. ctrl_table path stops at FF (term).
     assert split(encoded, 99) == 5  # FC.02 + AA, then term
+
+
+# --------------------------------------------------------------------------
+# Precompiled scan: one pass, many budgets
+# --------------------------------------------------------------------------
+
+def test_scan_records_every_safe_split():
+    split = split_ctrl_aware(ctrl_table=RBSHURA_CTRL_TABLE, terminator=0xFF)
+    # AA | FC 02 24 08 | BB | F7 01 | CC | FF(term) DD
+    encoded = bytes([0xAA, 0xFC, 0x02, 0x24, 0x08, 0xBB, 0xF7, 0x01, 0xCC, 0xFF, 0xDD])
+    points = split.scan(encoded)
+    safe = [i for i in range(len(encoded) + 1) if points.safe[i]]
+    assert safe == [0, 1, 5, 6, 8, 9]
+    assert [points.split(b) for b in (0, 1, 4, 5, 7, 99)] == [0, 1, 1, 5, 6, 9]
+    # Same bytes object again → cached scan, same answers as a fresh walk.
+    assert split.scan(encoded) is points
+    assert split(encoded, 7) == 6
+
+
+def test_scan_cache_sees_in_place_edits():
+    split = split_ctrl_aware(ctrl_table=RBSHURA_CTRL_TABLE, terminator=0xFF)
+    buf = bytearray([0xAA, 0xBB, 0xCC, 0xDD, 0xFF])
+    assert split(buf, 3) == 3
+    buf[1] = 0xF7           # AA | F7 01 | DD: 2-byte ctrl now spans 1..2
+    buf[2] = 0x01
+    assert split(buf, 2) == 1
+    assert split(bytes(buf), 2) == 1
+
+
+def test_scan_event_script_text_windows():
+    split = split_ctrl_aware(
+        ctrl_table={0xFF: (2, {})}, terminator=0x00,
+        event_script=True, text_enter=0x10,
+    )
+    # 01 02 | 10 (enter) 41 42 FF 05 43 00 (end text) | 03
+    encoded = bytes([0x01, 0x02, 0x10, 0x41, 0x42, 0xFF, 0x05, 0x43, 0x00, 0x03])
+    assert [split(encoded, b) for b in (2, 3, 4, 6, 7, 8, 9, 10)] == [
+        0, 0, 4, 5, 7, 8, 8, 8,
+    ]
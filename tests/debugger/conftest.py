@@ -0,0 +1,180 @@
+"""A fake Mesen2-Diz IPC server on a Unix socket, for client tests."""
+from __future__ import annotations
+
+import base64
+import json
+import socket
+import threading
+
+import pytest
+
+from retrotool.debugger import client as client_mod
+
+
+class FakeMesen:
+    """Newline-JSON server with a little emulated state.
+
+    `hold=N` withholds responses until N requests are buffered (a strictly
+    synchronous client then stalls); `reverse=True` answers each held group
+    last-first, echoing `requestId`, to exercise out-of-order matching.
+    `on_step(fake, count)` mutates memory when the client steps;
+    `on_resume(fake)` runs on `resume`. `push(doc)` sends an unsolicited
+    event line to every connection.
+    """
+
+    def __init__(self, path: str, *, hold: int = 1, reverse: bool = False,
+                 on_step=None, on_resume=None) -> None:
+        self.path = path
+        self.hold = hold
+        self.reverse = reverse
+        self.on_step = on_step
+        self.on_resume = on_resume
+        self._conns: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self.received: list[dict] = []
+        self.reads = 0                     # recv() calls that carried data
+        self.memory: dict[str, bytearray] = {}
+        self.frame = 0
+        self.paused = True
+        self.pc = 0x8000
+        self.breakpoints: dict[int, int] = {}
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(path)
+        self._sock.listen(4)
+        self._threads: list[threading.Thread] = []
+        self._accept = threading.Thread(target=self._serve, daemon=True)
+        self._accept.start()
+
+    def mem(self, memory_type: str) -> bytearray:
+        return self.memory.setdefault(memory_type, bytearray(0x20000))
+
+    def close(self) -> None:
+        self._sock.close()
+        for conn in self._conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def push(self, doc: dict) -> None:
+        line = (json.dumps(doc) + "\n").encode()
+        with self._lock:
+            for conn in self._conns:
+                conn.sendall(line)
+
+    # --- server ----------------------------------------------------------
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            t = threading.Thread(target=self._handle, args=(conn,), daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _handle(self, conn: socket.socket) -> None:
+        buf = bytearray()
+        held: list[dict] = []
+        self._conns.append(conn)
+        with conn:
+            while True:
+                try:
+                    chunk = conn.recv(65536)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                self.reads += 1
+                buf.extend(chunk)
+                while b"\n" in buf:
+                    nl = buf.index(b"\n")
+                    doc = json.loads(bytes(buf[:nl]))
+                    del buf[:nl + 1]
+                    self.received.append(doc)
+                    held.append(doc)
+                if len(held) >= self.hold:
+                    order = held[::-1] if self.reverse else held
+                    out = b"".join(self._reply(d) for d in order)
+                    with self._lock:
+                        conn.sendall(out)
+                    held = []
+
+    def _reply(self, doc: dict) -> bytes:
+        try:
+            data = self.dispatch(doc)
+            out = {"success": True, "data": data}
+        except Exception as exc:               # noqa: BLE001 — reported to client
+            out = {"success": False, "error": str(exc)}
+        if "requestId" in doc:
+            out["requestId"] = doc["requestId"]
+        return (json.dumps(out) + "\n").encode()
+
+    def dispatch(self, doc: dict):
+        cmd = doc["command"]
+        if cmd == "readMemory":
+            mem = self.mem(doc["memoryType"])
+            a = doc["address"]
+            chunk = bytes(mem[a:a + doc["length"]])
+            enc = doc.get("encoding")
+            if enc == "base64":
+                return {"base64": base64.b64encode(chunk).decode()}
+            if enc == "hex":
+                return {"bytes": chunk.hex(), "encoding": "hex"}
+            return {"bytes": list(chunk)}
+        if cmd == "writeMemory":
+            mem = self.mem(doc["memoryType"])
+            a = doc["address"]
+            raw = doc["bytes"]
+            enc = doc.get("encoding")
+            if enc == "base64":
+                raw = base64.b64decode(raw)
+            elif enc == "hex":
+                raw = bytes.fromhex(raw)
+            mem[a:a + len(raw)] = bytes(raw)
+            return {}
+        if cmd == "step":
+            self.frame += doc.get("count", 1)
+            if self.on_step:
+                self.on_step(self, doc.get("count", 1))
+            return {}
+        if cmd == "getStatus":
+            return {"paused": self.paused, "frame": self.frame}
+        if cmd == "pause":
+            self.paused = True
+            return {}
+        if cmd == "resume":
+            self.paused = False
+            if self.on_resume:
+                self.on_resume(self)
+            return {}
+        if cmd == "getCpuState":
+            return {"pc": self.pc}
+        if cmd == "addBreakpoint":
+            bp = len(self.breakpoints) + 1
+            self.breakpoints[bp] = doc["address"]
+            return {"id": bp}
+        if cmd == "removeBreakpoint":
+            self.breakpoints.pop(doc["id"])
+            return {}
+        if cmd == "echo":
+            return {"value": doc.get("value")}
+        raise ValueError(f"unknown command {cmd}")
+
+
+@pytest.fixture
+def fake_mesen(tmp_path, monkeypatch):
+    """Factory: `fake_mesen(**opts)` → a running `FakeMesen` every
+    `MesenClient` in the test connects to."""
+    servers: list[FakeMesen] = []
+
+    def make(**opts) -> FakeMesen:
+        path = str(tmp_path / f"mesen{len(servers)}.sock")
+        server = FakeMesen(path, **opts)
+        servers.append(server)
+        monkeypatch.setattr(client_mod, "_pipe_path", lambda _name: path)
+        return server
+
+    yield make
+    for s in servers:
+        s.close()
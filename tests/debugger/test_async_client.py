@@ -0,0 +1,196 @@
+"""AsyncMesenClient against the fake Unix-socket Mesen server."""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from retrotool.debugger import (
+    AsyncMesenClient,
+    IpcError,
+    MemoryRegion,
+    run_until_breakpoint_async,
+    snapshot_registers_async,
+    watch_async,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _later(seconds, fn):
+    t = threading.Timer(seconds, fn)
+    t.daemon = True
+    t.start()
+
+
+def test_concurrent_requests_are_in_flight_together(fake_mesen):
+    # The server answers only once three requests are buffered.
+    fake_mesen(hold=3)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            return await asyncio.gather(
+                c.call("echo", value=1), c.get_status(), c.call("echo", value=3)
+            )
+
+    a, status, b = _run(main())
+    assert a == {"value": 1} and b == {"value": 3} and status["paused"] is True
+
+
+def test_out_of_order_responses_match_by_request_id(fake_mesen):
+    fake_mesen(hold=10, reverse=True)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2, request_ids=True) as c:
+            return await asyncio.gather(*(c.call("echo", value=i) for i in range(10)))
+
+    assert [r["value"] for r in _run(main())] == list(range(10))
+
+
+def test_pipeline_and_failure(fake_mesen):
+    fake_mesen()
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            out = await c.pipeline([("echo", {"value": i}) for i in range(50)])
+            with pytest.raises(IpcError, match="nope"):
+                await c.call("nope")
+            return out
+
+    assert [r.data["value"] for r in _run(main())] == list(range(50))
+
+
+def test_subscribe_receives_pushed_events(fake_mesen):
+    server = fake_mesen()
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            bps = c.subscribe("breakpointHit")
+            everything = c.subscribe()
+            await c.get_status()
+            server.push({"event": "frame", "frame": 1})
+            server.push({"event": "breakpointHit", "pc": 0x8123})
+            got = await asyncio.wait_for(bps.get(), 2)
+            first = await asyncio.wait_for(everything.get(), 2)
+            assert await c.call("echo", value=5) == {"value": 5}
+            return got, first
+
+    got, first = _run(main())
+    assert got["pc"] == 0x8123 and first["event"] == "frame"
+
+
+def test_wait_until_paused_backs_off(fake_mesen):
+    def on_resume(fake):
+        _later(0.15, lambda: setattr(fake, "paused", True))
+
+    server = fake_mesen(on_resume=on_resume)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            await c.resume()
+            return await c.wait_until_paused(timeout=2, max_interval=0.05)
+
+    assert _run(main())["paused"] is True
+    polls = sum(d["command"] == "getStatus" for d in server.received)
+    assert 2 <= polls < 20
+
+
+def test_wait_until_paused_wakes_on_event(fake_mesen):
+    def on_resume(fake):
+        def hit():
+            fake.paused = True
+            fake.push({"event": "breakpointHit"})
+        _later(0.05, hit)
+
+    fake_mesen(on_resume=on_resume)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            await c.resume()
+            loop = asyncio.get_running_loop()
+            t0 = loop.time()
+            status = await c.wait_until_paused(timeout=10, min_interval=5, max_interval=5)
+            return status, loop.time() - t0
+
+    status, elapsed = _run(main())
+    assert status["paused"] is True and elapsed < 2
+
+
+def test_wait_until_paused_times_out(fake_mesen):
+    fake_mesen()
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            await c.resume()
+            return await c.wait_until_paused(timeout=0.05)
+
+    assert _run(main()) is None
+
+
+def test_run_until_breakpoint_async(fake_mesen):
+    def on_resume(fake):
+        def hit():
+            fake.pc = 0x8123
+            fake.paused = True
+        _later(0.02, hit)
+
+    server = fake_mesen(on_resume=on_resume)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            hit = await run_until_breakpoint_async(c, 0x8123, timeout=2)
+            regs = await snapshot_registers_async(c)
+            return hit, regs
+
+    hit, regs = _run(main())
+    assert hit is True and regs["pc"] == 0x8123
+    assert server.breakpoints == {}
+
+
+def test_watch_async_runs_alongside_other_tasks(fake_mesen):
+    def tick(fake, count):
+        fake.mem("SnesWorkRam")[0] += 1
+
+    fake_mesen(on_step=tick)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            changes, status = await asyncio.gather(
+                watch_async(c, MemoryRegion("SnesWorkRam", 0, 2), 4),
+                c.get_status(),
+            )
+            return changes, status
+
+    changes, status = _run(main())
+    assert changes == [(0, 0, 1), (0, 1, 2), (0, 2, 3), (0, 3, 4)]
+    assert "paused" in status
+
+
+def test_pending_requests_fail_when_pipe_closes(fake_mesen):
+    server = fake_mesen(hold=2)
+
+    async def main():
+        async with AsyncMesenClient("x", timeout=2) as c:
+            pending = asyncio.ensure_future(c.get_status())
+            await asyncio.sleep(0.05)
+            server.close()
+            with pytest.raises(IpcError, match="closed|failed"):
+                await pending
+            with pytest.raises(IpcError):
+                await c.get_status()
+
+    _run(main())
+
+
+def test_missing_pipe(tmp_path, monkeypatch):
+    from retrotool.debugger import client as client_mod
+    monkeypatch.setattr(client_mod, "_pipe_path", lambda _n: str(tmp_path / "none"))
+
+    async def main():
+        with pytest.raises(IpcError, match="not found"):
+            await AsyncMesenClient("x").connect()
+
+    _run(main())
@@ -0,0 +1,133 @@
+"""Pipelined / batched MesenClient traffic against a fake Unix-socket server."""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from retrotool.ai import IpcPlan, IpcStep
+from retrotool.debugger import (
+    IpcError, MemoryRegion, MesenClient, run_until_breakpoint, watch,
+)
+
+
+def test_request_and_call_round_trip(fake_mesen):
+    fake_mesen()
+    with MesenClient("x", timeout=2) as c:
+        assert c.call("echo", value=7) == {"value": 7}
+        assert c.get_status()["paused"] is True
+        r = c.request("nope")
+        assert not r.success and "unknown command" in r.error
+        with pytest.raises(IpcError, match="nope"):
+            c.call("nope")
+
+
+def test_pipeline_writes_window_before_reading(fake_mesen):
+    # The server answers only once 50 requests are buffered: a one-at-a-time
+    # client would time out waiting for the first response.
+    server = fake_mesen(hold=50)
+    with MesenClient("x", timeout=2) as c:
+        out = c.pipeline([("echo", {"value": i}) for i in range(100)], window=50)
+    assert [r.data["value"] for r in out] == list(range(100))
+    assert len(server.received) == 100
+
+
+def test_pipeline_matches_out_of_order_responses_by_id(fake_mesen):
+    server = fake_mesen(hold=8, reverse=True)
+    with MesenClient("x", timeout=2, request_ids=True) as c:
+        out = c.pipeline([("echo", {"value": i}) for i in range(16)], window=8)
+    assert [r.data["value"] for r in out] == list(range(16))
+    assert [d["requestId"] for d in server.received] == list(range(16))
+
+
+def test_pipeline_rejects_bad_window(fake_mesen):
+    fake_mesen()
+    with MesenClient("x", timeout=2) as c, pytest.raises(ValueError, match="window"):
+        c.pipeline([("echo", {})], window=0)
+
+
+def test_batch_fills_pending_results(fake_mesen):
+    server = fake_mesen(hold=3)
+    with MesenClient("x", timeout=2) as c:
+        with c.batch() as b:
+            w = b.request("writeMemory", memoryType="SnesWorkRam", address=16, bytes=[1, 2, 3])
+            r = b.request("readMemory", memoryType="SnesWorkRam", address=15, length=5)
+            bad = b.request("nope")
+            with pytest.raises(IpcError, match="not sent"):
+                r.result()
+        assert w.result() == {}
+        assert r.result()["bytes"] == [0, 1, 2, 3, 0]
+        with pytest.raises(IpcError, match="nope"):
+            bad.result()
+    assert len(server.received) == 3
+
+
+def test_batch_sends_nothing_when_block_raises(fake_mesen):
+    server = fake_mesen()
+    with MesenClient("x", timeout=2) as c:
+        with pytest.raises(RuntimeError):
+            with c.batch() as b:
+                b.request("echo", value=1)
+                raise RuntimeError("abort")
+        assert c.call("echo", value=2) == {"value": 2}
+    assert [d.get("value") for d in server.received] == [2]
+
+
+def test_run_plan_sends_whole_plan(fake_mesen):
+    server = fake_mesen(hold=4)
+    plan = IpcPlan(goal="t", steps=[
+        IpcStep("addBreakpoint", {"address": 0x8123, "memoryType": "SnesMemory", "type": "exec"}),
+        IpcStep("resume", {}),
+        IpcStep("getStatus", {}),
+        IpcStep("getCpuState", {}),
+    ])
+    with MesenClient("x", timeout=2) as c:
+        out = c.run_plan(plan)
+    assert [r.success for r in out] == [True] * 4
+    assert out[0].data == {"id": 1} and out[2].data["paused"] is False
+    assert [d["command"] for d in server.received] == [s.command for s in plan.steps]
+
+
+def test_watch_pipelines_step_and_read(fake_mesen):
+    def tick(fake, count):
+        fake.mem("SnesWorkRam")[0x10] = fake.frame & 0xFF
+
+    server = fake_mesen(on_step=tick)
+    seen = []
+    with MesenClient("x", timeout=2) as c:
+        changes = watch(c, MemoryRegion("SnesWorkRam", 0x10, 4), 3, step_between=2,
+                        on_change=lambda *a: seen.append(a))
+    assert changes == [(0, 0, 2), (0, 2, 4), (0, 4, 6)] == seen
+    assert [d["command"] for d in server.received] == ["readMemory"] + ["step", "readMemory"] * 3
+
+
+def _status_polls(server) -> int:
+    return sum(d["command"] == "getStatus" for d in server.received)
+
+
+def test_run_until_breakpoint_backs_off_between_polls(fake_mesen):
+    def on_resume(fake):
+        def hit():
+            fake.pc = 0x8123
+            fake.paused = True
+        t = threading.Timer(0.2, hit)
+        t.daemon = True
+        t.start()
+
+    server = fake_mesen(on_resume=on_resume)
+    with MesenClient("x", timeout=2) as c:
+        assert run_until_breakpoint(c, 0x8123, timeout=2, max_interval=0.05) is True
+    assert _status_polls(server) < 20                # not a busy loop
+    assert server.breakpoints == {}
+
+
+def test_run_until_breakpoint_wall_clock_timeout(fake_mesen):
+    server = fake_mesen()
+    with MesenClient("x", timeout=2) as c:
+        t0 = time.monotonic()
+        assert run_until_breakpoint(c, 0x8123, timeout=0.3, max_interval=0.05) is False
+        elapsed = time.monotonic() - t0
+    assert 0.3 <= elapsed < 1.5
+    assert _status_polls(server) < 20
+    assert server.breakpoints == {}
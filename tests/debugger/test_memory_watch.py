@@ -0,0 +1,109 @@
+"""Binary memory transfer, run-based diffs and the snapshot ring."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.debugger import (
+    IpcError,
+    MemoryRegion,
+    MesenClient,
+    SnapshotRing,
+    diff_bytes,
+    diff_runs,
+    watch,
+    watch_runs,
+)
+from retrotool.debugger.client import memory_bytes
+
+
+def _ref_diff(a, b):
+    return [(i, x, y) for i, (x, y) in enumerate(zip(a, b)) if x != y]
+
+
+def test_diff_bytes_matches_reference():
+    rng = random.Random(43)
+    a = bytes(rng.randrange(256) for _ in range(4096))
+    b = bytearray(a)
+    for _ in range(200):
+        b[rng.randrange(len(b))] = rng.randrange(256)
+    assert diff_bytes(a, bytes(b)) == _ref_diff(a, b)
+    assert diff_bytes(a, a) == []
+    assert diff_bytes(a[:10], b) == _ref_diff(a[:10], b)
+    assert diff_bytes(b"", b"x") == []
+
+
+def test_diff_runs_groups_and_merges():
+    a = bytes(16)
+    b = bytearray(a)
+    b[2:5] = b"\x01\x02\x03"
+    b[7] = 9
+    b[15] = 1
+    assert diff_runs(a, bytes(b)) == [
+        (2, b"\x00" * 3, b"\x01\x02\x03"), (7, b"\x00", b"\x09"), (15, b"\x00", b"\x01"),
+    ]
+    merged = diff_runs(a, bytes(b), merge_gap=2)
+    assert merged[0] == (2, a[2:8], bytes(b[2:8])) and merged[1][0] == 15
+
+
+def test_snapshot_ring_evicts_and_diffs():
+    ring = SnapshotRing(3)
+    for v in range(5):
+        ring.push(bytes([v, 7, v * 2]))
+    assert len(ring) == 3 and ring.ticks() == [2, 3, 4]
+    assert ring[0] == (2, bytes([2, 7, 4]))
+    assert ring.runs() == [(0, b"\x03", b"\x04"), (2, b"\x06", b"\x08")]
+    assert ring.runs(0, -1, merge_gap=1) == [(0, bytes([2, 7, 4]), bytes([4, 7, 8]))]
+    assert [t for t, _ in ring.changes()] == [3, 4]
+    assert ring.byte_history(0) == [(2, 2), (3, 3), (4, 4)]
+    ring.push(b"\x00\x00\x00", tick=100)
+    assert ring.ticks() == [3, 4, 100]
+    with pytest.raises(ValueError):
+        SnapshotRing(0)
+
+
+def test_memory_bytes_forms():
+    assert memory_bytes({"bytes": [1, 2, 255]}) == b"\x01\x02\xff"
+    assert memory_bytes({"base64": "AQL/"}) == b"\x01\x02\xff"
+    assert memory_bytes({"hex": "0102ff"}) == b"\x01\x02\xff"
+    assert memory_bytes({"bytes": "0102ff", "encoding": "hex"}) == b"\x01\x02\xff"
+    assert memory_bytes({"bytes": "AQL/", "encoding": "base64"}) == b"\x01\x02\xff"
+    assert memory_bytes({}) == b""
+    with pytest.raises(IpcError, match="bad base64"):
+        memory_bytes({"base64": "!!"})
+
+
+@pytest.mark.parametrize("encoding", ["list", "base64", "hex"])
+def test_read_write_memory_in_each_encoding(fake_mesen, encoding):
+    server = fake_mesen()
+    payload = bytes(range(256)) * 4
+    with MesenClient("x", timeout=2, memory_encoding=encoding) as c:
+        c.write_memory("SnesWorkRam", 0x100, payload)
+        assert c.read_memory("SnesWorkRam", 0x100, len(payload)) == payload
+    sent = server.received[0]
+    assert sent.get("encoding") == (None if encoding == "list" else encoding)
+    assert isinstance(sent["bytes"], list if encoding == "list" else str)
+
+
+def test_unknown_encoding_rejected():
+    with pytest.raises(ValueError, match="memory encoding"):
+        MesenClient("x", memory_encoding="zip")
+
+
+def test_watch_runs_and_history(fake_mesen):
+    def tick(fake, count):
+        mem = fake.mem("SnesWorkRam")
+        mem[0] = fake.frame
+        mem[100:104] = bytes([fake.frame] * 4)
+
+    fake_mesen(on_step=tick)
+    ring = SnapshotRing(2)
+    region = MemoryRegion("SnesWorkRam", 0, 0x2000)
+    with MesenClient("x", timeout=2, memory_encoding="base64") as c:
+        runs = watch_runs(c, region, 3, history=ring)
+        per_byte = watch(c, region, 1)
+    assert runs[:2] == [(1, (0, b"\x00", b"\x01")), (1, (100, bytes(4), b"\x01" * 4))]
+    assert [t for t, _ in runs] == [1, 1, 2, 2, 3, 3]
+    assert ring.ticks() == [2, 3] and ring[-1][1][100:104] == b"\x03" * 4
+    assert per_byte == [(0, 3, 4)] + [(100 + k, 3, 4) for k in range(4)]
@@ -1,6 +1,7 @@
 """Unit tests for Mesen2 SRAM sync helper."""
 from __future__ import annotations
 
+import io
 import tarfile
 import time
 from pathlib import Path
@@ -8,6 +9,7 @@ from pathlib import Path
 import pytest
 
 from retrotool.debugger.mesen_saves import (
+    SramArchive,
     SramSyncError,
     SramSyncResult,
     default_saves_dir,
@@ -101,13 +103,8 @@ def test_sync_creates_saves_dir_if_missing(tmp_path):
 
 
 def _archive_members(archive_path: Path) -> dict[str, bytes]:
-    with tarfile.open(archive_path, "r:gz") as tf:
-        out = {}
-        for m in tf.getmembers():
-            if m.isfile():
-                buf = tf.extractfile(m)
-                out[m.name] = buf.read() if buf else b""
-        return out
+    archive = SramArchive(archive_path)
+    return {e.name: archive.read(e) for e in archive.entries()}
 
 
 def test_sync_archives_existing_dest_before_clobber(tmp_path):
@@ -122,8 +119,8 @@ def test_sync_archives_existing_dest_before_clobber(tmp_path):
 
     # Dest overwritten with source.
     assert (saves / "out.srm").read_bytes() == b"fresh-base"
-    # Single archive per ROM, named <stem>_archive.tar.gz (no timestamp).
-    assert result.archived == saves / "out_archive.tar.gz"
+    # Single archive per ROM, named <stem>_archive (no timestamp).
+    assert result.archived == saves / "out_archive"
     assert result.archived.exists()
     members = _archive_members(result.archived)
     assert len(members) == 1
@@ -147,7 +144,7 @@ def test_sync_accumulates_entries_across_runs(tmp_path):
     (saves / "out.srm").write_bytes(b"playtest-B")
     sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
 
-    archive = saves / "out_archive.tar.gz"
+    archive = saves / "out_archive"
     members = _archive_members(archive)
     assert len(members) == 2
     payloads = set(members.values())
@@ -169,7 +166,7 @@ def test_sync_skips_archive_when_bytes_already_in_archive(tmp_path):
     r2 = sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
     assert r2.archived is None
 
-    members = _archive_members(saves / "out_archive.tar.gz")
+    members = _archive_members(saves / "out_archive")
     assert len(members) == 1
 
 
@@ -184,7 +181,7 @@ def test_sync_skips_archive_when_dest_matches_source(tmp_path):
     )
     assert result.archived is None
     # No archive materialized.
-    assert list(saves.glob("*_archive.tar.gz")) == []
+    assert list(saves.glob("*_archive*")) == []
 
 
 def test_sync_archive_disabled_still_overwrites(tmp_path):
@@ -199,7 +196,7 @@ def test_sync_archive_disabled_still_overwrites(tmp_path):
     )
     assert result.archived is None
     assert (saves / "out.srm").read_bytes() == b"fresh-base"
-    assert list(saves.glob("*_archive.tar.gz")) == []
+    assert list(saves.glob("*_archive*")) == []
 
 
 def test_sync_archive_same_second_gets_numeric_suffix(tmp_path, monkeypatch):
@@ -218,8 +215,88 @@ def test_sync_archive_same_second_gets_numeric_suffix(tmp_path, monkeypatch):
     (saves / "out.srm").write_bytes(b"second-playtest")
     sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
 
-    members = _archive_members(saves / "out_archive.tar.gz")
+    members = _archive_members(saves / "out_archive")
     assert len(members) == 2
     names = sorted(members.keys())
     # Second entry got numeric suffix because of same-second collision.
     assert any("_1.srm" in n for n in names)
+
+
+def test_archive_is_content_addressed(tmp_path):
+    archive = SramArchive(tmp_path / "a")
+    e = archive.add(b"save-1", "2024-01-01/x_000000.srm", mtime=5)
+    assert e is not None and e.size == 6 and e.mtime == 5
+    assert b"save-1" in archive and b"save-2" not in archive
+    assert archive.add(b"save-1", "2024-01-01/x_000001.srm") is None
+    obj = tmp_path / "a" / "objects" / e.digest[:2] / f"{e.digest}.srm.gz"
+    assert obj.exists()
+    archive.add(b"save-2", "2024-01-01/x_000000.srm")
+    archive.add(b"save-3", "2024-01-01/x_000000.srm")
+    assert [x.name for x in archive.entries()] == [
+        "2024-01-01/x_000000.srm", "2024-01-01/x_000000_1.srm", "2024-01-01/x_000000_2.srm",
+    ]
+    assert archive.read(archive.entries()[2]) == b"save-3"
+
+
+def test_archive_add_interrupted_before_object_is_repaired(tmp_path, monkeypatch):
+    from retrotool.debugger import mesen_saves
+
+    archive = SramArchive(tmp_path / "a")
+    archive.add(b"save-1", "2024-01-01/x_000000.srm", mtime=1)
+
+    def crash(src, dst):
+        raise OSError("power cut")
+
+    monkeypatch.setattr(mesen_saves.os, "replace", crash)
+    with pytest.raises(OSError, match="power cut"):
+        archive.add(b"save-2", "2024-01-01/x_000001.srm", mtime=2)
+    monkeypatch.undo()
+    assert b"save-2" not in archive
+
+    # The retry writes the missing object against the existing index line.
+    e = archive.add(b"save-2", "2024-01-01/x_000002.srm", mtime=3)
+    assert e is not None and (e.name, e.mtime) == ("2024-01-01/x_000001.srm", 2)
+    assert [x.name for x in archive.entries()] == [
+        "2024-01-01/x_000000.srm", "2024-01-01/x_000001.srm",
+    ]
+    assert archive.read(archive.entries()[1]) == b"save-2"
+    assert archive.add(b"save-2", "2024-01-01/x_000003.srm") is None
+
+
+def test_archive_add_does_not_rewrite_existing_objects(tmp_path):
+    saves = tmp_path / "Saves"
+    saves.mkdir()
+    (saves / "base.srm").write_bytes(b"fresh-base")
+    (saves / "out.srm").write_bytes(b"playtest-A")
+    sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
+    objs = list((saves / "out_archive" / "objects").rglob("*.srm.gz"))
+    stamp = objs[0].stat().st_mtime_ns
+    index_size = (saves / "out_archive" / "index.tsv").stat().st_size
+
+    (saves / "out.srm").write_bytes(b"playtest-B")
+    sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
+    assert objs[0].stat().st_mtime_ns == stamp
+    index = (saves / "out_archive" / "index.tsv").read_bytes()
+    assert len(index) > index_size and index.count(b"\n") == 2
+
+
+def test_legacy_tar_archive_is_imported(tmp_path):
+    saves = tmp_path / "Saves"
+    saves.mkdir()
+    legacy = saves / "out_archive.tar.gz"
+    with tarfile.open(legacy, "w:gz") as tf:
+        for name, data in (("2023-05-01/out_101010.srm", b"old-1"),
+                           ("2023-05-02/out_111111.srm", b"old-2")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1683000000
+            tf.addfile(info, io.BytesIO(data))
+    (saves / "base.srm").write_bytes(b"fresh-base")
+    (saves / "out.srm").write_bytes(b"old-2")       # already in the old archive
+
+    result = sync_sram(tmp_path / "base.sfc", tmp_path / "out.sfc", saves_dir=saves)
+    assert result.archived is None
+    members = _archive_members(saves / "out_archive")
+    assert members == {"2023-05-01/out_101010.srm": b"old-1",
+                       "2023-05-02/out_111111.srm": b"old-2"}
+    assert legacy.exists()                            # left untouched
@@ -0,0 +1,148 @@
+"""RAM trace recording, replay, search and export."""
+from __future__ import annotations
+
+import csv
+import random
+
+import pytest
+
+from retrotool.debugger import (
+    MesenClient,
+    TraceFormatError,
+    TraceReader,
+    TraceRegion,
+    TraceWriter,
+    record_trace,
+)
+
+_REGIONS = [TraceRegion("wram", "SnesWorkRam", 0x1000, 64),
+            TraceRegion("oam", "SnesSpriteRam", 0, 16)]
+
+
+def _frames(n: int, seed: int = 44) -> list[bytes]:
+    rng = random.Random(seed)
+    cur = bytearray(80)
+    out = []
+    for _ in range(n):
+        for _ in range(rng.randrange(4)):
+            cur[rng.randrange(80)] = rng.randrange(256)
+        out.append(bytes(cur))
+    return out
+
+
+def _write(path, frames, **opts):
+    with TraceWriter(path, _REGIONS, **opts) as w:
+        for f in frames:
+            w.add(f)
+
+
+def test_random_access_and_replay(tmp_path):
+    frames = _frames(100)
+    path = tmp_path / "t.rtrace"
+    _write(path, frames, keyframe_every=16)
+    with TraceReader(path) as r:
+        assert len(r) == 100 and r.complete and r.regions == _REGIONS
+        for i in (99, 0, 17, 16, 15, 50, 51, -1):
+            assert r.frame(i) == frames[i]
+        assert [d for _, d in r.frames()] == frames
+        assert [t for t, _ in r.frames(90)] == list(range(90, 100))
+        assert r.region(5, "oam") == frames[5][64:]
+        with pytest.raises(IndexError):
+            r.frame(100)
+        with pytest.raises(KeyError):
+            r.region(0, "vram")
+
+
+def test_deltas_compress_well(tmp_path):
+    big = [TraceRegion("wram", "SnesWorkRam", 0, 0x20000)]
+    path = tmp_path / "big.rtrace"
+    cur = bytearray(random.Random(1).randbytes(0x20000))
+    with TraceWriter(path, big) as w:
+        for n in range(20):
+            cur[n * 100] ^= 0xFF
+            w.add(bytes(cur))
+    # One incompressible keyframe; the 19 XOR frames add almost nothing.
+    assert path.stat().st_size < 0x20000 * 1.1
+    with TraceReader(path) as r:
+        assert r.frame(-1) == bytes(cur)
+
+
+def test_find_and_series(tmp_path):
+    frames = [bytes(80)] * 3 + [bytes([5]) + bytes(79)] * 2 + [bytes(80), bytes([5]) + bytes(79)]
+    path = tmp_path / "f.rtrace"
+    _write(path, frames, keyframe_every=2)
+    with TraceReader(path) as r:
+        assert r.find(0x1000, 5) == 3
+        assert r.find(0x1000, 5, start=4) == 4      # first frame searched counts
+        assert r.find(0x1000, 5, start=5) == 6
+        assert r.find(0x1000, 7) is None
+        assert r.find(0x0, 0, region="oam") == 0
+        assert r.byte_series(0x1000)[:4] == [(0, 0), (1, 0), (2, 0), (3, 5)]
+        with pytest.raises(KeyError):
+            r.find(0x2000, 1)
+
+
+def test_exports(tmp_path):
+    frames = _frames(10)
+    path = tmp_path / "e.rtrace"
+    _write(path, frames)
+    with TraceReader(path) as r:
+        assert r.export_raw(tmp_path / "all.bin") == 10
+        assert (tmp_path / "all.bin").read_bytes() == b"".join(frames)
+        r.export_raw(tmp_path / "oam.bin", region="oam", start=2, stop=4)
+        assert (tmp_path / "oam.bin").read_bytes() == frames[2][64:] + frames[3][64:]
+        r.export_csv(tmp_path / "s.csv", [0x1000, 0x1001])
+    rows = list(csv.reader(open(tmp_path / "s.csv")))
+    assert rows[0] == ["tick", "0x1000", "0x1001"]
+    assert rows[4] == ["3", str(frames[3][0]), str(frames[3][1])]
+
+
+def test_unclosed_trace_is_rescanned(tmp_path):
+    frames = _frames(12)
+    path = tmp_path / "u.rtrace"
+    w = TraceWriter(path, _REGIONS, keyframe_every=4)
+    for f in frames:
+        w.add(f)
+    w._f.flush()
+    raw = path.read_bytes()
+    path.write_bytes(raw[:-3])                 # torn last chunk, no index
+    with TraceReader(path) as r:
+        assert not r.complete and len(r) == 11
+        assert r.frame(10) == frames[10]
+    w.close()
+
+
+def test_writer_validation(tmp_path):
+    with pytest.raises(ValueError, match="duplicate"):
+        TraceWriter(tmp_path / "d", [_REGIONS[0], _REGIONS[0]])
+    with pytest.raises(ValueError, match="codec"):
+        TraceWriter(tmp_path / "c", _REGIONS, codec="brotli")
+    with TraceWriter(tmp_path / "s", _REGIONS) as w:
+        with pytest.raises(ValueError, match="80"):
+            w.add(b"\x00" * 3)
+        w.add([bytes(64), bytes(16)], tick=7)
+    with TraceReader(tmp_path / "s") as r:
+        assert r.ticks == [7]
+    (tmp_path / "bad").write_bytes(b"nope")
+    with pytest.raises(TraceFormatError):
+        TraceReader(tmp_path / "bad")
+
+
+def test_record_trace_from_emulator(fake_mesen, tmp_path):
+    def tick(fake, count):
+        fake.mem("SnesWorkRam")[0x1000] = fake.frame
+        fake.mem("SnesSpriteRam")[3] = fake.frame * 2
+
+    server = fake_mesen(on_step=tick)
+    path = tmp_path / "rec.rtrace"
+    with MesenClient("x", timeout=2, memory_encoding="base64") as c:
+        n = record_trace(c, path, _REGIONS, 6, step_between=2, keyframe_every=4)
+    assert n == 7
+    with TraceReader(path) as r:
+        assert r.ticks == [0, 2, 4, 6, 8, 10, 12]
+        assert r.step_between == 2
+        assert r.byte_series(0x1000) == [(t, t) for t in r.ticks]
+        assert r.region(3, "oam")[3] == 12
+        assert r.find(0x1000, 8) == 4
+    steps = [d for d in server.received if d["command"] == "step"]
+    assert len(steps) == 6 and steps[0]["count"] == 2
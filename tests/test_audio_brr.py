@@ -1,14 +1,26 @@
-"""Tests for retrotool.audio.brr — BRRtools wrappers."""
+"""Tests for retrotool.audio.brr — BRRtools wrappers and the in-process codec."""
 from __future__ import annotations
 
 import math
+import random
 import struct
 import wave
 from pathlib import Path
 
 import pytest
 
-from retrotool.audio.brr import BrrError, decode_brr, encode_brr
+from retrotool.audio.brr import (
+    BRR_BLOCK,
+    BRR_END,
+    BRR_LOOP,
+    BrrError,
+    BrrSample,
+    decode_brr,
+    decode_brr_samples,
+    encode_brr,
+    encode_brr_batch,
+    encode_brr_samples,
+)
 
 
 _HAS_LIBSFX = False
@@ -109,3 +121,158 @@ def test_encode_error_raises_brr_error(tmp_path):
     bad.write_bytes(b"not a wav file")
     with pytest.raises(BrrError):
         encode_brr(bad, tmp_path / "out.brr")
+
+
+# --- in-process codec -------------------------------------------------------
+
+
+def _sine(n: int, *, freq: int = 440, rate: int = 32000, amp: float = 0.6) -> list[int]:
+    return [int(amp * 32760 * math.sin(2 * math.pi * freq * i / rate)) for i in range(n)]
+
+
+def _snr(ref, out) -> float:
+    noise = sum((a - b) ** 2 for a, b in zip(ref, out))
+    return 10 * math.log10(sum(a * a for a in ref) / max(noise, 1))
+
+
+def _dsp_decode(data: bytes, *, wrap: bool = True) -> list[int]:
+    """Reference S-DSP decode (blargg's formulation: doubled history).
+    `wrap=False` clamps to 15 bits instead, like old SPC players."""
+    buf = [0, 0]
+    for pos in range(0, len(data), BRR_BLOCK):
+        header = data[pos]
+        shift, filt = header >> 4, (header >> 2) & 3
+        for byte in data[pos + 1:pos + BRR_BLOCK]:
+            for n in (byte >> 4, byte & 15):
+                s = n - 16 if n >= 8 else n
+                s = (s << shift) >> 1
+                if shift >= 0xD:
+                    s = (s >> 25) << 11
+                p1, p2 = buf[-1], buf[-2] >> 1
+                if filt >= 2:
+                    s += p1 - p2
+                    if filt == 2:
+                        s += (p2 >> 4) + ((p1 * -3) >> 6)
+                    else:
+                        s += ((p1 * -13) >> 7) + ((p2 * 3) >> 4)
+                elif filt:
+                    s += (p1 >> 1) + ((-p1) >> 5)
+                s = max(-32768, min(32767, s))
+                if not wrap:
+                    s = max(-16384, min(16383, s))
+                buf.append(((s * 2 + 0x8000) & 0xFFFF) - 0x8000)
+    return buf[2:]
+
+
+def test_decode_hand_built_block():
+    # range 12, filter 0: nibble n -> (n << 12) >> 1, output doubled.
+    data = bytes([0xC0 | BRR_END, 0x18, 0x7F] + [0] * 6)
+    out = decode_brr_samples(data)
+    assert len(out) == 16
+    assert list(out[:4]) == [4096, -32768, 28672, -4096]
+
+
+def test_decode_large_ranges_clamp_to_2048():
+    data = bytes([0xD0 | BRR_END, 0x7F] + [0] * 7)
+    assert list(decode_brr_samples(data)[:2]) == [0, -4096]
+
+
+def test_decode_matches_dsp_reference_on_random_blocks():
+    rng = random.Random(7)
+    data = bytearray()
+    for _ in range(200):
+        data.append(rng.randrange(16) << 4 | rng.randrange(4) << 2)
+        data += bytes(rng.randrange(256) for _ in range(8))
+    assert list(decode_brr_samples(bytes(data))) == _dsp_decode(bytes(data))
+
+
+def test_decode_stops_at_end_flag_and_loops():
+    block = bytes([0xC0, 0x11] + [0] * 7)
+    data = block + bytes([0xC0 | BRR_END | BRR_LOOP, 0x22] + [0] * 7) + block
+    assert len(decode_brr_samples(data)) == 32
+    looped = decode_brr_samples(data, loop_start_block=1, loops=2)
+    assert len(looped) == 64
+    assert list(looped[32:48]) == list(looped[16:32])
+
+
+def test_decode_rejects_partial_block():
+    with pytest.raises(ValueError):
+        decode_brr_samples(bytes(10))
+
+
+@pytest.mark.parametrize("search", ["exhaustive", "heuristic"])
+def test_encode_round_trip_quality(search):
+    pcm = _sine(4000)
+    sample = encode_brr_samples(pcm, search=search)
+    assert isinstance(sample, BrrSample)
+    assert sample.blocks == 250 and sample.loop_block is None
+    out = decode_brr_samples(sample.data)
+    assert list(out) == _dsp_decode(sample.data)
+    assert _snr(pcm, out) > 40
+
+
+def test_encode_exhaustive_is_no_worse_than_heuristic():
+    rng = random.Random(3)
+    pcm = [int(v + rng.randint(-2000, 2000)) for v in _sine(1600, freq=1234)]
+    best = decode_brr_samples(encode_brr_samples(pcm).data)
+    fast = decode_brr_samples(encode_brr_samples(pcm, search="heuristic").data)
+    assert _snr(pcm, best) >= _snr(pcm, fast) - 0.1
+
+
+def test_encode_flags_and_first_block_filter():
+    data = encode_brr_samples(_sine(160)).data
+    headers = data[::BRR_BLOCK]
+    assert headers[0] & 0x0C == 0
+    assert [h & (BRR_END | BRR_LOOP) for h in headers] == [0] * 9 + [BRR_END]
+
+
+def test_encode_pads_front_to_whole_blocks():
+    pcm = _sine(100)
+    sample = encode_brr_samples(pcm)
+    assert sample.blocks == 7
+    out = decode_brr_samples(sample.data)
+    assert list(out[:12]) == [0] * 12
+    assert _snr(pcm, out[12:]) > 30
+
+
+def test_encode_loop_point():
+    pcm = _sine(200)
+    sample = encode_brr_samples(pcm, loop_point=40)
+    # 8 samples of front padding put sample 40 at the start of block 3.
+    assert sample.loop_block == 3 and sample.loop_offset == 27
+    headers = sample.data[::BRR_BLOCK]
+    assert all(h & BRR_LOOP for h in headers)
+    assert headers[-1] & BRR_END and not any(h & BRR_END for h in headers[:-1])
+    assert headers[3] & 0x0C == 0
+    with pytest.raises(ValueError):
+        encode_brr_samples(pcm, loop_point=41)
+
+
+def test_encode_no_wrap_never_overflows():
+    square = ([32767] * 8 + [-32768] * 8) * 20
+    sample = encode_brr_samples(square, no_wrap=True)
+    out = decode_brr_samples(sample.data)
+    # Without wrap-around, a clamping player decodes the same thing.
+    assert list(out) == _dsp_decode(sample.data, wrap=False)
+    assert _snr(square, out) > 20
+
+
+def test_encode_gauss_boost_and_amplitude():
+    pcm = _sine(320, freq=3000)
+    plain = encode_brr_samples(pcm).data
+    assert encode_brr_samples(pcm, gauss_boost=True).data != plain
+    quiet = decode_brr_samples(encode_brr_samples(pcm, amplitude=0.5).data)
+    assert max(quiet) < max(pcm) * 0.6
+
+
+def test_encode_empty_and_bad_search():
+    assert decode_brr_samples(encode_brr_samples([]).data) == decode_brr_samples(bytes([BRR_END]) + bytes(8))
+    with pytest.raises(ValueError):
+        encode_brr_samples([0] * 16, search="greedy")
+
+
+def test_encode_batch_matches_serial():
+    bank = [_sine(320, freq=f) for f in (220, 440, 880)]
+    serial = [encode_brr_samples(s, loop_point=0) for s in bank]
+    assert encode_brr_batch(bank, jobs=None, loop_point=0) == serial
+    assert encode_brr_batch(bank, jobs=2, loop_point=0) == serial
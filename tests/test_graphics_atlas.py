@@ -0,0 +1,90 @@
+"""Tests for retrotool.graphics.sprites.pack_atlas."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.graphics import (
+    Palette, SpriteFrame, SpritePiece, Tile, pack_atlas, render_frame,
+)
+
+
+def _setup(n_frames: int = 40, seed: int = 0):
+    rng = random.Random(seed)
+    tiles = [Tile(bytes(rng.randrange(1, 16) for _ in range(64)), 4) for _ in range(8)]
+    tiles.append(Tile(bytes(64), 4))       # fully transparent
+    pals = [Palette(colors=[(i * 16, i * 8, i) for i in range(16)])]
+    frames = [
+        SpriteFrame(name=f"f{i}", pieces=[
+            SpritePiece(x=rng.randrange(0, 24), y=rng.randrange(0, 24),
+                        tile_index=rng.randrange(8))
+            for _ in range(rng.randrange(1, 4))
+        ])
+        for i in range(n_frames)
+    ]
+    return frames, tiles, pals
+
+
+def _assert_frames_intact(atlas, frames, tiles, pals):
+    for frame, e in zip(frames, atlas.entries):
+        ox, oy, w, h, rgba = render_frame(frame, tiles, pals)
+        for y in range(h):
+            for x in range(w):
+                px = rgba[(y * w + x) * 4:(y * w + x) * 4 + 4]
+                ax, ay = x - ox + e.origin_x, y - oy + e.origin_y
+                if 0 <= ax < e.width and 0 <= ay < e.height:
+                    q = ((e.y + ay) * atlas.width + e.x + ax) * 4
+                    assert atlas.rgba[q:q + 4] == px
+                else:
+                    assert px[3] == 0
+
+
+def test_rows_layout_places_columns_per_row():
+    frames, tiles, pals = _setup(5)
+    atlas = pack_atlas(frames, tiles, pals, columns=2, padding=1)
+    assert [e.y for e in atlas.entries[:2]] == [0, 0]
+    assert atlas.entries[1].x == atlas.entries[0].width + 1
+    assert atlas.entries[2].x == 0 and atlas.entries[2].y > 0
+    _assert_frames_intact(atlas, frames, tiles, pals)
+
+
+@pytest.mark.parametrize("method", ["skyline", "maxrects"])
+def test_packers_do_not_overlap_and_keep_pixels(method):
+    frames, tiles, pals = _setup(60)
+    atlas = pack_atlas(frames, tiles, pals, method=method, padding=1)
+    rects = [(e.x, e.y, e.width, e.height) for e in atlas.entries]
+    for i, (ax, ay, aw, ah) in enumerate(rects):
+        assert ax + aw <= atlas.width and ay + ah <= atlas.height
+        for bx, by, bw, bh in rects[i + 1:]:
+            assert (ax + aw + 1 <= bx or bx + bw + 1 <= ax
+                    or ay + ah + 1 <= by or by + bh + 1 <= ay)
+    _assert_frames_intact(atlas, frames, tiles, pals)
+    rows = pack_atlas(frames, tiles, pals)
+    assert atlas.stats().efficiency > rows.stats().efficiency
+
+
+def test_dedupe_and_trim():
+    frames, tiles, pals = _setup(10)
+    frames.append(SpriteFrame(name="copy", pieces=list(frames[3].pieces)))
+    frames.append(SpriteFrame(name="blank", pieces=[SpritePiece(x=0, y=0, tile_index=8)]))
+    # Transparent tile above-left of a solid one: trim drops it.
+    frames.append(SpriteFrame(name="pad", pieces=[
+        SpritePiece(x=0, y=0, tile_index=8), SpritePiece(x=8, y=8, tile_index=0),
+    ]))
+    atlas = pack_atlas(frames, tiles, pals, method="skyline", dedupe=True, trim=True)
+    by_name = {e.name: e for e in atlas.entries}
+    assert (by_name["copy"].x, by_name["copy"].y) == (by_name["f3"].x, by_name["f3"].y)
+    assert (by_name["blank"].width, by_name["blank"].height) == (0, 0)
+    pad = by_name["pad"]
+    assert (pad.width, pad.height, pad.origin_x, pad.origin_y) == (8, 8, -8, -8)
+    stats = atlas.stats()
+    assert stats.frames == len(frames)
+    assert stats.unique == len(frames) - 2      # copy shares, blank is empty
+    _assert_frames_intact(atlas, frames, tiles, pals)
+
+
+def test_unknown_method_raises():
+    frames, tiles, pals = _setup(2)
+    with pytest.raises(ValueError, match="unknown atlas method"):
+        pack_atlas(frames, tiles, pals, method="guillotine")
@@ -0,0 +1,73 @@
+"""Bulk BGR555 ↔ RGB888 conversion and the content-keyed palette caches."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.graphics import (
+    Palette, RgbaLut, bgr555_block_to_rgb888, bgr555_to_rgb888, decode_palette,
+    decode_palette_set, encode_palette, lut_for, rgb888_block_to_bgr555,
+    rgb888_to_bgr555,
+)
+
+
+def test_block_decode_matches_per_word():
+    words = list(range(0x8000)) + [0xFFFF, 0x8000]
+    raw = b"".join(w.to_bytes(2, "little") for w in words)
+    rgb = bgr555_block_to_rgb888(raw)
+    assert [tuple(rgb[i * 3:i * 3 + 3]) for i in range(len(words))] == [
+        bgr555_to_rgb888(w) for w in words
+    ]
+
+
+def test_block_encode_matches_per_color():
+    rng = random.Random(40)
+    colors = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(2000)]
+    out = rgb888_block_to_bgr555(bytes(c for t in colors for c in t))
+    assert out == b"".join(rgb888_to_bgr555(*c).to_bytes(2, "little") for c in colors)
+    assert encode_palette(colors) == out
+
+
+def test_block_lengths_are_checked():
+    with pytest.raises(ValueError, match="odd"):
+        bgr555_block_to_rgb888(b"\x00\x00\x00")
+    with pytest.raises(ValueError, match="multiple of 3"):
+        rgb888_block_to_bgr555(b"\x00\x00")
+    assert bgr555_block_to_rgb888(b"") == b""
+    with pytest.raises(IndexError):
+        decode_palette(b"\x00" * 30, 0, 16)
+
+
+def test_decode_palette_round_trip_and_fresh_lists():
+    raw = bytes(range(64))
+    a = decode_palette(raw, 32, 16)
+    assert encode_palette(a) == bytes(w & 0x7F if i % 2 else w for i, w in enumerate(raw[32:]))
+    a[0] = (1, 2, 3)
+    assert decode_palette(raw, 32, 16)[0] != (1, 2, 3)
+
+
+def test_decode_palette_set_splits_and_copies():
+    rng = random.Random(7)
+    cgram = bytes(rng.randrange(256) for _ in range(512))
+    pals = decode_palette_set(cgram, 0, 16, 16, transparent_index=0)
+    assert len(pals) == 16
+    for i, pal in enumerate(pals):
+        assert pal.colors == decode_palette(cgram, i * 32, 16)
+    again = decode_palette_set(cgram, 0, 16, 16)
+    assert again == pals and again[0] is not pals[0]
+    again[0].colors[1] = (9, 9, 9)
+    assert pals[0].colors[1] != (9, 9, 9)     # 9 is never an expanded 5-bit value
+
+
+def test_rgba_lut_cached_and_matches_rgba():
+    rng = random.Random(3)
+    pal = Palette(colors=[tuple(rng.randrange(256) for _ in range(3)) for _ in range(16)],
+                  transparent_index=5)
+    lut = pal.rgba_lut()
+    assert lut is Palette(colors=list(pal.colors), transparent_index=5).rgba_lut()
+    assert lut is lut_for(pal)
+    assert lut.table() == RgbaLut(pal).table()
+    assert lut.table() == bytes(c for i in range(16) for c in pal.rgba(i))
+    pal.colors[2] = (1, 2, 3)                # content changed → different LUT
+    assert pal.rgba_lut().table()[8:12] == bytes((1, 2, 3, 255))
@@ -0,0 +1,305 @@
+"""Tests for the PNG reader and the in-process `encode_png` path."""
+from __future__ import annotations
+
+import random
+import struct
+import zlib
+from pathlib import PurePosixPath
+
+import pytest
+
+from retrotool import _toolchain
+from retrotool.build import BuildSpec, Section, SectionKind, build
+from retrotool.build import driver
+from retrotool.build.driver import _section_cache_key
+from retrotool.build.handlers import HandlerError
+from retrotool.graphics import (
+    decode_tile_sheet, encode_png, grouped_palette_bytes, png_palette_rgb,
+)
+from retrotool.graphics.png import PngFormatError, read_png, write_png, write_png_rows
+from retrotool.graphics.superfamiconv import NativeEncodeError
+from tests.build.conftest import _make_lorom
+
+
+def _has_superfamiconv() -> bool:
+    try:
+        _toolchain.superfamiconv()
+    except _toolchain.ToolchainError:
+        return False
+    return True
+
+
+superfamiconv = pytest.mark.skipif(not _has_superfamiconv(), reason="superfamiconv not installed")
+
+
+def _chunk(typ: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + typ + body + struct.pack(">I", zlib.crc32(typ + body))
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+
+
+def _filter(line: bytes, prev: bytes, ftype: int, bpp: int) -> bytes:
+    def left(i, src): return src[i - bpp] if i >= bpp else 0
+    if ftype == 0:
+        return line
+    if ftype == 1:
+        return bytes((line[i] - left(i, line)) & 0xFF for i in range(len(line)))
+    if ftype == 2:
+        return bytes((a - b) & 0xFF for a, b in zip(line, prev))
+    if ftype == 3:
+        return bytes((line[i] - ((left(i, line) + prev[i]) >> 1)) & 0xFF for i in range(len(line)))
+    return bytes((line[i] - _paeth(left(i, line), prev[i], left(i, prev))) & 0xFF
+                 for i in range(len(line)))
+
+
+def _png(width, height, pixels: bytes, *, ctype: int, palette=None) -> bytes:
+    """Build a PNG, cycling through all five filter types row by row."""
+    bpp = {0: 1, 2: 3, 3: 1, 6: 4}[ctype]
+    stride = width * bpp
+    raw = bytearray()
+    prev = bytes(stride)
+    for y in range(height):
+        line = pixels[y * stride:(y + 1) * stride]
+        ftype = y % 5
+        raw += bytes([ftype]) + _filter(line, prev, ftype, bpp)
+        prev = line
+    out = b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, ctype, 0, 0, 0))
+    if palette is not None:
+        out += _chunk(b"PLTE", b"".join(bytes(c) for c in palette))
+    return out + _chunk(b"IDAT", zlib.compress(bytes(raw))) + _chunk(b"IEND", b"")
+
+
+def test_read_png_rgba_all_filters():
+    rng = random.Random(0)
+    pixels = bytes(rng.randrange(256) for _ in range(7 * 11 * 4))
+    img = read_png(_png(7, 11, pixels, ctype=6))
+    assert (img.width, img.height, img.rgba) == (7, 11, pixels)
+
+
+def test_read_png_indexed_keeps_indices():
+    palette = [(0, 0, 0), (255, 0, 0), (0, 255, 0)]
+    indices = bytes([0, 1, 2, 1] * 4)
+    img = read_png(_png(4, 4, indices, ctype=3, palette=palette))
+    assert img.indices == indices and img.palette == palette
+    assert img.rgba[4:8] == bytes([255, 0, 0, 255])
+
+
+def test_read_png_rejects_non_png():
+    with pytest.raises(PngFormatError, match="not a PNG"):
+        read_png(b"GIF89a" + bytes(20))
+
+
+# 1 shared colour + 3 per subpalette, two subpalettes (2bpp).
+_PALETTE = [(0, 0, 0), (248, 0, 0), (0, 248, 0), (0, 0, 248),
+            (248, 248, 0), (0, 248, 248), (248, 0, 248)]
+
+
+def _tile_art(rng) -> list[bytes]:
+    """Four 8x8 PLTE-index tiles: a base tile, its H flip, a copy, and one
+    drawn from the second subpalette."""
+    base = bytes(rng.choice([0, 1, 2, 3]) for _ in range(64))
+    hflip = bytes(base[y * 8 + 7 - x] for y in range(8) for x in range(8))
+    other = bytes(rng.choice([0, 4, 5, 6]) for _ in range(64))
+    return [base, hflip, base, other]
+
+
+def _sheet_png(tiles: list[bytes]) -> bytes:
+    width = 8 * len(tiles)
+    pixels = bytes(t[y * 8 + x] for y in range(8) for t in tiles for x in range(8))
+    return _png(width, 8, pixels, ctype=3, palette=_PALETTE)
+
+
+def test_native_encode_dedupes_with_flips(tmp_path):
+    tiles = _tile_art(random.Random(1))
+    png = tmp_path / "art.png"
+    png.write_bytes(_sheet_png(tiles))
+    fixed = grouped_palette_bytes(png_palette_rgb(png), subpalettes=2, colors_per=4)
+    enc = encode_png(png, bpp=2, colors=4, palettes=2, fixed_palette=fixed, engine="native")
+    assert (enc.cols, enc.rows) == (4, 1)
+    assert (enc.tilemap.width, enc.tilemap.height) == (4, 1)
+    assert list(enc.tilemap.words) == [0x0000, 0x4000, 0x0000, 0x0401]
+    assert [(e.tile, e.palette, e.h_flip, e.v_flip) for e in enc.entries] == [
+        (0, 0, False, False), (0, 0, True, False), (0, 0, False, False), (1, 1, False, False),
+    ]
+    sheet = decode_tile_sheet(enc.tiles, 0, 2, 2)
+    assert sheet[:64] == tiles[0]
+    assert sheet[64:] == bytes(0 if v == 0 else v - 3 for v in tiles[3])
+
+    enc_all = encode_png(png, bpp=2, colors=4, palettes=2, fixed_palette=fixed,
+                         no_discard=True, engine="native")
+    assert len(enc_all.tiles) == 4 * 16
+    enc_noflip = encode_png(png, bpp=2, colors=4, palettes=2, fixed_palette=fixed,
+                            no_flip=True, engine="native")
+    assert len(enc_noflip.tiles) == 3 * 16
+
+
+def test_native_encode_rejects_unmatched_colours(tmp_path):
+    png = tmp_path / "bad.png"
+    png.write_bytes(_png(8, 8, bytes([1, 4] * 32), ctype=3, palette=_PALETTE))
+    fixed = grouped_palette_bytes(_PALETTE, subpalettes=2, colors_per=4)
+    with pytest.raises(NativeEncodeError, match="outside every subpalette"):
+        encode_png(png, bpp=2, colors=4, palettes=2, fixed_palette=fixed, engine="native")
+    with pytest.raises(NativeEncodeError, match="needs fixed_palette"):
+        encode_png(png, bpp=2, engine="native")
+
+
+def test_graphics_section_palette_from_png_builds_in_process(tmp_path):
+    rom_path = _make_lorom(tmp_path)
+    tiles = _tile_art(random.Random(2))
+    (tmp_path / "art.png").write_bytes(_sheet_png(tiles))
+    spec = BuildSpec(sections=[Section(
+        kind=SectionKind.GRAPHICS, offset=0x3000,
+        files=[PurePosixPath("art.png")],
+        attrs={"bpp": "2", "colors": "4", "palettes": "2", "palette-from-png": "1"},
+    )])
+    out = tmp_path / "out.sfc"
+    build(spec, source_root=tmp_path, out_path=out, original_rom=rom_path)
+    written = out.read_bytes()[0x3000:0x3000 + 32]
+    assert decode_tile_sheet(written, 0, 1, 2) == tiles[0]
+
+
+def _section(**attrs) -> Section:
+    return Section(
+        kind=SectionKind.GRAPHICS, offset=0x3000, files=[PurePosixPath("art.png")],
+        attrs={"bpp": "2", "colors": "4", "palettes": "2", "palette-from-png": "1", **attrs},
+    )
+
+
+def test_graphics_section_engine_attr_and_cache_key(tmp_path):
+    rom_path = _make_lorom(tmp_path)
+    (tmp_path / "art.png").write_bytes(_sheet_png(_tile_art(random.Random(3))))
+    keys = [_section_cache_key(_section(**extra), tmp_path)
+            for extra in ({}, {"engine": "native"}, {"engine": "superfamiconv"})]
+    assert len(set(keys)) == 3
+    out = tmp_path / "out.sfc"
+    build(BuildSpec(sections=[_section(engine="native")]), source_root=tmp_path,
+          out_path=out, original_rom=rom_path)
+    with pytest.raises(HandlerError, match="unknown engine"):
+        build(BuildSpec(sections=[_section(engine="gpu")]), source_root=tmp_path,
+              out_path=out, original_rom=rom_path)
+
+
+def test_raw_graphics_cache_key_does_not_pin_engine(tmp_path, monkeypatch):
+    (tmp_path / "art.png").write_bytes(_sheet_png(_tile_art(random.Random(3))))
+    (tmp_path / "tiles.bin").write_bytes(bytes(range(64)))
+    seen = []
+    monkeypatch.setattr(driver, "sha256_many", lambda parts: seen.append(parts) or "k")
+    raw = Section(kind=SectionKind.GRAPHICS, offset=0x3000,
+                  files=[PurePosixPath("tiles.bin")], attrs={"bpp": "4"})
+    _section_cache_key(raw, tmp_path)
+    _section_cache_key(_section(), tmp_path)
+    raw_parts, png_parts = seen
+    assert not any(p.startswith(b"__engine__=") for p in raw_parts)
+    assert b"__engine__=auto" in png_parts
+
+
+def test_graphics_section_dedupe_tiles_false_keeps_every_tile(tmp_path):
+    rom_path = _make_lorom(tmp_path)
+    tiles = _tile_art(random.Random(4))
+    (tmp_path / "art.png").write_bytes(_sheet_png(tiles))
+    written = {}
+    for name, extra in (("default", {}), ("on", {"dedupe-tiles": "true"}),
+                        ("off", {"dedupe-tiles": "false"}), ("shared", {"dedupe": "false"})):
+        section = _section(**extra)
+        out = tmp_path / f"{name}.sfc"
+        build(BuildSpec(sections=[section]), source_root=tmp_path, out_path=out,
+              original_rom=rom_path)
+        written[name] = out.read_bytes()[0x3000:0x3000 + 4 * 16]
+    assert written["on"] == written["default"] == written["shared"]
+    assert written["default"][:32] == written["off"][:16] + written["off"][48:64]
+    assert decode_tile_sheet(written["off"], 0, 3, 2) == b"".join(tiles[:3])
+
+
+def _rgba_sheet(tiles: list[list[int]], cols: int, palette, transparent=()) -> bytes:
+    """RGBA PNG of 8x8 tiles of PLTE indices, `cols` tiles per row; indices
+    in `transparent` get alpha 0."""
+    rows = (len(tiles) + cols - 1) // cols
+    px = bytearray()
+    for ty in range(rows):
+        for y in range(8):
+            for tx in range(cols):
+                t = tiles[ty * cols + tx] if ty * cols + tx < len(tiles) else [0] * 64
+                for x in range(8):
+                    v = t[y * 8 + x]
+                    px += bytes(palette[v]) + (b"\x00" if v in transparent else b"\xff")
+    return _png(cols * 8, rows * 8, bytes(px), ctype=6)
+
+
+def _flips(t: list[int]) -> tuple[list[int], list[int], list[int]]:
+    h = [t[y * 8 + 7 - x] for y in range(8) for x in range(8)]
+    v = [t[(7 - y) * 8 + x] for y in range(8) for x in range(8)]
+    return h, v, t[::-1]
+
+
+def _parity_cases():
+    rng = random.Random(9)
+    a = [rng.choice([0, 1, 2, 3]) for _ in range(64)]
+    b = [rng.choice([0, 1, 2, 3]) for _ in range(64)]
+    c = [rng.choice([0, 4, 5, 6]) for _ in range(64)]
+    ah, av, ahv = _flips(a)
+    sym = [(x + y) % 4 for y in range(8) for x in range(4)]
+    sym = [v for y in range(8) for v in sym[y * 4:y * 4 + 4] + sym[y * 4:y * 4 + 4][::-1]]
+    # Dedupe order: repeats and flips spread across rows, second-sighting first.
+    order = [b, ahv, a, b, av, ah, c, a, sym, _flips(sym)[0], [0] * 64, c]
+    # Shared colour 0 next to alpha-0 pixels (index 7 is transparent).
+    holes = [[7 if (x + y) % 3 == 0 else v for x, v in enumerate(a[y * 8:y * 8 + 8])]
+             for y in range(8)]
+    holes = [v for row in holes for v in row]
+    palette = _PALETTE + [(255, 0, 255)]
+    # Red sits in both subpalettes (PLTE 1 and 5): a red-only tile fits
+    # either, a red + yellow one only the second.
+    dup_palette = _PALETTE[:5] + [(248, 0, 0), _PALETTE[6]]
+    red = [1 if v else 0 for v in b]
+    red_yellow = [(0, 4, 5, 5)[v] for v in b]
+    return [
+        ("dedupe-order", order, 4, palette, (), False),
+        ("no-flip", order, 4, palette, (), True),
+        ("transparency", [a, holes, holes, c], 2, palette, (7,), False),
+        ("duplicate-colours", [red, red_yellow, c, red], 4, dup_palette, (), False),
+    ]
+
+
+@superfamiconv
+@pytest.mark.parametrize("case", _parity_cases(), ids=lambda c: c[0])
+def test_native_encode_matches_superfamiconv(tmp_path, case):
+    _, tiles, cols, palette, transparent, no_flip = case
+    png = tmp_path / "art.png"
+    png.write_bytes(_rgba_sheet(tiles, cols, palette, transparent))
+    fixed = grouped_palette_bytes(palette[:7], subpalettes=2, colors_per=4)
+    results = [
+        encode_png(png, bpp=2, colors=4, palettes=2, fixed_palette=fixed,
+                   no_flip=no_flip, engine=engine)
+        for engine in ("native", "superfamiconv")
+    ]
+    native, sfc = results
+    assert native.tiles == sfc.tiles
+    assert native.tilemap.words == sfc.tilemap.words
+    assert (native.cols, native.rows) == (sfc.cols, sfc.rows)
+
+
+def test_write_png_round_trips_rgba_and_indexed(tmp_path):
+    rng = random.Random(5)
+    rgba = bytes(rng.randrange(256) for _ in range(9 * 4 * 4))
+    out = tmp_path / "rgba.png"
+    write_png(out, 9, 4, rgba)
+    img = read_png(out)
+    assert (img.width, img.height, img.rgba) == (9, 4, rgba)
+
+    indices = bytes(rng.randrange(3) for _ in range(5 * 2))
+    out = tmp_path / "idx.png"
+    write_png_rows(out, 5, 2, (indices[y * 5:(y + 1) * 5] for y in range(2)),
+                   mode="indexed", palette=_PALETTE[:3], transparent_index=0)
+    img = read_png(out)
+    assert img.indices == indices and img.palette == _PALETTE[:3]
+    assert img.rgba[3::4] == bytes(0 if i == 0 else 255 for i in indices)
+
+
+def test_write_png_validates_rows(tmp_path):
+    with pytest.raises(ValueError, match="row 0 length"):
+        write_png_rows(tmp_path / "x.png", 2, 1, [bytes(7)])
+    with pytest.raises(ValueError, match="needs a palette"):
+        write_png(tmp_path / "x.png", 1, 1, b"\x00", mode="indexed")
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import pytest
 
-from retrotool.graphics import write_ppm
+from retrotool.graphics import write_ppm, write_ppm_rows
 from retrotool.graphics.ppm import _strip_alpha
 
 
@@ -93,3 +93,12 @@ def test_round_trip_with_composite_to_image(tmp_path):
 def test_strip_alpha_helper():
     rgba = bytes([1, 2, 3, 99, 4, 5, 6, 88])
     assert _strip_alpha(rgba) == b"\x01\x02\x03\x04\x05\x06"
+
+
+def test_write_ppm_rows_streams_generator(tmp_path):
+    rows = (bytes([y, 0, 0, 255]) for y in range(3))
+    out = tmp_path / "gen.ppm"
+    write_ppm_rows(out, 1, 3, rows)
+    assert out.read_bytes() == b"P6\n1 3\n255\n" + bytes([0, 0, 0, 1, 0, 0, 2, 0, 0])
+    with pytest.raises(ValueError, match="expected 2"):
+        write_ppm_rows(out, 1, 2, iter([bytes(4)]))
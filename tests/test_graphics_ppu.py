@@ -0,0 +1,127 @@
+"""Tests for the PPU scene compositor (retrotool.graphics.ppu)."""
+from __future__ import annotations
+
+import random
+from array import array
+
+import pytest
+
+from retrotool.graphics import SpritePiece, Tile, TilemapEntry
+from retrotool.graphics.ppu import (
+    MODE_BPP, BgLayer, Scene, composite_indices, render_scene, render_scenes,
+)
+
+
+def _tiles(rng, n, bpp):
+    return [Tile(bytes(rng.randrange(1 << bpp) if rng.random() < 0.7 else 0
+                       for _ in range(64)), bpp) for _ in range(n)]
+
+
+def _scene(seed: int, mode: int, bg3_priority: bool = False) -> Scene:
+    rng = random.Random(seed)
+    layers = []
+    for bpp in MODE_BPP[mode]:
+        tiles = _tiles(rng, 6, bpp)
+        tm = [[TilemapEntry(tile=rng.randrange(6), palette=rng.randrange(8),
+                            priority=rng.random() < 0.5, h_flip=rng.random() < 0.5,
+                            v_flip=rng.random() < 0.5)
+               for _ in range(6)] for _ in range(5)]
+        layers.append(BgLayer(tm, tiles, scroll_x=rng.randrange(-50, 50),
+                              scroll_y=rng.randrange(-50, 50)))
+    sprite_tiles = _tiles(rng, 4, 4)
+    sprites = [SpritePiece(x=rng.randrange(-12, 40), y=rng.randrange(-12, 30),
+                           tile_index=rng.randrange(4), palette=rng.randrange(8),
+                           h_flip=rng.random() < 0.5, v_flip=rng.random() < 0.5,
+                           priority=rng.randrange(4))
+               for _ in range(12)]
+    cgram = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(256)]
+    return Scene(mode=mode, cgram=cgram, layers=layers, sprites=sprites,
+                 sprite_tiles=sprite_tiles, bg3_priority=bg3_priority,
+                 width=40, height=32)
+
+
+_ORDERS = {
+    0: "S3 1H 2H S2 1L 2L S1 3H 4H S0 3L 4L",
+    1: "S3 1H 2H S2 1L 2L S1 3H S0 3L",
+    "1b": "3H S3 1H 2H S2 1L 2L S1 S0 3L",
+    3: "S3 1H S2 2H S1 1L S0 2L",
+    7: "S3 S2 S1 1L S0",
+}
+
+
+def _reference(scene: Scene) -> list[int]:
+    """Per-pixel transcription of the PPU priority rules."""
+    bpps = MODE_BPP[scene.mode]
+    key = "1b" if scene.mode == 1 and scene.bg3_priority else scene.mode
+    out = []
+    for y in range(scene.height):
+        for x in range(scene.width):
+            found = {}
+            for i, layer in enumerate(scene.layers):
+                rows = layer.tilemap
+                py = (y + layer.scroll_y) % (len(rows) * 8)
+                px = (x + layer.scroll_x) % (len(rows[0]) * 8)
+                e = rows[py // 8][px // 8]
+                tx, ty = px % 8, py % 8
+                if scene.mode != 7:
+                    if e.h_flip:
+                        tx = 7 - tx
+                    if e.v_flip:
+                        ty = 7 - ty
+                v = layer.tiles[e.tile].data[ty * 8 + tx]
+                if not v:
+                    continue
+                if bpps[i] == 8:
+                    c = v
+                else:
+                    base = i * 32 if scene.mode == 0 else 0
+                    c = base + e.palette * (1 << bpps[i]) + v
+                hi = e.priority and scene.mode != 7
+                found[f"{i + 1}{'H' if hi else 'L'}"] = c
+            for p in scene.sprites:
+                sx, sy = x - p.x, y - p.y
+                if 0 <= sx < 8 and 0 <= sy < 8:
+                    if p.h_flip:
+                        sx = 7 - sx
+                    if p.v_flip:
+                        sy = 7 - sy
+                    v = scene.sprite_tiles[p.tile_index].data[sy * 8 + sx]
+                    if v:
+                        found[f"S{p.priority}"] = 128 + p.palette * 16 + v
+                        break
+            out.append(next((found[s] for s in _ORDERS[key].split() if s in found), 0))
+    return out
+
+
+@pytest.mark.parametrize("mode,bg3", [(0, False), (1, False), (1, True), (3, False), (7, False)])
+def test_composite_matches_reference(mode, bg3):
+    for seed in range(3):
+        scene = _scene(seed, mode, bg3)
+        assert list(composite_indices(scene)) == _reference(scene)
+
+
+def test_render_scene_uses_backdrop_and_is_opaque():
+    scene = Scene(mode=1, cgram=[(10, 20, 30)], width=8, height=2)
+    w, h, rgba = render_scene(scene)
+    assert (w, h) == (8, 2)
+    assert rgba == bytes([10, 20, 30, 255]) * 16
+
+
+def test_array_backed_tilemap_words_match_entries():
+    scene = _scene(9, 1)
+    words = Scene(**{**scene.__dict__, "layers": [
+        BgLayer([array("H", (e.to_word() for e in row)) for row in layer.tilemap],
+                layer.tiles, layer.scroll_x, layer.scroll_y)
+        for layer in scene.layers
+    ]})
+    assert composite_indices(words) == composite_indices(scene)
+
+
+def test_unsupported_mode_raises():
+    with pytest.raises(ValueError, match="unsupported BG mode"):
+        composite_indices(Scene(mode=2, cgram=[]))
+
+
+def test_render_scenes_pool_matches_serial():
+    scenes = [_scene(s, 1) for s in range(4)]
+    assert render_scenes(scenes, jobs=2) == [render_scene(s) for s in scenes]
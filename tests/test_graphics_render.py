@@ -0,0 +1,101 @@
+"""RGBA renderers must match a per-pixel `palette.rgba(index)` reference."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.graphics import (
+    Palette, RgbaLut, SpriteFrame, SpritePiece, TilemapEntry, Tile,
+    composite_to_image, render_frame, render_tilemap, tile_to_rgba,
+)
+
+
+def _tiles(rng: random.Random, n: int) -> list[Tile]:
+    return [Tile(bytes(rng.randrange(16) for _ in range(64)), 4) for _ in range(n)]
+
+
+def _palettes(rng: random.Random, n: int) -> list[Palette]:
+    return [
+        Palette(colors=[tuple(rng.randrange(256) for _ in range(3)) for _ in range(16)],
+                transparent_index=rng.choice([0, 5]))
+        for _ in range(n)
+    ]
+
+
+def _ref_tile(tile: Tile, pal, h=False, v=False) -> list[list[tuple]]:
+    rows = tile.pixels
+    if h:
+        rows = [r[::-1] for r in rows]
+    if v:
+        rows = rows[::-1]
+    return [[pal.rgba(i) for i in r] for r in rows]
+
+
+def _pixel(buf: bytes, x: int, y: int, width: int) -> tuple:
+    off = (y * width + x) * 4
+    return tuple(buf[off:off + 4])
+
+
+def test_rgba_lut_matches_palette_rgba():
+    pal = _palettes(random.Random(1), 1)[0]
+    data = bytes(range(16))
+    rgba = RgbaLut(pal).convert(data)
+    assert [tuple(rgba[i * 4:i * 4 + 4]) for i in range(16)] == [pal.rgba(i) for i in range(16)]
+    mask = RgbaLut(pal).opaque_mask(data)
+    assert mask[pal.transparent_index * 4:pal.transparent_index * 4 + 4] == bytes(4)
+    assert mask.count(0xFF) == 15 * 4
+    with pytest.raises(IndexError):
+        RgbaLut(pal).convert(bytes([16]))
+
+
+def test_render_tilemap_matches_reference():
+    rng = random.Random(2)
+    tiles, pals = _tiles(rng, 12), _palettes(rng, 3)
+    entries = [
+        [TilemapEntry(tile=rng.randrange(12), palette=rng.randrange(5),
+                      h_flip=rng.random() < 0.5, v_flip=rng.random() < 0.5)
+         for _ in range(5)]
+        for _ in range(4)
+    ]
+    w, h, buf = render_tilemap(entries, tiles, pals)
+    assert (w, h) == (40, 32)
+    for ty, row in enumerate(entries):
+        for tx, e in enumerate(row):
+            pal = pals[e.palette] if e.palette < len(pals) else pals[0]
+            ref = _ref_tile(tiles[e.tile], pal, e.h_flip, e.v_flip)
+            for y in range(8):
+                for x in range(8):
+                    assert _pixel(buf, tx * 8 + x, ty * 8 + y, w) == ref[y][x]
+
+
+def test_render_frame_keeps_earlier_pieces_under_transparent_pixels():
+    rng = random.Random(3)
+    tiles, pals = _tiles(rng, 4), _palettes(rng, 2)
+    pieces = [
+        SpritePiece(tile_index=i, x=rng.randrange(-6, 6), y=rng.randrange(-6, 6),
+                    palette=i % 2, h_flip=bool(i & 1), v_flip=bool(i & 2))
+        for i in range(4)
+    ]
+    ox, oy, w, h, buf = render_frame(SpriteFrame(name="f", pieces=pieces), tiles, pals)
+    expected = [[(0, 0, 0, 0)] * w for _ in range(h)]
+    for p in pieces:
+        ref = _ref_tile(tiles[p.tile_index], pals[p.palette], p.h_flip, p.v_flip)
+        for y in range(8):
+            for x in range(8):
+                if ref[y][x][3]:
+                    expected[p.y + oy + y][p.x + ox + x] = ref[y][x]
+    assert [[_pixel(buf, x, y, w) for x in range(w)] for y in range(h)] == expected
+
+
+def test_composite_to_image_pads_and_places_tiles():
+    rng = random.Random(4)
+    tiles, pal = _tiles(rng, 3), _palettes(rng, 1)[0]
+    w, h, buf = composite_to_image(tiles, pal, cols=2, padding_color=(1, 2, 3))
+    assert (w, h) == (16, 16)
+    assert _pixel(buf, 12, 12, w) == (1, 2, 3, 0)
+    ref = _ref_tile(tiles[2], pal)
+    assert [[_pixel(buf, x, 8 + y, w) for x in range(8)] for y in range(8)] == ref
+    assert tile_to_rgba(tiles[1], pal) == bytes(
+        c for row in _ref_tile(tiles[1], pal) for px in row for c in px
+    )
@@ -0,0 +1,61 @@
+"""Tests for retrotool.graphics.tileindex."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.graphics import Tile, TileIndex, dedupe_sheet
+
+
+def _random_tiles(rng, n):
+    return [bytes(rng.randrange(4) for _ in range(64)) for _ in range(n)]
+
+
+def test_add_matches_flipped_copies():
+    rng = random.Random(0)
+    base = Tile(_random_tiles(rng, 1)[0], 2)
+    index = TileIndex()
+    assert index.add(base.data) == (0, False, False)
+    assert index.add(base.flipped(h=True).data) == (0, True, False)
+    assert index.add(base.flipped(v=True).data) == (0, False, True)
+    assert index.add(base.flipped(h=True, v=True).data) == (0, True, True)
+    assert index.find(bytes(64)) is None
+    assert len(index) == 1
+
+    strict = TileIndex(flips=False)
+    strict.add(base.data)
+    assert strict.add(base.flipped(h=True).data) == (1, False, False)
+
+
+def test_add_sheet_matches_incremental_adds():
+    rng = random.Random(1)
+    uniques = _random_tiles(rng, 20)
+    tiles = []
+    for _ in range(200):
+        t = Tile(rng.choice(uniques), 2)
+        tiles.append(t.flipped(h=rng.random() < 0.5, v=rng.random() < 0.5).data)
+    incremental = TileIndex()
+    expected = [incremental.add(t) for t in tiles]
+    sheet, refs = dedupe_sheet(b"".join(tiles))
+    assert refs == expected
+    assert sheet == incremental.sheet()
+    assert len(sheet) // 64 == 20
+    # Every ref reproduces its source tile.
+    stored = [sheet[i:i + 64] for i in range(0, len(sheet), 64)]
+    for data, (i, h, v) in zip(tiles, refs):
+        assert Tile(stored[i], 2).flipped(h=h, v=v).data == data
+
+
+def test_symmetric_tiles_prefer_no_flip():
+    index = TileIndex()
+    solid = bytes([3]) * 64
+    index.add(solid)
+    assert index.add(solid) == (0, False, False)
+
+
+def test_bad_lengths_raise():
+    with pytest.raises(ValueError, match="64 pixels"):
+        TileIndex().add(bytes(10))
+    with pytest.raises(ValueError, match="multiple of 64"):
+        TileIndex().add_sheet(bytes(65))
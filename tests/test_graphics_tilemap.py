@@ -0,0 +1,77 @@
+"""Tests for the word-backed `Tilemap` and the functions that accept it."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.graphics import (
+    Palette, Tile, Tilemap, TilemapEntry, decode_tilemap, encode_tilemap,
+    project_tilemap, render_tilemap,
+)
+
+
+def _data(seed: int, n: int) -> bytes:
+    rng = random.Random(seed)
+    return bytes(rng.randrange(256) for _ in range(n * 2))
+
+
+def test_tilemap_fields_match_entries():
+    data = _data(0, 12 * 5)
+    tm = Tilemap.decode(data, 0, 12, 5)
+    entries = [e for row in decode_tilemap(data, 0, 12, 5) for e in row]
+    assert list(tm.tile_indices()) == [e.tile for e in entries]
+    assert list(tm.palettes()) == [e.palette for e in entries]
+    assert list(tm.priorities()) == [int(e.priority) for e in entries]
+    assert list(tm.h_flips()) == [int(e.h_flip) for e in entries]
+    assert list(tm.v_flips()) == [int(e.v_flip) for e in entries]
+    assert tm.entry(3, 2) == entries[2 * 12 + 3]
+    assert [list(r) for r in tm.tile_rows()][1] == [e.tile for e in entries[12:24]]
+
+
+def test_tilemap_round_trips_bytes_and_entries():
+    data = _data(1, 8 * 4)
+    tm = Tilemap.decode(data, 0, 8, 4)
+    assert tm.to_bytes() == data == encode_tilemap(tm)
+    assert Tilemap.from_entries(tm.to_entries()) == tm
+    assert len(tm) == 4 and list(tm[-1]) == list(tm.words[24:])
+    with pytest.raises(ValueError, match="truncated"):
+        Tilemap.decode(data, 2, 8, 4)
+    with pytest.raises(ValueError, match="needs 6 words"):
+        Tilemap(3, 2, [0] * 5)
+
+
+def test_project_and_render_accept_tilemap():
+    data = _data(2, 4 * 3)
+    tm = Tilemap.decode(data, 0, 4, 3)
+    entries = [e for row in tm.to_entries() for e in row]
+    kw = dict(tile_base=7, base_entry=2, dest_cols=8, dest_entries=64,
+              palette_remap={1: 3}, force_priority=True, skip_tiles={tm.words[0] & 0x3FF})
+    assert project_tilemap(tm, 4, 3, **kw) == project_tilemap(entries, 4, 3, **kw)
+
+    rng = random.Random(3)
+    tiles = [Tile(bytes(rng.randrange(16) for _ in range(64)), 4) for _ in range(1024)]
+    pals = [Palette(colors=[(i * 8, i, 255 - i) for i in range(16)]) for _ in range(8)]
+    for hide in (False, True):
+        assert render_tilemap(tm, tiles, pals, hide) == render_tilemap(
+            tm.to_entries(), tiles, pals, hide)
+
+
+def test_tilemap_entry_words_match_dataclass():
+    e = TilemapEntry(tile=0x155, palette=5, priority=True, h_flip=False, v_flip=True)
+    tm = Tilemap(1, 1, [e.to_word()])
+    assert tm.entry(0, 0) == e
+
+
+def test_tmx_export_accepts_tilemap_layer():
+    from retrotool.export.tiled.tmx import build_tmx
+    from retrotool.extraction.level import Level, TileLayer
+
+    data = _data(4, 5 * 3)
+    tm = Tilemap.decode(data, 0, 5, 3)
+    grid = [[e.tile for e in row] for row in tm.to_entries()]
+
+    def tmx(layer):
+        return build_tmx(Level("stage", 40, 24, layers=[layer]))
+
+    assert tmx(TileLayer.from_tilemap("bg1", tm)) == tmx(TileLayer("bg1", 5, 3, grid))
@@ -0,0 +1,112 @@
+"""Tests for the planar tile codec in retrotool.graphics.tiles."""
+from __future__ import annotations
+
+import copy
+import random
+
+import pytest
+
+from retrotool.graphics import (
+    TILE_BYTES, Tile, decode_tile, decode_tile_sheet, decode_tiles, encode_tile,
+    encode_tile_sheet,
+)
+
+
+def _reference_decode(data: bytes, offset: int, bpp: int) -> list[list[int]]:
+    """Straight per-pixel transcription of the SNES planar layouts."""
+    rows = []
+    for y in range(8):
+        row = []
+        for x in range(8):
+            bit = 7 - x
+            v = 0
+            if bpp == 1:
+                v = (data[offset + y] >> bit) & 1
+            else:
+                for plane in range(bpp):
+                    b = data[offset + (plane // 2) * 16 + 2 * y + (plane & 1)]
+                    v |= ((b >> bit) & 1) << plane
+            row.append(v)
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("bpp", [1, 2, 4, 8])
+def test_sheet_matches_reference_layout(bpp):
+    rng = random.Random(bpp)
+    size = TILE_BYTES[bpp]
+    data = bytes(rng.randrange(256) for _ in range(size * 17 + 3))
+    sheet = decode_tile_sheet(data, 3, 17, bpp)
+    assert len(sheet) == 17 * 64
+    for i in range(17):
+        ref = _reference_decode(data, 3 + i * size, bpp)
+        assert list(sheet[i * 64:(i + 1) * 64]) == [v for row in ref for v in row]
+        assert decode_tile(data, 3 + i * size, bpp) == ref
+    assert [t.pixels for t in decode_tiles(data, 3, 17, bpp)] == [
+        _reference_decode(data, 3 + i * size, bpp) for i in range(17)
+    ]
+
+
+@pytest.mark.parametrize("bpp", [1, 2, 4, 8])
+def test_sheet_round_trip(bpp):
+    rng = random.Random(100 + bpp)
+    size = TILE_BYTES[bpp]
+    data = bytes(rng.randrange(256) for _ in range(size * 33))
+    sheet = decode_tile_sheet(data, 0, 33, bpp)
+    assert encode_tile_sheet(sheet, bpp) == data
+    assert encode_tile(decode_tile(data, size, bpp), bpp) == data[size:2 * size]
+
+
+def test_encode_masks_bits_above_bpp():
+    pixels = [[(x + y * 8) | 0x30 for x in range(8)] for y in range(8)]
+    masked = [[v & 0x0F for v in row] for row in pixels]
+    assert encode_tile(pixels, 4) == encode_tile(masked, 4)
+
+
+def test_truncated_sheet_raises():
+    with pytest.raises(ValueError, match="truncated"):
+        decode_tile_sheet(bytes(40), 0, 2, 4)
+    with pytest.raises(ValueError, match="multiple of 64"):
+        encode_tile_sheet(bytes(65), 4)
+    with pytest.raises(ValueError, match="Unsupported bpp"):
+        decode_tile_sheet(bytes(64), 0, 1, 3)
+
+
+def test_tile_accepts_rows_or_flat_buffer():
+    rows = [[(x + y) & 3 for x in range(8)] for y in range(8)]
+    tile = Tile(pixels=rows, bpp=2)
+    assert tile.pixels == rows
+    assert tile.data == bytes(v for row in rows for v in row)
+    assert Tile(tile.data, 2) == tile
+    assert hash(Tile(bytearray(tile.data), 2)) == hash(tile)
+    assert Tile(tile.data, 4) != tile
+    with pytest.raises(ValueError, match="64 pixels"):
+        Tile(bytes(63), 2)
+
+
+def test_pixels_are_read_only_and_edits_go_through_helpers():
+    rows = [[(x + y) & 3 for x in range(8)] for y in range(8)]
+    tile = Tile(rows, 2)
+    with pytest.raises(TypeError, match="with_pixel"):
+        tile.pixels[2][3] = 1
+    with pytest.raises(TypeError, match="read-only"):
+        tile.pixels[0] = [0] * 8
+    edited = tile.with_pixel(3, 2, 1)
+    assert edited.pixels[2][3] == 1 and tile.pixels[2][3] == rows[2][3]
+    assert edited.data[:19] == tile.data[:19] and edited.data[20:] == tile.data[20:]
+    with pytest.raises(IndexError):
+        tile.with_pixel(8, 0, 1)
+    editable = copy.deepcopy(tile.pixels)
+    editable[2][3] = 1
+    assert Tile.from_rows(editable, 2) == edited
+
+
+def test_flipped_variants_match_row_reversal_and_are_cached():
+    rows = [[y * 8 + x for x in range(8)] for y in range(8)]
+    tile = Tile(rows, 8)
+    assert tile.flipped() is tile
+    assert tile.flipped(h=True).pixels == [r[::-1] for r in rows]
+    assert tile.flipped(v=True).pixels == rows[::-1]
+    assert tile.flipped(h=True, v=True).pixels == [r[::-1] for r in rows[::-1]]
+    assert tile.flipped(h=True) is tile.flipped(h=True)
+    assert tile.flipped(h=True).encode() == encode_tile([r[::-1] for r in rows], 8)
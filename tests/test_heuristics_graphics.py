@@ -0,0 +1,101 @@
+"""One-pass graphics window scoring vs. the per-window definitions."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from retrotool.heuristics import scan_graphics, scan_graphics_multi, shannon_entropy
+from retrotool.heuristics.graphics import _abs_diffs, _plane_pair_correlation
+
+
+def _rom(seed: int = 46) -> bytes:
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(30):
+        size = rng.randrange(100, 2500)
+        kind = rng.randrange(3)
+        if kind == 0:
+            parts.append(rng.randbytes(size))
+        elif kind == 1:
+            parts.append(bytes([rng.randrange(4)]) * size)
+        else:
+            base = rng.randrange(256)
+            parts.append(bytes((base + rng.randrange(-8, 9)) % 256 for _ in range(size)))
+    return b"".join(parts)
+
+
+def _reference(rom, bpp=4, tile_bytes=32, window_tiles=32, step_tiles=4,
+               min_entropy=4.0, min_correlation=0.5):
+    w = tile_bytes * window_tiles
+    out = []
+    for off in range(0, len(rom) - w, tile_bytes * step_tiles):
+        block = rom[off:off + w]
+        ent, corr = shannon_entropy(block), _plane_pair_correlation(block)
+        if ent >= min_entropy and corr >= min_correlation:
+            out.append((off, w, bpp, ent, corr))
+    return out
+
+
+@pytest.mark.parametrize("opts", [
+    {},
+    {"bpp": 2, "tile_bytes": 16},
+    {"tile_bytes": 24, "window_tiles": 5, "step_tiles": 3},
+    {"min_entropy": 0.0, "min_correlation": 0.0},
+    {"min_entropy": 2.0, "min_correlation": 0.0},   # 4 distinct bytes reach the bar
+])
+def test_scan_matches_per_window_scores(opts):
+    rom = _rom()
+    got = scan_graphics(rom, **opts)
+    ref = _reference(rom, **opts)
+    assert [(c.offset, c.length, c.bpp) for c in got] == [r[:3] for r in ref]
+    for c, r in zip(got, ref):
+        assert c.entropy == pytest.approx(r[3], abs=1e-9)
+        assert c.plane_correlation == pytest.approx(r[4], abs=1e-12)
+
+
+def test_scan_with_64k_window_matches_per_window_scores():
+    # 2 KiB blocks count in 16-bit lanes, 64 KiB windows need 32-bit lanes.
+    rom = b"".join(_rom(seed) for seed in range(5))
+    opts = {"window_tiles": 2048, "step_tiles": 64, "min_entropy": 2.0}
+    got = scan_graphics(rom, **opts)
+    ref = _reference(rom, **opts)
+    assert ref and [(c.offset, c.length) for c in got] == [r[:2] for r in ref]
+    for c, r in zip(got, ref):
+        assert c.entropy == pytest.approx(r[3], abs=1e-9)
+
+
+def test_zero_step_raises():
+    with pytest.raises(ValueError):
+        scan_graphics(bytes(4096), step_tiles=0)
+    with pytest.raises(ValueError):
+        scan_graphics(bytes(4096), tile_bytes=0)
+    with pytest.raises(ValueError):
+        scan_graphics_multi(bytes(4096), step_tiles=0)
+
+
+def test_multi_matches_single_bpp_scans():
+    rom = _rom(7)
+    multi = scan_graphics_multi(rom, bpps=(2, 4, 8))
+    assert multi == sorted(multi, key=lambda c: (c.offset, c.bpp))
+    for bpp in (2, 4, 8):
+        single = scan_graphics(rom, bpp=bpp, tile_bytes=8 * bpp)
+        assert [c for c in multi if c.bpp == bpp] == single
+
+
+def test_small_and_empty_inputs():
+    assert scan_graphics(b"") == []
+    assert scan_graphics(bytes(1024)) == []          # window must end before the ROM does
+    assert scan_graphics_multi(b"\x01" * 100) == []
+    assert shannon_entropy(b"") == 0.0
+    assert shannon_entropy(bytes(range(256))) == pytest.approx(8.0)
+
+
+def test_abs_diffs():
+    rom = bytes([5, 1, 200, 200, 0, 255, 3])
+    assert _abs_diffs(rom) == bytes([0, 4, 199, 0, 200, 255, 252])
+    assert _abs_diffs(rom[:6]) == bytes([0, 4, 199, 0, 200, 255])
+    assert _abs_diffs(b"\x07") == b"\x00"
+    data = _rom(3)
+    assert _abs_diffs(data) == bytes([0]) + bytes(
+        abs(a - b) for a, b in zip(data[1:], data))
@@ -0,0 +1,135 @@
+"""Whole-ROM classification: overlap resolution, sharding, cache, output."""
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from retrotool.compression.lzss import PARAMS_RBSHURA, LZSSCodec
+from retrotool.heuristics import Region, RomMap, classify_rom, resolve_overlaps
+from retrotool.heuristics import mapper
+
+_ROM_SIZE = 0x40000
+
+
+def _rom() -> tuple[bytes, dict]:
+    rng = random.Random(49)
+    rom = bytearray(rng.randbytes(_ROM_SIZE))
+    spots = {}
+    text = bytes(rng.choice(b"abcdefghijklmnop qrstuvwxyz.,") for _ in range(700))
+    rom[0x9F00:0x9F00 + len(text)] = text                 # crosses a 0x8000 shard edge
+    spots["text"] = (0x9F00, len(text))
+    packed = LZSSCodec(PARAMS_RBSHURA).compress(b"HELLO WORLD " * 200).data
+    rom[0x18000:0x18000 + len(packed)] = packed
+    # 40 monotonic pointers into the table's own bank ($03:8000 = PC 0x18000),
+    # the first at the LZSS block.
+    table = b"".join((0x8000 + 0x100 * k).to_bytes(2, "little") for k in range(40))
+    rom[0x30010:0x30010 + len(table)] = table
+    spots["pointer_table"] = (0x30010, len(table))
+    spots["compressed"] = (0x18000, len(packed))
+    rom[0x38000:0x3A000] = bytes(0x2000)                    # fill
+    return bytes(rom), spots
+
+
+def _kind_at(m: RomMap, offset: int) -> str:
+    for r in m.regions:
+        if r.offset <= offset < r.offset + r.length:
+            return r.kind
+    raise AssertionError(f"{offset:#x} not covered")
+
+
+def test_resolve_overlaps_highest_confidence_wins():
+    regions = [
+        Region(0, 100, "graphics", 0.5),
+        Region(20, 30, "text", 0.9),
+        Region(40, 80, "compressed", 0.7),
+        Region(90, 20, "graphics", 0.6),
+    ]
+    out = resolve_overlaps(regions, 200)
+    assert [(r.offset, r.length, r.kind) for r in out] == [
+        (0, 20, "graphics"), (20, 30, "text"), (50, 70, "compressed"),
+    ]
+    assert out[2].confidence == 0.7
+
+
+def test_classify_finds_planted_regions():
+    rom, spots = _rom()
+    m = classify_rom(rom, jobs=None, shard_size=0x8000)
+    covered = 0
+    for r in m.regions:
+        assert r.offset == covered
+        covered += r.length
+    assert covered == len(rom)
+    for kind in ("text", "pointer_table"):
+        start, length = spots[kind]
+        assert all(_kind_at(m, start + k) == kind for k in (0, length // 2, length - 1))
+    assert _kind_at(m, 0x39000) == "unknown"
+    assert m.sha256 == mapper.sha256_bytes(rom)
+
+
+def test_sharding_and_pool_do_not_change_the_map():
+    rom, _ = _rom()
+    serial = classify_rom(rom, jobs=None, shard_size=0x8000)
+    assert classify_rom(rom, jobs=None, shard_size=0x40000) == serial
+    assert classify_rom(rom, jobs=2, shard_size=0x10000) == serial
+
+
+def _pointer_rom() -> bytes:
+    """Back-to-back 3-byte tables of odd length, so the pointer walk lands
+    on odd offsets, and some longer than `max_entries`."""
+    rng = random.Random(5)
+    rom = bytearray(_ROM_SIZE)
+    pos = 0x201
+    while pos < _ROM_SIZE - 0x800:
+        count = rng.choice((9, 11, 13, 600))
+        rom[pos:pos + 3 * count] = b"".join(
+            (0x808000 + rng.randrange(0x7000)).to_bytes(3, "little") for _ in range(count))
+        pos += 3 * count + rng.choice((0, 0, 1, 3, 0x333))
+    return bytes(rom)
+
+
+def test_pointer_tables_do_not_depend_on_shard_size(monkeypatch):
+    monkeypatch.setattr(mapper, "scan_graphics_multi", lambda *_a, **_k: [])
+    monkeypatch.setattr(mapper, "scan_text_table", lambda *_a, **_k: [])
+    rom = _pointer_rom()
+    whole = classify_rom(rom, jobs=None, shard_size=_ROM_SIZE, min_confidence=0.0)
+    assert whole.totals().get("pointer_table", 0) > _ROM_SIZE // 2
+    for shard_size in (0x1000, 0x3000, 0x8000):
+        assert classify_rom(rom, jobs=None, shard_size=shard_size, min_confidence=0.0) == whole
+
+
+def test_lzss_at_pointer_targets():
+    rom, spots = _rom()
+    m = classify_rom(rom, jobs=None, shard_size=0x8000,       # table and block in other shards
+                     lzss_presets=[("rbshura", PARAMS_RBSHURA)])
+    start, length = spots["compressed"]
+    (region,) = [r for r in m.regions if r.offset <= start < r.offset + r.length]
+    assert region.kind == "compressed" and region.note.startswith("rbshura")
+    assert region.offset + region.length >= start + length
+    assert region.confidence == pytest.approx(0.9)
+
+
+def test_cache_and_outputs(tmp_path, monkeypatch):
+    rom, _ = _rom()
+    first = classify_rom(rom, jobs=None, cache_dir=tmp_path / "cache")
+
+    def boom(*_args):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(mapper, "_run_shard", boom)
+    assert classify_rom(rom, jobs=None, cache_dir=tmp_path / "cache") == first
+    with pytest.raises(AssertionError):
+        classify_rom(rom, jobs=None, min_confidence=0.3, cache_dir=tmp_path / "cache")
+
+    first.write_json(tmp_path / "map.json")
+    assert RomMap.from_dict(json.loads((tmp_path / "map.json").read_text())) == first
+    first.write_html(tmp_path / "map.html", title="Test <ROM>")
+    page = (tmp_path / "map.html").read_text()
+    assert "Test &lt;ROM&gt;" in page and "pointer_table" in page
+    assert sum(first.totals().values()) == len(rom)
+
+
+def test_shard_size_check():
+    with pytest.raises(ValueError):
+        classify_rom(b"\x00" * 0x2000, shard_size=0x1234)
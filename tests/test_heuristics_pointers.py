@@ -0,0 +1,126 @@
+"""Table-driven pointer scanner vs. a per-entry SFCAddress walk."""
+from __future__ import annotations
+
+import contextlib
+import io
+import random
+
+import pytest
+
+from retrotool.core.address import SFCAddress, SFCAddressType
+from retrotool.heuristics import scan_pointer_tables, scan_pointer_tables_multi, table_targets
+
+
+def _reference(rom, entry_size=2, bank=None, address_type=SFCAddressType.LOROM1,
+               min_entries=8, max_entries=512, valid_range=None, step=2):
+    """The original scanner: restart at every `step`, one SFCAddress per entry."""
+    low, high = valid_range if valid_range else (0, len(rom))
+    out = []
+    i = 0
+    while i <= len(rom) - entry_size * min_entries:
+        targets = []
+        j = i
+        while len(targets) < max_entries and j + entry_size <= len(rom):
+            if entry_size == 2:
+                snes = ((bank if bank is not None else j >> 16) << 16) | rom[j] | rom[j + 1] << 8
+            else:
+                snes = rom[j] | rom[j + 1] << 8 | rom[j + 2] << 16
+            with contextlib.redirect_stdout(io.StringIO()):
+                pc = SFCAddress(snes, address_type).get_address(SFCAddressType.PC)
+            if pc is None or not low <= pc < high:
+                break
+            targets.append(pc)
+            j += entry_size
+        if len(targets) >= min_entries:
+            mono = sum(b > a for a, b in zip([-1] + targets, targets))
+            out.append((i, entry_size, len(targets), min(targets), max(targets),
+                        mono / len(targets)))
+            i = j
+        else:
+            i += step
+    return out
+
+
+def _rom(seed: int, size: int = 12000) -> bytes:
+    rng = random.Random(seed)
+    out = bytearray()
+    while len(out) < size:
+        kind = rng.randrange(3)
+        if kind == 0:
+            out += rng.randbytes(rng.randrange(10, 300))
+        elif kind == 1:
+            addr = rng.randrange(0x8000, 0xF000)
+            bank = rng.choice([0x00, 0x80, 0xC0])
+            wide = rng.random() < 0.4
+            for _ in range(rng.randrange(4, 30)):
+                addr = (addr + rng.randrange(0, 200)) & 0xFFFF
+                out += bytes([addr & 0xFF, addr >> 8]) + (bytes([bank]) if wide else b"")
+        else:
+            out += bytes(rng.randrange(40))
+    return bytes(out[:size])
+
+
+def _key(c):
+    return (c.offset, c.entry_size, c.count, c.target_low, c.target_high, c.monotonic_fraction)
+
+
+@pytest.mark.parametrize("address_type", [
+    SFCAddressType.LOROM1, SFCAddressType.LOROM2, SFCAddressType.EXLOROM,
+])
+@pytest.mark.parametrize("opts", [
+    {},
+    {"entry_size": 3, "valid_range": (0, 0x8000)},
+    {"bank": 0x80, "step": 1},
+    {"min_entries": 3, "max_entries": 5, "valid_range": (0x100, 0x2000)},
+    {"entry_size": 3, "step": 2, "min_entries": 2},
+])
+def test_scan_matches_reference(address_type, opts):
+    rom = _rom(47)
+    got = [_key(c) for c in scan_pointer_tables(rom, address_type=address_type, **opts)]
+    assert got == _reference(rom, address_type=address_type, **opts)
+
+
+def test_known_table_found():
+    targets = [0x8000 + 0x40 * k for k in range(10)]
+    rom = bytes(0x200) + b"".join(t.to_bytes(2, "little") for t in targets) + bytes(0x200)
+    (c,) = scan_pointer_tables(rom, bank=0x80)
+    assert (c.offset, c.count, c.bank) == (0x200, 10, 0x80)
+    assert (c.target_low, c.target_high, c.monotonic_fraction) == (0, 0x240, 1.0)
+
+
+def test_multi_is_union_of_single_scans():
+    rom = _rom(3)
+    multi = scan_pointer_tables_multi(rom, entry_sizes=(2, 3), banks=(None, 0x80),
+                                      min_entries=4)
+    expected = []
+    for size, bank in ((2, None), (2, 0x80), (3, None)):
+        expected += scan_pointer_tables(rom, entry_size=size, bank=bank, min_entries=4)
+    key = lambda c: (c.offset, c.entry_size, -1 if c.bank is None else c.bank)
+    assert multi == sorted(expected, key=key)
+    assert {c.bank for c in multi if c.entry_size == 3} <= {None}
+
+
+def test_argument_checks():
+    with pytest.raises(ValueError):
+        scan_pointer_tables(b"\x00" * 64, entry_size=4)
+    with pytest.raises(ValueError):
+        scan_pointer_tables(b"\x00" * 64, step=0)
+    assert scan_pointer_tables(b"") == []
+    assert scan_pointer_tables(b"\x00\x80" * 20, min_entries=9, max_entries=8) == []
+
+
+def test_start_stop_resumes_the_walk():
+    rom = _rom(11)
+    full = scan_pointer_tables_multi(rom, entry_sizes=(2,), min_entries=4)
+    assert len(full) > 6
+    start, stop = full[2].offset, full[-2].offset
+    part = scan_pointer_tables_multi(rom, entry_sizes=(2,), min_entries=4,
+                                     start=start, stop=stop)
+    assert part == full[2:-2]
+
+
+def test_table_targets():
+    targets = [0x8000 + 0x40 * k for k in range(10)]
+    rom = bytes(0x200) + b"".join(t.to_bytes(2, "little") for t in targets) + bytes(0x200)
+    (c,) = scan_pointer_tables(rom, bank=0x80)
+    assert table_targets(rom, c) == [0x40 * k for k in range(10)]
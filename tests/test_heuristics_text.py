@@ -0,0 +1,107 @@
+"""Table-aware text scanner."""
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from retrotool.heuristics import scan_text_table, table_byte_classes
+from retrotool.heuristics.text import (
+    CLASS_CHAR, CLASS_CTRL, CLASS_END, CLASS_LEAD, _decodable,
+)
+from retrotool.script.table import Table
+
+_LOWER = bytes(range(0xA0, 0xBA))
+
+
+@pytest.fixture
+def table(tmp_path: Path) -> Table:
+    lines = ["@ctrl_prefix F0", "@ctrl F0=3", "@ctrl F0.01=4", "FF=<end>", "E0= ", "E1=."]
+    lines += [f"{0xA0 + i:02X}={c}" for i, c in enumerate("abcdefghijklmnopqrstuvwxyz")]
+    lines += ["C000=[k0]", "C001=[k1]", "0005=[z]"]
+    p = tmp_path / "game.tbl"
+    p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return Table(p)
+
+
+def _reference_mask(rom: bytes, table: Table, terminators=()) -> bytes:
+    """Byte-by-byte version of the decodable mask."""
+    classes = table_byte_classes(table, terminators)
+    extra = {0xF0: 3, 0xC0: 1, 0x00: 1}
+    mask = bytearray(len(rom))
+    for i, b in enumerate(rom):
+        if classes[b]:
+            mask[i] = 1
+        for k in range(1, extra.get(b, 0) + 1):
+            if i + k < len(rom):
+                mask[i + k] = 1
+    i = 0
+    while i < len(rom):
+        j = i
+        while j < len(rom) and rom[j] == rom[i]:
+            j += 1
+        if j - i >= 16:
+            mask[i:j] = bytes(j - i)
+        i = j
+    return bytes(mask)
+
+
+def test_byte_classes(table):
+    classes = table_byte_classes(table, terminators=(0xFF,))
+    assert classes[0xA0] == CLASS_CHAR
+    assert classes[0xC0] == CLASS_LEAD
+    assert classes[0x00] == CLASS_LEAD            # 0005 keeps its leading zero
+    assert classes[0x05] == 0
+    assert classes[0xF0] == CLASS_CTRL
+    assert classes[0xFF] == CLASS_CHAR | CLASS_END
+    assert classes[0x41] == 0
+
+
+def test_mask_matches_reference(table):
+    rng = random.Random(48)
+    rom = bytearray(rng.randbytes(6000))
+    rom[100:140] = b"\x11" * 40
+    rom[500:515] = b"\xA3" * 15                   # one short of fill
+    rom[-2:] = b"\xF0\xF0"
+    rom = bytes(rom)
+    classes = table_byte_classes(table)
+    assert _decodable(rom, table, classes) == _reference_mask(rom, table)
+
+
+def test_finds_and_ranks_blocks(table):
+    rng = random.Random(7)
+    rom = bytearray(b"\x13\x37" * 4000)
+    long_text = bytes(rng.choice(_LOWER) for _ in range(300)) + b"\xF0\x12\x34" + b"\xA0\xE1\xFF"
+    short_text = bytes(rng.choice(_LOWER + b"\xE0") for _ in range(40)) + b"\xC0\x01\xFF"
+    rom[1000:1000 + len(long_text)] = long_text
+    rom[5000:5000 + len(short_text)] = short_text
+    blocks = scan_text_table(bytes(rom), table)
+    assert [(b.offset, b.length) for b in blocks] == [
+        (1000, len(long_text)), (5000, len(short_text)),
+    ]
+    assert blocks[0].score > blocks[1].score
+    assert blocks[0].printable_ratio == 1.0
+
+
+def test_gaps_and_coverage(table):
+    text = bytes(_LOWER[:12]) + b"\x13\x37" + bytes(_LOWER[:12])
+    rom = b"\x13\x37\x13\x37" + text + b"\x13\x37\x13\x37"
+    (block,) = scan_text_table(rom, table)
+    assert (block.offset, block.length) == (4, len(text))
+    assert block.printable_ratio == pytest.approx(24 / 26)
+    assert scan_text_table(rom, table, max_gap=1) == []      # halves are too short
+    assert scan_text_table(rom, table, min_coverage=0.99) == []
+
+
+def test_fill_is_not_text(table):
+    assert scan_text_table(b"\xA0" * 500, table) == []
+    assert scan_text_table(b"", table) == []
+
+
+def test_ascii_without_table():
+    rom = b"\x00\x91" * 50 + b"HELLO WORLD, THIS IS TEXT" + b"\x00\x91" * 50
+    (block,) = scan_text_table(rom, None)
+    assert (block.offset, block.length, block.printable_ratio) == (100, 25, 1.0)
+    assert table_byte_classes(None)[0x41] == CLASS_CHAR
+    assert table_byte_classes(None, terminators=(0,))[0] == CLASS_END
@@ -0,0 +1,129 @@
+"""Unit tests for retrotool.script.dte (DTE/MTE dictionary optimizer)."""
+from __future__ import annotations
+
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from retrotool.script.dte import (
+    apply_dte,
+    build_dte_table,
+    free_codes,
+    optimize_dte,
+    savings_estimate,
+)
+from retrotool.script.table import Table
+
+
+_TEXTS = [
+    "the then there",
+    "then the other",
+    "hello there",
+    "[end]there[FF01]",
+]
+
+
+def _write_table(tmp_path: Path, body: str, name: str = "t.tbl") -> Path:
+    p = tmp_path / name
+    p.write_text(body, encoding="utf-8")
+    return p
+
+
+def _ascii_table(tmp_path: Path) -> Path:
+    lines = [f"{ord(c):02X}={c}" for c in "abcdefghijklmnopqrstuvwxyz "]
+    lines += ["00=[end]", "@ctrl_prefix FF"]
+    return _write_table(tmp_path, "\n".join(lines) + "\n")
+
+
+def test_savings_are_recounted_after_each_pick():
+    result = optimize_dte(_TEXTS, [0x80, 0x81, 0x82])
+    # Reported savings match what the map really saves when applied.
+    assert result.savings == savings_estimate(
+        [t.replace("[end]", " ").replace("[FF01]", " ") for t in _TEXTS],
+        result.mapping,
+    )
+    assert result.encoded_size == result.original_size - result.savings
+    assert [code for _, code in result.entries] == [0x80, 0x81, 0x82]
+
+
+def test_overlapping_run_counts_once():
+    result = optimize_dte(["aaa"], [1])
+    assert result.entries == [("aa", 1)]
+    assert result.savings == 1
+
+
+def test_mte_tokens_and_code_reuse():
+    texts = ["abcd abcd abcd abcd"]
+    result = optimize_dte(texts, [0x80, 0x81], max_token_len=4)
+    # `abcd` absorbs every use of any shorter token that led to it, so the
+    # shorter token's code is handed back.
+    assert result.mapping == {"abcd": 0x80}
+    assert result.savings == 4 * 3
+    assert apply_dte("abcd abc", result.mapping) == "[80] abc"
+
+
+def test_opaque_spans_are_not_merged():
+    assert apply_dte("[FF01]ff", {"ff": 0x90, "FF": 0x91}) == "[FF01][90]"
+    result = optimize_dte(["[FF01][FF01][FF01]"], [0x80])
+    assert result.entries == []
+
+
+def test_table_constraints_and_fragment_round_trip(tmp_path):
+    tbl = Table(_ascii_table(tmp_path))
+    codes = free_codes(tbl)
+    assert 0x00 not in codes and 0xFF not in codes and 0x61 not in codes
+    assert 0x80 in codes
+
+    texts = ["the then there", "hello there ÿ"]
+    result = optimize_dte(texts, table=tbl, max_token_len=3, skip_chars="\n")
+    assert result.entries
+    assert all(code in codes for _, code in result.entries)
+    assert all("ÿ" not in tok for tok, _ in result.entries)
+
+    base = _ascii_table(tmp_path).read_text(encoding="utf-8")
+    merged = _write_table(tmp_path, base + result.to_tbl(), "merged.tbl")
+    encoded = Table(merged).encode_text("the then there")
+    assert len(encoded) < len("the then there")
+
+
+def test_build_dte_table_digraphs_only():
+    mapping = build_dte_table(_TEXTS, [0xA0, 0xA1, 0xA2, 0xA3])
+    assert mapping
+    assert all(len(k) == 2 and " " not in k for k in mapping)
+    assert set(mapping.values()) <= {0xA0, 0xA1, 0xA2, 0xA3}
+
+
+def test_min_gain_below_one_is_rejected():
+    for gain in (0, -3):
+        with pytest.raises(ValueError, match="min_gain"):
+            optimize_dte(["hello world", "abc"], codes=range(0x80, 0x100), min_gain=gain)
+    assert optimize_dte(["hello world", "abc"], codes=range(0x80, 0x100), min_gain=1)
+
+
+def _corpus(alphabet: str, sep: str, size: int, entry: int) -> list[str]:
+    """~`size` chars of Zipf-weighted pseudo-words in `entry`-char lines."""
+    rng = random.Random(5)
+    vocab = [''.join(rng.choices(alphabet, k=rng.randint(2, 8))) for _ in range(4000)]
+    words = rng.choices(vocab, [1 / (i + 1) for i in range(len(vocab))], k=size // 4)
+    texts, line, n = [], [], 0
+    for w in words:
+        line.append(w)
+        n += len(w) + len(sep)
+        if n >= entry:
+            texts.append(sep.join(line))
+            line, n = [], 0
+    return texts
+
+
+def test_large_corpus_with_long_entries_is_fast():
+    # ~1 MiB of 160-char entries; spaces are mergeable, so pair counts are
+    # dense and every pick touches thousands of spans.
+    texts = _corpus("abcdefghijklmnopqrstuvwxyz", " ", 1 << 20, 160)
+    start = time.perf_counter()
+    result = optimize_dte(texts, list(range(0x80, 0x100)), skip_chars="\n")
+    elapsed = time.perf_counter() - start
+    assert len(result.entries) == 128
+    assert result.savings == savings_estimate(texts, result.mapping)
+    assert elapsed < 20, f"optimize_dte took {elapsed:.1f}s"